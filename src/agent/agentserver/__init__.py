@@ -0,0 +1,12 @@
+"""에이전트 API 서버(run_server) 공용 도구."""
+from .admission import AdmissionRejected, AdmissionScheduler
+from .concurrency import KeyedLock, SingleFlight, map_unordered, request_key
+
+__all__ = [
+    "AdmissionRejected",
+    "AdmissionScheduler",
+    "KeyedLock",
+    "SingleFlight",
+    "map_unordered",
+    "request_key",
+]
@@ -0,0 +1,174 @@
+"""LLM 호출 admission control: 백엔드별 동시 실행 상한 + 대기열 (우선순위, 사용자별 공정성).
+
+- 실행 중인 호출이 max_inflight 미만이면 바로 실행.
+- 아니면 대기열에 넣음. 슬롯이 비면 가장 높은 우선순위(숫자가 작을수록 높음) 중에서
+  사용자 단위 라운드 로빈으로 다음 요청을 깨움 (한 사용자가 대기열을 독점하지 못하도록).
+- 대기열이 가득 찼거나 max_wait 동안 슬롯을 못 받으면 AdmissionRejected (HTTP 429 + Retry-After).
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+
+
+class AdmissionRejected(Exception):
+    """대기열 포화 또는 대기 시간 초과. retry_after: 재시도까지 권장 대기(초)."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("user_id", "future", "enqueued")
+
+    def __init__(self, user_id: str, future: asyncio.Future):
+        self.user_id = user_id
+        self.future = future
+        self.enqueued = time.monotonic()
+
+
+class AdmissionScheduler:
+    def __init__(
+        self,
+        name: str,
+        max_inflight: int = 4,
+        max_queue: int = 64,
+        max_wait: float = 60.0,
+    ):
+        self.name = name
+        self._max_inflight = max(1, max_inflight)
+        self._max_queue = max(0, max_queue)
+        self._max_wait = max_wait
+        self._inflight = 0
+        # priority -> (user_id -> deque[_Waiter]); 사용자 순서가 라운드 로빈 순서
+        self._queues: dict[int, OrderedDict[str, deque[_Waiter]]] = {}
+        self._queued = 0
+        # 메트릭
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.wait_count = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self._service_ewma = 0.0
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queued
+
+    def _retry_after(self) -> int:
+        """대기열이 빠지는 데 걸릴 시간 추정 (평균 실행 시간 × 앞선 요청 수 / 동시 실행 수)."""
+        per_slot = self._service_ewma or 1.0
+        return max(1, math.ceil(per_slot * (self._queued + 1) / self._max_inflight))
+
+    @asynccontextmanager
+    async def slot(self, user_id: str = "", priority: int = 0) -> AsyncIterator[None]:
+        """실행 슬롯을 얻은 동안만 블록 실행. 얻지 못하면 AdmissionRejected."""
+        await self._acquire(user_id, priority)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            self._service_ewma = elapsed if not self._service_ewma else 0.8 * self._service_ewma + 0.2 * elapsed
+            self._release()
+
+    async def _acquire(self, user_id: str, priority: int) -> None:
+        if self._inflight < self._max_inflight and self._queued == 0:
+            self._inflight += 1
+            self.admitted += 1
+            self._record_wait(0.0)
+            return
+        if self._queued >= self._max_queue:
+            self.rejected += 1
+            raise AdmissionRejected(f"{self.name}: queue full ({self._queued} waiting)", self._retry_after())
+        waiter = _Waiter(user_id, asyncio.get_running_loop().create_future())
+        users = self._queues.setdefault(priority, OrderedDict())
+        users.setdefault(user_id, deque()).append(waiter)
+        self._queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=self._max_wait)
+        except BaseException as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # 슬롯을 받은 직후 취소/타임아웃 → 다음 대기자에게 넘김
+                self._release()
+            else:
+                waiter.future.cancel()
+                self._remove(priority, waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                self.timed_out += 1
+                raise AdmissionRejected(
+                    f"{self.name}: waited {self._max_wait:.0f}s without a free slot", self._retry_after()
+                ) from None
+            raise
+        self.admitted += 1
+        self._record_wait(time.monotonic() - waiter.enqueued)
+
+    def _remove(self, priority: int, waiter: _Waiter) -> None:
+        users = self._queues.get(priority)
+        if not users or waiter.user_id not in users:
+            return
+        q = users[waiter.user_id]
+        try:
+            q.remove(waiter)
+        except ValueError:
+            return
+        self._queued -= 1
+        if not q:
+            del users[waiter.user_id]
+        if not users:
+            del self._queues[priority]
+
+    def _release(self) -> None:
+        self._inflight -= 1
+        while self._queued and self._inflight < self._max_inflight:
+            waiter = self._next_waiter()
+            if waiter is None:
+                break
+            self._inflight += 1
+            waiter.future.set_result(None)
+
+    def _next_waiter(self) -> _Waiter | None:
+        for priority in sorted(self._queues):
+            users = self._queues[priority]
+            while users:
+                user_id, q = next(iter(users.items()))
+                waiter = q.popleft()
+                self._queued -= 1
+                # 라운드 로빈: 이 사용자의 다음 요청은 다른 사용자 뒤로
+                del users[user_id]
+                if q:
+                    users[user_id] = q
+                if not users:
+                    del self._queues[priority]
+                if not waiter.future.done():
+                    return waiter
+                if priority not in self._queues:
+                    break
+        return None
+
+    def _record_wait(self, seconds: float) -> None:
+        self.wait_count += 1
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "backend": self.name,
+            "inflight": self._inflight,
+            "max_inflight": self._max_inflight,
+            "queue_depth": self._queued,
+            "max_queue": self._max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "wait_seconds_avg": round(self.wait_seconds_total / self.wait_count, 4) if self.wait_count else 0.0,
+            "wait_seconds_max": round(self.wait_seconds_max, 4),
+        }
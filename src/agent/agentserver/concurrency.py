@@ -0,0 +1,118 @@
+"""/run 동시성 도구: 동일 요청 single-flight, 세션별 직렬화, 동시 실행 수 제한 map (/run_batch)."""
+import asyncio
+import hashlib
+import json
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Hashable, Sequence
+
+
+def request_key(req: dict, *scope: str) -> tuple[str, ...]:
+    """SingleFlight 키: scope(사용자/세션 등) + 요청 본문 전체의 해시.
+    newMessage가 같아도 동작을 바꾸는 필드(forceLlm, priority 등)가 다르면 합치지 않음."""
+    body = json.dumps(req, sort_keys=True, ensure_ascii=False, default=str)
+    return (*scope, hashlib.sha256(body.encode("utf-8")).hexdigest())
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """같은 키로 동시에 들어온 호출은 첫 호출의 결과(또는 예외)를 공유.
+    fn은 호출자와 분리된 task로 실행하고 모든 호출자가 shield로 기다림: 어느 호출자(첫 호출 포함)가 취소돼도
+    나머지는 결과를 받음. 기다리는 호출자가 모두 취소되면 그때 task를 취소.
+    완료된 호출은 기억하지 않음 (진행 중인 호출만 합침)."""
+
+    def __init__(self):
+        self._calls: dict[Hashable, _Flight] = {}
+        self.leaders = 0
+        self.shared = 0
+        self.abandoned = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        flight = self._calls.get(key)
+        if flight is None:
+            flight = self._calls[key] = _Flight(asyncio.ensure_future(fn()))
+            flight.task.add_done_callback(lambda task: self._done(key, flight))
+            self.leaders += 1
+        else:
+            self.shared += 1
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # 결과를 기다리는 호출자가 없음: 실행 중단, 이후 같은 키는 새로 실행
+                self.abandoned += 1
+                self._forget(key, flight)
+                flight.task.cancel()
+
+    def _done(self, key: Hashable, flight: _Flight) -> None:
+        self._forget(key, flight)
+        if not flight.task.cancelled():
+            # 대기자가 모두 떠난 뒤 끝난 경우 "exception was never retrieved" 경고 방지
+            flight.task.exception()
+
+    def _forget(self, key: Hashable, flight: _Flight) -> None:
+        if self._calls.get(key) is flight:
+            del self._calls[key]
+
+    def stats(self) -> dict[str, int]:
+        return {"in_flight": len(self._calls), "leaders": self.leaders, "shared": self.shared,
+                "abandoned": self.abandoned}
+
+
+class KeyedLock:
+    """키(세션)별 asyncio.Lock. 사용 중인 키만 보관."""
+
+    def __init__(self):
+        self._locks: dict[Hashable, tuple[asyncio.Lock, int]] = {}
+
+    @asynccontextmanager
+    async def hold(self, key: Hashable) -> AsyncIterator[None]:
+        lock, refs = self._locks.get(key) or (asyncio.Lock(), 0)
+        self._locks[key] = (lock, refs + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, refs = self._locks[key]
+            if refs <= 1:
+                del self._locks[key]
+            else:
+                self._locks[key] = (lock, refs - 1)
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+
+async def map_unordered(
+    fn: Callable[[Any], Awaitable[Any]], items: Sequence[Any], limit: int
+) -> AsyncIterator[tuple[int, Any, BaseException | None]]:
+    """items를 최대 limit개씩 동시에 fn으로 실행하고, 끝나는 순서대로 (index, 결과, 예외) 생성.
+    항목의 예외는 생성 값으로 전달 (나머지 항목은 계속 실행). 소비자가 중단(취소/aclose)하면 남은 작업 취소."""
+    done: asyncio.Queue = asyncio.Queue()
+    pending = iter(range(len(items)))
+
+    async def worker() -> None:
+        for i in pending:
+            try:
+                done.put_nowait((i, await fn(items[i]), None))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                done.put_nowait((i, None, e))
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, min(limit, len(items))))]
+    try:
+        for _ in range(len(items)):
+            yield await done.get()
+    finally:
+        for w in workers:
+            w.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
@@ -0,0 +1,133 @@
+"""Prometheus 메트릭 (/metrics): /run 단계별 지연, 진행 중 요청 수, LLM 토큰/지연, 오류 카운터.
+
+- 단계 히스토그램: run_server가 stage_timer(endpoint, stage)로 측정 (queue_wait, pre_append, runner, serialize, total,
+  /run_sse의 title_ready = 요청부터 제목 field 이벤트까지). 프로파일링 대상 요청이면 캡처의 단계별 시간에도 기록.
+- LLM: MetricsPlugin(plugin.py, ADK Runner plugin)이 모델 호출마다 TTFT/전체 시간, prompt/completion 토큰, 오류를 backend 라벨로 기록.
+- 기존 stats() 딕셔너리(admission, 응답 캐시 등)는 register_stats로 등록하면 scrape 시점에만 읽어 게이지로 노출.
+prometheus_client가 없으면 모든 메트릭은 no-op, render()는 None.
+"""
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+    from prometheus_client.core import GaugeMetricFamily
+except ImportError:
+    Counter = Gauge = Histogram = None
+
+from .profiling import record_stage
+
+_STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80)
+
+
+class _Noop:
+    def labels(self, *args: Any, **kwargs: Any) -> "_Noop":
+        return self
+
+    def observe(self, value: float) -> None:
+        pass
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+    def dec(self, amount: float = 1) -> None:
+        pass
+
+
+_NOOP = _Noop()
+
+if Histogram is not None:
+    RUN_STAGE_SECONDS = Histogram(
+        "diagram_agent_run_stage_seconds", "Time spent per /run stage", ["endpoint", "stage"], buckets=_STAGE_BUCKETS
+    )
+    RUNS_IN_FLIGHT = Gauge("diagram_agent_runs_in_flight", "Runs currently being handled", ["endpoint"])
+    LLM_SECONDS = Histogram(
+        "diagram_agent_llm_seconds", "LLM time to first token (ttft) and total generation time",
+        ["backend", "phase"], buckets=_STAGE_BUCKETS,
+    )
+    LLM_IN_FLIGHT = Gauge("diagram_agent_llm_in_flight", "LLM calls currently generating", ["backend"])
+    LLM_TOKENS = Counter("diagram_agent_llm_tokens_total", "LLM tokens by kind (prompt/completion)", ["backend", "kind"])
+    ERRORS = Counter("diagram_agent_errors_total", "Errors by backend and stage", ["backend", "stage"])
+else:
+    RUN_STAGE_SECONDS = RUNS_IN_FLIGHT = LLM_SECONDS = LLM_IN_FLIGHT = LLM_TOKENS = ERRORS = _NOOP
+
+
+def observe_stage(endpoint: str, stage: str, seconds: float) -> None:
+    RUN_STAGE_SECONDS.labels(endpoint, stage).observe(seconds)
+    record_stage(stage, seconds)
+
+
+@contextmanager
+def stage_timer(endpoint: str, stage: str) -> Iterator[None]:
+    """블록 실행 시간을 RUN_STAGE_SECONDS{endpoint, stage}에 기록 (예외가 나도 기록)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(endpoint, stage, time.perf_counter() - started)
+
+
+@contextmanager
+def in_flight(endpoint: str) -> Iterator[None]:
+    gauge = RUNS_IN_FLIGHT.labels(endpoint)
+    gauge.inc()
+    try:
+        yield
+    finally:
+        gauge.dec()
+
+
+class _StatsCollector:
+    """등록된 stats() 딕셔너리의 숫자 값을 scrape 시점에 diagram_agent_<name>_<key> 게이지로."""
+
+    def __init__(self) -> None:
+        self._sources: list[tuple[str, Callable[[], Any], str | None]] = []
+
+    def add(self, name: str, fn: Callable[[], Any], label: str | None) -> None:
+        self._sources.append((name, fn, label))
+
+    def collect(self) -> Iterator[Any]:
+        for name, fn, label in self._sources:
+            try:
+                data = fn()
+            except Exception:
+                continue
+            if data is None:
+                continue
+            rows = data if isinstance(data, list) else [data]
+            families: dict[str, Any] = {}
+            for row in rows:
+                if not isinstance(row, dict):
+                    continue
+                label_values = [str(row.get(label, ""))] if label else []
+                for key, value in row.items():
+                    if isinstance(value, bool):
+                        value = int(value)
+                    if not isinstance(value, (int, float)):
+                        continue
+                    metric = f"diagram_agent_{name}_{key}"
+                    family = families.get(metric)
+                    if family is None:
+                        family = families[metric] = GaugeMetricFamily(
+                            metric, f"{name} {key}", labels=[label] if label else []
+                        )
+                    family.add_metric(label_values, value)
+            yield from families.values()
+
+
+_stats_collector = _StatsCollector()
+if Gauge is not None:
+    REGISTRY.register(_stats_collector)
+
+
+def register_stats(name: str, fn: Callable[[], Any], label: str | None = None) -> None:
+    """fn()이 반환하는 dict(또는 label 키를 가진 dict 목록)의 숫자 값을 /metrics에 노출."""
+    _stats_collector.add(name, fn, label)
+
+
+def render() -> tuple[bytes, str] | None:
+    """(본문, Content-Type). prometheus_client가 없으면 None."""
+    if Gauge is None:
+        return None
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,74 @@
+"""ADK Runner plugin: 모델 호출마다 LLM 메트릭 기록 (metrics.py의 LLM_* / ERRORS).
+
+metrics.py와 분리: ADK plugin 기반 클래스 import(google.genai 포함)가 커서, 에이전트/Runner를 만들 때만 import.
+"""
+import time
+from collections import OrderedDict
+from typing import Any
+
+from google.adk.plugins.base_plugin import BasePlugin
+
+from .metrics import ERRORS, LLM_IN_FLIGHT, LLM_SECONDS, LLM_TOKENS
+
+
+class _LlmCall:
+    __slots__ = ("started", "first_token")
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.first_token = False
+
+
+class MetricsPlugin(BasePlugin):
+    """모델 호출 단위 LLM 메트릭. 응답 캐시 히트처럼 모델을 부르지 않은 호출은 after_run에서 정리."""
+
+    def __init__(self, backend: str, max_pending: int = 1024):
+        super().__init__(name="metrics")
+        self._backend = backend
+        self._max_pending = max_pending
+        self._calls: OrderedDict[str, _LlmCall] = OrderedDict()
+
+    def _finish(self, invocation_id: str) -> _LlmCall | None:
+        call = self._calls.pop(invocation_id, None)
+        if call is not None:
+            LLM_IN_FLIGHT.labels(self._backend).dec()
+        return call
+
+    async def before_model_callback(self, *, callback_context: Any, llm_request: Any) -> None:
+        key = callback_context.invocation_id
+        self._finish(key)
+        self._calls[key] = _LlmCall()
+        LLM_IN_FLIGHT.labels(self._backend).inc()
+        while len(self._calls) > self._max_pending:
+            self._finish(next(iter(self._calls)))
+        return None
+
+    async def after_model_callback(self, *, callback_context: Any, llm_response: Any) -> None:
+        key = callback_context.invocation_id
+        call = self._calls.get(key)
+        if call is None:
+            return None
+        now = time.perf_counter()
+        if not call.first_token:
+            call.first_token = True
+            LLM_SECONDS.labels(self._backend, "ttft").observe(now - call.started)
+        if getattr(llm_response, "partial", False):
+            return None
+        self._finish(key)
+        LLM_SECONDS.labels(self._backend, "total").observe(now - call.started)
+        usage = getattr(llm_response, "usage_metadata", None)
+        if usage is not None:
+            LLM_TOKENS.labels(self._backend, "prompt").inc(getattr(usage, "prompt_token_count", 0) or 0)
+            LLM_TOKENS.labels(self._backend, "completion").inc(getattr(usage, "candidates_token_count", 0) or 0)
+        if getattr(llm_response, "error_code", None):
+            ERRORS.labels(self._backend, "llm").inc()
+        return None
+
+    async def on_model_error_callback(self, *, callback_context: Any, llm_request: Any, error: Exception) -> None:
+        self._finish(callback_context.invocation_id)
+        ERRORS.labels(self._backend, "llm").inc()
+        return None
+
+    async def after_run_callback(self, *, invocation_context: Any) -> None:
+        self._finish(invocation_context.invocation_id)
+        return None
@@ -0,0 +1,349 @@
+"""요청 단위 프로파일링: 샘플링 프로파일러 + 느린 요청 캡처 (/admin/profiles).
+
+- 대상 요청: paths에 해당하는 요청만. `X-Profile: <token>` 헤더(token이 설정된 경우에만 인정), 또는
+  sample_percent 확률로 뽑힌 요청은 처음부터 프로파일링. 그 밖의 요청은 slow 임계값을 넘는 순간부터
+  프로파일링 (느린 구간만; 타이머 하나 외에 비용 없음).
+- 샘플러: 프로파일링 중인 요청이 있을 때만 도는 데몬 스레드. interval마다 sys._current_frames()로 모든 스레드의
+  스택을 접어(folded) 진행 중인 캡처에 더함 (일감을 기다리는 스레드 풀 워커는 제외). 이벤트 루프는 모든 요청이
+  공유하므로 샘플은 프로세스 전체의 것 (동시에 처리 중인 다른 요청의 스택도 섞임).
+- 단계별 시간: stage_timer(metrics.py)가 record_stage로 현재 요청의 캡처에 더함 (contextvar).
+- 저장: 캡처 하나 = JSON 파일 하나. 디렉터리에 최근 max_captures개만 유지 (링 버퍼, 워커 간 공유 가능).
+  folded 형식("스레드;바깥 프레임;...;안쪽 프레임 횟수")은 flamegraph.pl, speedscope, inferno에서 바로 열림.
+ProfilingMiddleware는 순수 ASGI라 요청과 같은 태스크에서 실행되어 contextvar가 핸들러/스트리밍 본문까지 이어짐.
+"""
+import asyncio
+import hmac
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+# 일감을 기다리는 스레드 풀 워커의 가장 안쪽 프레임 (파일, 함수): 샘플에서 제외
+_IDLE_FRAMES = frozenset({("threading.py", "wait"), ("queue.py", "get"), ("thread.py", "_worker")})
+
+
+class _Capture:
+    __slots__ = (
+        "id", "time", "started", "method", "path", "reason", "status", "stages",
+        "stacks", "samples", "profile_started", "timer",
+    )
+
+    def __init__(self, method: str, path: str, reason: str | None):
+        self.id = f"{int(time.time() * 1000):013d}-{uuid.uuid4().hex[:8]}"
+        self.time = time.time()
+        self.started = time.perf_counter()
+        self.method = method
+        self.path = path
+        self.reason = reason
+        self.status = 0
+        self.stages: dict[str, float] = {}
+        self.stacks: dict[str, int] = {}
+        self.samples = 0
+        self.profile_started = 0.0
+        self.timer: asyncio.TimerHandle | None = None
+
+
+_current: ContextVar[_Capture | None] = ContextVar("profile_capture", default=None)
+
+
+def record_stage(stage: str, seconds: float) -> None:
+    """현재 요청이 캡처 대상이면 단계 시간을 더함 (같은 단계가 여러 번이면 합계)."""
+    capture = _current.get()
+    if capture is not None:
+        capture.stages[stage] = capture.stages.get(stage, 0.0) + seconds
+
+
+class _Sampler:
+    """진행 중인 캡처가 있을 때만 스택을 샘플링하는 데몬 스레드."""
+
+    def __init__(self, interval: float, max_seconds: float, max_depth: int = 256):
+        self._interval = interval
+        self._max_seconds = max_seconds
+        self._max_depth = max_depth
+        self._active: set[_Capture] = set()
+        self._cond = threading.Condition()
+        self._thread: threading.Thread | None = None
+        self._labels: dict[Any, str] = {}
+        self.ticks = 0
+
+    def add(self, capture: _Capture) -> None:
+        with self._cond:
+            capture.profile_started = time.perf_counter()
+            self._active.add(capture)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def discard(self, capture: _Capture) -> None:
+        with self._cond:
+            self._active.discard(capture)
+
+    @property
+    def active(self) -> int:
+        return len(self._active)
+
+    def _label(self, code: Any) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            name = getattr(code, "co_qualname", code.co_name)
+            filename = os.path.basename(code.co_filename)
+            # folded 형식의 구분자(;)와 개수 앞 공백이 깨지지 않도록
+            label = f"{name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+            if len(self._labels) < 65536:
+                self._labels[code] = label
+        return label
+
+    def _fold(self, thread_name: str, frame: Any) -> str | None:
+        code = frame.f_code
+        if (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES and thread_name != "MainThread":
+            return None
+        names = []
+        while frame is not None and len(names) < self._max_depth:
+            names.append(self._label(frame.f_code))
+            frame = frame.f_back
+        if frame is not None:
+            names.append("(truncated)")
+        names.append(thread_name.replace(";", ":").replace(" ", "_"))
+        names.reverse()
+        return ";".join(names)
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while True:
+            with self._cond:
+                while not self._active:
+                    self._cond.wait()
+            time.sleep(self._interval)
+            threads = {t.ident: t.name for t in threading.enumerate()}
+            frames = sys._current_frames()
+            stacks = [self._fold(threads.get(tid, str(tid)), f) for tid, f in frames.items() if tid != me]
+            del frames
+            stacks = [stack for stack in stacks if stack is not None]
+            now = time.perf_counter()
+            with self._cond:
+                self.ticks += 1
+                for capture in self._active:
+                    if now - capture.profile_started > self._max_seconds:
+                        continue
+                    capture.samples += 1
+                    for stack in stacks:
+                        capture.stacks[stack] = capture.stacks.get(stack, 0) + 1
+
+
+class RequestProfiler:
+    """캡처 대상 선정, 느린 요청 타이머, 디스크 링 버퍼."""
+
+    def __init__(
+        self,
+        directory: str,
+        *,
+        paths: tuple[str, ...] = ("/run", "/run_sse"),
+        sample_percent: float = 0.0,
+        slow_seconds: float = 0.0,
+        interval: float = 0.01,
+        max_seconds: float = 60.0,
+        max_captures: int = 50,
+        token: str = "",
+    ):
+        self.directory = directory
+        self._token = token.encode()  # 비어 있으면 X-Profile 헤더 무시
+        self._paths = frozenset(p for path in paths for p in (path, "/api" + path))
+        self._sample = max(0.0, min(100.0, sample_percent)) / 100.0
+        self._slow = max(0.0, slow_seconds)
+        self._interval = interval
+        self._max_captures = max(1, max_captures)
+        self._sampler = _Sampler(interval, max_seconds)
+        os.makedirs(directory, exist_ok=True)
+        self.captures = {"header": 0, "sampled": 0, "slow": 0}
+        self.write_errors = 0
+
+    def begin(self, scope: dict[str, Any]) -> _Capture | None:
+        """이 요청을 추적할지 결정. 추적하지 않으면 None (미들웨어는 그대로 통과)."""
+        path = scope.get("path", "")
+        if path not in self._paths:
+            return None
+        if self._header(scope):
+            reason = "header"
+        elif self._sample and random.random() < self._sample:
+            reason = "sampled"
+        elif self._slow:
+            reason = None
+        else:
+            return None
+        capture = _Capture(scope.get("method", ""), path, reason)
+        if reason is not None:
+            self._sampler.add(capture)
+        else:
+            capture.timer = asyncio.get_running_loop().call_later(self._slow, self._sampler.add, capture)
+        return capture
+
+    def _header(self, scope: dict[str, Any]) -> bool:
+        """X-Profile 헤더가 설정된 token과 같은지 (token이 없으면 항상 False)."""
+        if not self._token:
+            return False
+        return any(k == PROFILE_HEADER and hmac.compare_digest(v.strip(), self._token)
+                   for k, v in scope.get("headers", ()))
+
+    async def end(self, capture: _Capture) -> None:
+        total = time.perf_counter() - capture.started
+        if capture.timer is not None:
+            capture.timer.cancel()
+        self._sampler.discard(capture)
+        if capture.reason is None:
+            if total < self._slow:
+                return
+            capture.reason = "slow"
+        self.captures[capture.reason] += 1
+        record = {
+            "id": capture.id,
+            "time": capture.time,
+            "method": capture.method,
+            "path": capture.path,
+            "status": capture.status,
+            "reason": capture.reason,
+            "total_ms": round(total * 1000, 1),
+            "stages_ms": {name: round(s * 1000, 1) for name, s in capture.stages.items()},
+            # 느린 요청은 임계값을 넘은 뒤부터만 샘플링
+            "profiled_from_ms": round((capture.profile_started - capture.started) * 1000, 1) if capture.samples else None,
+            "interval_ms": self._interval * 1000,
+            "samples": capture.samples,
+            "stacks": capture.stacks,
+        }
+        try:
+            await asyncio.to_thread(self._write, record)
+        except OSError as e:
+            self.write_errors += 1
+            logger.warning("writing profile %s failed: %s", capture.id, e)
+            return
+        logger.info("profile %s captured (%s, %s %s, %.0fms)", capture.id, capture.reason, capture.method,
+                    capture.path, total * 1000)
+
+    def _write(self, record: dict[str, Any]) -> None:
+        path = os.path.join(self.directory, record["id"] + ".json")
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        names = self._names()
+        for name in names[:-self._max_captures]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def _names(self) -> list[str]:
+        """캡처 파일 이름, 오래된 것부터 (이름이 시각으로 시작)."""
+        try:
+            return sorted(n for n in os.listdir(self.directory) if n.endswith(".json"))
+        except FileNotFoundError:
+            return []
+
+    def load(self, capture_id: str) -> dict[str, Any] | None:
+        if not capture_id or os.path.basename(capture_id) != capture_id or capture_id.startswith("."):
+            return None
+        try:
+            with open(os.path.join(self.directory, capture_id + ".json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def summaries(self) -> list[dict[str, Any]]:
+        """캡처 요약 (최신 순, 스택 제외)."""
+        out = []
+        for name in reversed(self._names()):
+            record = self.load(name[:-len(".json")])
+            if record is not None:
+                record.pop("stacks", None)
+                out.append(record)
+        return out
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            **{f"captures_{reason}": n for reason, n in self.captures.items()},
+            "write_errors": self.write_errors,
+            "profiling": self._sampler.active,
+            "sampler_ticks": self._sampler.ticks,
+            "sample_percent": self._sample * 100,
+            "slow_ms": self._slow * 1000,
+            "header_enabled": bool(self._token),
+        }
+
+
+def folded(stacks: dict[str, int]) -> str:
+    """flamegraph folded 형식 텍스트 (한 줄에 "스택 횟수", 많은 순)."""
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(stacks.items(), key=lambda kv: -kv[1]))
+
+
+class ProfilingMiddleware:
+    """RequestProfiler.begin/end로 요청을 감쌈. 추적 대상이 아니면 바로 통과."""
+
+    def __init__(self, app: Any, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        capture = self.profiler.begin(scope)
+        if capture is None:
+            return await self.app(scope, receive, send)
+
+        async def send_wrapper(message: dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                capture.status = message.get("status", 0)
+                if capture.reason is not None:
+                    # 처음부터 프로파일링한 요청은 캡처 id를 알려 줌 (GET /admin/profiles/{id})
+                    message = {**message, "headers": [*message.get("headers", ()), (b"x-profile-id", capture.id.encode())]}
+            await send(message)
+
+        token = _current.set(capture)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            await self.profiler.end(capture)
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "").strip() or default)
+    except ValueError:
+        logger.warning("invalid %s, using %s", name, default)
+        return default
+
+
+def build_profiler() -> RequestProfiler | None:
+    """env 기반 생성. PROFILE_ENABLED=true 일 때만 (기본은 None — 미들웨어도 설치하지 않음)."""
+    if os.getenv("PROFILE_ENABLED", "false").strip().lower() not in ("true", "1", "yes", "on"):
+        return None
+    directory = os.getenv("PROFILE_DIR", "").strip() or os.path.join(tempfile.gettempdir(), "diagram-agent-profiles")
+    paths = tuple(p.strip().rstrip("/") for p in os.getenv("PROFILE_PATHS", "/run,/run_sse").split(",") if p.strip())
+    try:
+        profiler = RequestProfiler(
+            directory,
+            paths=paths,
+            sample_percent=_env_float("PROFILE_SAMPLE_PERCENT", 0.0),
+            slow_seconds=_env_float("PROFILE_SLOW_MS", 10000.0) / 1000,
+            interval=max(0.001, _env_float("PROFILE_INTERVAL_MS", 10.0) / 1000),
+            max_seconds=_env_float("PROFILE_MAX_SECONDS", 60.0),
+            max_captures=int(_env_float("PROFILE_MAX_CAPTURES", 50)),
+            token=os.getenv("PROFILE_TOKEN", "").strip(),
+        )
+    except OSError as e:
+        logger.warning("profile directory %s unavailable (%s); profiling disabled", directory, e)
+        return None
+    stats = profiler.stats()
+    logger.info("Request profiling: dir=%s, paths=%s, sample=%s%%, slow=%sms, header=%s", directory, ",".join(paths),
+                stats["sample_percent"], stats["slow_ms"], "token" if stats["header_enabled"] else "off")
+    return profiler
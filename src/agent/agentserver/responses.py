@@ -0,0 +1,85 @@
+"""JSON 바이트 직렬화 경로 (/run, /run_sse, in-memory 세션 API).
+
+ADK Event는 pydantic-core 직렬화기로 바로 camelCase JSON 바이트를 만들고(by_alias, exclude_none —
+ADK api_server와 같은 형식), 응답은 JSONBytesResponse로 보내 FastAPI의 jsonable_encoder + json.dumps를 거치지 않음.
+그 외 dict/list는 orjson(있으면) 또는 표준 json으로 인코딩.
+"""
+import json
+from typing import Any, Awaitable, Callable, Iterable
+
+from fastapi.responses import Response, StreamingResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(obj: Any) -> bytes:
+    """compact UTF-8 JSON. 직렬화할 수 없는 값은 str()."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def _default(obj: Any) -> Any:
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(mode="json", by_alias=True, exclude_none=True)
+    if hasattr(obj, "__dict__"):
+        return vars(obj)
+    return str(obj)
+
+
+def event_json(ev: Any) -> bytes:
+    """ADK Event(pydantic) -> REST JSON 바이트. pydantic 모델이 아니면 dumps."""
+    serializer = getattr(type(ev), "__pydantic_serializer__", None)
+    if serializer is not None:
+        return serializer.to_json(ev, by_alias=True, exclude_none=True)
+    return dumps(ev)
+
+
+def events_json(events: Iterable[Any]) -> bytes:
+    return b"[" + b",".join(event_json(ev) for ev in events) + b"]"
+
+
+def session_json(session: Any) -> bytes:
+    """ADK Session -> {id, appName, userId, lastUpdateTime, state, events} 바이트 (events는 event_json으로)."""
+    head = dumps({
+        "id": getattr(session, "id", ""),
+        "appName": getattr(session, "app_name", ""),
+        "userId": getattr(session, "user_id", ""),
+        "lastUpdateTime": getattr(session, "last_update_time", 0),
+        "state": getattr(session, "state", {}),
+    })
+    return head[:-1] + b',"events":' + events_json(getattr(session, "events", None) or []) + b"}"
+
+
+class JSONBytesResponse(Response):
+    """이미 인코딩된 JSON 바이트는 그대로, 그 외 값은 dumps로 렌더링."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, (bytes, bytearray, memoryview)):
+            return bytes(content)
+        return dumps(content)
+
+
+class ClosingStreamingResponse(StreamingResponse):
+    """본문을 끝까지 보내지 못해도 (첫 청크 전 연결 끊김, 전송 오류, 취소) 본문 생성기를 닫고 on_close를 호출.
+    핸들러에서 잡은 자원(세션 락, LLM 슬롯)을 생성기의 finally에만 맡기면 생성기가 시작되지 않았을 때 풀리지 않음."""
+
+    def __init__(self, content: Any, on_close: Callable[[], Awaitable[Any]], **kwargs: Any):
+        super().__init__(content, **kwargs)
+        self._on_close = on_close
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            try:
+                close = getattr(self.body_iterator, "aclose", None)
+                if close is not None:
+                    await close()
+            finally:
+                await self._on_close()
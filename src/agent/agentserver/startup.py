@@ -0,0 +1,130 @@
+"""기동 시간 측정과 준비 상태(readiness).
+
+프로세스가 떠서 /health에 응답하는 것(liveness)과 요청을 제 속도로 처리할 수 있는 것(readiness)을 구분.
+
+- StartupProfile: 모듈 import/초기화 단계별 소요 시간. 합계가 예산을 넘으면 경고 로그.
+- Readiness: 기동 후 백그라운드로 warm-up 단계(모델 로드, 커넥션 준비 등)를 동시에 실행하고,
+  모두 끝나면 ready. 단계가 실패하면 retry_delay 간격으로 max_wait까지 재시도하고, 그래도 안 되면
+  포기하고 ready (warm-up 없이 느리게라도 처리하는 편이 영원히 트래픽을 못 받는 것보다 나음).
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class StartupProfile:
+    """mark(phase)를 부를 때마다 직전 mark 이후 걸린 시간을 그 단계로 기록."""
+
+    def __init__(self, started: float | None = None):
+        self._started = started if started is not None else time.perf_counter()
+        self._last = self._started
+        self.phases: dict[str, float] = {}
+        self.total = 0.0
+        self.budget = 0.0
+
+    def mark(self, phase: str) -> None:
+        now = time.perf_counter()
+        self.phases[phase] = self.phases.get(phase, 0.0) + (now - self._last)
+        self._last = now
+
+    def record(self, phase: str, seconds: float) -> None:
+        """모듈 초기화 이후의 단계 (예: 요청을 받기 전 preload). 합계(예산 비교 대상)에는 넣지 않음."""
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+        logger.info("startup %s took %.0fms", phase, seconds * 1000)
+
+    def finish(self, budget: float = 0.0) -> float:
+        """합계(초) 기록 후 로그. budget(초) > 0 이고 넘으면 경고."""
+        self.total = time.perf_counter() - self._started
+        self.budget = budget
+        breakdown = ", ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in self.phases.items())
+        if budget > 0 and self.total > budget:
+            logger.warning("startup took %.0fms (budget %.0fms): %s", self.total * 1000, budget * 1000, breakdown)
+        else:
+            logger.info("startup took %.0fms: %s", self.total * 1000, breakdown)
+        return self.total
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "import_ms": round(self.total * 1000, 1),
+            "budget_ms": round(self.budget * 1000, 1) if self.budget > 0 else None,
+            "phases_ms": {name: round(seconds * 1000, 1) for name, seconds in self.phases.items()},
+        }
+
+
+class Readiness:
+    """warm-up 단계를 실행하고 끝났는지 알려줌 (/ready). 단계가 없으면 start() 직후 ready."""
+
+    def __init__(self, *, timeout: float = 120.0, max_wait: float = 300.0, retry_delay: float = 2.0):
+        self._timeout = timeout
+        self._max_wait = max_wait
+        self._retry_delay = retry_delay
+        self._steps: dict[str, Callable[[], Awaitable[Any]]] = {}
+        self._status: dict[str, dict[str, Any]] = {}
+        self._task: asyncio.Task | None = None
+        self._started = 0.0
+        self.seconds = 0.0
+        self.ready = False
+
+    def add(self, name: str, step: Callable[[], Awaitable[Any]]) -> None:
+        self._steps[name] = step
+        self._status[name] = {"state": "pending", "attempts": 0}
+
+    def start(self) -> None:
+        """이벤트 루프 안에서 (lifespan 시작 시) 호출."""
+        if self._task is not None:
+            return
+        self._started = time.perf_counter()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self) -> None:
+        await asyncio.gather(*(self._run_step(name, step) for name, step in self._steps.items()))
+        self.seconds = time.perf_counter() - self._started
+        self.ready = True
+        failed = [name for name, s in self._status.items() if s["state"] != "ok"]
+        if failed:
+            logger.warning("ready after %.1fs without warm-up of %s", self.seconds, ", ".join(failed))
+        else:
+            logger.info("ready: warm-up finished in %.1fs", self.seconds)
+
+    async def _run_step(self, name: str, step: Callable[[], Awaitable[Any]]) -> None:
+        status = self._status[name]
+        deadline = time.monotonic() + self._max_wait
+        while True:
+            status["state"] = "running"
+            status["attempts"] += 1
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(step(), timeout=self._timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                status["error"] = str(e) or type(e).__name__
+                if time.monotonic() + self._retry_delay >= deadline:
+                    status["state"] = "failed"
+                    logger.warning("warm-up %s gave up after %d attempts: %s", name, status["attempts"], status["error"])
+                    return
+                logger.info("warm-up %s failed (attempt %d), retrying: %s", name, status["attempts"], status["error"])
+                await asyncio.sleep(self._retry_delay)
+                continue
+            status.update(state="ok", ms=round((time.perf_counter() - started) * 1000, 1))
+            status.pop("error", None)
+            logger.info("warm-up %s done in %.0fms", name, status["ms"])
+            return
+
+    async def aclose(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "warmup_ms": round(self.seconds * 1000, 1) if self.ready else None,
+            "steps": {name: dict(s) for name, s in self._status.items()},
+        }
@@ -0,0 +1,63 @@
+"""두 벤치마크 결과(JSON) 비교: 엔드포인트별 p50/p95/p99, 처리량, 수신 바이트의 변화율.
+
+    python -m bench.compare baseline.json candidate.json [--fail-over 10]
+
+--fail-over PCT: 어느 엔드포인트든 p95가 PCT% 넘게 느려지면 종료 코드 1 (CI 회귀 검사용).
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+_METRICS = ("p50_ms", "p95_ms", "p99_ms", "throughput_rps", "bytes_received")
+
+
+def _change(before: float, after: float) -> str:
+    if not before:
+        return "n/a"
+    return f"{(after - before) / before * 100:+.1f}%"
+
+
+def compare(baseline: dict, candidate: dict) -> tuple[list[tuple], float]:
+    """(행 목록, 최악의 p95 증가율%)."""
+    rows = []
+    worst = 0.0
+    for endpoint in sorted(set(baseline["endpoints"]) | set(candidate["endpoints"])):
+        a = baseline["endpoints"].get(endpoint)
+        b = candidate["endpoints"].get(endpoint)
+        if a is None or b is None:
+            rows.append((endpoint, "only in " + ("candidate" if a is None else "baseline")))
+            continue
+        for m in _METRICS:
+            rows.append((endpoint, m, a[m], b[m], _change(a[m], b[m])))
+        if a["p95_ms"]:
+            worst = max(worst, (b["p95_ms"] - a["p95_ms"]) / a["p95_ms"] * 100)
+    return rows, worst
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(description="Compare two bench.run result files")
+    p.add_argument("baseline")
+    p.add_argument("candidate")
+    p.add_argument("--fail-over", type=float, default=None, help="p95 regression threshold in percent")
+    args = p.parse_args(argv)
+    baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+    candidate = json.loads(Path(args.candidate).read_text(encoding="utf-8"))
+
+    rows, worst = compare(baseline, candidate)
+    print(f"{'endpoint':<16}{'metric':<16}{'baseline':>14}{'candidate':>14}{'change':>10}")
+    for row in rows:
+        if len(row) == 2:
+            print(f"{row[0]:<16}{row[1]}")
+        else:
+            print(f"{row[0]:<16}{row[1]:<16}{row[2]:>14}{row[3]:>14}{row[4]:>10}")
+    print(f"\nturns/s: {baseline['turns_per_sec']} -> {candidate['turns_per_sec']} "
+          f"({_change(baseline['turns_per_sec'], candidate['turns_per_sec'])})")
+    if args.fail_over is not None and worst > args.fail_over:
+        print(f"p95 regression {worst:.1f}% exceeds {args.fail_over}%", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
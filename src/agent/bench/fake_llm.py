@@ -0,0 +1,129 @@
+"""OpenAI 호환 가짜 LLM 서버 (벤치마크용, 오프라인).
+
+POST /v1/chat/completions (stream / non-stream), GET /v1/models.
+응답은 마지막 user 메시지로 결정되는 DiagramResponse JSON (title / message / mermaid).
+지연: 첫 토큰까지 FAKE_LLM_TTFT 초, 이후 FAKE_LLM_TOKENS_PER_SEC 속도로 토큰 생성 (토큰 ≈ 4자).
+
+실행: python -m uvicorn bench.fake_llm:app --port 9101
+| env | 기본값 | 설명 |
+| FAKE_LLM_TTFT | 0.2 | 첫 토큰까지 지연(초) |
+| FAKE_LLM_TOKENS_PER_SEC | 80 | 생성 속도 (0이면 지연 없음) |
+| FAKE_LLM_NODES | 8 | 첫 다이어그램 노드 수 (턴마다 1개씩 증가) |
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+from typing import Any, AsyncIterator
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+
+CHARS_PER_TOKEN = 4
+
+TTFT = float(os.getenv("FAKE_LLM_TTFT", "0.2"))
+TOKENS_PER_SEC = float(os.getenv("FAKE_LLM_TOKENS_PER_SEC", "80"))
+NODES = int(os.getenv("FAKE_LLM_NODES", "8"))
+# 스트리밍 청크 간격 하한 (토큰마다 sleep 하면 이벤트 루프 오버헤드가 측정을 왜곡)
+_MIN_CHUNK_INTERVAL = 0.01
+
+app = FastAPI(title="fake LLM (benchmark)")
+stats = {"requests": 0, "streamed": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+
+def _text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(p.get("text", "") for p in content if isinstance(p, dict))
+    return ""
+
+
+def diagram_for(messages: list[dict]) -> dict:
+    """대화 길이(이전 assistant 턴 수)에 따라 노드가 늘어나는 결정적 다이어그램."""
+    prompt = next((_text(m.get("content")) for m in reversed(messages) if m.get("role") == "user"), "")
+    turn = sum(1 for m in messages if m.get("role") == "assistant")
+    seed = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:6]
+    n = NODES + turn
+    lines = ["flowchart TD"]
+    lines += [f"    N{i}[Step {i} {seed}]" for i in range(n)]
+    lines += [f"    N{i} --> N{i + 1}" for i in range(n - 1)]
+    return {
+        "title": f"Diagram {seed}",
+        "message": f"Drew a top-down flowchart with {n} steps connected in sequence for: {prompt[:80]}",
+        "mermaid": "\n".join(lines),
+    }
+
+
+def _tokens(text: str) -> int:
+    return max(1, (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN)
+
+
+def _usage(messages: list[dict], completion: str) -> dict[str, int]:
+    prompt_tokens = sum(_tokens(_text(m.get("content"))) for m in messages)
+    completion_tokens = _tokens(completion)
+    stats["prompt_tokens"] += prompt_tokens
+    stats["completion_tokens"] += completion_tokens
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+
+@app.get("/v1/models")
+@app.get("/models")
+def models() -> dict:
+    return {"object": "list", "data": [{"id": "bench-model", "object": "model", "owned_by": "bench"}]}
+
+
+@app.get("/stats")
+def get_stats() -> dict:
+    return stats
+
+
+@app.post("/v1/chat/completions")
+@app.post("/chat/completions")
+async def chat_completions(body: dict) -> Any:
+    stats["requests"] += 1
+    messages = body.get("messages") or []
+    model = body.get("model") or "bench-model"
+    text = json.dumps(diagram_for(messages), ensure_ascii=False)
+    completion_id = "chatcmpl-" + uuid.uuid4().hex[:12]
+    if body.get("stream"):
+        stats["streamed"] += 1
+        return StreamingResponse(_stream(completion_id, model, messages, text), media_type="text/event-stream")
+    await asyncio.sleep(TTFT + (_tokens(text) / TOKENS_PER_SEC if TOKENS_PER_SEC > 0 else 0))
+    return {
+        "id": completion_id,
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+        "usage": _usage(messages, text),
+    }
+
+
+async def _stream(completion_id: str, model: str, messages: list[dict], text: str) -> AsyncIterator[str]:
+    def chunk(delta: dict, finish: str | None = None, usage: dict | None = None) -> str:
+        data: dict[str, Any] = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+        }
+        if usage is not None:
+            data["usage"] = usage
+        return f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    await asyncio.sleep(TTFT)
+    yield chunk({"role": "assistant", "content": ""})
+    tokens_per_chunk = max(1, int(TOKENS_PER_SEC * _MIN_CHUNK_INTERVAL)) if TOKENS_PER_SEC > 0 else len(text)
+    step = tokens_per_chunk * CHARS_PER_TOKEN
+    for i in range(0, len(text), step):
+        piece = text[i:i + step]
+        if TOKENS_PER_SEC > 0:
+            await asyncio.sleep(_tokens(piece) / TOKENS_PER_SEC)
+        yield chunk({"content": piece})
+    yield chunk({}, finish="stop", usage=_usage(messages, text))
+    yield "data: [DONE]\n\n"
@@ -0,0 +1,427 @@
+"""Session Service 대역 (벤치마크용, 오프라인). SQLite에 저장하고 session-service/handlers.go와 같은 REST 경로를 제공.
+
+- POST   /api/apps/{app}/users/{user}/sessions[/{sid}]            -> Session JSON
+- GET    /api/apps/{app}/users/{user}/sessions[?view=summary]     -> [Session] | {sessions, nextCursor}
+- GET    /api/apps/{app}/users/{user}/sessions/{sid}[?since=ts]   -> Session JSON (since 이후(포함) 이벤트만)
+- GET    /api/apps/{app}/users/{user}/sessions/{sid}?view=snapshot[&tail=N] -> state + 최근 이벤트 (스냅샷 이후는 모두)
+- DELETE /api/apps/{app}/users/{user}/sessions/{sid}
+- POST   /api/apps/{app}/users/{user}/sessions/{sid}/events[/batch] -> {"lastUpdateTime"} (X-Session-Last-Update-Time 충돌 시 409)
+- POST   /api/apps/{app}/users/{user}/sessions/{sid}/compact      -> {"archived": n} (events -> events_archive)
+- POST   /api/apps/{app}/users/{user}/sessions/{sid}/artifacts/{name}/versions -> ArtifactVersion
+         ({"hash", "text"} 또는 {"hash", "base", "diff"}: base를 모르면 409, 결과 해시가 다르면 422)
+- GET    /api/apps/{app}/users/{user}/sessions/{sid}/artifacts[/{name}[/versions[/metadata|/{v}]]][?version=N]
+- DELETE /api/apps/{app}/users/{user}/sessions/{sid}/artifacts/{name}
+- GET    /api/diagrams/{hash} -> text/plain,  POST /api/diagrams/batch {"hashes"} -> {"diagrams": {hash: text}}
+
+Go 서비스처럼 partial 이벤트는 저장하지 않고, stateDelta는 temp: 키를 제외하고 세션 state에 병합.
+실행: python -m uvicorn bench.fake_session_service:app --port 9102  (FAKE_SESSION_DB, 기본 :memory:)
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any
+
+from fastapi import FastAPI, HTTPException, Request, Response
+
+from sessionclient.diagrams import MAX_DELTA_CHAIN, apply_diff, diagram_hash, resolve
+
+DEFAULT_SUMMARY_LIMIT = 50
+MAX_SUMMARY_LIMIT = 500
+LAST_UPDATE_HEADER = "X-Session-Last-Update-Time"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name TEXT NOT NULL, user_id TEXT NOT NULL, id TEXT NOT NULL,
+    state TEXT NOT NULL, last_update_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, id)
+);
+CREATE TABLE IF NOT EXISTS events (
+    app_name TEXT NOT NULL, user_id TEXT NOT NULL, session_id TEXT NOT NULL,
+    seq INTEGER PRIMARY KEY AUTOINCREMENT, time INTEGER NOT NULL, body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_session ON events (app_name, user_id, session_id, time);
+CREATE TABLE IF NOT EXISTS events_archive (
+    app_name TEXT NOT NULL, user_id TEXT NOT NULL, session_id TEXT NOT NULL,
+    seq INTEGER PRIMARY KEY, time INTEGER NOT NULL, body TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS diagram_blobs (
+    hash TEXT PRIMARY KEY, base TEXT NOT NULL, depth INTEGER NOT NULL, data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS diagram_versions (
+    app_name TEXT NOT NULL, user_id TEXT NOT NULL, session_id TEXT NOT NULL, filename TEXT NOT NULL,
+    version INTEGER NOT NULL, hash TEXT NOT NULL, create_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id, filename, version)
+);
+"""
+DEFAULT_SNAPSHOT_TAIL = 30
+
+
+class _Store:
+    """단일 커넥션 + 락. 핸들러는 sync 함수라 FastAPI 스레드풀에서 실행됨."""
+
+    def __init__(self, path: str):
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        if path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(_SCHEMA)
+        self.lock = threading.Lock()
+
+    def session_row(self, app_name: str, user_id: str, sid: str) -> tuple[dict, float] | None:
+        row = self._db.execute(
+            "SELECT state, last_update_time FROM sessions WHERE app_name=? AND user_id=? AND id=?",
+            (app_name, user_id, sid),
+        ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def events(self, app_name: str, user_id: str, sid: str, since: int | None = None,
+               recent: int | None = None) -> list[dict]:
+        sql = "SELECT seq, body FROM events WHERE app_name=? AND user_id=? AND session_id=?"
+        args: list[Any] = [app_name, user_id, sid]
+        if since is not None:
+            sql += " AND time >= ?"
+            args.append(since)
+        if recent:
+            sql = f"SELECT * FROM ({sql} ORDER BY seq DESC LIMIT ?)"
+            args.append(recent)
+        return [json.loads(b) for (_, b) in self._db.execute(sql + " ORDER BY seq", args)]
+
+    def compact(self, app_name: str, user_id: str, sid: str, before: int, keep: int) -> int:
+        where = ("app_name=? AND user_id=? AND session_id=? AND time < ? AND seq NOT IN "
+                 "(SELECT seq FROM events WHERE app_name=? AND user_id=? AND session_id=? ORDER BY seq DESC LIMIT ?)")
+        args = (app_name, user_id, sid, before, app_name, user_id, sid, keep)
+        self._db.execute("BEGIN")
+        self._db.execute(f"INSERT INTO events_archive SELECT * FROM events WHERE {where}", args)
+        moved = self._db.execute(f"DELETE FROM events WHERE {where}", args).rowcount
+        self._db.execute("COMMIT")
+        return moved
+
+    def create(self, app_name: str, user_id: str, sid: str, state: dict) -> None:
+        self._db.execute(
+            "INSERT INTO sessions (app_name, user_id, id, state, last_update_time) VALUES (?, ?, ?, ?, ?)",
+            (app_name, user_id, sid, json.dumps(state), time.time()),
+        )
+
+    def sessions(self, app_name: str, user_id: str) -> list[tuple[str, dict, float]]:
+        rows = self._db.execute(
+            "SELECT id, state, last_update_time FROM sessions WHERE app_name=? AND user_id=?", (app_name, user_id)
+        )
+        return [(sid, json.loads(state), ts) for sid, state, ts in rows]
+
+    def delete(self, app_name: str, user_id: str, sid: str) -> None:
+        self._db.execute("BEGIN")
+        for table in ("events", "events_archive", "diagram_versions"):
+            self._db.execute(f"DELETE FROM {table} WHERE app_name=? AND user_id=? AND session_id=?",
+                             (app_name, user_id, sid))
+        self._db.execute("DELETE FROM sessions WHERE app_name=? AND user_id=? AND id=?", (app_name, user_id, sid))
+        self._db.execute("COMMIT")
+
+    def append(self, app_name: str, user_id: str, sid: str, state: dict, events: list[dict]) -> float:
+        last = time.time()
+        self._db.execute("BEGIN")
+        try:
+            for ev in events:
+                if ev.get("partial"):
+                    continue
+                for k, v in ((ev.get("actions") or {}).get("stateDelta") or {}).items():
+                    if not k.startswith("temp:"):
+                        state[k] = v
+                ts = int(ev.get("time") or last)
+                self._db.execute(
+                    "INSERT INTO events (app_name, user_id, session_id, time, body) VALUES (?, ?, ?, ?, ?)",
+                    (app_name, user_id, sid, ts, json.dumps(ev, ensure_ascii=False)),
+                )
+            self._db.execute(
+                "UPDATE sessions SET state=?, last_update_time=? WHERE app_name=? AND user_id=? AND id=?",
+                (json.dumps(state, ensure_ascii=False), last, app_name, user_id, sid),
+            )
+            self._db.execute("COMMIT")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+        return last
+
+    def diagram(self, digest: str) -> str | None:
+        return resolve(digest, lambda d: self._db.execute(
+            "SELECT base, data FROM diagram_blobs WHERE hash=?", (d,)).fetchone())
+
+    def put_diagram(self, key: tuple[str, str, str, str], body: dict) -> dict:
+        """handlers.go saveDiagramVersion과 같은 규칙: blob은 해시당 한 번, diff는 base 체인이 짧을 때만 diff로 저장."""
+        digest, base, diff = body.get("hash"), body.get("base"), body.get("diff")
+        if diff is not None:
+            base_text = self.diagram(base) if isinstance(base, str) and base else None
+            if base_text is None:
+                raise HTTPException(status_code=409, detail="unknown base diagram")
+            try:
+                text = apply_diff(base_text, diff)
+            except (TypeError, ValueError) as e:
+                raise HTTPException(status_code=422, detail=f"invalid diff: {e}")
+        else:
+            text = body.get("text")
+            if not isinstance(text, str):
+                raise HTTPException(status_code=400, detail="text or base+diff is required")
+        text = text.strip()
+        if digest != diagram_hash(text):
+            raise HTTPException(status_code=422, detail="hash does not match the diagram text")
+        now = time.time()
+        self._db.execute("BEGIN")
+        try:
+            if self._db.execute("SELECT 1 FROM diagram_blobs WHERE hash=?", (digest,)).fetchone() is None:
+                row = self._db.execute("SELECT depth FROM diagram_blobs WHERE hash=?", (base,)).fetchone() if diff is not None else None
+                blob = (digest, base, row[0] + 1, json.dumps(diff, ensure_ascii=False)) if row and row[0] < MAX_DELTA_CHAIN \
+                    else (digest, "", 0, text)
+                self._db.execute("INSERT INTO diagram_blobs (hash, base, depth, data) VALUES (?, ?, ?, ?)", blob)
+            (version,) = self._db.execute(
+                "SELECT COALESCE(MAX(version) + 1, 0) FROM diagram_versions "
+                "WHERE app_name=? AND user_id=? AND session_id=? AND filename=?", key).fetchone()
+            self._db.execute("INSERT INTO diagram_versions VALUES (?, ?, ?, ?, ?, ?, ?)", (*key, version, digest, now))
+            self._db.execute("COMMIT")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+        return _artifact_version(key, version, digest, now)
+
+    def versions(self, key: tuple[str, str, str, str]) -> list[dict]:
+        rows = self._db.execute(
+            "SELECT version, hash, create_time FROM diagram_versions "
+            "WHERE app_name=? AND user_id=? AND session_id=? AND filename=? ORDER BY version", key)
+        return [_artifact_version(key, v, h, t) for v, h, t in rows]
+
+    def artifact_names(self, app_name: str, user_id: str, sid: str) -> list[str]:
+        rows = self._db.execute("SELECT DISTINCT filename FROM diagram_versions WHERE app_name=? AND user_id=? "
+                                "AND session_id=? ORDER BY filename", (app_name, user_id, sid))
+        return [name for (name,) in rows]
+
+    def delete_artifact(self, key: tuple[str, str, str, str]) -> None:
+        self._db.execute("DELETE FROM diagram_versions WHERE app_name=? AND user_id=? AND session_id=? AND filename=?", key)
+
+
+def _artifact_version(key: tuple[str, str, str, str], version: int, digest: str, created: float) -> dict:
+    """ADK ArtifactVersion JSON (customMetadata.hash = 다이어그램 해시)."""
+    app_name, user_id, sid, filename = key
+    return {
+        "version": version,
+        "canonicalUri": f"artifact://apps/{app_name}/users/{user_id}/sessions/{sid}/artifacts/{filename}/versions/{version}",
+        "customMetadata": {"hash": digest},
+        "createTime": created,
+        "mimeType": "text/vnd.mermaid",
+    }
+
+
+_store = _Store(os.getenv("FAKE_SESSION_DB", ":memory:"))
+app = FastAPI(title="fake session service (benchmark)")
+
+
+def _session_json(app_name: str, user_id: str, sid: str, since: int | None = None, tail: int | None = None) -> dict:
+    row = _store.session_row(app_name, user_id, sid)
+    if row is None:
+        raise HTTPException(status_code=500, detail="session not found")
+    state, ts = row
+    snapshot = state.get("snapshot") if tail else None
+    if not isinstance(snapshot, dict):
+        events = _store.events(app_name, user_id, sid, since)
+    else:
+        # handlers.go getSnapshotTail과 같은 규칙: 최근 tail개, 단 스냅샷 이후 이벤트는 모두
+        events = _store.events(app_name, user_id, sid, recent=tail)
+        if len(events) >= tail and int(events[0].get("time") or 0) > int(snapshot.get("time") or 0) > 0:
+            events = _store.events(app_name, user_id, sid, int(snapshot["time"]))
+    return {
+        "id": sid,
+        "appName": app_name,
+        "userId": user_id,
+        "lastUpdateTime": int(ts),
+        "events": events,
+        "state": state,
+    }
+
+
+@app.get("/")
+@app.get("/health")
+def health() -> Response:
+    return Response(status_code=200)
+
+
+@app.get("/api/apps/{app_name}/users/{user_id}/sessions")
+def list_sessions(app_name: str, user_id: str, view: str | None = None, limit: int | None = None,
+                  after: str | None = None) -> Any:
+    with _store.lock:
+        rows = _store.sessions(app_name, user_id)
+        if view != "summary":
+            return [_session_json(app_name, user_id, sid) for sid, _, _ in rows]
+    if limit is not None and limit <= 0:
+        raise HTTPException(status_code=400, detail="invalid limit parameter")
+    limit = min(limit or DEFAULT_SUMMARY_LIMIT, MAX_SUMMARY_LIMIT)
+    summaries = sorted(
+        ({"id": sid, "appName": app_name, "userId": user_id, "lastUpdateTime": int(ts),
+          **({"title": state["title"]} if isinstance(state.get("title"), str) else {})}
+         for sid, state, ts in rows),
+        key=lambda s: (-s["lastUpdateTime"], s["id"]),
+    )
+    start = 0
+    if after:
+        ts_text, _, cursor_id = after.partition(":")
+        try:
+            key = (-int(ts_text), cursor_id)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="invalid cursor")
+        while start < len(summaries) and (-summaries[start]["lastUpdateTime"], summaries[start]["id"]) <= key:
+            start += 1
+    page: dict[str, Any] = {"sessions": summaries[start:start + limit]}
+    if start + limit < len(summaries):
+        last = summaries[start + limit - 1]
+        page["nextCursor"] = f"{last['lastUpdateTime']}:{last['id']}"
+    return page
+
+
+@app.post("/api/apps/{app_name}/users/{user_id}/sessions")
+@app.post("/api/apps/{app_name}/users/{user_id}/sessions/{session_id}")
+async def create_session(app_name: str, user_id: str, request: Request, session_id: str | None = None) -> Any:
+    raw = await request.body()
+    body = json.loads(raw) if raw else {}
+    sid = session_id or str(uuid.uuid4())
+    with _store.lock:
+        if _store.session_row(app_name, user_id, sid) is not None:
+            raise HTTPException(status_code=500, detail="session already exists")
+        _store.create(app_name, user_id, sid, body.get("state") or {})
+        if body.get("events"):
+            _store.append(app_name, user_id, sid, body.get("state") or {}, body["events"])
+        return _session_json(app_name, user_id, sid)
+
+
+@app.get("/api/apps/{app_name}/users/{user_id}/sessions/{session_id}")
+def get_session(app_name: str, user_id: str, session_id: str, since: str | None = None, view: str | None = None,
+                tail: str | None = None) -> Any:
+    try:
+        since_ts = int(since) if since else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid since parameter")
+    tail_n = None
+    if view == "snapshot" and since_ts is None:
+        tail_n = int(tail) if tail and tail.isdigit() else (None if tail else DEFAULT_SNAPSHOT_TAIL)
+        if not tail_n:
+            raise HTTPException(status_code=400, detail="invalid tail parameter")
+    with _store.lock:
+        return _session_json(app_name, user_id, session_id, since_ts, tail_n)
+
+
+@app.delete("/api/apps/{app_name}/users/{user_id}/sessions/{session_id}")
+def delete_session(app_name: str, user_id: str, session_id: str) -> Any:
+    with _store.lock:
+        _store.delete(app_name, user_id, session_id)
+    return None
+
+
+def _append(app_name: str, user_id: str, session_id: str, request: Request, events: list[dict]) -> Any:
+    with _store.lock:
+        row = _store.session_row(app_name, user_id, session_id)
+        if row is None:
+            raise HTTPException(status_code=500, detail="session not found")
+        state, ts = row
+        client_time = request.headers.get(LAST_UPDATE_HEADER)
+        if client_time and client_time.lstrip("-").isdigit() and int(ts) > int(client_time):
+            raise HTTPException(status_code=409, detail="session was updated after the client's copy")
+        if not events:
+            return Response(status_code=204)
+        # 클라이언트 세션 캐시의 다음 커서 (?since=, X-Session-Last-Update-Time)
+        return {"lastUpdateTime": int(_store.append(app_name, user_id, session_id, state, events))}
+
+
+@app.post("/api/apps/{app_name}/users/{user_id}/sessions/{session_id}/events")
+async def append_event(app_name: str, user_id: str, session_id: str, request: Request) -> Any:
+    return _append(app_name, user_id, session_id, request, [await request.json()])
+
+
+@app.post("/api/apps/{app_name}/users/{user_id}/sessions/{session_id}/events/batch")
+async def append_events(app_name: str, user_id: str, session_id: str, request: Request) -> Any:
+    body = await request.json()
+    return _append(app_name, user_id, session_id, request, body.get("events") or [])
+
+
+@app.post("/api/apps/{app_name}/users/{user_id}/sessions/{session_id}/compact")
+async def compact_session(app_name: str, user_id: str, session_id: str, request: Request) -> Any:
+    body = await request.json()
+    before, keep = body.get("before"), body.get("keep", 0)
+    if not isinstance(before, int) or before <= 0 or not isinstance(keep, int) or keep < 0:
+        raise HTTPException(status_code=400, detail="before must be a unix time and keep must not be negative")
+    with _store.lock:
+        return {"archived": _store.compact(app_name, user_id, session_id, before, keep)}
+
+
+# ----- 다이어그램 저장소 (handlers.go / diagrams.go 대역) -----
+
+_ARTIFACTS = "/api/apps/{app_name}/users/{user_id}/sessions/{session_id}/artifacts"
+_IMMUTABLE = {"Cache-Control": "public, max-age=31536000, immutable"}
+
+
+@app.get("/api/diagrams/{digest}")
+def get_diagram(digest: str) -> Response:
+    with _store.lock:
+        text = _store.diagram(digest)
+    if text is None:
+        raise HTTPException(status_code=404, detail="diagram not found")
+    return Response(content=text, media_type="text/plain; charset=utf-8", headers={**_IMMUTABLE, "ETag": f'"{digest}"'})
+
+
+@app.post("/api/diagrams/batch")
+async def get_diagrams(request: Request) -> Any:
+    hashes = (await request.json()).get("hashes") or []
+    with _store.lock:
+        texts = {h: _store.diagram(h) for h in hashes if isinstance(h, str)}
+    return {"diagrams": {h: t for h, t in texts.items() if t is not None}}
+
+
+@app.post(_ARTIFACTS + "/{filename}/versions")
+async def save_artifact_version(app_name: str, user_id: str, session_id: str, filename: str, request: Request) -> Any:
+    body = await request.json()
+    with _store.lock:
+        return _store.put_diagram((app_name, user_id, session_id, filename), body)
+
+
+@app.get(_ARTIFACTS)
+def list_artifacts(app_name: str, user_id: str, session_id: str) -> Any:
+    with _store.lock:
+        return _store.artifact_names(app_name, user_id, session_id)
+
+
+@app.get(_ARTIFACTS + "/{filename}/versions/metadata")
+def list_artifact_versions_metadata(app_name: str, user_id: str, session_id: str, filename: str) -> Any:
+    with _store.lock:
+        return _store.versions((app_name, user_id, session_id, filename))
+
+
+@app.get(_ARTIFACTS + "/{filename}/versions")
+def list_artifact_versions(app_name: str, user_id: str, session_id: str, filename: str) -> Any:
+    with _store.lock:
+        return [v["version"] for v in _store.versions((app_name, user_id, session_id, filename))]
+
+
+def _load_artifact(key: tuple[str, str, str, str], version: str | None) -> Response:
+    with _store.lock:
+        versions = _store.versions(key)
+        if version not in (None, "latest"):
+            versions = [v for v in versions if str(v["version"]) == version]
+        text = _store.diagram(versions[-1]["customMetadata"]["hash"]) if versions else None
+    if text is None:
+        raise HTTPException(status_code=404, detail="artifact not found")
+    return Response(content=json.dumps({"text": text}, ensure_ascii=False), media_type="application/json",
+                    headers={"X-Artifact-Version": str(versions[-1]["version"])})
+
+
+@app.get(_ARTIFACTS + "/{filename}/versions/{version}")
+def load_artifact_version(app_name: str, user_id: str, session_id: str, filename: str, version: str) -> Response:
+    return _load_artifact((app_name, user_id, session_id, filename), version)
+
+
+@app.get(_ARTIFACTS + "/{filename}")
+def load_artifact(app_name: str, user_id: str, session_id: str, filename: str, version: str | None = None) -> Response:
+    return _load_artifact((app_name, user_id, session_id, filename), version)
+
+
+@app.delete(_ARTIFACTS + "/{filename}")
+def delete_artifact(app_name: str, user_id: str, session_id: str, filename: str) -> Any:
+    with _store.lock:
+        _store.delete_artifact((app_name, user_id, session_id, filename))
+    return None
@@ -0,0 +1,112 @@
+"""세션 하이드레이션 마이크로벤치마크: rest_to_session eager vs lazy (LazyEventList).
+
+    cd src/agent && python -m bench.hydration [--sizes 10 100 1000] [--repeat 20] [--out hydration.json]
+
+시나리오 (세션 JSON은 이미 파싱된 dict에서 시작):
+- eager: 모든 이벤트를 즉시 ADK Event로 검증 (lazy=False)
+- lazy: 세션 생성만 (이벤트는 REST dict로 보관)
+- lazy_recent10: 생성 + 최근 10개 이벤트 접근 (이력 압축 후 실제로 프롬프트에 들어가는 범위)
+- lazy_all: 생성 + 전체 이벤트 순회 (Runner가 이력 전체를 훑는 경우, 최악)
+"""
+import argparse
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+
+from sessionclient.models import rest_to_session
+
+
+def _diagram(i: int) -> str:
+    nodes = "\n".join(f"    N{j}[Step {j} of turn {i}]" for j in range(12))
+    edges = "\n".join(f"    N{j} --> N{j + 1}" for j in range(11))
+    return json.dumps({"title": f"Diagram {i}", "message": f"Updated diagram for turn {i}.",
+                       "mermaid": f"flowchart TD\n{nodes}\n{edges}"})
+
+
+def make_session(n_events: int) -> dict[str, Any]:
+    """user/model 이벤트가 번갈아 나오는 REST 세션 (model 이벤트는 DiagramResponse JSON + stateDelta)."""
+    events = []
+    for i in range(n_events):
+        if i % 2 == 0:
+            content = {"role": "user", "parts": [{"text": f"Add component number {i} to the diagram"}]}
+            actions = {"stateDelta": {}, "artifactDelta": {}}
+            author = "user"
+        else:
+            text = _diagram(i)
+            content = {"role": "model", "parts": [{"text": text}]}
+            actions = {"stateDelta": {"diagram": json.loads(text)}, "artifactDelta": {}}
+            author = "diagram_agent"
+        events.append({
+            "id": f"ev-{i:05d}", "time": 1_700_000_000 + i, "invocationId": f"inv-{i // 2}", "branch": "",
+            "author": author, "partial": False, "longRunningToolIds": [], "content": content,
+            "groundingMetadata": None, "turnComplete": author != "user", "interrupted": False,
+            "errorCode": "", "errorMessage": "", "actions": actions,
+        })
+    return {"id": "s1", "appName": "diagram_agent", "userId": "u", "lastUpdateTime": 1_700_000_000 + n_events,
+            "state": {"title": "bench"}, "events": events}
+
+
+def _touch_recent(session: Any, n: int = 10) -> None:
+    for ev in session.events[-n:]:
+        _ = ev.content
+
+
+def _touch_all(session: Any) -> None:
+    for ev in session.events:
+        _ = ev.content
+
+
+SCENARIOS: dict[str, Callable[[dict], Any]] = {
+    "eager": lambda data: rest_to_session(data, lazy=False),
+    "lazy": lambda data: rest_to_session(data),
+    "lazy_recent10": lambda data: _touch_recent(rest_to_session(data)),
+    "lazy_all": lambda data: _touch_all(rest_to_session(data)),
+}
+
+
+def measure(fn: Callable[[dict], Any], data: dict, repeat: int) -> dict[str, float]:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(data)
+        times.append(time.perf_counter() - started)
+    tracemalloc.start()
+    result = fn(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return {
+        "median_ms": round(statistics.median(times) * 1000, 3),
+        "min_ms": round(min(times) * 1000, 3),
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def main(argv: list[str] | None = None) -> dict[str, Any]:
+    p = argparse.ArgumentParser(description="rest_to_session eager vs lazy hydration")
+    p.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    p.add_argument("--repeat", type=int, default=20)
+    p.add_argument("--out", default="")
+    args = p.parse_args(argv)
+
+    results: dict[str, Any] = {"python": platform.python_version(), "repeat": args.repeat, "sizes": {}}
+    print(f"{'events':>8}{'scenario':>16}{'median_ms':>12}{'min_ms':>10}{'peak_kib':>12}{'speedup':>10}")
+    for size in args.sizes:
+        data = make_session(size)
+        rows = {name: measure(fn, data, args.repeat) for name, fn in SCENARIOS.items()}
+        results["sizes"][str(size)] = rows
+        base = rows["eager"]["median_ms"]
+        for name, row in rows.items():
+            speedup = f"{base / row['median_ms']:.1f}x" if row["median_ms"] else "-"
+            print(f"{size:>8}{name:>16}{row['median_ms']:>12}{row['min_ms']:>10}{row['peak_kib']:>12}{speedup:>10}")
+    if args.out:
+        Path(args.out).write_text(json.dumps(results, indent=2), encoding="utf-8")
+    return results
+
+
+if __name__ == "__main__":
+    main()
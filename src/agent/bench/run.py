@@ -0,0 +1,349 @@
+"""오프라인 부하/벤치마크 드라이버.
+
+가짜 LLM(bench.fake_llm), Session Service 대역(bench.fake_session_service), 실제 에이전트 서버(run_server)를
+로컬 포트에 띄운 뒤, 가상 사용자(세션)마다 세션 생성 -> N턴 /run 또는 /run_sse -> 세션 조회 -> 목록 조회를
+지정한 동시성으로 실행. 엔드포인트별 처리량, p50/p95/p99 지연, 송수신 바이트를 JSON(--out)과 표로 출력.
+
+    cd src/agent && python -m bench.run --sessions 20 --turns 3 --concurrency 8 --out results.json
+    python -m bench.compare before.json after.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from typing import Any, Iterator
+
+import httpx
+
+AGENT_DIR = Path(__file__).resolve().parent.parent
+APP_NAME = "diagram_agent"
+
+PROMPTS = (
+    "Draw the request flow of a three-tier web app: browser, load balancer, API server, database.",
+    "사용자 로그인 흐름: 브라우저 -> 인증 서버 -> 토큰 발급 -> API 호출",
+    "CI pipeline: commit, build, unit tests, integration tests, deploy to staging, deploy to production.",
+    "Kafka 기반 주문 처리: 주문 서비스 -> 토픽 -> 결제/재고/배송 컨슈머",
+)
+FOLLOW_UPS = (
+    "Add a cache between the API server and the database.",
+    "모니터링 컴포넌트를 추가하고 모든 서비스와 연결해줘.",
+    "Group the backend components into a subgraph.",
+    "Rename the first node to Client.",
+)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextmanager
+def _serve(name: str, module: str, port: int, env: dict[str, str], log_dir: Path, workers: int = 1) -> Iterator[str]:
+    """uvicorn 하위 프로세스를 띄우고 종료 시 정리. 로그는 log_dir/<name>.log."""
+    log = open(log_dir / f"{name}.log", "wb")
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", module, "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning", "--no-access-log", "--workers", str(workers)],
+        cwd=AGENT_DIR, env={**os.environ, **env}, stdout=log, stderr=subprocess.STDOUT,
+    )
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+        log.close()
+
+
+def _wait_ready(url: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} not ready after {timeout:.0f}s")
+
+
+class _Recorder:
+    """엔드포인트별 지연(초), 오류 수, 송수신 바이트, (SSE) 첫 바이트 / 제목 field 이벤트까지 시간."""
+
+    def __init__(self) -> None:
+        self.samples: dict[str, dict[str, Any]] = {}
+
+    def _slot(self, endpoint: str) -> dict[str, Any]:
+        return self.samples.setdefault(
+            endpoint, {"latency": [], "ttfb": [], "title": [], "errors": 0, "bytes_sent": 0, "bytes_received": 0}
+        )
+
+    def record(self, endpoint: str, seconds: float, sent: int, received: int, ok: bool,
+               ttfb: float | None = None, title: float | None = None) -> None:
+        slot = self._slot(endpoint)
+        slot["latency"].append(seconds)
+        slot["bytes_sent"] += sent
+        slot["bytes_received"] += received
+        if ttfb is not None:
+            slot["ttfb"].append(ttfb)
+        if title is not None:
+            slot["title"].append(title)
+        if not ok:
+            slot["errors"] += 1
+
+    def summary(self, wall_seconds: float) -> dict[str, Any]:
+        return {endpoint: _summarize(slot, wall_seconds) for endpoint, slot in sorted(self.samples.items())}
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    """최근접 순위(nearest-rank) 백분위수."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * q // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def _latency_stats(values: list[float]) -> dict[str, float]:
+    v = sorted(values)
+    ms = lambda x: round(x * 1000, 2)  # noqa: E731
+    return {
+        "p50_ms": ms(_percentile(v, 50)),
+        "p95_ms": ms(_percentile(v, 95)),
+        "p99_ms": ms(_percentile(v, 99)),
+        "mean_ms": ms(sum(v) / len(v)) if v else 0.0,
+        "max_ms": ms(v[-1]) if v else 0.0,
+    }
+
+
+def _summarize(slot: dict[str, Any], wall_seconds: float) -> dict[str, Any]:
+    count = len(slot["latency"])
+    out = {
+        "count": count,
+        "errors": slot["errors"],
+        "throughput_rps": round(count / wall_seconds, 3) if wall_seconds else 0.0,
+        **_latency_stats(slot["latency"]),
+        "bytes_sent": slot["bytes_sent"],
+        "bytes_received": slot["bytes_received"],
+    }
+    for mark in ("ttfb", "title"):
+        if slot[mark]:
+            out[mark] = _latency_stats(slot[mark])
+    return out
+
+
+async def _call(client: httpx.AsyncClient, rec: _Recorder, endpoint: str, method: str, url: str,
+                **kwargs: Any) -> httpx.Response | None:
+    started = time.perf_counter()
+    try:
+        r = await client.request(method, url, **kwargs)
+    except httpx.HTTPError:
+        rec.record(endpoint, time.perf_counter() - started, 0, 0, ok=False)
+        return None
+    sent = len(r.request.content or b"")
+    rec.record(endpoint, time.perf_counter() - started, sent, len(r.content), ok=r.status_code < 400)
+    return r
+
+
+_TITLE_FIELD = b'event: field\ndata: {"field":"title"'
+
+
+async def _call_sse(client: httpx.AsyncClient, rec: _Recorder, url: str, body: dict) -> None:
+    """/run_sse: 스트림 끝까지 읽음. 첫 바이트(ttfb)와 제목 field 이벤트(title)까지 시간도 기록.
+    error 이벤트는 오류로 집계."""
+    payload = json.dumps(body).encode("utf-8")
+    started = time.perf_counter()
+    ttfb = title = None
+    tail = b""  # 청크 경계에 걸친 표식 검색용
+    received = 0
+    ok = False
+    try:
+        async with client.stream("POST", url, content=payload, headers={"Content-Type": "application/json"}) as r:
+            ok = r.status_code < 400
+            async for chunk in r.aiter_bytes():
+                if ttfb is None:
+                    ttfb = time.perf_counter() - started
+                received += len(chunk)
+                window = tail + chunk
+                if b"event: error" in window:
+                    ok = False
+                if title is None and _TITLE_FIELD in window:
+                    title = time.perf_counter() - started
+                tail = window[-64:]
+    except httpx.HTTPError:
+        ok = False
+    rec.record("run_sse", time.perf_counter() - started, len(payload), received, ok=ok, ttfb=ttfb, title=title)
+
+
+def _message(text: str) -> dict:
+    return {"role": "user", "parts": [{"text": text}]}
+
+
+async def _virtual_user(client: httpx.AsyncClient, rec: _Recorder, base: str, session_base: str, index: int,
+                        args: argparse.Namespace) -> None:
+    """session_base: 세션 REST API 주소 (UI처럼 원격 모드에서는 Session Service, 메모리 모드에서는 에이전트)."""
+    user_id = f"bench-user-{index % max(1, args.users)}"
+    sessions = f"{session_base}/api/apps/{APP_NAME}/users/{user_id}/sessions"
+    r = await _call(client, rec, "create_session", "POST", sessions, json={"state": {}})
+    if r is None or r.status_code >= 400:
+        return
+    session_id = r.json()["id"]
+    tag = uuid.uuid4().hex[:8]  # 세션마다 다른 프롬프트 (응답 캐시 히트 방지)
+    for turn in range(args.turns):
+        text = PROMPTS[index % len(PROMPTS)] if turn == 0 else FOLLOW_UPS[(index + turn) % len(FOLLOW_UPS)]
+        body = {"userId": user_id, "sessionId": session_id, "newMessage": _message(f"{text} [{tag}-{turn}]")}
+        if args.endpoint == "run_sse":
+            await _call_sse(client, rec, f"{base}/run_sse", body)
+        else:
+            await _call(client, rec, "run", "POST", f"{base}/run", json=body)
+    await _call(client, rec, "get_session", "GET", f"{sessions}/{session_id}")
+    await _call(client, rec, "list_sessions", "GET", sessions, params={"view": "summary", "limit": 20})
+
+
+async def _drive(base: str, session_base: str, args: argparse.Namespace) -> tuple[_Recorder, float]:
+    rec = _Recorder()
+    sem = asyncio.Semaphore(args.concurrency)
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+
+    async with httpx.AsyncClient(timeout=args.request_timeout, limits=limits) as client:
+        async def one(i: int) -> None:
+            async with sem:
+                await _virtual_user(client, rec, base, session_base, i, args)
+
+        # 워밍업 세션은 동시에 보냄: --agent-workers N이면 여러 워커가 첫 요청 비용을 미리 치르도록
+        await asyncio.gather(*(_virtual_user(client, _Recorder(), base, session_base, -1 - i, args)
+                               for i in range(args.warmup)))
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(args.sessions)))
+        return rec, time.perf_counter() - started
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=AGENT_DIR, capture_output=True, text=True, timeout=5,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def _print_table(endpoints: dict[str, Any]) -> None:
+    cols = ("count", "errors", "throughput_rps", "p50_ms", "p95_ms", "p99_ms", "max_ms", "bytes_sent", "bytes_received")
+    print(f"{'endpoint':<16}" + "".join(f"{c:>16}" for c in cols))
+    for endpoint, row in endpoints.items():
+        print(f"{endpoint:<16}" + "".join(f"{row[c]:>16}" for c in cols))
+        for mark in ("ttfb", "title"):
+            if mark in row:
+                t = row[mark]
+                print(f"{'  (' + mark + ')':<16}{'':>48}"
+                      + "".join(f"{t[c]:>16}" for c in ("p50_ms", "p95_ms", "p99_ms", "max_ms")))
+
+
+def _parse_args(argv: list[str] | None) -> argparse.Namespace:
+    p = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    p.add_argument("--sessions", type=int, default=20, help="가상 사용자(세션) 수")
+    p.add_argument("--turns", type=int, default=3, help="세션당 대화 턴 수")
+    p.add_argument("--concurrency", type=int, default=8, help="동시에 진행하는 세션 수")
+    p.add_argument("--users", type=int, default=4, help="세션을 나눠 가질 userId 수")
+    p.add_argument("--endpoint", choices=("run", "run_sse"), default="run")
+    p.add_argument("--warmup", type=int, default=1, help="측정 전에 (동시에) 실행할 세션 수. 워커가 여럿이면 워커 수 이상으로")
+    p.add_argument("--ttft", type=float, default=0.2, help="가짜 LLM 첫 토큰 지연(초)")
+    p.add_argument("--tokens-per-sec", type=float, default=80, help="가짜 LLM 생성 속도")
+    p.add_argument("--nodes", type=int, default=8, help="가짜 LLM 첫 다이어그램 노드 수")
+    p.add_argument("--session-backend", choices=("fake", "memory", "sqlite"), default="fake",
+                   help="fake: SQLite Session Service 대역(REST), memory: SESSION_USE_MEMORY=true, "
+                        "sqlite: 에이전트 내장 SQLite 세션(SESSION_SQLITE_PATH)")
+    p.add_argument("--session-db", default=":memory:",
+                   help="fake: 대역 Session Service SQLite 경로, sqlite: 세션 파일 (기본: 로그 디렉터리의 sessions.db)")
+    p.add_argument("--agent-workers", type=int, default=1, help="에이전트 uvicorn 워커 수 (memory 백엔드는 1만 의미 있음)")
+    p.add_argument("--agent-url", default="", help="이미 떠 있는 에이전트 서버 URL (지정하면 하위 프로세스를 띄우지 않음)")
+    p.add_argument("--session-url", default="", help="--agent-url과 함께: 세션 REST API 주소 (기본: 에이전트 URL)")
+    p.add_argument("--agent-env", action="append", default=[], metavar="KEY=VALUE", help="에이전트 서버 추가 env")
+    p.add_argument("--request-timeout", type=float, default=120)
+    p.add_argument("--startup-timeout", type=float, default=60)
+    p.add_argument("--log-dir", default="", help="하위 프로세스 로그 디렉터리 (기본: 임시 디렉터리)")
+    p.add_argument("--out", default="", help="결과 JSON 경로")
+    return p.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> dict[str, Any]:
+    import tempfile
+
+    args = _parse_args(argv)
+    agent_env = dict(kv.split("=", 1) for kv in args.agent_env)
+    log_dir = Path(args.log_dir or tempfile.mkdtemp(prefix="bench-"))
+    log_dir.mkdir(parents=True, exist_ok=True)
+
+    with ExitStack() as stack:
+        base = args.agent_url.rstrip("/")
+        session_base = args.session_url.rstrip("/") or base
+        if not base:
+            llm = stack.enter_context(_serve("fake_llm", "bench.fake_llm:app", _free_port(), {
+                "FAKE_LLM_TTFT": str(args.ttft),
+                "FAKE_LLM_TOKENS_PER_SEC": str(args.tokens_per_sec),
+                "FAKE_LLM_NODES": str(args.nodes),
+            }, log_dir))
+            env = {
+                "LLM_BASE_URL": f"{llm}/v1",
+                "LLM_MODEL_NAME": "bench-model",
+                "LLM_BASE_URLS": "",
+                "LITELLM_LOCAL_MODEL_COST_MAP": "True",
+            }
+            sessions = ""
+            if args.session_backend == "memory":
+                env["SESSION_USE_MEMORY"] = "true"
+            elif args.session_backend == "sqlite":
+                path = args.session_db if args.session_db != ":memory:" else str(log_dir / "sessions.db")
+                env.update({"SESSION_USE_MEMORY": "false", "SESSION_SQLITE_PATH": path})
+            else:
+                sessions = stack.enter_context(_serve(
+                    "fake_session_service", "bench.fake_session_service:app", _free_port(),
+                    {"FAKE_SESSION_DB": args.session_db}, log_dir,
+                ))
+                _wait_ready(f"{sessions}/health", args.startup_timeout)
+                env.update({"SESSION_SERVICE_URL": sessions, "SESSION_USE_MEMORY": "false"})
+            env.update(agent_env)
+            _wait_ready(f"{llm}/v1/models", args.startup_timeout)
+            base = stack.enter_context(_serve("agent", "run_server:app", _free_port(), env, log_dir, args.agent_workers))
+            session_base = sessions or base
+        # /ready: warm-up(모델 로드)이 끝난 뒤부터 측정. /ready 가 없는 서버는 404 → 바로 진행
+        _wait_ready(f"{base}/ready", args.startup_timeout)
+
+        rec, wall = asyncio.run(_drive(base, session_base, args))
+        try:
+            health = httpx.get(f"{base}/health", timeout=5).json()
+        except (httpx.HTTPError, ValueError):
+            health = None
+
+    endpoints = rec.summary(wall)
+    total = sum(row["count"] for row in endpoints.values())
+    result = {
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "log_dir")},
+        "env": {"python": platform.python_version(), "platform": platform.platform(), "git_commit": _git_commit(),
+                "cpu_count": os.cpu_count()},
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(total / wall, 3) if wall else 0.0,
+        "turns_per_sec": round(endpoints.get(args.endpoint, {}).get("count", 0) / wall, 3) if wall else 0.0,
+        "endpoints": endpoints,
+        "health": health,
+    }
+    _print_table(endpoints)
+    print(f"\nwall {result['wall_seconds']}s, {result['turns_per_sec']} turns/s, logs in {log_dir}")
+    if args.out:
+        Path(args.out).write_text(json.dumps(result, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"results written to {args.out}")
+    return result
+
+
+if __name__ == "__main__":
+    main()
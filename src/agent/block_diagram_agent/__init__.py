@@ -1,5 +1,46 @@
-"""Block Diagram Agent — ADK 에이전트 + Pydantic 구조화 출력."""
-from .agent import get_llm_info, root_agent
-from .schema import DiagramResponse
+"""Block Diagram Agent — ADK 에이전트 + Pydantic 구조화 출력.
 
-__all__ = ["get_llm_info", "root_agent", "DiagramResponse"]
+공개 이름은 처음 사용할 때 import (PEP 562). `block_diagram_agent.render` 같은 하위 모듈만 쓰는 도구
+(CLI, CI)는 에이전트(ADK, 모델 설정)를 만들지 않음. get_llm_info/preload_llm(.llm)도 에이전트를 만들지 않음.
+"""
+import importlib
+from typing import Any
+
+_LAZY = {
+    "close_response_cache": ".agent",
+    "fast_path_matches": ".agent",
+    "get_context_stats": ".agent",
+    "get_diagram_version_stats": ".agent",
+    "get_edit_stats": ".agent",
+    "get_fast_path_stats": ".agent",
+    "get_llm_info": ".llm",
+    "get_repair_stats": ".agent",
+    "get_response_cache_stats": ".agent",
+    "preload_llm": ".llm",
+    "root_agent": ".agent",
+    "warm_up_llm": ".agent",
+    "force_llm": ".fastpath",
+    "DiagramRenderer": ".render",
+    "RenderError": ".render",
+    "build_renderer": ".render",
+    "render_svg": ".render",
+    "DiagramResponse": ".schema",
+    "EventFieldStream": ".streaming",
+    "FieldEvent": ".streaming",
+    "StructuredStreamParser": ".streaming",
+}
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_LAZY))
@@ -1,44 +1,19 @@
 """Block Diagram Agent — Converts user descriptions to Mermaid diagrams (Google ADK + Pydantic).
-LLM: 환경변수 LLM_BASE_URL(또는 KSERVE_URL)이 있으면 해당 OpenAI 호환 엔드포인트(KServe 등) 사용, 없으면 Gemini 사용.
+모델 선택(LLM_BASE_URL(S) / KSERVE_URL / Gemini)은 llm.py. 이 모듈을 import하면 에이전트와 콜백을 만듦.
 """
-import os
+import asyncio
 
 from google.adk.agents import Agent
 
-from .schema import DiagramResponse
-
-
-def get_llm_info():
-    """현재 사용 중인 LLM 정보. 로컬 모델 여부 확인용."""
-    base_url = (
-        os.getenv("LLM_BASE_URL", "").strip()
-        or os.getenv("KSERVE_URL", "").strip()
-    )
-    if base_url:
-        if not base_url.rstrip("/").endswith("/v1"):
-            base_url = base_url.rstrip("/") + "/v1"
-        model_name = os.getenv("LLM_MODEL_NAME", "local").strip() or "local"
-        return {
-            "provider": "local",
-            "base_url": base_url,
-            "model_name": model_name,
-        }
-    return {"provider": "gemini", "model": "gemini-2.0-flash"}
-
-
-def _resolve_model():
-    """LLM_BASE_URL 또는 KSERVE_URL이 설정되면 로컬(OpenAI 호환) 모델, 아니면 Gemini."""
-    info = get_llm_info()
-    if info["provider"] == "local":
-        from google.adk.models.lite_llm import LiteLlm
-
-        # 로컬(Ollama 등)은 키 검증 없음. LiteLLM이 api_key 필수로 요구하므로 더미 값 전달.
-        return LiteLlm(
-            model=f"openai/{info['model_name']}",
-            api_base=info["base_url"],
-            api_key=os.getenv("OPENAI_API_KEY", "ollama"),
-        )
-    return "gemini-2.0-flash"
+from .context import build_context_compactor
+from .edit import EDIT_INSTRUCTION, build_diagram_editor
+from .fastpath import build_fast_path
+from .llm import get_llm_info, resolve_model
+from .repair import build_mermaid_repairer
+from .response_cache import build_response_cache
+from .retry import RequestStash
+from .schema import DiagramEditResponse, DiagramResponse
+from .versions import build_diagram_versioner
 
 
 DIAGRAM_INSTRUCTION = """You are a diagram assistant. Your role is to generate block diagrams from the user's description.
@@ -48,11 +23,133 @@ Output: You must respond with a single JSON object that conforms to the provided
 **Required:** title, message, and mermaid must all be written in the same language as the user's input. If the user writes in Korean, respond in Korean; if in English, respond in English.
 """
 
+def _model_name(info: dict) -> str:
+    return info.get("model_name") or info.get("model") or ""
+
+
+# 프롬프트 → DiagramResponse 캐시 (히트 시 LLM 호출 생략). RESPONSE_CACHE_ENABLED=false 로 비활성.
+_response_cache = build_response_cache(_model_name(get_llm_info()))
+
+
+def get_response_cache_stats():
+    """응답 캐시 히트/미스 카운터 (/health 용). 비활성이면 None."""
+    return _response_cache.stats() if _response_cache is not None else None
+
+
+def close_response_cache() -> None:
+    """종료 시 응답 캐시 백엔드(SQLite 커넥션) 정리."""
+    if _response_cache is not None:
+        _response_cache.close()
+
+
+# 대화 이력 압축 (최신 다이어그램 + 최근 턴만 전송). CONTEXT_COMPACTION_ENABLED=false 로 비활성.
+_context_compactor = build_context_compactor()
+
+
+def get_context_stats():
+    """압축 전/후 토큰 수와 절감량 (/health 용). 비활성이면 None."""
+    return _context_compactor.stats() if _context_compactor is not None else None
+
+
+# edit mode 재생성 / mermaid 재시도가 같은 요청으로 모델을 다시 부를 수 있도록 보관
+_request_stash = RequestStash()
+
+# 증분 편집 모드 (LLM은 이전 다이어그램에 대한 edits만 생성). DIAGRAM_EDIT_MODE=true 로 활성.
+_diagram_editor = build_diagram_editor(_request_stash)
+
+
+def get_edit_stats():
+    """edit mode 적용/실패/재생성 카운터 (/health 용). 비활성이면 None."""
+    return _diagram_editor.stats() if _diagram_editor is not None else None
+
+
+# mermaid 검증/복구 (실패 시 1회 재시도). MERMAID_REPAIR_ENABLED=false 로 비활성.
+_mermaid_repairer = build_mermaid_repairer(_request_stash)
+
+
+def get_repair_stats():
+    """mermaid 복구율/재시도 카운터 (/health 용). 비활성이면 None."""
+    return _mermaid_repairer.stats() if _mermaid_repairer is not None else None
+
+
+# 최종 다이어그램을 세션 artifact 버전으로 저장 (내용 해시로 중복 제거). DIAGRAM_STORE_ENABLED=false 로 비활성.
+_diagram_versioner = build_diagram_versioner()
+
+
+def get_diagram_version_stats():
+    """다이어그램 버전 저장/생략/실패 카운터 (/health 용). 비활성이면 None."""
+    return _diagram_versioner.stats() if _diagram_versioner is not None else None
+
+
+# 구조가 명시된 요청("A -> B -> C", 글머리 목록, "3-tier: ...")은 LLM 없이 규칙으로 응답.
+# FASTPATH_ENABLED=false 로 비활성.
+_fast_path = build_fast_path()
+
+
+def get_fast_path_stats():
+    """fast path 검사/히트/임계값 미달 카운터 (/health 용). 비활성이면 None."""
+    return _fast_path.stats() if _fast_path is not None else None
+
+
+def fast_path_matches(text: str, state=None) -> bool:
+    """이 프롬프트를 fast path가 처리하는지 (run_server가 LLM admission 대기를 건너뛸 때). 카운터 변경 없음.
+    state는 세션 state (이미 다이어그램이 있으면 후속 턴이므로 False)."""
+    return _fast_path is not None and _fast_path.match(text, state) is not None
+
+
+def _with_versions(before_model):
+    # before_model이 응답을 만들면 after_model을 거치지 않으므로 버전 저장은 before_model 쪽에서
+    if before_model is None or _diagram_versioner is None:
+        return before_model
+    return _diagram_versioner.on_response(before_model)
+
+
+# fast path → 캐시 조회 (히트면 압축 불필요) → 미스일 때만 압축 후 LLM 호출
+_before_model = [cb for cb in (
+    _with_versions(_fast_path.before_model if _fast_path is not None else None),
+    _with_versions(_response_cache.before_model if _response_cache is not None else None),
+    _context_compactor.before_model if _context_compactor is not None else None,
+    _request_stash.before_model if _diagram_editor is not None or _mermaid_repairer is not None else None,
+) if cb is not None]
+# edits 적용 → mermaid 복구 (둘 다 응답을 제자리에서 교체) → 캐시/버전 저장은 최종 결과로
+_after_model = [cb for cb in (
+    _diagram_editor.after_model if _diagram_editor is not None else None,
+    _mermaid_repairer.after_model if _mermaid_repairer is not None else None,
+    _response_cache.after_model if _response_cache is not None else None,
+    _diagram_versioner.after_model if _diagram_versioner is not None else None,
+) if cb is not None]
+
+
 root_agent = Agent(
     name="diagram_agent",
-    model=_resolve_model(),
+    model=resolve_model(),
     description="Generates block or flowchart diagrams from natural language descriptions using Mermaid.",
-    instruction=DIAGRAM_INSTRUCTION,
-    output_schema=DiagramResponse,
+    instruction=DIAGRAM_INSTRUCTION + (EDIT_INSTRUCTION if _diagram_editor is not None else ""),
+    output_schema=DiagramEditResponse if _diagram_editor is not None else DiagramResponse,
     output_key="diagram",
+    before_model_callback=_before_model or None,
+    after_model_callback=_after_model or None,
 )
+
+
+async def warm_up_llm(prompt: str = "ping") -> None:
+    """모델 로드 + 커넥션 준비: 출력 1토큰짜리 생성 한 번 (콜백/캐시/메트릭을 거치지 않고 모델에 직접).
+    백엔드가 여러 개(RoutedLlm)면 모두 시도하고 하나라도 성공하면 완료."""
+    from google.adk.models.llm_request import LlmRequest
+    from google.genai import types
+
+    async def generate(llm) -> None:
+        request = LlmRequest(
+            model=llm.model,
+            contents=[types.Content(role="user", parts=[types.Part(text=prompt)])],
+            config=types.GenerateContentConfig(max_output_tokens=1),
+        )
+        async for _ in llm.generate_content_async(request, stream=False):
+            pass
+
+    backends = getattr(root_agent.model, "backends", None)  # RoutedLlm
+    models = [b.llm for b in backends] if backends else [root_agent.canonical_model]
+    results = await asyncio.gather(*(generate(m) for m in models), return_exceptions=True)
+    errors = [r for r in results if isinstance(r, BaseException)]
+    if len(errors) == len(results):
+        raise errors[0]
@@ -0,0 +1,235 @@
+"""LLM 호출 전 대화 이력 압축 (before_model_callback).
+
+Runner는 매 턴 session.events 전체를 프롬프트로 보내고, 모델 턴마다 전체 mermaid가 들어 있어
+같은 다이어그램을 수정할수록 프롬프트가 커짐. 압축 규칙:
+- 최신 다이어그램을 담은 모델 응답만 원문 유지, 이전 모델 응답은 "[previous diagram: 제목]"으로 대체.
+- 최근 window_turns 턴만 유지, 그 이전 턴은 한 줄 요약으로 바꿔 첫 유지 턴 앞에 붙임
+  (최신 다이어그램이 잘려 나가면 요약에 포함).
+- 토큰 수(교체 가능한 tokenizer)가 token_budget을 넘으면 오래된 턴부터 요약으로 옮김.
+- 연속된 동일 사용자 메시지(원격 세션의 사전 append로 생기는 중복)는 하나로 합침.
+"""
+import json
+import logging
+import os
+from typing import Any, Callable, Protocol
+
+from .retry import content_text
+
+logger = logging.getLogger(__name__)
+
+
+class Tokenizer(Protocol):
+    def count(self, text: str) -> int: ...
+
+
+class ByteTokenizer:
+    """근사 토크나이저: UTF-8 바이트 / 4 (영문 ~4자, 한글 ~1.3자당 1토큰)."""
+
+    def count(self, text: str) -> int:
+        return (len(text.encode("utf-8")) + 3) // 4
+
+
+class TiktokenTokenizer:
+    """tiktoken 기반 (선택 의존성)."""
+
+    def __init__(self, encoding: str = "cl100k_base"):
+        import tiktoken
+
+        self._enc = tiktoken.get_encoding(encoding)
+
+    def count(self, text: str) -> int:
+        return len(self._enc.encode(text, disallowed_special=()))
+
+
+def _is_text_only(content: Any) -> bool:
+    parts = getattr(content, "parts", None) or []
+    return bool(parts) and all(getattr(p, "text", None) is not None for p in parts)
+
+
+def _parse_diagram(text: str) -> dict | None:
+    t = text.strip()
+    if t.startswith("```"):
+        t = t.strip("`")
+        t = t[4:] if t.startswith("json") else t
+    start, end = t.find("{"), t.rfind("}")
+    if start == -1 or end <= start:
+        return None
+    try:
+        data = json.loads(t[start:end + 1])
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) and "mermaid" in data else None
+
+
+def _shorten(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+class ContextCompactor:
+    def __init__(
+        self,
+        window_turns: int = 4,
+        token_budget: int = 8000,
+        tokenizer: Tokenizer | None = None,
+        summary_chars: int = 120,
+    ):
+        self._window_turns = max(1, window_turns)
+        self._token_budget = token_budget
+        self._tokenizer = tokenizer or ByteTokenizer()
+        self._summary_chars = summary_chars
+        self.requests = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+        self.last_saved = 0
+
+    def count(self, contents: list) -> int:
+        return sum(self._tokenizer.count(content_text(c)) for c in contents)
+
+    def compact(self, contents: list) -> list:
+        from google.genai import types
+
+        contents = self._dedupe_user(contents)
+        turns = self._split_turns(contents)
+        if not turns:
+            return contents
+        latest = self._latest_diagram(contents)
+
+        def model_stub(content: Any) -> Any:
+            if content is latest or not _is_text_only(content):
+                return content
+            diagram = _parse_diagram(content_text(content))
+            if diagram is None:
+                return content
+            title = diagram.get("title") or "untitled"
+            return types.Content(role=content.role, parts=[types.Part(text=f"[previous diagram: {title}]")])
+
+        turns = [[model_stub(c) if c.role == "model" else c for c in turn] for turn in turns]
+        keep_from = max(0, len(turns) - self._window_turns)
+        result = self._assemble(turns, keep_from, latest)
+        while self._token_budget > 0 and keep_from < len(turns) - 1 and self.count(result) > self._token_budget:
+            keep_from += 1
+            result = self._assemble(turns, keep_from, latest)
+        return result
+
+    def _assemble(self, turns: list[list], keep_from: int, latest: Any) -> list:
+        from google.genai import types
+
+        if keep_from == 0:
+            return [c for turn in turns for c in turn]
+        dropped, kept = turns[:keep_from], turns[keep_from:]
+        lines = ["Summary of earlier turns in this conversation:"]
+        latest_dropped = False
+        for turn in dropped:
+            user = next((content_text(c) for c in turn if c.role == "user"), "")
+            titles = []
+            for c in turn:
+                if c.role != "model":
+                    continue
+                if c is latest:
+                    latest_dropped = True
+                diagram = _parse_diagram(content_text(c))
+                titles.append(diagram.get("title") if diagram else _shorten(content_text(c), 40))
+            lines.append(f"- user: {_shorten(user, self._summary_chars)}" + (f" → {', '.join(t for t in titles if t)}" if titles else ""))
+        if latest_dropped:
+            lines.append("Current diagram (latest version, edit this one):")
+            lines.append(content_text(latest))
+        summary = types.Part(text="\n".join(lines))
+        first = kept[0]
+        if first and first[0].role == "user":
+            head = types.Content(role="user", parts=[summary] + list(first[0].parts or []))
+            kept = [[head] + first[1:]] + kept[1:]
+        else:
+            kept = [[types.Content(role="user", parts=[summary])]] + kept
+        return [c for turn in kept for c in turn]
+
+    @staticmethod
+    def _dedupe_user(contents: list) -> list:
+        out: list = []
+        for c in contents:
+            if (
+                out
+                and c.role == "user"
+                and out[-1].role == "user"
+                and _is_text_only(c)
+                and _is_text_only(out[-1])
+                and content_text(c) == content_text(out[-1])
+            ):
+                continue
+            out.append(c)
+        return out
+
+    @staticmethod
+    def _split_turns(contents: list) -> list[list]:
+        """user 메시지에서 새 턴 시작 (연속된 user 메시지는 같은 턴)."""
+        turns: list[list] = []
+        for c in contents:
+            if c.role == "user" and (not turns or turns[-1][-1].role != "user"):
+                turns.append([c])
+            elif turns:
+                turns[-1].append(c)
+            else:
+                turns.append([c])
+        return turns
+
+    @staticmethod
+    def _latest_diagram(contents: list) -> Any:
+        for c in reversed(contents):
+            if c.role == "model" and _is_text_only(c) and _parse_diagram(content_text(c)) is not None:
+                return c
+        return None
+
+    def before_model(self, callback_context: Any, llm_request: Any) -> None:
+        contents = list(getattr(llm_request, "contents", None) or [])
+        if not contents:
+            return None
+        try:
+            before = self.count(contents)
+            compacted = self.compact(contents)
+            after = self.count(compacted)
+        except Exception:
+            logger.exception("context compaction failed; sending full history")
+            return None
+        llm_request.contents = compacted
+        self.requests += 1
+        self.tokens_before += before
+        self.tokens_after += after
+        self.last_saved = before - after
+        if self.last_saved:
+            logger.debug("context compaction: %d -> %d tokens (%d contents -> %d)",
+                         before, after, len(contents), len(compacted))
+        return None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+            "tokens_saved": self.tokens_before - self.tokens_after,
+            "last_saved": self.last_saved,
+        }
+
+
+_TOKENIZERS: dict[str, Callable[[], Tokenizer]] = {
+    "bytes": ByteTokenizer,
+    "tiktoken": TiktokenTokenizer,
+}
+
+
+def build_context_compactor() -> ContextCompactor | None:
+    """env 기반 생성. CONTEXT_COMPACTION_ENABLED=false 이면 None."""
+    if os.getenv("CONTEXT_COMPACTION_ENABLED", "true").strip().lower() in ("false", "0", "no", "off"):
+        return None
+    name = os.getenv("CONTEXT_TOKENIZER", "bytes").strip() or "bytes"
+    try:
+        tokenizer = _TOKENIZERS[name]()
+    except (KeyError, ImportError):
+        logger.warning("tokenizer %r unavailable; using byte estimate", name)
+        tokenizer = ByteTokenizer()
+    try:
+        window = int(os.getenv("CONTEXT_WINDOW_TURNS", "4"))
+        budget = int(os.getenv("CONTEXT_TOKEN_BUDGET", "8000"))
+    except ValueError:
+        logger.warning("invalid CONTEXT_* value; using defaults")
+        window, budget = 4, 8000
+    return ContextCompactor(window_turns=window, token_budget=budget, tokenizer=tokenizer)
@@ -0,0 +1,213 @@
+"""Diagram edit mode: LLM이 이전 다이어그램에 대한 patch(edits)만 생성하고, 서버가 적용해 전체 mermaid를 만듦.
+
+- after_model: 최종 응답(DiagramEditResponse)에 edits가 있으면 state["diagram"]의 mermaid에 적용하고
+  응답 본문을 일반 DiagramResponse JSON으로 바꿈 (output_key로 저장되는 값도 전체 다이어그램).
+  적용 실패 시 같은 요청(RequestStash) + 오류 안내로 모델을 한 번 더 호출해 전체 mermaid를 받음.
+  재생성도 실패하면 (요청 없음, 모델 오류, 스키마 밖 응답) 이전 다이어그램을 그대로 두고 안내 메시지로 응답.
+응답 객체를 제자리에서 수정하고 None을 반환하므로 뒤에 오는 after_model 콜백(응답 캐시)도 적용된 결과를 봄.
+"""
+import logging
+import os
+from typing import Any
+
+from pydantic import ValidationError
+
+from .mermaid import Edge, Flowchart, MermaidParseError, parse_flowchart
+from .response_cache import detect_language
+from .retry import RequestStash, call_again, response_text, set_response_text, strip_code_fence
+from .schema import DiagramEdit, DiagramEditResponse, DiagramResponse
+
+logger = logging.getLogger(__name__)
+
+EDIT_INSTRUCTION = """
+**Edit mode:** When a previous diagram exists in the conversation and the user asks for a change that touches only a few nodes or edges,
+leave `mermaid` empty and put the change in `edits`, using the node ids from the previous Mermaid code:
+- add_node: id (new, unique), label, optional subgraph
+- remove_node: id (its edges are removed too)
+- rename_node: id, label (new label)
+- add_edge / remove_edge: source, target, optional label
+- move_to_subgraph: id, subgraph (id; created if missing, label = its title), empty subgraph = move out to top level
+When there is no previous diagram, or the change rewrites most of the diagram, return the full `mermaid` and leave `edits` empty.
+"""
+
+_REGENERATE_PROMPT = (
+    "The edits could not be applied to the previous diagram ({error}). "
+    "Return the complete updated diagram in `mermaid` and leave `edits` empty."
+)
+
+_KEPT_MESSAGE = {
+    "ko": "요청하신 변경을 이전 다이어그램에 적용하지 못해 다이어그램을 그대로 두었습니다. 다시 요청해 주세요. ({error})",
+    "en": "Could not apply the requested change to the previous diagram, so it was left unchanged. Please try again. ({error})",
+}
+
+
+class PatchError(ValueError):
+    """edits를 이전 다이어그램에 적용할 수 없음."""
+
+
+def apply_edits(mermaid: str, edits: list[DiagramEdit]) -> str:
+    """mermaid(없으면 빈 flowchart)에 edits를 순서대로 적용한 전체 Mermaid 코드."""
+    try:
+        chart = parse_flowchart(mermaid) if mermaid.strip() else Flowchart()
+    except MermaidParseError as e:
+        raise PatchError(f"previous diagram is not an editable flowchart: {e}") from e
+    for i, edit in enumerate(edits):
+        try:
+            _apply(chart, edit)
+        except PatchError as e:
+            raise PatchError(f"edit #{i + 1} ({edit.op}): {e}") from None
+    return chart.to_mermaid()
+
+
+def _require_node(chart: Flowchart, node_id: str) -> None:
+    if not node_id:
+        raise PatchError("missing id")
+    if node_id not in chart.nodes:
+        raise PatchError(f"unknown node {node_id!r}")
+
+
+def _require_endpoint(chart: Flowchart, node_id: str) -> None:
+    if not node_id:
+        raise PatchError("missing source/target")
+    if not chart.has(node_id):
+        raise PatchError(f"unknown node {node_id!r}")
+
+
+def _apply(chart: Flowchart, edit: DiagramEdit) -> None:
+    op = edit.op
+    if op == "add_node":
+        if not edit.id:
+            raise PatchError("missing id")
+        if chart.has(edit.id):
+            raise PatchError(f"node {edit.id!r} already exists")
+        if edit.subgraph:
+            chart.add_subgraph(edit.subgraph)
+        chart.add_node(edit.id, edit.label or edit.id, subgraph=edit.subgraph or None)
+    elif op == "remove_node":
+        _require_node(chart, edit.id)
+        chart.remove_node(edit.id)
+    elif op == "rename_node":
+        if edit.id in chart.subgraphs and edit.label:
+            chart.subgraphs[edit.id].title = edit.label
+            return
+        _require_node(chart, edit.id)
+        if not edit.label:
+            raise PatchError("missing label")
+        chart.nodes[edit.id].label = edit.label
+    elif op == "add_edge":
+        _require_endpoint(chart, edit.source)
+        _require_endpoint(chart, edit.target)
+        if any(e.source == edit.source and e.target == edit.target and e.label == edit.label for e in chart.edges):
+            return
+        chart.edges.append(Edge(edit.source, edit.target, "-->", edit.label))
+    elif op == "remove_edge":
+        before = len(chart.edges)
+        chart.edges = [
+            e for e in chart.edges
+            if not (e.source == edit.source and e.target == edit.target and (not edit.label or e.label == edit.label))
+        ]
+        if len(chart.edges) == before:
+            raise PatchError(f"no edge {edit.source!r} -> {edit.target!r}")
+    elif op == "move_to_subgraph":
+        _require_node(chart, edit.id)
+        if edit.subgraph:
+            chart.add_subgraph(edit.subgraph, edit.label or None)
+            chart.membership[edit.id] = edit.subgraph
+        else:
+            chart.membership.pop(edit.id, None)
+    else:
+        raise PatchError(f"unsupported op {op!r}")
+
+
+def _previous(state: Any, field: str) -> str:
+    diagram = state.get("diagram")
+    if isinstance(diagram, dict):
+        return diagram.get(field) or ""
+    return getattr(diagram, field, "") or ""
+
+
+class DiagramEditor:
+    """edit mode after_model 콜백 + 카운터."""
+
+    def __init__(self, stash: RequestStash) -> None:
+        self._stash = stash
+        self.full = 0
+        self.patched = 0
+        self.edits_applied = 0
+        self.patch_failures = 0
+        self.regenerated = 0
+        self.regenerate_failures = 0
+
+    async def after_model(self, callback_context: Any, llm_response: Any) -> None:
+        if getattr(llm_response, "partial", False) or getattr(llm_response, "error_code", None):
+            return None
+        text = response_text(llm_response)
+        if not text.strip():
+            return None
+        try:
+            parsed = DiagramEditResponse.model_validate_json(strip_code_fence(text))
+        except Exception:
+            return None  # 스키마 밖 응답은 그대로 (output_key 검증에서 처리)
+        if parsed.mermaid.strip() or not parsed.edits:
+            self.full += 1
+            return None
+        try:
+            mermaid = apply_edits(_previous(callback_context.state, "mermaid"), parsed.edits)
+        except PatchError as e:
+            self.patch_failures += 1
+            logger.info("diagram patch failed, regenerating: %s", e)
+            try:
+                result = await self._regenerate(callback_context, str(e))
+            except (PatchError, ValidationError) as regen_error:
+                result = self._keep_previous(callback_context, parsed, regen_error)
+            except Exception as regen_error:
+                logger.warning("diagram regeneration failed: %s", regen_error, exc_info=True)
+                result = self._keep_previous(callback_context, parsed, regen_error)
+        else:
+            self.patched += 1
+            self.edits_applied += len(parsed.edits)
+            result = DiagramResponse(title=parsed.title, message=parsed.message, mermaid=mermaid)
+        set_response_text(llm_response, result.model_dump_json())
+        return None
+
+    async def _regenerate(self, callback_context: Any, error: str) -> DiagramResponse:
+        """같은 요청에 오류 안내를 덧붙여 전체 다이어그램 재생성."""
+        llm_request = self._stash.get(callback_context)
+        if llm_request is None:
+            raise PatchError(f"cannot regenerate diagram: {error}")
+        text = await call_again(callback_context, llm_request, _REGENERATE_PROMPT.format(error=error))
+        parsed = DiagramEditResponse.model_validate_json(strip_code_fence(text))
+        if not parsed.mermaid.strip():
+            raise PatchError(f"regeneration returned no mermaid after: {error}")
+        self.regenerated += 1
+        return DiagramResponse(title=parsed.title, message=parsed.message, mermaid=parsed.mermaid)
+
+    def _keep_previous(self, callback_context: Any, parsed: DiagramEditResponse, error: Exception) -> DiagramResponse:
+        """patch도 재생성도 실패: 턴을 오류로 끝내지 않고 이전 다이어그램을 유지, 이유를 메시지로."""
+        self.regenerate_failures += 1
+        logger.info("keeping previous diagram: %s", error)
+        state = callback_context.state
+        template = _KEPT_MESSAGE[detect_language(parsed.message or parsed.title)]
+        return DiagramResponse(
+            title=_previous(state, "title") or parsed.title,
+            message=template.format(error=error),
+            mermaid=_previous(state, "mermaid"),
+        )
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "full": self.full,
+            "patched": self.patched,
+            "edits_applied": self.edits_applied,
+            "patch_failures": self.patch_failures,
+            "regenerated": self.regenerated,
+            "regenerate_failures": self.regenerate_failures,
+        }
+
+
+def build_diagram_editor(stash: RequestStash) -> DiagramEditor | None:
+    """DIAGRAM_EDIT_MODE=true 일 때만 활성 (기본 비활성: 전체 mermaid 생성)."""
+    if os.getenv("DIAGRAM_EDIT_MODE", "false").strip().lower() not in ("true", "1", "yes", "on"):
+        return None
+    logger.info("Diagram edit mode enabled (LLM returns patches against the previous diagram)")
+    return DiagramEditor(stash)
@@ -0,0 +1,362 @@
+"""구조가 명시된 요청의 규칙 기반 처리 (before_model_callback, LLM 호출 없음).
+
+사용자가 구조를 이미 적어 준 요청은 모델 없이 DiagramResponse를 바로 만듦:
+- 화살표 연결: "A -> B -> C, C -> D", "웹 → WAS → DB" (`->`, `-->`, `=>`, `→`, `⇒`; 링크 라벨 `->|HTTP|`)
+- 목록: "- 로그인", "1. Login" 같은 글머리 줄 → 순서대로 연결 (앞에 "제목:" 줄이 있으면 제목)
+- N계층: "3-tier: web, app, db", "3계층 구조: 웹, WAS, DB"
+응답은 응답 캐시 히트와 같은 경로(before_model이 LlmResponse 반환)로 기록되므로 세션에는 모델 턴과 같은
+이벤트(output_key state 포함)가 남고, 이후 턴은 평소처럼 LLM이 이어 받음.
+
+confidence: 입력 중 구조로 해석한 부분의 비율에서 감점(긴 라벨, 계층 수 불일치, 중첩 목록 등). 해석하지 못한
+지시("make sure ...")가 남으면 0.5 이하. min_confidence 미만이면 LLM으로.
+편집 요청("추가", "remove" 등), 질문, 다른 종류의 다이어그램(시퀀스, class 등) 요청, 이미 다이어그램이 있는
+세션의 후속 턴은 항상 LLM. force_llm()(/run 요청의 forceLlm)이면 검사하지 않음.
+"""
+import logging
+import os
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, NamedTuple
+
+from .mermaid import Edge, Flowchart
+from .response_cache import detect_language
+from .retry import content_text
+from .schema import DiagramResponse
+
+logger = logging.getLogger(__name__)
+
+# 화살표 (뒤에 |링크 라벨| 가능)
+_ARROW_RE = re.compile(r"\s*(?:[-–—=]{1,2}>|→|⟶|⇒|➔|➜)\s*(?:\|([^|]*)\|\s*)?")
+_BULLET_RE = re.compile(r"^(\s*)(?:[-*•·▪◦]|\d{1,2}[.)]|[①-⑳])\s+(.+)$")
+_TIER_RE = re.compile(
+    r"^\s*(\d{1,2})\s*[- ]?\s*(?:tier|layer|계층|티어|층)(?:\s*(?:architecture|구조|아키텍처|시스템|system))?"
+    r"\s*[:：]\s*(.+)$",
+    re.IGNORECASE,
+)
+_HEADER_RE = re.compile(r"^(.{1,40}?)\s*[:：]\s*(.*)$")
+_LIST_SPLIT_RE = re.compile(r"\s*(?:,|/|、|\band\b|및|그리고)\s*", re.IGNORECASE)
+# "그려줘" / "draw ..." 같은 지시어: 구조 해석에서 빼고 confidence에도 넣지 않음
+_FILLER_PREFIX_RE = re.compile(
+    r"^(?:please\s+)?(?:draw|create|make|generate|render|show)(?:\s+me)?(?:\s+(?:a|an|the))?"
+    r"(?:\s+(?:it|this|that))?(?:\s+(?:simple|quick))?(?:\s+(?:diagram|flowchart|flow\s*chart|flow|chart|graph))?(?:\s+(?:of|for))?\s*[:：]?\s*",
+    re.IGNORECASE,
+)
+_FILLER_SUFFIX_RE = re.compile(
+    r"\s*(?:(?:을|를|으로|로)\s*)?(?:(?:다이어그램|흐름도|플로우차트|순서도|구조도|그림|diagram|flowchart)\s*(?:으로|로|을|를)?\s*)?"
+    r"(?:그려|만들어|작성해|표현해)\s*(?:줘|주세요|줄래|봐|보세요)?[.!~]*\s*$"
+)
+# 이전 다이어그램을 고치라는 요청이나 질문은 모델이 판단
+_EDIT_RE = re.compile(
+    r"\b(?:add|remove|delete|drop|change|rename|replace|update|modify|insert|move|instead|undo|explain|why|how)\b"
+    r"|추가|삭제|제거|변경|바꿔|바꾸|수정|옮겨|대신|빼\s*줘|빼고|넣어|설명|왜|어떻게",
+    re.IGNORECASE,
+)
+# flowchart가 아닌 다이어그램 요청
+_OTHER_DIAGRAM_RE = re.compile(
+    r"\b(?:sequence|class|state|er|entity[- ]relationship|gantt|pie|mind\s*map|timeline|journey)\s*(?:diagram|chart)"
+    r"|\b(?:erd|gantt|mindmap)\b|시퀀스|클래스\s*다이어그램|상태\s*(?:다이어그램|전이도)|간트|파이\s*차트|마인드\s*맵",
+    re.IGNORECASE,
+)
+# 라벨에 이런 단어(띄어 쓴 조사, 접속어, 지시어)가 있으면 노드 이름이 아니라 문장의 일부
+_NOISE_WORDS = frozenset((
+    "given", "that", "if", "then", "when", "while", "because", "should", "must", "make", "sure", "please", "draw",
+    "drawn", "using", "which", "where", "so", "but", "also", "is", "are", "be", "it", "this",
+    "로", "으로", "을", "를", "이", "가", "은", "는", "에", "에서", "와", "과", "의", "도", "처럼",
+    "다이어그램", "흐름도", "구조도", "구조", "그림", "형태", "방식", "모양",
+))
+_DB_RE = re.compile(r"\b(?:db|database|rdbms|mysql|postgres(?:ql)?|oracle|redis|mongo(?:db)?|storage)\b|디비|데이터베이스|저장소",
+                    re.IGNORECASE)
+
+_MAX_LABEL = 40
+_MAX_LABEL_WORDS = 6
+_MAX_NODES = 50
+_MAX_TITLE = 25
+
+
+class Route(NamedTuple):
+    kind: str  # chain | list | tiers
+    confidence: float
+    response: DiagramResponse
+
+
+_force_llm: ContextVar[bool] = ContextVar("fastpath_force_llm", default=False)
+
+
+@contextmanager
+def force_llm(enabled: bool = True) -> Iterator[None]:
+    """이 구간의 Runner 실행은 fast path를 건너뜀 (/run 요청의 forceLlm)."""
+    token = _force_llm.set(enabled)
+    try:
+        yield
+    finally:
+        _force_llm.reset(token)
+
+
+# ----- 해석 -----
+
+
+def _strip_filler(text: str) -> str:
+    text = _FILLER_SUFFIX_RE.sub("", text.strip())
+    return _FILLER_PREFIX_RE.sub("", text, count=1).strip()
+
+
+def _label_ok(label: str) -> bool:
+    words = label.split()
+    return (0 < len(label) <= _MAX_LABEL and len(words) <= _MAX_LABEL_WORDS and not label.endswith(("?", "？"))
+            and not any(w.casefold() in _NOISE_WORDS for w in words))
+
+
+def _clean_label(label: str) -> str:
+    return label.strip().strip("\"'`“”‘’").strip().rstrip(".。")
+
+
+def _parse_chain(segment: str) -> list[tuple[str, str, str]] | None:
+    """'A -> B ->|x| C' → [(A, B, ''), (B, C, 'x')]. 화살표가 없거나 라벨이 이상하면 None."""
+    parts = _ARROW_RE.split(segment)
+    # split 결과: [노드, 링크 라벨, 노드, 링크 라벨, 노드, ...]
+    if len(parts) < 3:
+        return None
+    nodes = [_clean_label(p) for p in parts[0::2]]
+    links = [(p or "").strip() for p in parts[1::2]]
+    if not all(_label_ok(n) for n in nodes):
+        return None
+    return [(nodes[i], nodes[i + 1], links[i]) for i in range(len(links))]
+
+
+class _Builder:
+    """라벨 → 노드 id (같은 라벨은 같은 노드). DB류 라벨은 원통 모양."""
+
+    def __init__(self, direction: str):
+        self.chart = Flowchart(direction)
+        self._ids: dict[str, str] = {}
+
+    def node(self, label: str) -> str:
+        key = label.casefold()
+        node_id = self._ids.get(key)
+        if node_id is None:
+            node_id = self._ids[key] = f"N{len(self._ids) + 1}"
+            shape = ("[(", ")]") if _DB_RE.search(label) else ("[", "]")
+            self.chart.add_node(node_id, label, shape)
+        return node_id
+
+    def edge(self, source: str, target: str, label: str = "") -> None:
+        self.chart.edges.append(Edge(self.node(source), self.node(target), "-->", label))
+
+    def response(self, kind: str, confidence: float, title: str, message: str) -> Route | None:
+        if len(self.chart.nodes) > _MAX_NODES:
+            return None
+        return Route(kind, confidence, DiagramResponse(title=title, message=message, mermaid=self.chart.to_mermaid()))
+
+
+def _title(text: str) -> str:
+    text = text.strip()
+    return text if len(text) <= _MAX_TITLE else text[:_MAX_TITLE - 1].rstrip() + "…"
+
+
+def _path(labels: list[str], limit: int = 6) -> str:
+    return " → ".join(labels if len(labels) <= limit else [*labels[:limit - 1], "…", labels[-1]])
+
+
+def _parse_tiers(line: str, ko: bool) -> Route | None:
+    m = _TIER_RE.match(line)
+    if not m:
+        return None
+    count = int(m.group(1))
+    items = [_clean_label(x) for x in _LIST_SPLIT_RE.split(m.group(2)) if _clean_label(x)]
+    if len(items) < 2 or not all(_label_ok(x) for x in items):
+        return None
+    confidence = 1.0 if len(items) == count else 0.6
+    builder = _Builder("TD")
+    for upper, lower in zip(items, items[1:]):
+        builder.edge(upper, lower)
+    if ko:
+        title = f"{len(items)}계층 아키텍처"
+        message = f"{len(items)}계층 구조를 위에서 아래로 연결해 그렸습니다: {_path(items)}."
+    else:
+        title = f"{len(items)}-tier architecture"
+        message = f"Drew a {len(items)}-tier architecture as a top-down flowchart: {_path(items)}."
+    return builder.response("tiers", confidence, title, message)
+
+
+def _parse_list(lines: list[str], ko: bool) -> Route | None:
+    header = ""
+    items: list[tuple[int, str]] = []
+    other = 0
+    for line in lines:
+        m = _BULLET_RE.match(line)
+        if m:
+            items.append((len(m.group(1).expandtabs(4)), _clean_label(m.group(2))))
+        elif not items and not header and line.strip().endswith((":", "：")):
+            header = line.strip().rstrip(":：").strip()
+        else:
+            other += 1
+    if len(items) < 2 or other:
+        return None
+    labels = [label for _, label in items]
+    if len({label.casefold() for label in labels}) != len(labels) or _ARROW_RE.search("\n".join(labels)):
+        return None
+    if not all(_label_ok(label) for label in labels):
+        return None
+    # 중첩 목록은 계층/그룹일 수도 있어 모델에게
+    confidence = 1.0 if len({indent for indent, _ in items}) == 1 else 0.6
+    builder = _Builder("TD")
+    for a, b in zip(labels, labels[1:]):
+        builder.edge(a, b)
+    if ko:
+        title = _title(header or f"{labels[0]} 외 {len(labels) - 1}단계")
+        message = f"나열하신 {len(labels)}단계를 순서대로 연결한 flowchart TD를 그렸습니다: {_path(labels)}."
+    else:
+        title = _title(header or f"{len(labels)}-step flow")
+        message = f"Drew a top-down flowchart of the {len(labels)} listed steps in order: {_path(labels)}."
+    return builder.response("list", confidence, title, message)
+
+
+def _parse_chains(text: str, ko: bool) -> Route | None:
+    # 줄, 쉼표, 세미콜론, 문장 끝에서 나눔 ("a -> b. draw it"의 "draw it"이 라벨에 붙지 않도록)
+    segments = [s.strip() for s in re.split(r"[\n;,]+|(?<=[.!。])\s+", text) if s.strip()]
+    header = ""
+    if segments:
+        m = _HEADER_RE.match(segments[0])
+        if m and not _ARROW_RE.search(m.group(1)) and _ARROW_RE.search(m.group(2)):
+            header, segments[0] = m.group(1).strip(), m.group(2)
+    edges: list[tuple[str, str, str]] = []
+    structured = unstructured = 0
+    for segment in segments:
+        bullet = _BULLET_RE.match(segment)
+        if bullet:
+            segment = bullet.group(2)
+        chain = _parse_chain(segment)
+        if chain is None:
+            # 지시어만 있는 조각("그려줘", "draw a diagram")은 무시, 내용이 남으면 해석 못 한 요구 사항
+            unstructured += len(_strip_filler(segment).rstrip(".!。"))
+            continue
+        structured += len(segment)
+        edges.extend(chain)
+    if not edges:
+        return None
+    confidence = structured / (structured + unstructured)
+    if unstructured:
+        # 버린 문장에 요구 사항이 있을 수 있으므로 비율과 상관없이 임계값 아래로
+        confidence = min(confidence, 0.5)
+    builder = _Builder("LR")
+    for source, target, label in edges:
+        builder.edge(source, target, label)
+    order = [n.label for n in builder.chart.nodes.values()]
+    nodes, links = len(order), len(builder.chart.edges)
+    if ko:
+        title = _title(header or f"{order[0]} → {order[-1]} 흐름")
+        message = f"입력하신 연결 그대로 노드 {nodes}개, 연결 {links}개의 flowchart LR을 그렸습니다: {_path(order)}."
+    else:
+        title = _title(header or f"{order[0]} to {order[-1]} flow")
+        message = f"Drew a left-to-right flowchart with {nodes} nodes and {links} connection{'s' if links != 1 else ''} as written: {_path(order)}."
+    return builder.response("chain", confidence, title, message)
+
+
+def route(text: str) -> Route | None:
+    """구조가 명시된 요청이면 (종류, confidence, 응답). 해석할 수 없거나 편집/질문/다른 다이어그램 종류면 None."""
+    if not text or not text.strip() or _EDIT_RE.search(text) or "?" in text or "？" in text:
+        return None
+    if _OTHER_DIAGRAM_RE.search(text):
+        return None
+    ko = detect_language(text) == "ko"
+    # 들여쓰기는 중첩 목록 판정에 쓰므로 남김
+    lines = [line[: len(line) - len(line.lstrip())] + stripped
+             for line in text.strip("\n").splitlines() if (stripped := _strip_filler(line))]
+    if not lines:
+        return None
+    if len(lines) == 1:
+        tiers = _parse_tiers(lines[0], ko)
+        if tiers is not None:
+            return tiers
+    found = _parse_list(lines, ko) if len(lines) > 1 else None
+    return found if found is not None else _parse_chains("\n".join(lines), ko)
+
+
+# ----- before_model 콜백 -----
+
+
+class FastPath:
+    """before_model_callback: min_confidence 이상이면 LlmResponse를 반환해 LLM 호출을 건너뜀."""
+
+    def __init__(self, min_confidence: float = 0.9):
+        self._min_confidence = min_confidence
+        self.checked = 0
+        self.hits = 0
+        self.low_confidence = 0
+        self.no_match = 0
+        self.forced = 0
+        self.follow_ups = 0
+        self.errors = 0
+        self.kinds = {"chain": 0, "list": 0, "tiers": 0}
+
+    def match(self, text: str, state: Any = None) -> Route | None:
+        """카운터 없이 판정만 (run_server가 LLM 대기열을 건너뛸지 결정할 때). state는 세션 state."""
+        if _force_llm.get() or _has_diagram(state):
+            return None
+        try:
+            found = route(text)
+        except Exception:
+            return None
+        return found if found is not None and found.confidence >= self._min_confidence else None
+
+    def before_model(self, callback_context: Any, llm_request: Any) -> Any:
+        if _force_llm.get():
+            self.forced += 1
+            return None
+        if _has_diagram(getattr(callback_context, "state", None)):
+            # 후속 턴은 이전 다이어그램과 대화 맥락을 보는 LLM이 처리
+            self.follow_ups += 1
+            return None
+        self.checked += 1
+        try:
+            found = route(content_text(getattr(callback_context, "user_content", None)))
+        except Exception:
+            self.errors += 1
+            logger.exception("fast path failed")
+            return None
+        if found is None:
+            self.no_match += 1
+            return None
+        if found.confidence < self._min_confidence:
+            self.low_confidence += 1
+            return None
+        self.hits += 1
+        self.kinds[found.kind] += 1
+        from google.adk.models.llm_response import LlmResponse
+        from google.genai import types
+
+        return LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text=found.response.model_dump_json())]),
+            turn_complete=True,
+        )
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "checked": self.checked,
+            "hits": self.hits,
+            "low_confidence": self.low_confidence,
+            "no_match": self.no_match,
+            "forced": self.forced,
+            "follow_ups": self.follow_ups,
+            "errors": self.errors,
+            "hit_rate": round(self.hits / self.checked, 4) if self.checked else 0.0,
+            **{f"hits_{kind}": n for kind, n in self.kinds.items()},
+            "min_confidence": self._min_confidence,
+        }
+
+
+def _has_diagram(state: Any) -> bool:
+    return state is not None and bool(state.get("diagram"))
+
+
+def build_fast_path() -> FastPath | None:
+    """env 기반 생성. FASTPATH_ENABLED=false 이면 None."""
+    if os.getenv("FASTPATH_ENABLED", "true").strip().lower() in ("false", "0", "no", "off"):
+        return None
+    try:
+        threshold = float(os.getenv("FASTPATH_MIN_CONFIDENCE", "0.9"))
+    except ValueError:
+        logger.warning("invalid FASTPATH_MIN_CONFIDENCE; using 0.9")
+        threshold = 0.9
+    return FastPath(min_confidence=threshold)
@@ -0,0 +1,616 @@
+"""Sugiyama 방식 계층 레이아웃: mermaid.Flowchart → 노드/간선/subgraph 좌표 (브라우저 없이 SVG를 그릴 때).
+
+단계:
+1. 사이클 제거 — 선언 순서로 DFS, 역방향 간선을 뒤집음 (그릴 때 화살표 방향은 원래대로).
+2. 계층 배정 — 최장 경로 계층화 후 소스 노드를 후속 노드 바로 위 계층으로 내림.
+3. 두 계층 이상 건너는 간선에 더미 노드 삽입 (라벨이 있으면 가운데 더미가 라벨 자리를 차지).
+   subgraph가 걸친 계층마다 왼쪽/오른쪽 경계 더미도 넣음.
+4. 교차 최소화 — 위/아래 barycenter 스윕, 교차 수가 가장 적은 순서를 유지. 같은 subgraph 멤버는 연속 배치,
+   형제 subgraph의 좌우 순서는 모든 계층에서 같게.
+5. 좌표 — 인접 계층 이웃의 평균 위치를 목표로, 왼쪽/오른쪽 기준 배치 결과를 평균 (최소 간격 보장).
+   마지막으로 같은 subgraph의 경계 더미를 한 좌표로 맞춰, 다른 노드가 subgraph 상자 안에 들어가지 않게 함.
+
+좌표는 (order, rank) 공간에서 계산한 뒤 방향(TD/TB/BT/LR/RL)에 맞게 변환. subgraph 안의 `direction`은 무시.
+텍스트 폭은 글꼴 없이 문자 폭 근사(한글 등 전각 1em)로 추정.
+"""
+import re
+import unicodedata
+from collections import defaultdict, deque
+from typing import Any, Iterable
+
+from .mermaid import Flowchart
+
+FONT_SIZE = 14.0
+LINE_HEIGHT = 1.4 * FONT_SIZE
+PAD_X = 15.0
+PAD_Y = 9.0
+MIN_NODE_WIDTH = 40.0
+TITLE_HEIGHT = 22.0  # subgraph 제목 줄
+MARGIN = 8.0
+
+_BR_RE = re.compile(r"<br\s*/?>", re.IGNORECASE)
+_TAG_RE = re.compile(r"</?(?:b|i|u|em|strong|small|span)[^>]*>", re.IGNORECASE)
+_NARROW = set("il.,:;'|!()[]{} ")
+_WIDE = set("mwMW@%")
+
+
+def label_lines(label: str) -> list[str]:
+    """`<br>`/개행으로 나눈 줄 (간단한 서식 태그는 제거)."""
+    text = _TAG_RE.sub("", _BR_RE.sub("\n", label or ""))
+    return [line.strip() for line in text.split("\n")] or [""]
+
+
+def text_width(text: str, font_size: float = FONT_SIZE) -> float:
+    """대략적인 텍스트 폭 (px)."""
+    em = 0.0
+    for ch in text:
+        if unicodedata.east_asian_width(ch) in ("W", "F"):
+            em += 1.0
+        elif ch in _NARROW:
+            em += 0.3
+        elif ch in _WIDE or ch.isupper():
+            em += 0.72
+        else:
+            em += 0.56
+    return em * font_size
+
+
+def text_size(lines: list[str]) -> tuple[float, float]:
+    return max(text_width(line) for line in lines), len(lines) * LINE_HEIGHT
+
+
+class LayoutNode:
+    __slots__ = ("id", "lines", "shape", "css_class", "width", "height", "x", "y", "dummy")
+
+    def __init__(self, id: str, lines: list[str], shape: tuple[str, str], css_class: str = "",
+                 dummy: bool = False):
+        self.id = id
+        self.lines = lines
+        self.shape = shape
+        self.css_class = css_class
+        self.dummy = dummy
+        self.width, self.height = (0.0, 0.0) if dummy and not lines else node_size(lines, shape)
+        self.x = self.y = 0.0
+
+
+class LayoutEdge:
+    __slots__ = ("source", "target", "op", "label", "points", "label_pos")
+
+    def __init__(self, source: str, target: str, op: str, label: str):
+        self.source = source
+        self.target = target
+        self.op = op
+        self.label = label
+        self.points: list[tuple[float, float]] = []
+        self.label_pos: tuple[float, float] | None = None
+
+
+class Cluster:
+    __slots__ = ("id", "title", "depth", "x", "y", "width", "height")
+
+    def __init__(self, id: str, title: str, depth: int):
+        self.id = id
+        self.title = title
+        self.depth = depth
+        self.x = self.y = self.width = self.height = 0.0
+
+
+class Layout:
+    __slots__ = ("direction", "width", "height", "nodes", "edges", "clusters")
+
+    def __init__(self, direction: str, nodes: dict[str, LayoutNode], edges: list[LayoutEdge],
+                 clusters: list[Cluster]):
+        self.direction = direction
+        self.nodes = nodes
+        self.edges = edges
+        self.clusters = clusters
+        self.width = self.height = 0.0
+
+
+def node_size(lines: list[str], shape: tuple[str, str]) -> tuple[float, float]:
+    """라벨이 들어가는 모양의 (폭, 높이)."""
+    tw, th = text_size(lines)
+    w, h = max(tw + 2 * PAD_X, MIN_NODE_WIDTH), th + 2 * PAD_Y
+    open_ = shape[0]
+    if open_ in ("((", "((("):
+        d = max(tw, th) + 2 * PAD_Y + (8 if open_ == "(((" else 0)
+        return d, d
+    if open_ == "{":
+        # 마름모 안에 텍스트 사각형(반폭 p, 반높이 q)이 들어가도록: p/a + q/b <= 1
+        p, q = w / 2, h / 2
+        b = min(p + q, 1.1 * h)
+        return 2 * p / (1 - q / b), 2 * b
+    if open_ in ("{{", "([", "[/", "[\\"):
+        return w + h / 2, h
+    if open_ == ">":
+        return w + h / 3, h
+    if open_ == "[[":
+        return w + 16, h
+    if open_ == "[(":
+        return w, h + 16
+    return w, h
+
+
+def _cluster_chains(chart: Flowchart) -> dict[str, tuple[str, ...]]:
+    """노드 id → 바깥쪽부터 안쪽까지 속한 subgraph id."""
+    def chain(sg_id: str | None) -> tuple[str, ...]:
+        out: list[str] = []
+        seen: set[str] = set()
+        while sg_id is not None and sg_id in chart.subgraphs and sg_id not in seen:
+            seen.add(sg_id)
+            out.append(sg_id)
+            sg_id = chart.subgraphs[sg_id].parent
+        return tuple(reversed(out))
+
+    return {node_id: chain(chart.membership.get(node_id)) for node_id in chart.nodes}
+
+
+def _common_prefix(a: tuple[str, ...], b: tuple[str, ...]) -> tuple[str, ...]:
+    n = 0
+    while n < len(a) and n < len(b) and a[n] == b[n]:
+        n += 1
+    return a[:n]
+
+
+def _break_cycles(order: list[str], edges: list[tuple[str, str]]) -> set[int]:
+    """DFS에서 스택 위의 노드로 가는 (역방향) 간선 인덱스."""
+    adj: dict[str, list[tuple[str, int]]] = defaultdict(list)
+    for i, (u, v) in enumerate(edges):
+        adj[u].append((v, i))
+    state: dict[str, int] = {}  # 1: 스택 위, 2: 완료
+    back: set[int] = set()
+    for root in order:
+        if root in state:
+            continue
+        state[root] = 1
+        stack = [(root, iter(adj[root]))]
+        while stack:
+            v, it = stack[-1]
+            for w, i in it:
+                s = state.get(w)
+                if s is None:
+                    state[w] = 1
+                    stack.append((w, iter(adj[w])))
+                    break
+                if s == 1:
+                    back.add(i)
+            else:
+                state[v] = 2
+                stack.pop()
+    return back
+
+
+def _assign_layers(order: list[str], edges: Iterable[tuple[str, str]]) -> dict[str, int]:
+    """최장 경로 계층 (DAG). 들어오는 간선이 없는 노드는 가장 가까운 후속 노드 바로 위로."""
+    succ: dict[str, list[str]] = defaultdict(list)
+    indeg = dict.fromkeys(order, 0)
+    for u, v in edges:
+        succ[u].append(v)
+        indeg[v] += 1
+    sources = {v for v in order if indeg[v] == 0}
+    layer = dict.fromkeys(order, 0)
+    queue = deque(v for v in order if indeg[v] == 0)
+    topo: list[str] = []
+    while queue:
+        v = queue.popleft()
+        topo.append(v)
+        for w in succ[v]:
+            layer[w] = max(layer[w], layer[v] + 1)
+            indeg[w] -= 1
+            if indeg[w] == 0:
+                queue.append(w)
+    for v in reversed(topo):
+        if v in sources and succ[v]:
+            layer[v] = max(0, min(layer[w] for w in succ[v]) - 1)
+    return layer
+
+
+def _count_crossings(upper: list[str], pos: dict[str, int], lower_adj: dict[str, list[str]]) -> int:
+    """두 계층 사이 간선 교차 수 (아래쪽 위치 수열의 역순 쌍, 병합 정렬)."""
+    seq = [pw for _, pw in sorted((pos[u], pos[w]) for u in upper for w in lower_adj[u])]
+
+    def sort_count(a: list[int]) -> tuple[list[int], int]:
+        if len(a) < 2:
+            return a, 0
+        mid = len(a) // 2
+        left, cl = sort_count(a[:mid])
+        right, cr = sort_count(a[mid:])
+        merged, count, i, j = [], cl + cr, 0, 0
+        while i < len(left) and j < len(right):
+            if right[j] < left[i]:
+                merged.append(right[j])
+                count += len(left) - i
+                j += 1
+            else:
+                merged.append(left[i])
+                i += 1
+        merged += left[i:] + right[j:]
+        return merged, count
+
+    return sort_count(seq)[1]
+
+
+def _order_layers(layers: list[list[str]], upper_adj: dict[str, list[str]], lower_adj: dict[str, list[str]],
+                  chains: dict[str, tuple[str, ...]], borders: dict[str, tuple[str, str]],
+                  sweeps: int) -> list[list[str]]:
+    pos = {v: i for layer in layers for i, v in enumerate(layer)}
+    rank_of = {sg: i for i, sg in enumerate(dict.fromkeys(g for c in chains.values() for g in c))}
+    group_key: dict[str, float] = {}
+
+    def update_group_keys() -> None:
+        """subgraph 키는 모든 계층의 멤버 위치 평균: 형제 subgraph의 좌우 순서가 계층마다 같도록."""
+        sums: dict[str, list[float]] = defaultdict(lambda: [0.0, 0])
+        for v, p in pos.items():
+            if v not in borders:
+                for g in chains[v]:
+                    sums[g][0] += p
+                    sums[g][1] += 1
+        group_key.clear()
+        group_key.update({g: total / n + rank_of[g] * 1e-6 for g, (total, n) in sums.items()})
+
+    def sort_layer(k: int, neighbors: dict[str, list[str]] | None) -> None:
+        layer = layers[k]
+        bary = {}
+        for v in layer:
+            ns = neighbors[v] if neighbors is not None else ()
+            if v in borders:
+                bary[v] = float("-inf") if borders[v][0] == "L" else float("inf")
+            else:
+                bary[v] = sum(pos[w] for w in ns) / len(ns) if ns else float(pos[v])
+        # subgraph 멤버를 연속으로: 바깥 subgraph부터 그룹 키를 앞쪽 키로, 경계 더미는 그룹의 양 끝
+        layer.sort(key=lambda v: tuple(group_key.get(g, 0.0) for g in chains[v]) + (bary[v],))
+        for i, v in enumerate(layer):
+            pos[v] = i
+
+    def crossings() -> int:
+        return sum(_count_crossings(layers[k], pos, lower_adj) for k in range(len(layers) - 1))
+
+    update_group_keys()
+    for k in range(len(layers)):
+        sort_layer(k, None)
+    best, best_count = [list(layer) for layer in layers], crossings()
+    for sweep in range(sweeps):
+        if best_count == 0:
+            break
+        update_group_keys()
+        if sweep % 2 == 0:
+            for k in range(1, len(layers)):
+                sort_layer(k, upper_adj)
+        else:
+            for k in range(len(layers) - 2, -1, -1):
+                sort_layer(k, lower_adj)
+        count = crossings()
+        if count < best_count:
+            best, best_count = [list(layer) for layer in layers], count
+    return best
+
+
+def _place_layer(desired: list[float], gaps: list[float]) -> list[float]:
+    """목표 위치에 가깝게, 이웃 사이 최소 간격(gaps[i]: i와 i+1 사이)을 지키는 위치.
+    왼쪽 기준/오른쪽 기준 두 결과의 평균 (둘 다 제약을 만족하므로 평균도 만족)."""
+    n = len(desired)
+    left = list(desired)
+    for i in range(1, n):
+        left[i] = max(left[i], left[i - 1] + gaps[i - 1])
+    for i in range(n - 2, -1, -1):
+        left[i] = min(left[i], left[i + 1] - gaps[i])
+    right = list(desired)
+    for i in range(n - 2, -1, -1):
+        right[i] = min(right[i], right[i + 1] - gaps[i])
+    for i in range(1, n):
+        right[i] = max(right[i], right[i - 1] + gaps[i - 1])
+    return [(a + b) / 2 for a, b in zip(left, right)]
+
+
+def _align_borders(layers: list[list[str]], layer_gaps: list[list[float]], coord: dict[str, float],
+                   borders: dict[str, tuple[str, str]], min_width: dict[str, float]) -> None:
+    """같은 subgraph의 경계 더미를 한 변수로 묶고, 모든 계층의 간격 제약을 만족하는 위치로 (제약 그래프 위에서
+    _place_layer와 같은 왼쪽/오른쪽 기준 평균). 경계는 바깥쪽 극값을 목표로. 순서가 모순(순환)이면 그대로 둠."""
+    def var(v: str) -> str | tuple[str, str]:
+        return borders.get(v, v)
+
+    desired: dict[str | tuple[str, str], float] = {}
+    for v, x in coord.items():
+        key = var(v)
+        if v not in borders or key not in desired:
+            desired[key] = x
+        else:
+            desired[key] = min(desired[key], x) if borders[v][0] == "L" else max(desired[key], x)
+    succ: dict[Any, dict[Any, float]] = defaultdict(dict)
+    pred: dict[Any, dict[Any, float]] = defaultdict(dict)
+    for layer, gaps in zip(layers, layer_gaps):
+        for a, b, g in zip(layer, layer[1:], gaps):
+            va, vb = var(a), var(b)
+            g = max(g, succ[va].get(vb, g))
+            succ[va][vb] = pred[vb][va] = g
+    for sg, width in min_width.items():  # 제목이 들어갈 폭
+        g = max(width, succ[("L", sg)].get(("R", sg), width))
+        succ[("L", sg)][("R", sg)] = pred[("R", sg)][("L", sg)] = g
+    indeg = {v: len(pred[v]) for v in desired}
+    queue = deque(v for v in desired if indeg[v] == 0)
+    topo = []
+    while queue:
+        v = queue.popleft()
+        topo.append(v)
+        for w in succ[v]:
+            indeg[w] -= 1
+            if indeg[w] == 0:
+                queue.append(w)
+    if len(topo) < len(desired):
+        return
+    left: dict[Any, float] = {}
+    for v in topo:
+        left[v] = max([desired[v]] + [left[u] + g for u, g in pred[v].items()])
+    right: dict[Any, float] = {}
+    for v in reversed(topo):
+        right[v] = min([desired[v]] + [right[w] - g for w, g in succ[v].items()])
+    for v in coord:
+        coord[v] = (left[var(v)] + right[var(v)]) / 2
+
+
+def layout(chart: Flowchart, *, node_sep: float = 30.0, rank_sep: float = 45.0, cluster_pad: float = 14.0,
+           sweeps: int = 8, align_passes: int = 4) -> Layout:
+    """Flowchart의 Sugiyama 레이아웃. 좌표는 노드/라벨/subgraph 중심 기준, 전체가 (0, 0)~(width, height) 안."""
+    nodes: dict[str, LayoutNode] = {
+        n.id: LayoutNode(n.id, label_lines(n.label if n.label is not None else n.id), n.shape, n.css_class)
+        for n in chart.nodes.values()
+    }
+    chains = _cluster_chains(chart)
+
+    def endpoint(ref: str) -> str | None:
+        """subgraph를 가리키는 간선은 그 subgraph의 첫 노드에 연결."""
+        if ref in nodes:
+            return ref
+        return next((v for v in nodes if ref in chains[v]), None)
+
+    edges: list[LayoutEdge] = []
+    for e in chart.edges:
+        u, v = endpoint(e.source), endpoint(e.target)
+        if u is not None and v is not None:
+            edges.append(LayoutEdge(u, v, e.op, e.label))
+
+    order = list(nodes)
+    graph = [(e.source, e.target) for e in edges if e.source != e.target]
+    graph_edges = [e for e in edges if e.source != e.target]
+    back = _break_cycles(order, graph)
+    dag = [(v, u) if i in back else (u, v) for i, (u, v) in enumerate(graph)]
+    layer_of = _assign_layers(order, dag)
+
+    # 더미 노드로 긴 간선을 계층마다 한 칸씩
+    routes: list[list[str]] = []
+    for i, ((u, v), edge) in enumerate(zip(dag, graph_edges)):
+        span = layer_of[v] - layer_of[u]
+        route = [u]
+        chain = _common_prefix(chains[u], chains[v])
+        for k in range(1, span):
+            dummy_id = f"\0{i}:{k}"
+            with_label = bool(edge.label) and k == span // 2
+            nodes[dummy_id] = LayoutNode(dummy_id, label_lines(edge.label) if with_label else [], ("[", "]"),
+                                         dummy=True)
+            chains[dummy_id] = chain
+            layer_of[dummy_id] = layer_of[u] + k
+            route.append(dummy_id)
+        route.append(v)
+        routes.append(route)
+
+    # subgraph가 걸친 계층마다 왼쪽/오른쪽 경계 더미: 비멤버 노드는 상자 밖에, 경계는 계층 공통 좌표
+    spans: dict[str, tuple[int, int, tuple[str, ...]]] = {}
+    for v, n in list(nodes.items()):
+        if not n.dummy:
+            for d, sg in enumerate(chains[v]):
+                lo, hi, _ = spans.get(sg, (layer_of[v], layer_of[v], ()))
+                spans[sg] = (min(lo, layer_of[v]), max(hi, layer_of[v]), chains[v][:d + 1])
+    borders: dict[str, tuple[str, str]] = {}
+    for sg, (lo, hi, chain) in spans.items():
+        for k in range(lo, hi + 1):
+            for side in "LR":
+                border_id = f"\0{side}:{sg}:{k}"
+                nodes[border_id] = LayoutNode(border_id, [], ("[", "]"), dummy=True)
+                nodes[border_id].width = nodes[border_id].height = 0.0
+                chains[border_id] = chain
+                layer_of[border_id] = k
+                borders[border_id] = (side, sg)
+
+    n_layers = max(layer_of.values(), default=-1) + 1
+    layers: list[list[str]] = [[] for _ in range(n_layers)]
+    for v in nodes:
+        layers[layer_of[v]].append(v)
+    upper_adj: dict[str, list[str]] = defaultdict(list)
+    lower_adj: dict[str, list[str]] = defaultdict(list)
+    for route in routes:
+        for a, b in zip(route, route[1:]):
+            lower_adj[a].append(b)
+            upper_adj[b].append(a)
+    layers = _order_layers(layers, upper_adj, lower_adj, chains, borders, sweeps)
+
+    # (order, rank) 공간: TD/BT는 order=x, LR/RL은 order=y
+    horizontal = chart.direction in ("LR", "RL")
+    extent = {v: (n.height if horizontal else n.width) for v, n in nodes.items()}
+    thickness = {v: (n.width if horizontal else n.height) for v, n in nodes.items()}
+    max_depth = max((len(c) for v, c in chains.items() if not nodes[v].dummy), default=0)
+
+    def gap(a: str, b: str) -> float:
+        # 경계와 그 subgraph 안쪽 사이는 여백 (LR/RL은 위쪽 경계에 제목 줄), 나머지는 노드 간격
+        if a in borders and borders[a][0] == "L" and borders[a][1] in chains[b]:
+            return cluster_pad + (TITLE_HEIGHT if horizontal else 0.0)
+        if b in borders and borders[b][0] == "R" and borders[b][1] in chains[a]:
+            return cluster_pad
+        return node_sep / 2 if nodes[a].dummy or nodes[b].dummy else node_sep
+
+    coord: dict[str, float] = {}
+    layer_gaps = [[(extent[a] + extent[b]) / 2 + gap(a, b) for a, b in zip(layer, layer[1:])] for layer in layers]
+    for layer, gaps in zip(layers, layer_gaps):
+        x = 0.0
+        for i, v in enumerate(layer):
+            coord[v] = x
+            if i < len(gaps):
+                x += gaps[i]
+        for v in layer:
+            coord[v] -= x / 2
+
+    def align(k: int, neighbors: dict[str, list[str]]) -> None:
+        layer = layers[k]
+        desired = [sum(coord[w] for w in neighbors[v]) / len(neighbors[v]) if neighbors[v] else coord[v]
+                   for v in layer]
+        for v, x in zip(layer, _place_layer(desired, layer_gaps[k])):
+            coord[v] = x
+
+    for _ in range(align_passes):
+        for k in range(1, n_layers):
+            align(k, upper_adj)
+        for k in range(n_layers - 2, -1, -1):
+            align(k, lower_adj)
+    title_width = {} if horizontal else {
+        sg: text_width(chart.subgraphs[sg].title or sg) + 2 * cluster_pad for sg in spans}
+    _align_borders(layers, layer_gaps, coord, borders, title_width)
+
+    rank_gap = rank_sep + ((max_depth * cluster_pad + (0.0 if horizontal else TITLE_HEIGHT)) if max_depth else 0.0)
+    rank: list[float] = []
+    r = 0.0
+    for k, layer in enumerate(layers):
+        t = max((thickness[v] for v in layer), default=0.0)
+        if k:
+            r += rank_gap
+        rank.append(r + t / 2)
+        r += t
+
+    flip = chart.direction in ("BT", "RL")
+    for k, layer in enumerate(layers):
+        for v in layer:
+            o, rk = coord[v], (-rank[k] if flip else rank[k])
+            nodes[v].x, nodes[v].y = (rk, o) if horizontal else (o, rk)
+
+    # 간선 경로: 노드 중심을 잇고 양 끝은 노드 경계에서 자름. 뒤집은 간선은 원래 방향으로.
+    for i, (edge, route) in enumerate(zip(graph_edges, routes)):
+        if i in back:
+            route = list(reversed(route))
+        points = [(nodes[v].x, nodes[v].y) for v in route]
+        points[0] = _clip(nodes[route[0]], points[1])
+        points[-1] = _clip(nodes[route[-1]], points[-2])
+        edge.points = points
+        if edge.label:
+            label_dummy = next((v for v in route if nodes[v].dummy and nodes[v].lines), None)
+            edge.label_pos = (nodes[label_dummy].x, nodes[label_dummy].y) if label_dummy else _midpoint(points)
+    for edge in edges:
+        if edge.source == edge.target:
+            n = nodes[edge.source]
+            x, y = n.x + n.width / 2, n.y
+            edge.points = [(x, y - 6), (x + 18, y - 14), (x + 18, y + 14), (x, y + 6)]
+            if edge.label:
+                edge.label_pos = (x + 18 + text_width(edge.label) / 2 + 4, y)
+
+    clusters = _clusters(chart, nodes, chains, borders, cluster_pad)
+    real = {v: n for v, n in nodes.items() if not n.dummy}
+    result = Layout(chart.direction, real, edges, clusters)
+    _normalize(result, [n for n in nodes.values() if n.dummy and n.lines])
+    return result
+
+
+def _clip(node: LayoutNode, toward: tuple[float, float]) -> tuple[float, float]:
+    """노드 중심에서 toward 방향으로 나가는 선이 노드 경계와 만나는 점."""
+    dx, dy = toward[0] - node.x, toward[1] - node.y
+    if node.dummy or (dx == 0 and dy == 0):
+        return node.x, node.y
+    hw, hh = node.width / 2, node.height / 2
+    open_ = node.shape[0]
+    if open_ in ("((", "((("):
+        t = hw / (dx * dx + dy * dy) ** 0.5
+    elif open_ == "{":
+        t = 1 / (abs(dx) / hw + abs(dy) / hh)
+    else:
+        t = min(hw / abs(dx) if dx else float("inf"), hh / abs(dy) if dy else float("inf"))
+    return node.x + dx * t, node.y + dy * t
+
+
+def _midpoint(points: list[tuple[float, float]]) -> tuple[float, float]:
+    """경로 길이의 절반 지점."""
+    seg = [((b[0] - a[0]) ** 2 + (b[1] - a[1]) ** 2) ** 0.5 for a, b in zip(points, points[1:])]
+    half = sum(seg) / 2
+    for (a, b), length in zip(zip(points, points[1:]), seg):
+        if half <= length and length > 0:
+            t = half / length
+            return a[0] + (b[0] - a[0]) * t, a[1] + (b[1] - a[1]) * t
+        half -= length
+    return points[-1]
+
+
+def _clusters(chart: Flowchart, nodes: dict[str, LayoutNode], chains: dict[str, tuple[str, ...]],
+              borders: dict[str, tuple[str, str]], pad: float) -> list[Cluster]:
+    """subgraph 상자: 멤버 노드(와 하위 subgraph 상자)를 감싸고 위쪽에 제목 줄. 안쪽부터 계산."""
+    boxes: dict[str, list[float]] = {}
+    depth_of = {}
+    for sg_id in chart.subgraphs:
+        depth, parent = 0, chart.subgraphs[sg_id].parent
+        while parent is not None and parent in chart.subgraphs and depth < len(chart.subgraphs):
+            depth, parent = depth + 1, chart.subgraphs[parent].parent
+        depth_of[sg_id] = depth
+    for sg_id in sorted(chart.subgraphs, key=lambda s: -depth_of[s]):
+        xs: list[float] = []
+        for v, n in nodes.items():
+            if not n.dummy and chains[v] and chains[v][-1] == sg_id:
+                xs.append((n.x - n.width / 2, n.y - n.height / 2, n.x + n.width / 2, n.y + n.height / 2))
+        xs += [tuple(boxes[c]) for c, sg in chart.subgraphs.items() if sg.parent == sg_id and c in boxes]
+        if not xs:
+            continue
+        x0, y0 = min(b[0] for b in xs) - pad, min(b[1] for b in xs) - pad - TITLE_HEIGHT
+        x1, y1 = max(b[2] for b in xs) + pad, max(b[3] for b in xs) + pad
+        # 경계 더미까지 (여백/제목 포함): 다른 계층의 멤버 폭만큼 넓어진 상자
+        for v, (_, sg) in borders.items():
+            if sg == sg_id:
+                x0, y0 = min(x0, nodes[v].x), min(y0, nodes[v].y)
+                x1, y1 = max(x1, nodes[v].x), max(y1, nodes[v].y)
+        boxes[sg_id] = [x0, y0, x1, y1]
+    clusters = []
+    for sg_id in chart.subgraphs:  # 선언 순서 (바깥 상자가 먼저 그려지도록 깊이순 정렬)
+        if sg_id in boxes:
+            x0, y0, x1, y1 = boxes[sg_id]
+            # TD/BT는 경계 제약으로 제목 폭이 확보됨. LR/RL은 상자 폭에 맞춰 줄임
+            c = Cluster(sg_id, _fit(chart.subgraphs[sg_id].title or sg_id, x1 - x0 - 2 * pad), depth_of[sg_id])
+            c.x, c.y, c.width, c.height = x0, y0, x1 - x0, y1 - y0
+            clusters.append(c)
+    clusters.sort(key=lambda c: c.depth)
+    return clusters
+
+
+def _fit(text: str, width: float) -> str:
+    """폭을 넘는 제목은 말줄임표로."""
+    if text_width(text) <= width:
+        return text
+    while text and text_width(text + "…") > width:
+        text = text[:-1]
+    return text + "…"
+
+
+def _normalize(result: Layout, label_dummies: list[LayoutNode]) -> None:
+    """모든 요소가 MARGIN부터 시작하도록 평행 이동하고 전체 크기 계산."""
+    xs: list[float] = []
+    ys: list[float] = []
+    for n in list(result.nodes.values()) + label_dummies:
+        xs += [n.x - n.width / 2, n.x + n.width / 2]
+        ys += [n.y - n.height / 2, n.y + n.height / 2]
+    for c in result.clusters:
+        xs += [c.x, c.x + c.width]
+        ys += [c.y, c.y + c.height]
+    for e in result.edges:
+        xs += [p[0] for p in e.points]
+        ys += [p[1] for p in e.points]
+        if e.label_pos is not None:
+            w, h = text_size(label_lines(e.label))
+            xs += [e.label_pos[0] - w / 2, e.label_pos[0] + w / 2]
+            ys += [e.label_pos[1] - h / 2, e.label_pos[1] + h / 2]
+    if not xs:
+        result.width = result.height = 2 * MARGIN
+        return
+    dx, dy = MARGIN - min(xs), MARGIN - min(ys)
+    for n in result.nodes.values():
+        n.x += dx
+        n.y += dy
+    for c in result.clusters:
+        c.x += dx
+        c.y += dy
+    for e in result.edges:
+        e.points = [(x + dx, y + dy) for x, y in e.points]
+        if e.label_pos is not None:
+            e.label_pos = (e.label_pos[0] + dx, e.label_pos[1] + dy)
+    result.width = max(xs) - min(xs) + 2 * MARGIN
+    result.height = max(ys) - min(ys) + 2 * MARGIN
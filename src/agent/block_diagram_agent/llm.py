@@ -0,0 +1,96 @@
+"""LLM 선택 (env 기반): LLM_BASE_URL(또는 KSERVE_URL)이 있으면 해당 OpenAI 호환 엔드포인트(KServe 등),
+없으면 Gemini. LLM_BASE_URLS(쉼표 구분)로 여러 엔드포인트를 주면 RoutedLlm이 부하 분산/헬스 체크/failover.
+
+ADK/LiteLLM은 resolve_model()에서만 import: get_llm_info()는 에이전트를 만들기 전(서버 모듈 초기화)에도 가벼움.
+"""
+import importlib
+import os
+
+
+def _normalize_base_url(url: str) -> str:
+    url = url.strip().rstrip("/")
+    if not url.endswith("/v1"):
+        url += "/v1"
+    return url
+
+
+def _local_base_urls() -> list[str]:
+    """LLM_BASE_URLS(쉼표 구분, 여러 레플리카) > LLM_BASE_URL > KSERVE_URL."""
+    urls = [u for u in os.getenv("LLM_BASE_URLS", "").split(",") if u.strip()]
+    if not urls:
+        single = os.getenv("LLM_BASE_URL", "").strip() or os.getenv("KSERVE_URL", "").strip()
+        urls = [single] if single else []
+    return [_normalize_base_url(u) for u in urls]
+
+
+def _gemini_fallback_enabled() -> bool:
+    return os.getenv("LLM_FALLBACK_GEMINI", "").strip().lower() in ("true", "1", "yes")
+
+
+# 여러 엔드포인트(또는 Gemini fallback)를 쓸 때의 라우터. 상태는 get_llm_info()["backends"]로 노출.
+_router = None
+
+
+def get_llm_info():
+    """현재 사용 중인 LLM 정보. 로컬 모델 여부 확인용."""
+    base_urls = _local_base_urls()
+    if base_urls:
+        model_name = os.getenv("LLM_MODEL_NAME", "local").strip() or "local"
+        info = {
+            "provider": "local",
+            "base_url": base_urls[0],
+            "model_name": model_name,
+        }
+        if len(base_urls) > 1 or _gemini_fallback_enabled():
+            info["backends"] = _router.status() if _router is not None else [{"base_url": u} for u in base_urls]
+            info["fallback"] = "gemini-2.0-flash" if _gemini_fallback_enabled() else None
+        return info
+    return {"provider": "gemini", "model": "gemini-2.0-flash"}
+
+
+def _lite_llm(model_name: str, base_url: str):
+    from google.adk.models.lite_llm import LiteLlm
+
+    # 로컬(Ollama 등)은 키 검증 없음. LiteLLM이 api_key 필수로 요구하므로 더미 값 전달.
+    return LiteLlm(
+        model=f"openai/{model_name}",
+        api_base=base_url,
+        api_key=os.getenv("OPENAI_API_KEY", "ollama"),
+    )
+
+
+def resolve_model():
+    """LLM_BASE_URL(S) 또는 KSERVE_URL이 설정되면 로컬(OpenAI 호환) 모델, 아니면 Gemini.
+    엔드포인트가 여러 개이거나 LLM_FALLBACK_GEMINI=true 이면 RoutedLlm으로 분산/failover."""
+    global _router
+    info = get_llm_info()
+    if info["provider"] == "local":
+        base_urls = _local_base_urls()
+        if "backends" not in info:
+            return _lite_llm(info["model_name"], info["base_url"])
+        from google.adk.models.google_llm import Gemini
+
+        from .router import Backend, RoutedLlm
+
+        _router = RoutedLlm(
+            model=f"openai/{info['model_name']}",
+            backends=[
+                Backend(u, _lite_llm(info["model_name"], u), int(os.getenv("LLM_MAX_CONCURRENCY", "4")))
+                for u in base_urls
+            ],
+            fallback=Gemini(model="gemini-2.0-flash") if _gemini_fallback_enabled() else None,
+            policy=os.getenv("LLM_ROUTING_POLICY", "least_outstanding").strip() or "least_outstanding",
+            max_failures=int(os.getenv("LLM_EJECT_AFTER_FAILURES", "3")),
+            eject_seconds=float(os.getenv("LLM_EJECT_SECONDS", "30")),
+            health_interval=float(os.getenv("LLM_HEALTH_INTERVAL", "10")),
+        )
+        return _router
+    return "gemini-2.0-flash"
+
+
+def preload_llm() -> None:
+    """LiteLLM은 첫 요청 때 import되며 수 초가 걸리므로 요청을 받기 전에 미리 (로컬 모델일 때만).
+    메인 스레드에서 호출: import 중에 LiteLLM이 로깅 필터를 설치하므로, 다른 스레드에서 import하면
+    동시에 로그를 남기는 메인 스레드와 import 락 교착이 생길 수 있음."""
+    if get_llm_info()["provider"] == "local":
+        importlib.import_module("litellm")
@@ -0,0 +1,499 @@
+"""Mermaid flowchart 모델: 파싱 → 수정 → 다시 Mermaid 코드로 직렬화.
+
+지원 범위: YAML front matter(`---` ... `---`), flowchart/graph 헤더, 노드 모양(`[]`, `()`, `{}`, `(())`,
+`[()]` 등), `A@{ shape: ... }` 메타데이터, `:::class`, `&` 묶음, 체인(`A --> B --> C`), 보이지 않는 링크(`~~~`),
+링크 라벨(`-->|text|`, `-- text -->`), 중첩 subgraph, `direction`.
+classDef / class / style / linkStyle / click / accTitle / accDescr / 주석 줄은 그대로 보존.
+같은 id를 다른 라벨로 다시 선언하면 Mermaid와 같이 한 노드의 라벨 변경으로 읽음.
+복구 가능한 결함(특수 문자가 든 따옴표 없는 라벨, 노드와 같은 subgraph id, 예약어 `end` id)은 고쳐서 읽고
+`Flowchart.warnings`에 기록. 고친 문장만 바꾼 원문 줄은 `Flowchart.source` (to_mermaid()는 전체를 다시 씀).
+"""
+import re
+
+DIRECTIONS = ("TB", "TD", "BT", "RL", "LR")
+
+# (여는 기호, 닫는 기호) — 긴 것부터 매칭
+SHAPES: tuple[tuple[str, str], ...] = (
+    ("(((", ")))"),
+    ("((", "))"),
+    ("([", "])"),
+    ("[[", "]]"),
+    ("[(", ")]"),
+    ("{{", "}}"),
+    ("[/", "/]"),
+    ("[\\", "\\]"),
+    ("(", ")"),
+    ("[", "]"),
+    ("{", "}"),
+    (">", "]"),
+)
+_TRAPEZOID_CLOSE = {"[/": ("/]", "\\]"), "[\\": ("\\]", "/]")}
+
+_ID_RE = re.compile(r"\w+(?:-\w+)*")
+_CLASS_RE = re.compile(r":::(\w[\w-]*)")
+_LINK_RE = re.compile(r"~{3,}|<?(?:-{2,}|={2,}|-\.+-)(?:>|x\b|o\b)?|<?(?:-{2,}|={2,})[xo](?=\s|\w)")
+_LINK_TEXT_RE = re.compile(r"(--|==|-\.)\s+(.+?)\s*(-{2,}>|-{3,}|={2,}>|={3,}|\.-+>|\.-+|-{2,}[xo])(?=\s|\w|$)")
+_PIPE_LABEL_RE = re.compile(r"\s*\|([^|]*)\|")
+_PASSTHROUGH = ("classDef", "class", "style", "linkStyle", "click", "%%")
+# accTitle: ... / accDescr: ... / accDescr { 여러 줄 } — ';'로 나누지 않고 줄 그대로 보존
+_ACC_RE = re.compile(r"acc(?:Title|Descr)\s*[:{]")
+_ACC_BLOCK_RE = re.compile(r"accDescr\s*\{")
+_META_LABEL_RE = re.compile(r"\blabel\s*:\s*(?:\"([^\"]*)\"|([^,}]+))")
+_SPECIAL = set('()[]{}<>|;"#&')
+# 따옴표 없이 라벨에 들어가면 Mermaid 파서가 실패하는 문자
+_UNSAFE_UNQUOTED = set('()[]{}|"')
+_RESERVED_IDS = ("end",)
+_BRACKETS = {"(": ")", "[": "]", "{": "}"}
+
+
+class MermaidParseError(ValueError):
+    """flowchart가 아니거나 해석할 수 없는 구문."""
+
+
+class Node:
+    __slots__ = ("id", "label", "shape", "css_class", "meta")
+
+    def __init__(self, id: str, label: str | None = None, shape: tuple[str, str] = ("[", "]"), css_class: str = "",
+                 meta: str = ""):
+        self.id = id
+        self.label = label  # None이면 선언 없이 참조만 된 노드 (id가 곧 라벨)
+        self.shape = shape
+        self.css_class = css_class
+        self.meta = meta  # `A@{ shape: ..., label: ... }`의 { } 안 원문 (있으면 괄호 모양 대신 사용)
+
+    def to_mermaid(self) -> str:
+        out = self.id
+        if self.meta:
+            out += "@{ " + _meta_with_label(self.meta, self.label) + " }"
+        elif self.label is not None:
+            out += self.shape[0] + quote_label(self.label) + self.shape[1]
+        if self.css_class:
+            out += ":::" + self.css_class
+        return out
+
+
+class Edge:
+    __slots__ = ("source", "target", "op", "label")
+
+    def __init__(self, source: str, target: str, op: str = "-->", label: str = ""):
+        self.source = source
+        self.target = target
+        self.op = op
+        self.label = label
+
+    def to_mermaid(self) -> str:
+        if self.label:
+            return f"{self.source} {self.op}|{quote_label(self.label)}| {self.target}"
+        return f"{self.source} {self.op} {self.target}"
+
+
+class Subgraph:
+    __slots__ = ("id", "title", "direction", "parent", "extras")
+
+    def __init__(self, id: str, title: str | None = None, parent: str | None = None):
+        self.id = id
+        self.title = title
+        self.direction = ""
+        self.parent = parent
+        self.extras: list[str] = []
+
+
+class Flowchart:
+    def __init__(self, direction: str = "TD", keyword: str = "flowchart"):
+        self.keyword = keyword
+        self.direction = direction
+        self.nodes: dict[str, Node] = {}
+        self.edges: list[Edge] = []
+        self.subgraphs: dict[str, Subgraph] = {}
+        self.membership: dict[str, str] = {}  # node id -> subgraph id
+        self.preamble: list[str] = []  # 헤더 앞 front matter, %%{init}%% 등
+        self.extras: list[str] = []  # classDef/style/... 원문
+        self.warnings: list[str] = []  # 파싱 중 고친 결함
+        self.source: list[str] = []  # 파싱한 원문 줄 (결함을 고친 줄만 바뀜)
+        self._aliases: dict[str, str] = {}  # 원래 id -> 고친 id (이후 참조에 적용)
+
+    # --- 조회/수정 ---------------------------------------------------------
+
+    def has(self, id: str) -> bool:
+        return id in self.nodes or id in self.subgraphs
+
+    def add_node(self, id: str, label: str | None = None, shape: tuple[str, str] | None = None, subgraph: str | None = None) -> Node:
+        node = self.nodes.get(id)
+        if node is None:
+            node = self.nodes[id] = Node(id)
+        if label is not None:
+            node.label = label
+        if shape is not None:
+            node.shape = shape
+        if subgraph:
+            self.membership[id] = subgraph
+        return node
+
+    def remove_node(self, id: str) -> None:
+        del self.nodes[id]
+        self.membership.pop(id, None)
+        self.edges = [e for e in self.edges if e.source != id and e.target != id]
+
+    def add_subgraph(self, id: str, title: str | None = None, parent: str | None = None) -> Subgraph:
+        sg = self.subgraphs.get(id)
+        if sg is None:
+            sg = self.subgraphs[id] = Subgraph(id, title, parent)
+            # 정의 전에 링크로 참조되어 노드로 잡힌 경우
+            placeholder = self.nodes.get(id)
+            if placeholder is not None and placeholder.label is None:
+                del self.nodes[id]
+                self.membership.pop(id, None)
+        elif title:
+            sg.title = title
+        return sg
+
+    def unique_id(self, base: str) -> str:
+        """base가 비어 있으면 base, 아니면 base_2, base_3, ..."""
+        if not self.has(base):
+            return base
+        n = 2
+        while self.has(f"{base}_{n}"):
+            n += 1
+        return f"{base}_{n}"
+
+    # --- 직렬화 ------------------------------------------------------------
+
+    def to_mermaid(self) -> str:
+        lines = list(self.preamble)
+        lines.append(f"{self.keyword} {self.direction}".rstrip())
+        for node in self.nodes.values():
+            if node.id not in self.membership:
+                lines.append("    " + node.to_mermaid())
+        for sg in self.subgraphs.values():
+            if sg.parent is None:
+                self._emit_subgraph(sg, lines, 1)
+        lines.extend("    " + e.to_mermaid() for e in self.edges)
+        lines.extend("    " + x for x in self.extras)
+        return "\n".join(lines)
+
+    def _emit_subgraph(self, sg: Subgraph, lines: list[str], depth: int) -> None:
+        pad = "    " * depth
+        header = f"subgraph {sg.id}"
+        if sg.title is not None and sg.title != sg.id:
+            header += f" [{quote_label(sg.title)}]"
+        lines.append(pad + header)
+        if sg.direction:
+            lines.append(pad + "    direction " + sg.direction)
+        for node in self.nodes.values():
+            if self.membership.get(node.id) == sg.id:
+                lines.append(pad + "    " + node.to_mermaid())
+        for child in self.subgraphs.values():
+            if child.parent == sg.id:
+                self._emit_subgraph(child, lines, depth + 1)
+        lines.extend(pad + "    " + x for x in sg.extras)
+        lines.append(pad + "end")
+
+
+def quote_label(label: str) -> str:
+    """특수 문자가 있으면 큰따옴표로 감쌈 (내부 따옴표는 #quot;)."""
+    if label and (any(c in _SPECIAL for c in label) or label != label.strip()):
+        return '"' + label.replace('"', "#quot;") + '"'
+    return label
+
+
+def split_front_matter(lines: list[str]) -> tuple[list[str], list[str]]:
+    """(맨 앞 YAML front matter 줄들 — 구분선 `---` 포함, 나머지 줄들). front matter가 없으면 ([], lines)."""
+    start = 0
+    while start < len(lines) and not lines[start].strip():
+        start += 1
+    if start == len(lines) or lines[start].strip() != "---":
+        return [], lines
+    for i in range(start + 1, len(lines)):
+        if lines[i].strip() == "---":
+            return lines[start:i + 1], lines[i + 1:]
+    raise MermaidParseError("front matter is not closed with '---'")
+
+
+def _split_line(line: str) -> list[str]:
+    """한 줄을 세미콜론 단위 문장으로 (따옴표·괄호 안의 ';'는 무시)."""
+    out: list[str] = []
+    buf, depth, quoted = [], 0, False
+    for ch in line:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch in "[({":
+            depth += 1
+        elif not quoted and ch in "])}" and depth:
+            depth -= 1
+        if ch == ";" and not quoted and depth == 0:
+            stmt = "".join(buf).strip()
+            if stmt:
+                out.append(stmt)
+            buf = []
+            continue
+        buf.append(ch)
+    stmt = "".join(buf).strip()
+    if stmt:
+        out.append(stmt)
+    return out
+
+
+def _read_label(s: str, pos: int, close: str | tuple[str, ...]) -> tuple[str, int, bool]:
+    """(라벨, 다음 위치, 따옴표 없이 특수 문자가 들어 있었는지). 따옴표 없는 라벨 안의 괄호 쌍은 건너뜀."""
+    closers = (close,) if isinstance(close, str) else close
+    if pos < len(s) and s[pos] == '"':
+        end = s.find('"', pos + 1)
+        if end == -1:
+            raise MermaidParseError(f"unterminated quote in {s!r}")
+        label = s[pos + 1:end].replace("#quot;", '"')
+        pos = end + 1
+        for c in closers:
+            if s.startswith(c, pos):
+                return label, pos + len(c), False
+        raise MermaidParseError(f"expected {closers[0]!r} after label in {s!r}")
+    depth: list[str] = []
+    i = pos
+    while i < len(s):
+        if not depth:
+            for c in closers:
+                if s.startswith(c, i):
+                    label = s[pos:i].strip()
+                    return label, i + len(c), any(ch in _UNSAFE_UNQUOTED for ch in label)
+        ch = s[i]
+        if ch in _BRACKETS:
+            depth.append(_BRACKETS[ch])
+        elif depth and ch == depth[-1]:
+            depth.pop()
+        i += 1
+    raise MermaidParseError(f"missing {closers[0]!r} in {s!r}")
+
+
+def _read_meta(s: str, pos: int) -> tuple[str, int]:
+    """`@{ ... }` 안 원문과 닫는 `}` 다음 위치. pos는 `@{` 바로 뒤."""
+    quoted = False
+    for i in range(pos, len(s)):
+        if s[i] == '"':
+            quoted = not quoted
+        elif s[i] == "}" and not quoted:
+            return s[pos:i].strip(), i + 1
+    raise MermaidParseError(f"missing '}}' in {s!r}")
+
+
+def _meta_label(meta: str) -> str | None:
+    m = _META_LABEL_RE.search(meta)
+    if m is None:
+        return None
+    return m.group(1) if m.group(1) is not None else m.group(2).strip()
+
+
+def _meta_with_label(meta: str, label: str | None) -> str:
+    """라벨이 바뀐 노드(rename 등)면 메타데이터의 label 항목을 새 라벨로."""
+    if label is None or _meta_label(meta) == label:
+        return meta
+    rest = re.sub(r",\s*,", ",", _META_LABEL_RE.sub("", meta)).strip(" ,")
+    return (rest + ", " if rest else "") + 'label: "' + label.replace('"', "#quot;") + '"'
+
+
+def _parse_node(s: str, pos: int) -> tuple[str, str | None, tuple[str, str] | None, str, str, bool, int]:
+    """(id, label, shape, css_class, meta, 라벨에 따옴표가 필요했는지, 다음 위치)."""
+    m = _ID_RE.match(s, pos)
+    if m is None:
+        raise MermaidParseError(f"expected node id at {s[pos:]!r}")
+    node_id, pos = m.group(0), m.end()
+    label = shape = None
+    meta = ""
+    unsafe = False
+    if s.startswith("@{", pos):
+        meta, pos = _read_meta(s, pos + 2)
+        label = _meta_label(meta)
+    else:
+        for open_, close in SHAPES:
+            if s.startswith(open_, pos):
+                label, pos, unsafe = _read_label(s, pos + len(open_), _TRAPEZOID_CLOSE.get(open_, close))
+                shape = (open_, close)
+                break
+    css_class = ""
+    m = _CLASS_RE.match(s, pos)
+    if m:
+        css_class, pos = m.group(1), m.end()
+    return node_id, label, shape, css_class, meta, unsafe, pos
+
+
+def _skip_ws(s: str, pos: int) -> int:
+    while pos < len(s) and s[pos].isspace():
+        pos += 1
+    return pos
+
+
+def _parse_link(s: str, pos: int) -> tuple[str, str, int] | None:
+    """(op, label, 다음 위치). 링크가 없으면 None."""
+    m = _LINK_TEXT_RE.match(s, pos)
+    if m:
+        family = m.group(1)
+        head = m.group(3)[-1]
+        op = {"--": "--", "==": "==", "-.": "-.-"}[family]
+        op = op + (head if head in ">xo" else ("=" if family == "==" else "-" if family == "--" else ""))
+        return op, m.group(2).strip().strip('"'), m.end()
+    m = _LINK_RE.match(s, pos)
+    if m is None:
+        return None
+    op, pos = m.group(0), m.end()
+    label = ""
+    lm = _PIPE_LABEL_RE.match(s, pos)
+    if lm:
+        label, pos = lm.group(1).strip().strip('"').replace("#quot;", '"'), lm.end()
+    return op, label, pos
+
+
+def parse_flowchart(text: str) -> Flowchart:
+    """Mermaid flowchart 코드를 Flowchart로. 다른 다이어그램 종류거나 구문 오류면 MermaidParseError."""
+    front, lines = split_front_matter(text.splitlines())
+    chart: Flowchart | None = None
+    preamble: list[str] = list(front)
+    source: list[str] = list(front)
+    stack: list[Subgraph] = []  # 열린 subgraph
+    in_acc_block = False  # accDescr { ... } 안
+    for raw in lines:
+        line = raw.strip()
+        if chart is not None and (in_acc_block or _ACC_RE.match(line)):
+            (stack[-1].extras if stack else chart.extras).append(line)
+            source.append(raw)
+            in_acc_block = "}" not in line and (in_acc_block or bool(_ACC_BLOCK_RE.match(line)))
+            continue
+        stmts = [line] if line.startswith("%%") else _split_line(line)
+        fixed: list[str] = []
+        for stmt in stmts:
+            if chart is None:
+                if not stmt.startswith("%%"):
+                    chart = _parse_header(stmt)
+                    chart.preamble = preamble
+                else:
+                    preamble.append(stmt)
+                fixed.append(stmt)
+            else:
+                fixed.append(_parse_statement(chart, stack, stmt))
+        # 고친 문장이 있는 줄만 다시 씀 (들여쓰기 유지)
+        source.append(raw if fixed == stmts else raw[:len(raw) - len(raw.lstrip())] + "; ".join(fixed))
+    if chart is None:
+        raise MermaidParseError("empty diagram")
+    if in_acc_block:
+        raise MermaidParseError("accDescr block is not closed with '}'")
+    if stack:
+        raise MermaidParseError(f"subgraph {stack[-1].id!r} is not closed with 'end'")
+    chart.source = source
+    return chart
+
+
+def _parse_header(stmt: str) -> Flowchart:
+    head = stmt.split()
+    if head[0] not in ("flowchart", "graph"):
+        raise MermaidParseError(f"not a flowchart: {head[0]!r}")
+    direction = head[1].upper() if len(head) > 1 else "TD"
+    if direction not in DIRECTIONS:
+        raise MermaidParseError(f"unknown direction {head[1]!r}")
+    return Flowchart(direction, head[0])
+
+
+def _parse_statement(chart: Flowchart, stack: list[Subgraph], stmt: str) -> str:
+    """헤더 다음 문장 하나를 chart에 반영. 결함을 고쳤으면 고친 문장, 아니면 stmt 그대로."""
+    word = stmt.split(None, 1)[0]
+    if word == "end" and stmt == "end":
+        if not stack:
+            raise MermaidParseError("'end' without subgraph")
+        stack.pop()
+    elif word == "subgraph":
+        sg, stmt = _parse_subgraph(chart, stmt, stack[-1].id if stack else None)
+        stack.append(sg)
+    elif word == "direction" and stack:
+        d = stmt.split()[-1].upper()
+        if d not in DIRECTIONS:
+            raise MermaidParseError(f"unknown direction {d!r}")
+        stack[-1].direction = d
+    elif word in _PASSTHROUGH or stmt.startswith("%%"):
+        (stack[-1].extras if stack else chart.extras).append(stmt)
+    else:
+        stmt = _parse_chain(chart, stmt, stack[-1].id if stack else None)
+    return stmt
+
+
+def _parse_subgraph(chart: Flowchart, stmt: str, parent: str | None) -> tuple[Subgraph, str]:
+    rest = stmt[len("subgraph"):].strip()
+    if not rest:
+        raise MermaidParseError("subgraph without id")
+    if rest.startswith('"'):
+        title = rest.strip('"')
+        return chart.add_subgraph(title, title, parent), stmt
+    m = _ID_RE.match(rest)
+    if m is None:
+        raise MermaidParseError(f"invalid subgraph {rest!r}")
+    sg_id, tail = m.group(0), rest[m.end():].strip()
+    if tail.startswith("["):
+        title, _, _ = _read_label(tail, 1, "]")
+    elif tail:
+        # `subgraph 제목 여러 단어` → id와 title 모두 전체 텍스트
+        sg_id = title = rest
+    else:
+        title = None
+    if sg_id in chart.nodes and chart.nodes[sg_id].label is not None:
+        new_id = chart.unique_id(f"{sg_id}_group")
+        chart.warnings.append(f"subgraph id {sg_id!r} clashes with a node; renamed to {new_id!r}")
+        title = sg_id if title is None else title
+        sg_id = new_id
+        stmt = f"subgraph {sg_id} [{quote_label(title)}]"
+    return chart.add_subgraph(sg_id, title, parent), stmt
+
+
+def _resolve_node(chart: Flowchart, node_id: str, label: str | None, unsafe: bool) -> str:
+    """복구 규칙을 적용한 실제 노드 id. 이미 있는 노드를 다른 라벨로 다시 선언하면 같은 노드 (라벨 변경)."""
+    if unsafe:
+        chart.warnings.append(f"quoted label of {node_id!r} (special characters)")
+    if node_id in _RESERVED_IDS or (label is not None and node_id in chart.subgraphs):
+        # 이미 나온 문장은 건드리지 않도록 이 노드 쪽 id를 바꾸고, 이후 참조도 같은 노드로
+        new_id = chart._aliases.get(node_id) or chart.unique_id(f"{node_id}_node")
+        if node_id not in chart._aliases:
+            reason = "is reserved" if node_id in _RESERVED_IDS else "clashes with a subgraph"
+            chart.warnings.append(f"node id {node_id!r} {reason}; renamed to {new_id!r}")
+        chart._aliases[node_id] = new_id
+        return new_id
+    return chart._aliases.get(node_id, node_id)
+
+
+def _parse_chain(chart: Flowchart, stmt: str, subgraph: str | None) -> str:
+    """노드/링크 체인. 고친 노드 토큰만 바꾼 문장을 반환."""
+    pos = 0
+    prev: list[str] = []
+    pending: tuple[str, str] | None = None
+    patches: list[tuple[int, int, str]] = []  # (시작, 끝, 고친 토큰)
+    while True:
+        pos = _skip_ws(stmt, pos)
+        group: list[str] = []
+        while True:
+            start = pos
+            raw_id, label, shape, css_class, meta, unsafe, pos = _parse_node(stmt, pos)
+            node_id = _resolve_node(chart, raw_id, label, unsafe)
+            if unsafe or node_id != raw_id:
+                token = Node(node_id, label if shape else None, shape or ("[", "]"), css_class, meta)
+                patches.append((start, pos, token.to_mermaid()))
+            if node_id not in chart.subgraphs:
+                node = chart.add_node(node_id, label, shape)
+                if css_class:
+                    node.css_class = css_class
+                if label is not None or meta:
+                    node.meta = meta
+                if subgraph and node_id not in chart.membership:
+                    chart.membership[node_id] = subgraph
+            group.append(node_id)
+            pos = _skip_ws(stmt, pos)
+            if pos < len(stmt) and stmt[pos] == "&":
+                pos = _skip_ws(stmt, pos + 1)
+                continue
+            break
+        if pending is not None:
+            op, edge_label = pending
+            chart.edges.extend(Edge(a, b, op, edge_label) for a in prev for b in group)
+        if pos >= len(stmt):
+            break
+        link = _parse_link(stmt, pos)
+        if link is None:
+            raise MermaidParseError(f"unexpected {stmt[pos:]!r} in {stmt!r}")
+        op, edge_label, pos = link
+        pending = (op, edge_label)
+        prev = group
+    for start, end, token in reversed(patches):
+        stmt = stmt[:start] + token + stmt[end:]
+    return stmt
@@ -0,0 +1,358 @@
+"""서버 측 SVG 렌더링: DiagramResponse.mermaid (flowchart) → layout.py 계층 레이아웃 → SVG.
+
+브라우저의 mermaid.run 없이 그림을 만들 수 있어 느린 클라이언트, 헤드리스 내보내기, CI에서 사용.
+지원 범위는 mermaid.py 파서와 같은 flowchart/graph 부분집합 (노드 모양, 링크 종류/라벨, 중첩 subgraph,
+classDef/class/style의 fill·stroke·color 등). 그 밖의 다이어그램은 RenderError.
+
+결과는 mermaid 해시(response_cache.diagram_hash, 앞뒤 공백 제거 후 sha256 앞 16자)를 키로 하는
+크기 제한 LRU(RenderCache)에 저장되고 /render/{hash}.svg 로 제공. 같은 입력은 항상 같은 SVG.
+
+    python -m block_diagram_agent.render diagram.mmd -o diagram.svg   # '-'면 stdin
+"""
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+from xml.sax.saxutils import escape, quoteattr
+
+from .layout import FONT_SIZE, LINE_HEIGHT, Layout, LayoutNode, label_lines, layout, text_size
+from .mermaid import Flowchart, MermaidParseError, parse_flowchart
+from .response_cache import diagram_hash
+
+logger = logging.getLogger(__name__)
+
+# Mermaid 기본 테마에 가까운 색
+_STYLE = (
+    ".bd-node{fill:#ECECFF;stroke:#9370DB;stroke-width:1px}"
+    ".bd-text{font-family:'trebuchet ms',verdana,arial,'Noto Sans KR','Malgun Gothic',sans-serif;"
+    f"font-size:{FONT_SIZE:g}px;fill:#333}}"
+    ".bd-cluster{fill:#ffffde;stroke:#aaaa33;stroke-width:1px}"
+    ".bd-edge{fill:none;stroke:#333;stroke-width:1.5px}"
+    ".bd-edge.dotted{stroke-dasharray:3 3}"
+    ".bd-edge.thick{stroke-width:3.5px}"
+    ".bd-label{fill:#e8e8e8;opacity:0.85}"
+    ".bd-head{fill:#333;stroke:#333}"
+)
+# classDef/style에서 허용하는 속성과 값 (SVG 속성에 그대로 들어가므로 제한)
+_STYLE_PROPS = {"fill", "stroke", "stroke-width", "stroke-dasharray", "color", "font-weight", "opacity"}
+_STYLE_VALUE_RE = re.compile(r"^[#\w\s.,()%-]+$")
+
+
+class RenderError(ValueError):
+    """flowchart가 아니거나 구문 오류, 또는 노드 수 제한 초과."""
+
+
+def _parse_style(spec: str) -> dict[str, str]:
+    out = {}
+    for item in spec.split(","):
+        key, _, value = item.partition(":")
+        key, value = key.strip(), value.strip().rstrip(";")
+        if key in _STYLE_PROPS and value and _STYLE_VALUE_RE.match(value):
+            out[key] = value
+    return out
+
+
+def _node_styles(chart: Flowchart) -> dict[str, dict[str, str]]:
+    """classDef / class / :::class / style 줄 → 노드 id별 스타일 속성."""
+    extras = list(chart.extras) + [x for sg in chart.subgraphs.values() for x in sg.extras]
+    class_defs: dict[str, dict[str, str]] = {}
+    assigned: dict[str, list[str]] = {n.id: [n.css_class] if n.css_class else [] for n in chart.nodes.values()}
+    direct: dict[str, dict[str, str]] = {}
+    for line in extras:
+        parts = line.split(None, 2)
+        if len(parts) < 3:
+            continue
+        kind, target, rest = parts
+        if kind == "classDef":
+            style = _parse_style(rest)
+            for name in target.split(","):
+                class_defs[name.strip()] = style
+        elif kind == "class":
+            for node_id in target.split(","):
+                assigned.setdefault(node_id.strip(), []).append(rest.strip())
+        elif kind == "style":
+            direct.setdefault(target, {}).update(_parse_style(rest))
+    styles: dict[str, dict[str, str]] = {}
+    for node_id in chart.nodes:
+        style = dict(class_defs.get("default", {}))
+        for name in assigned.get(node_id, ()):
+            style.update(class_defs.get(name, {}))
+        style.update(direct.get(node_id, {}))
+        if style:
+            styles[node_id] = style
+    return styles
+
+
+def _style_attr(style: dict[str, str] | None, text: bool = False) -> str:
+    if not style:
+        return ""
+    if text:
+        return f' style={quoteattr("fill:" + style["color"])}' if "color" in style else ""
+    css = ";".join(f"{k}:{v}" for k, v in style.items() if k != "color")
+    return f" style={quoteattr(css)}" if css else ""
+
+
+def _f(v: float) -> str:
+    return f"{v:.1f}".rstrip("0").rstrip(".")
+
+
+def _shape(n: LayoutNode, style: str) -> str:
+    x, y, w, h = n.x, n.y, n.width, n.height
+    l, t, r, b = x - w / 2, y - h / 2, x + w / 2, y + h / 2
+    open_ = n.shape[0]
+
+    def poly(points: list[tuple[float, float]]) -> str:
+        return f'<polygon class="bd-node" points="{" ".join(f"{_f(px)},{_f(py)}" for px, py in points)}"{style}/>'
+
+    def rect(rx: float = 0.0) -> str:
+        return (f'<rect class="bd-node" x="{_f(l)}" y="{_f(t)}" width="{_f(w)}" height="{_f(h)}"'
+                + (f' rx="{_f(rx)}"' if rx else "") + f"{style}/>")
+
+    if open_ in ("((", "((("):
+        out = f'<circle class="bd-node" cx="{_f(x)}" cy="{_f(y)}" r="{_f(w / 2)}"{style}/>'
+        if open_ == "(((":
+            out += f'<circle class="bd-node" cx="{_f(x)}" cy="{_f(y)}" r="{_f(w / 2 - 4)}"{style}/>'
+        return out
+    if open_ == "{":
+        return poly([(x, t), (r, y), (x, b), (l, y)])
+    if open_ == "{{":
+        d = h / 4
+        return poly([(l + d, t), (r - d, t), (r, y), (r - d, b), (l + d, b), (l, y)])
+    if open_ == "[/":
+        d = h / 4
+        return poly([(l + d, t), (r, t), (r - d, b), (l, b)])
+    if open_ == "[\\":
+        d = h / 4
+        return poly([(l, t), (r - d, t), (r, b), (l + d, b)])
+    if open_ == ">":
+        return poly([(l, t), (r, t), (r, b), (l, b), (l + h / 3, y)])
+    if open_ == "([":
+        return rect(h / 2)
+    if open_ == "(":
+        return rect(6)
+    if open_ == "[[":
+        return (rect() + f'<path class="bd-node" d="M{_f(l + 8)} {_f(t)}V{_f(b)}M{_f(r - 8)} {_f(t)}V{_f(b)}"'
+                f"{style}/>")
+    if open_ == "[(":
+        ry = 6.0
+        return (f'<path class="bd-node" d="M{_f(l)} {_f(t + ry)}A{_f(w / 2)} {_f(ry)} 0 0 1 {_f(r)} {_f(t + ry)}'
+                f'V{_f(b - ry)}A{_f(w / 2)} {_f(ry)} 0 0 1 {_f(l)} {_f(b - ry)}Z'
+                f'M{_f(l)} {_f(t + ry)}A{_f(w / 2)} {_f(ry)} 0 0 0 {_f(r)} {_f(t + ry)}"{style}/>')
+    return rect()
+
+
+def _text(lines: list[str], x: float, y: float, style: str = "") -> str:
+    top = y - (len(lines) - 1) * LINE_HEIGHT / 2
+    spans = "".join(
+        f'<tspan x="{_f(x)}" y="{_f(top + i * LINE_HEIGHT)}">{escape(line)}</tspan>' for i, line in enumerate(lines)
+    )
+    return f'<text class="bd-text" text-anchor="middle" dominant-baseline="central"{style}>{spans}</text>'
+
+
+def _edge_classes(op: str) -> tuple[str, str | None, bool]:
+    """(class, 끝 표시 종류 또는 None, 시작에도 표시)."""
+    cls = "bd-edge" + (" dotted" if "." in op else "") + (" thick" if "=" in op else "")
+    head = {">": "arrow", "x": "cross", "o": "circle"}.get(op[-1])
+    return cls, head, op.startswith("<") and head is not None
+
+
+def to_svg(result: Layout, chart: Flowchart, id_prefix: str = "bd", title: str = "") -> str:
+    """레이아웃 → SVG 문자열. id_prefix는 marker id (한 페이지에 여러 SVG를 넣을 때 충돌 방지)."""
+    styles = _node_styles(chart)
+    w, h = result.width, result.height
+    out = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{_f(w)}" height="{_f(h)}" viewBox="0 0 {_f(w)} {_f(h)}"'
+        f' role="img"' + (f" aria-label={quoteattr(title)}" if title else "") + ">",
+        f"<style>{_STYLE}</style>",
+        "<defs>",
+        f'<marker id="{id_prefix}-arrow" viewBox="0 0 10 10" refX="9" refY="5" markerWidth="8" markerHeight="8"'
+        ' orient="auto-start-reverse"><path class="bd-head" d="M0 0L10 5L0 10z"/></marker>',
+        f'<marker id="{id_prefix}-cross" viewBox="0 0 10 10" refX="5" refY="5" markerWidth="9" markerHeight="9"'
+        ' orient="auto-start-reverse"><path class="bd-head" d="M1 1L9 9M9 1L1 9" style="stroke-width:2"/></marker>',
+        f'<marker id="{id_prefix}-circle" viewBox="0 0 10 10" refX="9" refY="5" markerWidth="8" markerHeight="8"'
+        ' orient="auto-start-reverse"><circle class="bd-head" cx="5" cy="5" r="4"/></marker>',
+        "</defs>",
+    ]
+    if title:
+        out.insert(1, f"<title>{escape(title)}</title>")
+    for c in result.clusters:
+        out.append(f'<rect class="bd-cluster" x="{_f(c.x)}" y="{_f(c.y)}" width="{_f(c.width)}"'
+                   f' height="{_f(c.height)}"/>')
+        out.append(_text(label_lines(c.title), c.x + c.width / 2, c.y + 4 + LINE_HEIGHT / 2))
+    for e in result.edges:
+        if not e.points or e.op.startswith("~"):
+            continue  # `~~~`는 배치에만 쓰는 보이지 않는 링크
+        cls, head, both = _edge_classes(e.op)
+        d = f"M{_f(e.points[0][0])} {_f(e.points[0][1])}" + "".join(f"L{_f(x)} {_f(y)}" for x, y in e.points[1:])
+        markers = ""
+        if head:
+            markers += f' marker-end="url(#{id_prefix}-{head})"'
+            if both:
+                markers += f' marker-start="url(#{id_prefix}-{head})"'
+        out.append(f'<path class="{cls}" d="{d}"{markers}/>')
+    for e in result.edges:
+        if e.label and e.label_pos is not None:
+            lines = label_lines(e.label)
+            tw, th = text_size(lines)
+            x, y = e.label_pos
+            out.append(f'<rect class="bd-label" x="{_f(x - tw / 2 - 2)}" y="{_f(y - th / 2)}" width="{_f(tw + 4)}"'
+                       f' height="{_f(th)}"/>')
+            out.append(_text(lines, x, y))
+    for n in result.nodes.values():
+        style = styles.get(n.id)
+        out.append(_shape(n, _style_attr(style)))
+        out.append(_text(n.lines, n.x, n.y, _style_attr(style, text=True)))
+    out.append("</svg>")
+    return "".join(out)
+
+
+def render_svg(mermaid: str, *, id_prefix: str = "bd", title: str = "", max_nodes: int = 0) -> str:
+    """mermaid flowchart 코드 → SVG. max_nodes > 0 이면 노드 수 제한 (CPU 시간 상한)."""
+    try:
+        chart = parse_flowchart(mermaid)
+    except MermaidParseError as e:
+        raise RenderError(str(e)) from None
+    if max_nodes and len(chart.nodes) > max_nodes:
+        raise RenderError(f"diagram has {len(chart.nodes)} nodes (max {max_nodes})")
+    return to_svg(layout(chart), chart, id_prefix=id_prefix, title=title)
+
+
+class RenderCache:
+    """mermaid 해시 → SVG 바이트. 전체 바이트 수 기준 LRU (한 항목이 상한보다 크면 저장하지 않음)."""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self._max_bytes = max(0, max_bytes)
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: bytes) -> None:
+        if len(value) > self._max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old)
+            self._entries[key] = value
+            self._bytes += len(value)
+            while self._bytes > self._max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+
+class DiagramRenderer:
+    """렌더 단계: mermaid → (해시, SVG 바이트). 결과는 RenderCache에 저장, 해시로 다시 조회.
+    render()는 CPU 작업이므로 이벤트 루프에서는 asyncio.to_thread로 호출."""
+
+    def __init__(self, cache: RenderCache, max_nodes: int = 500):
+        self.cache = cache
+        self._max_nodes = max_nodes
+        self.hits = 0
+        self.misses = 0
+        self.renders = 0
+        self.errors = 0
+        self._render_seconds = 0.0
+
+    def get(self, key: str) -> bytes | None:
+        value = self.cache.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def render(self, mermaid: str) -> tuple[str, bytes]:
+        """캐시에 있으면 그대로, 없으면 렌더링 후 저장. 빈 코드나 지원하지 않는 구문이면 RenderError.
+        키가 mermaid 해시뿐이므로 SVG도 mermaid에만 의존 (요청별 제목 등은 넣지 않음)."""
+        key = diagram_hash(mermaid)
+        if not key:
+            raise RenderError("empty diagram")
+        cached = self.get(key)
+        if cached is not None:
+            return key, cached
+        started = time.perf_counter()
+        try:
+            svg = render_svg(mermaid.strip(), id_prefix=f"bd-{key}", max_nodes=self._max_nodes)
+        except RenderError:
+            self.errors += 1
+            raise
+        except Exception as e:
+            self.errors += 1
+            logger.exception("diagram render failed")
+            raise RenderError(f"render failed: {e}") from None
+        self._render_seconds += time.perf_counter() - started
+        self.renders += 1
+        value = svg.encode("utf-8")
+        self.cache.put(key, value)
+        return key, value
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "renders": self.renders,
+            "errors": self.errors,
+            "avg_render_ms": round(self._render_seconds / self.renders * 1000, 2) if self.renders else 0.0,
+            "entries": len(self.cache),
+            "bytes": self.cache.size_bytes,
+            "evictions": self.cache.evictions,
+        }
+
+
+def build_renderer() -> DiagramRenderer | None:
+    """env 기반 생성. RENDER_ENABLED=false 이면 None."""
+    if os.getenv("RENDER_ENABLED", "true").strip().lower() in ("false", "0", "no", "off"):
+        return None
+    try:
+        max_bytes = int(os.getenv("RENDER_CACHE_BYTES", str(32 * 1024 * 1024)))
+        max_nodes = int(os.getenv("RENDER_MAX_NODES", "500"))
+    except ValueError:
+        logger.warning("invalid RENDER_* value; server-side rendering disabled")
+        return None
+    logger.info("Diagram renderer: cache=%d bytes, max_nodes=%d", max_bytes, max_nodes)
+    return DiagramRenderer(RenderCache(max_bytes), max_nodes=max_nodes)
+
+
+def main(argv: list[str] | None = None) -> int:
+    import argparse
+    import sys
+
+    p = argparse.ArgumentParser(description="Render a Mermaid flowchart to SVG without a browser")
+    p.add_argument("input", help="mermaid file ('-' for stdin)")
+    p.add_argument("-o", "--output", default="-", help="SVG file ('-' for stdout)")
+    args = p.parse_args(argv)
+    source = sys.stdin.read() if args.input == "-" else open(args.input, encoding="utf-8").read()
+    try:
+        svg = render_svg(source, id_prefix=f"bd-{diagram_hash(source) or 'empty'}")
+    except RenderError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    if args.output == "-":
+        sys.stdout.write(svg + "\n")
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(svg)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,157 @@
+"""DiagramResponse.mermaid 검증/복구 (after_model 단계).
+
+1. 코드 펜스(```mermaid ... ```) 제거, 다이어그램 헤더가 없으면 (front matter 다음에) `flowchart TD` 추가.
+2. flowchart/graph는 mermaid.parse_flowchart로 파싱. 복구 가능한 결함(따옴표 없는 특수 문자 라벨,
+   예약어 id 등)이 있으면 그 줄만 고친 코드로 교체. 결함이 없으면 원문 유지.
+3. 파싱 자체가 실패할 때만 파서 오류를 알려 주고 모델을 한 번 재호출.
+flowchart 이외(sequenceDiagram, block-beta 등)는 펜스 제거만 하고 검증하지 않음.
+"""
+import json
+import logging
+import os
+from typing import Any
+
+from .mermaid import MermaidParseError, parse_flowchart, split_front_matter
+from .retry import RequestStash, call_again, response_text, set_response_text, strip_code_fence
+
+logger = logging.getLogger(__name__)
+
+FLOWCHART_KEYWORDS = ("flowchart", "graph")
+DIAGRAM_KEYWORDS = FLOWCHART_KEYWORDS + (
+    "sequenceDiagram", "classDiagram", "stateDiagram", "stateDiagram-v2", "erDiagram", "journey", "gantt",
+    "pie", "gitGraph", "mindmap", "timeline", "quadrantChart", "requirementDiagram", "C4Context",
+    "C4Container", "C4Component", "sankey-beta", "xychart-beta", "block-beta", "packet-beta", "architecture-beta",
+)
+
+_RETRY_PROMPT = (
+    "The `mermaid` code in your previous answer does not parse: {error}. "
+    "Return the same diagram again with valid Mermaid flowchart syntax "
+    "(quote labels containing special characters, unique node ids, no code fence)."
+)
+
+
+def diagram_keyword(code: str) -> str:
+    """첫 줄(front matter/주석/지시문 제외)의 다이어그램 종류. 없으면 빈 문자열."""
+    try:
+        _, lines = split_front_matter(code.splitlines())
+    except MermaidParseError:
+        return ""
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("%%"):
+            word = line.split(None, 1)[0]
+            return word if word in DIAGRAM_KEYWORDS else ""
+    return ""
+
+
+def repair_mermaid(code: str) -> tuple[str, list[str]]:
+    """(고친 코드, 적용한 수정 목록). 고칠 수 없으면 MermaidParseError."""
+    fixes: list[str] = []
+    text = code.strip()
+    if text.startswith("```"):
+        text = strip_code_fence(text)
+        fixes.append("removed code fence")
+    first, _, rest = text.partition("\n")
+    if first.strip().lower() == "mermaid":
+        text = rest.strip()
+        fixes.append("removed leading 'mermaid' line")
+    keyword = diagram_keyword(text)
+    if not keyword:
+        front, lines = split_front_matter(text.splitlines())
+        text = "\n".join([*front, "flowchart TD", *lines])
+        keyword = "flowchart"
+        fixes.append("added missing 'flowchart TD' header")
+    if keyword not in FLOWCHART_KEYWORDS:
+        return text, fixes
+    chart = parse_flowchart(text)
+    if chart.warnings:
+        fixes.extend(chart.warnings)
+        text = "\n".join(chart.source)
+    return text, fixes
+
+
+class MermaidRepairer:
+    """after_model 콜백 + 복구/재시도 카운터."""
+
+    def __init__(self, stash: RequestStash | None = None):
+        self._stash = stash
+        self.checked = 0
+        self.valid = 0
+        self.repaired = 0
+        self.unrepairable = 0
+        self.skipped = 0
+        self.retries = 0
+        self.retry_succeeded = 0
+
+    async def after_model(self, callback_context: Any, llm_response: Any) -> None:
+        if getattr(llm_response, "partial", False) or getattr(llm_response, "error_code", None):
+            return None
+        text = response_text(llm_response)
+        body = strip_code_fence(text)
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return None
+        mermaid = data.get("mermaid") if isinstance(data, dict) else None
+        if not isinstance(mermaid, str) or not mermaid.strip():
+            return None
+        changed = body != text.strip()
+        self.checked += 1
+        try:
+            fixed, fixes = repair_mermaid(mermaid)
+        except MermaidParseError as e:
+            self.unrepairable += 1
+            retried = await self._retry(callback_context, str(e))
+            if retried is not None:
+                data, changed = retried, True
+        else:
+            if diagram_keyword(fixed) not in FLOWCHART_KEYWORDS:
+                self.skipped += 1
+            elif fixes:
+                self.repaired += 1
+            else:
+                self.valid += 1
+            if fixes:
+                logger.info("repaired mermaid: %s", "; ".join(fixes))
+                data["mermaid"] = fixed
+                changed = True
+        if changed:
+            set_response_text(llm_response, json.dumps(data, ensure_ascii=False))
+        return None
+
+    async def _retry(self, callback_context: Any, error: str) -> dict | None:
+        """파서 오류를 알려 주고 한 번 재호출. 결과도 검증해 통과하면 반환."""
+        llm_request = self._stash.get(callback_context) if self._stash is not None else None
+        if llm_request is None:
+            return None
+        self.retries += 1
+        logger.info("mermaid does not parse, retrying once: %s", error)
+        try:
+            text = await call_again(callback_context, llm_request, _RETRY_PROMPT.format(error=error))
+            data = json.loads(strip_code_fence(text))
+            data["mermaid"], _ = repair_mermaid(data["mermaid"])
+        except Exception as e:
+            logger.warning("mermaid retry failed: %s", e)
+            return None
+        self.retry_succeeded += 1
+        return data
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "checked": self.checked,
+            "valid": self.valid,
+            "repaired": self.repaired,
+            "unrepairable": self.unrepairable,
+            "skipped": self.skipped,
+            "retries": self.retries,
+            "retry_succeeded": self.retry_succeeded,
+            "repair_rate": round(self.repaired / self.checked, 4) if self.checked else 0.0,
+        }
+
+
+def build_mermaid_repairer(stash: RequestStash) -> MermaidRepairer | None:
+    """MERMAID_REPAIR_ENABLED=false 면 None. MERMAID_REPAIR_RETRY=false 면 재호출 없이 복구만."""
+    if os.getenv("MERMAID_REPAIR_ENABLED", "true").strip().lower() in ("false", "0", "no", "off"):
+        return None
+    retry = os.getenv("MERMAID_REPAIR_RETRY", "true").strip().lower() not in ("false", "0", "no", "off")
+    return MermaidRepairer(stash if retry else None)
@@ -0,0 +1,336 @@
+"""Prompt → DiagramResponse cache in front of the LLM (ADK before/after model callbacks).
+
+Key: normalized prompt text + language + model name + hash of the previous diagram (state["diagram"]).
+Tiers: exact match, then (optional) character n-gram similarity within the same language/model/diagram bucket.
+Backends: in-process LRU + TTL (default) or SQLite file (RESPONSE_CACHE_SQLITE_PATH), shared across workers.
+A hit returns the stored, already validated DiagramResponse and skips the LLM call.
+Blocking backends (SQLite) run in a worker thread (asyncio.to_thread) so lookups never stall the event loop.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Iterable
+
+from .retry import content_text, response_text, strip_code_fence
+from .schema import DiagramResponse
+
+logger = logging.getLogger(__name__)
+
+_WS_RE = re.compile(r"\s+")
+_HANGUL_RE = re.compile(r"[가-힣ㄱ-ㆎ]")
+_TRAILING_PUNCT = " .!?。！？~"
+# 유사도 탐색 시 버킷당 비교할 최대 후보 수 (최근 항목 우선)
+_MAX_CANDIDATES = 512
+
+
+def normalize_prompt(text: str) -> str:
+    """NFKC + casefold + 공백 정리 + 끝 문장부호 제거."""
+    t = unicodedata.normalize("NFKC", text or "").casefold()
+    return _WS_RE.sub(" ", t).strip().rstrip(_TRAILING_PUNCT).strip()
+
+
+def detect_language(text: str) -> str:
+    """DIAGRAM_INSTRUCTION 기준 응답 언어: 한글이 있으면 ko, 아니면 en."""
+    return "ko" if _HANGUL_RE.search(text or "") else "en"
+
+
+def diagram_hash(diagram: Any) -> str:
+    """이전 턴 다이어그램(state["diagram"])의 mermaid 해시. 없으면 빈 문자열."""
+    if isinstance(diagram, dict):
+        mermaid = diagram.get("mermaid") or ""
+    elif isinstance(diagram, str):
+        mermaid = diagram
+    else:
+        mermaid = getattr(diagram, "mermaid", "") or ""
+    if not mermaid.strip():
+        return ""
+    return hashlib.sha256(mermaid.strip().encode("utf-8")).hexdigest()[:16]
+
+
+def _ngrams(text: str, n: int = 3) -> frozenset[str]:
+    t = f" {text} "
+    if len(t) <= n:
+        return frozenset((t,))
+    return frozenset(t[i:i + n] for i in range(len(t) - n + 1))
+
+
+def ngram_similarity(a: str, b: str) -> float:
+    """문자 3-gram Jaccard 유사도 (0~1)."""
+    ga, gb = _ngrams(a), _ngrams(b)
+    if not ga or not gb:
+        return 0.0
+    return len(ga & gb) / len(ga | gb)
+
+
+class MemoryBackend:
+    """프로세스 내 LRU + TTL."""
+
+    blocking = False
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 86400.0):
+        self._max_entries = max(1, max_entries)
+        self._ttl = ttl
+        # key -> (bucket, prompt, value, expires_at)
+        self._entries: OrderedDict[str, tuple[str, str, str, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[3] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[2]
+
+    def put(self, key: str, bucket: str, prompt: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = (bucket, prompt, value, time.time() + self._ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def candidates(self, bucket: str) -> Iterable[tuple[str, str]]:
+        """같은 버킷의 (key, prompt), 최근 사용 순."""
+        now = time.time()
+        with self._lock:
+            items = [(k, e[1]) for k, e in reversed(self._entries.items()) if e[0] == bucket and e[3] > now]
+        return items[:_MAX_CANDIDATES]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteBackend:
+    """SQLite 파일 백엔드 (여러 워커 프로세스가 공유). accessed 기준 LRU, created 기준 TTL.
+    파일 I/O라 ResponseCache가 이벤트 루프 밖 스레드에서 호출 (스레드별 커넥션, close()로 일괄 정리).
+    len()은 put 때(스레드에서) 센 항목 수: /health, /metrics가 루프에서 COUNT(*)를 돌리지 않도록."""
+
+    blocking = True
+
+    def __init__(self, path: str, max_entries: int = 10000, ttl: float = 86400.0):
+        self._path = path
+        self._max_entries = max(1, max_entries)
+        self._ttl = ttl
+        self._local = threading.local()
+        self._conns: list[sqlite3.Connection] = []
+        self._conns_lock = threading.Lock()
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache ("
+                " key TEXT PRIMARY KEY, bucket TEXT NOT NULL, prompt TEXT NOT NULL,"
+                " value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS response_cache_bucket ON response_cache (bucket, accessed)")
+            conn.execute("CREATE INDEX IF NOT EXISTS response_cache_accessed ON response_cache (accessed)")
+            self._count = self._count_rows(conn)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # close()는 종료 시 다른 스레드에서 부름. 그 외에는 만든 스레드에서만 사용
+            conn = sqlite3.connect(self._path, timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._conns_lock:
+                self._conns.append(conn)
+        return conn
+
+    @staticmethod
+    def _count_rows(conn: sqlite3.Connection) -> int:
+        return conn.execute("SELECT COUNT(*) FROM response_cache").fetchone()[0]
+
+    def get(self, key: str) -> str | None:
+        conn = self._conn()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value FROM response_cache WHERE key = ? AND created > ?", (key, now - self._ttl)
+        ).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE response_cache SET accessed = ? WHERE key = ?", (now, key))
+        return row[0]
+
+    def put(self, key: str, bucket: str, prompt: str, value: str) -> None:
+        conn = self._conn()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO response_cache (key, bucket, prompt, value, created, accessed)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (key, bucket, prompt, value, now, now),
+        )
+        conn.execute("DELETE FROM response_cache WHERE created <= ?", (now - self._ttl,))
+        conn.execute(
+            "DELETE FROM response_cache WHERE key IN ("
+            " SELECT key FROM response_cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (self._max_entries,),
+        )
+        # 다른 워커의 쓰기는 다음 put 때 반영
+        self._count = self._count_rows(conn)
+
+    def candidates(self, bucket: str) -> Iterable[tuple[str, str]]:
+        return self._conn().execute(
+            "SELECT key, prompt FROM response_cache WHERE bucket = ? AND created > ?"
+            " ORDER BY accessed DESC LIMIT ?",
+            (bucket, time.time() - self._ttl, _MAX_CANDIDATES),
+        ).fetchall()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def close(self) -> None:
+        """모든 스레드의 커넥션을 닫음. 이후 호출은 새 커넥션을 엶."""
+        with self._conns_lock:
+            conns, self._conns = self._conns, []
+            self._local = threading.local()
+        for conn in conns:
+            conn.close()
+
+
+class ResponseCache:
+    """before_model_callback / after_model_callback 쌍으로 LLM 앞단에 붙는 응답 캐시.
+    similarity_threshold > 0 이면 exact miss 시 n-gram 유사도 tier 사용.
+    """
+
+    def __init__(self, backend: Any, model_name: str, similarity_threshold: float = 0.0):
+        self._backend = backend
+        self._model_name = model_name
+        self._similarity_threshold = similarity_threshold
+        self.hits_exact = 0
+        self.hits_similar = 0
+        self.misses = 0
+        self.stores = 0
+
+    def _lookup_key(self, callback_context: Any) -> tuple[str, str, str] | None:
+        """(exact key, bucket, normalized prompt). 프롬프트가 없으면 None (캐시 대상 아님)."""
+        prompt = content_text(getattr(callback_context, "user_content", None))
+        norm = normalize_prompt(prompt)
+        if not norm:
+            return None
+        prev = diagram_hash(callback_context.state.get("diagram"))
+        bucket = f"{detect_language(prompt)}|{self._model_name}|{prev}"
+        key = hashlib.sha256(f"{bucket}|{norm}".encode("utf-8")).hexdigest()
+        return key, bucket, norm
+
+    async def _call(self, fn: Any, *args: Any) -> Any:
+        """블로킹 백엔드(SQLite)는 스레드에서, 메모리 백엔드는 바로."""
+        if self._backend.blocking:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    def _find(self, key: str, bucket: str, norm: str) -> tuple[str | None, str]:
+        """(저장된 값, "exact" | "similar"). 백엔드 I/O만 — 카운터는 호출한 쪽(이벤트 루프)에서."""
+        value = self._backend.get(key)
+        if value is not None:
+            return value, "exact"
+        if self._similarity_threshold > 0:
+            best_key, best = None, 0.0
+            for cand_key, cand_prompt in self._backend.candidates(bucket):
+                score = ngram_similarity(norm, cand_prompt)
+                if score > best:
+                    best_key, best = cand_key, score
+            if best_key is not None and best >= self._similarity_threshold:
+                return self._backend.get(best_key), "similar"
+        return None, ""
+
+    async def lookup(self, callback_context: Any) -> DiagramResponse | None:
+        k = self._lookup_key(callback_context)
+        if k is None:
+            return None
+        value, tier = await self._call(self._find, *k)
+        if value is None:
+            self.misses += 1
+            return None
+        if tier == "exact":
+            self.hits_exact += 1
+        else:
+            self.hits_similar += 1
+        return DiagramResponse.model_validate_json(value)
+
+    async def store(self, callback_context: Any, response: DiagramResponse) -> None:
+        k = self._lookup_key(callback_context)
+        if k is None:
+            return
+        key, bucket, norm = k
+        await self._call(self._backend.put, key, bucket, norm, response.model_dump_json())
+        self.stores += 1
+
+    async def before_model(self, callback_context: Any, llm_request: Any) -> Any:
+        """캐시 히트면 LlmResponse를 반환해 LLM 호출을 건너뜀."""
+        try:
+            cached = await self.lookup(callback_context)
+        except Exception:
+            logger.exception("response cache lookup failed")
+            return None
+        if cached is None:
+            return None
+        from google.adk.models.llm_response import LlmResponse
+        from google.genai import types
+
+        return LlmResponse(
+            content=types.Content(role="model", parts=[types.Part(text=cached.model_dump_json())]),
+            turn_complete=True,
+        )
+
+    async def after_model(self, callback_context: Any, llm_response: Any) -> Any:
+        """완성된(비부분) 응답이 DiagramResponse로 검증되면 저장. 응답은 바꾸지 않음."""
+        if getattr(llm_response, "partial", False) or getattr(llm_response, "error_code", None):
+            return None
+        text = response_text(llm_response)
+        if not text.strip():
+            return None
+        try:
+            response = DiagramResponse.model_validate_json(strip_code_fence(text))
+        except Exception:
+            return None
+        try:
+            await self.store(callback_context, response)
+        except Exception:
+            logger.exception("response cache store failed")
+        return None
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits_exact + self.hits_similar + self.misses
+        return {
+            "hits_exact": self.hits_exact,
+            "hits_similar": self.hits_similar,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_rate": round((self.hits_exact + self.hits_similar) / lookups, 4) if lookups else 0.0,
+            "entries": len(self._backend),
+        }
+
+    def close(self) -> None:
+        self._backend.close()
+
+
+def build_response_cache(model_name: str) -> ResponseCache | None:
+    """env 기반 생성. RESPONSE_CACHE_ENABLED=false 이면 None."""
+    if os.getenv("RESPONSE_CACHE_ENABLED", "true").strip().lower() in ("false", "0", "no", "off"):
+        return None
+    try:
+        size = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+        ttl = float(os.getenv("RESPONSE_CACHE_TTL", "86400"))
+        threshold = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "0") or 0)
+    except ValueError:
+        logger.warning("invalid RESPONSE_CACHE_* value; response cache disabled")
+        return None
+    path = os.getenv("RESPONSE_CACHE_SQLITE_PATH", "").strip()
+    backend = SQLiteBackend(path, max_entries=size, ttl=ttl) if path else MemoryBackend(max_entries=size, ttl=ttl)
+    logger.info("Response cache: %s, size=%d, ttl=%ss, similarity=%s",
+                f"sqlite:{path}" if path else "memory", size, ttl, threshold or "off")
+    return ResponseCache(backend, model_name=model_name, similarity_threshold=threshold)
+
@@ -0,0 +1,67 @@
+"""after_model 단계에서 같은 요청으로 모델을 한 번 더 부르기 위한 공용 도구 + 콜백들이 함께 쓰는 텍스트 도우미.
+
+after_model_callback은 llm_request를 받지 못하므로 before_model 단계에서 invocation_id 별로 보관해 둠.
+"""
+from collections import OrderedDict
+from typing import Any
+
+
+class RequestStash:
+    """invocation_id -> 마지막 llm_request (최근 max_entries개만 유지)."""
+
+    def __init__(self, max_entries: int = 64):
+        self._max_entries = max(1, max_entries)
+        self._requests: OrderedDict[str, Any] = OrderedDict()
+
+    def before_model(self, callback_context: Any, llm_request: Any) -> None:
+        key = callback_context.invocation_id
+        self._requests[key] = llm_request
+        self._requests.move_to_end(key)
+        while len(self._requests) > self._max_entries:
+            self._requests.popitem(last=False)
+        return None
+
+    def get(self, callback_context: Any) -> Any | None:
+        return self._requests.get(callback_context.invocation_id)
+
+
+def content_text(content: Any) -> str:
+    """Content(또는 /run 요청 body의 dict)의 text part를 이어 붙인 문자열."""
+    parts = content.get("parts") if isinstance(content, dict) else getattr(content, "parts", None)
+    return "".join((p.get("text") if isinstance(p, dict) else getattr(p, "text", None)) or "" for p in parts or [])
+
+
+def response_text(llm_response: Any) -> str:
+    content = getattr(llm_response, "content", None)
+    parts = getattr(content, "parts", None) or []
+    return "".join(p.text for p in parts if getattr(p, "text", None) and not getattr(p, "thought", False))
+
+
+def strip_code_fence(text: str) -> str:
+    t = text.strip()
+    if t.startswith("```"):
+        t = t.split("\n", 1)[1] if "\n" in t else t[3:]
+        if t.rstrip().endswith("```"):
+            t = t.rstrip()[:-3]
+    return t.strip()
+
+
+def set_response_text(llm_response: Any, text: str) -> None:
+    """응답 본문을 제자리에서 교체 (이후 after_model 콜백과 output_key 저장이 새 본문을 봄)."""
+    from google.genai import types
+
+    llm_response.content = types.Content(role="model", parts=[types.Part(text=text)])
+
+
+async def call_again(callback_context: Any, llm_request: Any, feedback: str) -> str:
+    """llm_request 복사본에 feedback(user 메시지)을 덧붙여 에이전트 모델을 비스트리밍으로 다시 호출, 최종 텍스트 반환."""
+    from google.genai import types
+
+    request = llm_request.model_copy(deep=True)
+    request.contents.append(types.Content(role="user", parts=[types.Part(text=feedback)]))
+    llm = callback_context._invocation_context.agent.canonical_model
+    final = None
+    async for resp in llm.generate_content_async(request, stream=False):
+        if not getattr(resp, "partial", False):
+            final = resp
+    return response_text(final) if final is not None else ""
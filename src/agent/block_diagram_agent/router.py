@@ -0,0 +1,234 @@
+"""여러 OpenAI 호환 LLM 엔드포인트(Ollama 레플리카 등)에 요청을 분산하는 라우팅 모델.
+
+- 선택 정책: least_outstanding(진행 중 요청 수 최소, 동률이면 지연 EWMA) 또는 ewma(지연 EWMA × (진행 중 + 1)).
+  슬롯이 남은 엔드포인트가 먼저. 엔드포인트마다 동시 실행 상한(max_concurrency)이 있어 고른 뒤 그 슬롯을 기다림.
+- 주기적 헬스 체크(GET {base_url}/models)와 연속 실패 시 일정 시간 제외(ejection).
+- 첫 응답 청크 전에 실패하면 다음 엔드포인트로 failover, 모두 실패하면 선택적으로 Gemini로 fallback.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, AsyncGenerator
+
+import httpx
+from google.adk.models.base_llm import BaseLlm
+from pydantic import PrivateAttr
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ("least_outstanding", "ewma")
+
+
+class Backend:
+    """라우팅 대상 엔드포인트 하나와 그 상태."""
+
+    __slots__ = (
+        "base_url",
+        "llm",
+        "outstanding",
+        "waiting",
+        "max_concurrency",
+        "slots",
+        "latency_ewma",
+        "healthy",
+        "consecutive_failures",
+        "ejected_until",
+        "requests",
+        "failures",
+        "last_error",
+    )
+
+    def __init__(self, base_url: str, llm: BaseLlm, max_concurrency: int = 0):
+        self.base_url = base_url
+        self.llm = llm
+        self.outstanding = 0
+        self.waiting = 0  # 슬롯 대기 중
+        self.max_concurrency = max(0, max_concurrency)  # 0이면 제한 없음
+        self.slots = asyncio.Semaphore(self.max_concurrency) if self.max_concurrency else None
+        self.latency_ewma = 0.0
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.last_error = ""
+
+    def available(self, now: float) -> bool:
+        return self.healthy and self.ejected_until <= now
+
+    def full(self) -> bool:
+        return bool(self.max_concurrency) and self.outstanding + self.waiting >= self.max_concurrency
+
+    async def acquire(self) -> None:
+        if self.slots is None:
+            return
+        self.waiting += 1
+        try:
+            await self.slots.acquire()
+        finally:
+            self.waiting -= 1
+
+    def release(self) -> None:
+        if self.slots is not None:
+            self.slots.release()
+
+    def status(self) -> dict[str, Any]:
+        return {
+            "base_url": self.base_url,
+            "healthy": self.available(time.monotonic()),
+            "outstanding": self.outstanding,
+            "waiting": self.waiting,
+            "max_concurrency": self.max_concurrency,
+            "latency_ewma_ms": round(self.latency_ewma * 1000, 1),
+            "requests": self.requests,
+            "failures": self.failures,
+            "last_error": self.last_error,
+        }
+
+
+class RoutedLlm(BaseLlm):
+    """BaseLlm 구현: 요청마다 backends 중 하나를 골라 위임."""
+
+    _backends: list[Backend] = PrivateAttr(default_factory=list)
+    _fallback: BaseLlm | None = PrivateAttr(default=None)
+    _policy: str = PrivateAttr(default="least_outstanding")
+    _max_failures: int = PrivateAttr(default=3)
+    _eject_seconds: float = PrivateAttr(default=30.0)
+    _health_interval: float = PrivateAttr(default=10.0)
+    _health_task: asyncio.Task | None = PrivateAttr(default=None)
+
+    def __init__(
+        self,
+        model: str,
+        backends: list[Backend],
+        *,
+        fallback: BaseLlm | None = None,
+        policy: str = "least_outstanding",
+        max_failures: int = 3,
+        eject_seconds: float = 30.0,
+        health_interval: float = 10.0,
+    ):
+        super().__init__(model=model)
+        if not backends:
+            raise ValueError("RoutedLlm requires at least one backend")
+        if policy not in POLICIES:
+            raise ValueError(f"unknown routing policy {policy!r}; expected one of {POLICIES}")
+        self._backends = backends
+        self._fallback = fallback
+        self._policy = policy
+        self._max_failures = max(1, max_failures)
+        self._eject_seconds = eject_seconds
+        self._health_interval = health_interval
+
+    @property
+    def capabilities(self):
+        return self._backends[0].llm.capabilities
+
+    @property
+    def backends(self) -> list[Backend]:
+        return self._backends
+
+    def _score(self, b: Backend) -> tuple:
+        if self._policy == "ewma":
+            return (b.full(), b.latency_ewma * (b.outstanding + b.waiting + 1), b.outstanding + b.waiting)
+        return (b.full(), b.outstanding + b.waiting, b.latency_ewma)
+
+    def _candidates(self) -> list[Backend]:
+        """시도 순서: 사용 가능한 엔드포인트(점수순), fallback이 없으면 제외된 엔드포인트도 마지막에."""
+        now = time.monotonic()
+        up = sorted((b for b in self._backends if b.available(now)), key=self._score)
+        if self._fallback is not None and up:
+            return up
+        down = sorted((b for b in self._backends if not b.available(now)), key=lambda b: b.ejected_until)
+        return up + down
+
+    def _record_success(self, b: Backend, elapsed: float) -> None:
+        b.latency_ewma = elapsed if not b.latency_ewma else 0.8 * b.latency_ewma + 0.2 * elapsed
+        b.consecutive_failures = 0
+        b.healthy = True
+
+    def _record_failure(self, b: Backend, error: Exception) -> None:
+        b.failures += 1
+        b.consecutive_failures += 1
+        b.last_error = str(error)[:200]
+        if b.consecutive_failures >= self._max_failures:
+            b.ejected_until = time.monotonic() + self._eject_seconds
+            logger.warning("LLM backend %s ejected for %.0fs after %d failures: %s",
+                           b.base_url, self._eject_seconds, b.consecutive_failures, b.last_error)
+
+    async def generate_content_async(self, llm_request: Any, stream: bool = False) -> AsyncGenerator[Any, None]:
+        self._ensure_health_task()
+        last_error: Exception | None = None
+        for b in self._candidates():
+            # 고른 엔드포인트의 슬롯 (다른 엔드포인트의 여유와 무관하게 이 엔드포인트의 상한만 적용)
+            await b.acquire()
+            b.outstanding += 1
+            b.requests += 1
+            started = time.monotonic()
+            yielded = False
+            # 완결(non-partial) 응답은 슬롯을 놓은 뒤에 내보낸다. yield 동안 ADK가 after_model 콜백을 돌리고,
+            # 그 안의 retry.call_again(편집 재생성/Mermaid 재시도)이 다시 슬롯을 잡기 때문 (모든 슬롯이 차 있으면 교착)
+            final: list[Any] = []
+            try:
+                async for resp in b.llm.generate_content_async(llm_request, stream=stream):
+                    if getattr(resp, "partial", False):
+                        yielded = True
+                        yield resp
+                    else:
+                        final.append(resp)
+            except Exception as e:
+                self._record_failure(b, e)
+                if yielded:
+                    # 이미 일부 응답을 내보냈으면 다른 엔드포인트로 다시 생성할 수 없음
+                    raise
+                logger.warning("LLM backend %s failed, trying next: %s", b.base_url, e)
+                last_error = e
+                continue
+            finally:
+                b.outstanding -= 1
+                b.release()
+            self._record_success(b, time.monotonic() - started)
+            for resp in final:
+                yield resp
+            return
+        if self._fallback is not None:
+            logger.warning("all LLM backends failed; falling back to %s", self._fallback.model)
+            async for resp in self._fallback.generate_content_async(llm_request, stream=stream):
+                yield resp
+            return
+        raise last_error or RuntimeError("no LLM backend available")
+
+    def _ensure_health_task(self) -> None:
+        if self._health_interval <= 0:
+            return
+        if self._health_task is None or self._health_task.done():
+            self._health_task = asyncio.get_running_loop().create_task(self._health_loop())
+
+    async def _health_loop(self) -> None:
+        async with httpx.AsyncClient(timeout=min(5.0, self._health_interval)) as client:
+            while True:
+                await asyncio.gather(*(self._check(client, b) for b in self._backends))
+                await asyncio.sleep(self._health_interval)
+
+    async def _check(self, client: httpx.AsyncClient, b: Backend) -> None:
+        try:
+            r = await client.get(b.base_url.rstrip("/") + "/models")
+            ok = r.status_code < 500
+        except Exception as e:
+            ok = False
+            b.last_error = str(e)[:200]
+        if ok and not b.available(time.monotonic()):
+            logger.info("LLM backend %s is healthy again", b.base_url)
+            b.ejected_until = 0.0
+            b.consecutive_failures = 0
+        elif not ok and b.healthy:
+            logger.warning("LLM backend %s failed health check", b.base_url)
+        b.healthy = ok
+
+    async def aclose(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+
+    def status(self) -> list[dict[str, Any]]:
+        return [b.status() for b in self._backends]
@@ -1,4 +1,6 @@
 """Pydantic schema for agent structured output (title / message / mermaid)."""
+from typing import Literal
+
 from pydantic import BaseModel, Field
 
 
@@ -16,3 +18,33 @@ class DiagramResponse(BaseModel):
     mermaid: str = Field(
         description="Mermaid diagram code. flowchart LR/TD or subgraph etc. Plain code only, no markdown/code fence. Node labels in user language per request."
     )
+
+
+class DiagramEdit(BaseModel):
+    """One patch operation against the previous turn's Mermaid flowchart (edit mode)."""
+
+    op: Literal["add_node", "remove_node", "rename_node", "add_edge", "remove_edge", "move_to_subgraph"] = Field(
+        description="add_node(id, label, subgraph?) | remove_node(id) | rename_node(id, label) | add_edge(source, target, label?) | remove_edge(source, target) | move_to_subgraph(id, subgraph, label? = subgraph title; empty subgraph = top level)"
+    )
+    id: str = Field(default="", description="Node id as written in the previous Mermaid code (not the label).")
+    label: str = Field(default="", description="Node label, edge label, or subgraph title depending on op. Must match user language.")
+    source: str = Field(default="", description="Edge source node id (add_edge/remove_edge).")
+    target: str = Field(default="", description="Edge target node id (add_edge/remove_edge).")
+    subgraph: str = Field(default="", description="Subgraph id (add_node/move_to_subgraph).")
+
+
+class DiagramEditResponse(BaseModel):
+    """Edit-mode structured response: either a full `mermaid` or `edits` against the previous diagram.
+    The server applies `edits` and stores the result as a regular DiagramResponse.
+    """
+
+    title: str = DiagramResponse.model_fields["title"]
+    message: str = DiagramResponse.model_fields["message"]
+    mermaid: str = Field(
+        default="",
+        description="Full Mermaid code only when there is no previous diagram or the change rewrites most of it; otherwise empty. Plain code only, no markdown/code fence.",
+    )
+    edits: list[DiagramEdit] = Field(
+        default_factory=list,
+        description="Small changes to the previous diagram, applied in order. Leave empty when mermaid is given.",
+    )
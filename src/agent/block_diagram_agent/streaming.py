@@ -0,0 +1,228 @@
+"""Incremental parser for the structured (JSON) response while it is still being generated.
+
+With output_schema the model streams one JSON object ({"title", "message", "mermaid"} or the edit-mode
+variant) as partial text chunks. Nothing else can read it until the closing brace arrives, so the server
+feeds each partial chunk here and forwards field-level events to the client (/run_sse `event: field`):
+
+- `title` is sent once, when its string is complete (session list label).
+- Other string fields (`message`, `mermaid`) are sent as deltas as they arrive, then a final `done`.
+- Non-string values (e.g. edit-mode `edits`) are skipped; the final event still carries the full response.
+
+The parser is resumable: feed() may split the text anywhere (inside keys, escapes or `\\uXXXX`).
+Leading code fences / prose before the first `{` are ignored.
+"""
+import re
+from typing import Any, NamedTuple
+
+# 완성된 값만 보내는 필드 (나머지 문자열 필드는 delta로)
+WHOLE_FIELDS = ("title",)
+
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+_STRING_RUN = re.compile(r'[^"\\]+')
+
+# parser states
+_START, _KEY_OR_END, _KEY, _COLON, _VALUE, _STRING, _OTHER, _AFTER_VALUE, _DONE = range(9)
+
+
+class FieldEvent(NamedTuple):
+    field: str
+    delta: str
+    done: bool
+
+    def to_json(self) -> dict[str, Any]:
+        return {"field": self.field, "delta": self.delta, "done": self.done}
+
+
+class StructuredStreamParser:
+    """Flat JSON object parser fed with text chunks. feed() returns the FieldEvents the chunk completed."""
+
+    def __init__(self, whole_fields: tuple[str, ...] = WHOLE_FIELDS):
+        self._whole = whole_fields
+        self._state = _START
+        self._key: list[str] = []
+        self._field = ""
+        self._buf: list[str] = []  # 현재 문자열 값 중 아직 보내지 않은 부분 (whole 필드는 전체)
+        self._escape: str | None = None  # None | "" (백슬래시 직후) | "u" + 16진수 일부
+        self._high_surrogate = ""
+        # non-string value: 중첩 깊이, 문자열 안 여부, 이스케이프 직후 여부
+        self._depth = 0
+        self._in_str = False
+        self._str_escape = False
+        self.values: dict[str, str] = {}  # 지금까지 받은 문자열 필드 값
+
+    @property
+    def done(self) -> bool:
+        return self._state == _DONE
+
+    def feed(self, chunk: str) -> list[FieldEvent]:
+        out: list[FieldEvent] = []
+        i, n = 0, len(chunk)
+        while i < n and self._state != _DONE:
+            state = self._state
+            if state == _STRING or state == _KEY:
+                i = self._scan_string(chunk, i, out)
+                continue
+            c = chunk[i]
+            i += 1
+            if state == _START:
+                if c == "{":
+                    self._state = _KEY_OR_END
+            elif state == _OTHER:
+                self._scan_other(c)
+            elif c.isspace():
+                continue
+            elif state == _KEY_OR_END:
+                if c == '"':
+                    self._key.clear()
+                    self._state = _KEY
+                elif c == "}":
+                    self._state = _DONE
+            elif state == _COLON:
+                if c == ":":
+                    self._state = _VALUE
+            elif state == _VALUE:
+                if c == '"':
+                    self._buf.clear()
+                    self._state = _STRING
+                else:
+                    self._depth = 1 if c in "{[" else 0
+                    self._in_str = self._str_escape = False
+                    self._state = _OTHER
+                    if self._depth == 0:
+                        self._scan_other(c)
+            elif state == _AFTER_VALUE:
+                if c == ",":
+                    self._state = _KEY_OR_END
+                elif c == "}":
+                    self._state = _DONE
+        if self._state == _STRING and self._field not in self._whole:
+            self._flush(out, done=False)
+        return out
+
+    def _scan_string(self, chunk: str, i: int, out: list[FieldEvent]) -> int:
+        """문자열(키 또는 값) 안: 따옴표/백슬래시가 아닌 구간은 한 번에 복사."""
+        target = self._key if self._state == _KEY else self._buf
+        n = len(chunk)
+        while i < n:
+            if self._escape is not None:
+                i = self._scan_escape(chunk, i, target)
+                continue
+            m = _STRING_RUN.match(chunk, i)
+            if m:
+                self._take_high_surrogate(target)
+                target.append(m.group())
+                i = m.end()
+                continue
+            c = chunk[i]
+            i += 1
+            if c == "\\":
+                self._escape = ""
+                continue
+            # closing quote
+            self._take_high_surrogate(target)
+            if self._state == _KEY:
+                self._field = "".join(self._key)
+                self._state = _COLON
+            else:
+                self._flush(out, done=True)
+                self._state = _AFTER_VALUE
+            return i
+        return i
+
+    def _scan_escape(self, chunk: str, i: int, target: list[str]) -> int:
+        if self._escape == "":
+            c = chunk[i]
+            if c == "u":
+                self._escape = "u"
+            else:
+                self._take_high_surrogate(target)
+                target.append(_ESCAPES.get(c, c))
+                self._escape = None
+            return i + 1
+        need = 5 - len(self._escape)
+        self._escape += chunk[i:i + need]
+        i += min(need, len(chunk) - i)
+        if len(self._escape) < 5:
+            return i
+        try:
+            cp = int(self._escape[1:], 16)
+        except ValueError:
+            cp = 0xFFFD
+        self._escape = None
+        if 0xD800 <= cp < 0xDC00:
+            self._take_high_surrogate(target)
+            self._high_surrogate = chr(cp)
+        elif 0xDC00 <= cp < 0xE000 and self._high_surrogate:
+            high = ord(self._high_surrogate)
+            self._high_surrogate = ""
+            target.append(chr(0x10000 + ((high - 0xD800) << 10) + (cp - 0xDC00)))
+        else:
+            self._take_high_surrogate(target)
+            target.append(chr(cp))
+        return i
+
+    def _take_high_surrogate(self, target: list[str]) -> None:
+        """짝이 없는 상위 서로게이트는 대체 문자로."""
+        if self._high_surrogate:
+            self._high_surrogate = ""
+            target.append("\ufffd")
+
+    def _scan_other(self, c: str) -> None:
+        """문자열이 아닌 값(숫자, true, 배열, 객체)을 건너뜀. 깊이 0에서 , 또는 } 가 나오면 끝."""
+        if self._in_str:
+            if self._str_escape:
+                self._str_escape = False
+            elif c == "\\":
+                self._str_escape = True
+            elif c == '"':
+                self._in_str = False
+        elif c == '"':
+            self._in_str = True
+        elif c in "{[":
+            self._depth += 1
+        elif c in "}]":
+            if self._depth == 0:  # 최상위 객체의 끝
+                self._state = _DONE
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._state = _AFTER_VALUE
+        elif c == "," and self._depth == 0:
+            self._state = _KEY_OR_END
+
+    def _flush(self, out: list[FieldEvent], done: bool) -> None:
+        field = self._field
+        if field in self._whole:
+            if done:
+                value = "".join(self._buf)
+                self.values[field] = value
+                out.append(FieldEvent(field, value, True))
+            return
+        delta = "".join(self._buf)
+        self._buf.clear()
+        self.values[field] = self.values.get(field, "") + delta
+        if delta or done:
+            out.append(FieldEvent(field, delta, done))
+
+
+class EventFieldStream:
+    """ADK 이벤트 스트림 → FieldEvent. 모델의 partial 텍스트 조각을 파서에 넣고, 비부분(완료) 모델 이벤트가
+    오면 다음 응답을 위해 초기화 (한 실행에서 모델이 여러 번 응답하는 경우)."""
+
+    def __init__(self, whole_fields: tuple[str, ...] = WHOLE_FIELDS):
+        self._whole = whole_fields
+        self._parser: StructuredStreamParser | None = None
+
+    def feed(self, event: Any) -> list[FieldEvent]:
+        if getattr(event, "author", "user") == "user":
+            return []
+        if not getattr(event, "partial", False):
+            self._parser = None
+            return []
+        parts = getattr(getattr(event, "content", None), "parts", None) or []
+        text = "".join(getattr(p, "text", None) or "" for p in parts if not getattr(p, "thought", False))
+        if not text:
+            return []
+        if self._parser is None:
+            self._parser = StructuredStreamParser(self._whole)
+        return self._parser.feed(text)
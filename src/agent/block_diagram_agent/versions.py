@@ -0,0 +1,83 @@
+"""다이어그램 버전 기록 (after_model 단계).
+
+완성된 응답의 mermaid를 세션 artifact(DIAGRAM_FILENAME)로 저장: 이벤트 actions.artifactDelta에 버전 번호가
+붙고, 세션 저장소는 이벤트/state의 mermaid를 내용 해시 참조(mermaidRef)로 바꿔 씀 (sessionclient.diagrams).
+응답 캐시 히트는 after_model을 거치지 않으므로 before_model 콜백을 on_response로 감싸 같은 처리를 함.
+Runner에 artifact_service가 없으면 (/run_batch의 stateless 실행 등) 아무것도 하지 않음.
+"""
+import inspect
+import json
+import logging
+import os
+from typing import Any, Callable
+
+from sessionclient import DiagramStoreUnavailable
+
+from .retry import response_text, strip_code_fence
+
+logger = logging.getLogger(__name__)
+
+DIAGRAM_FILENAME = "diagram.mmd"
+
+
+class DiagramVersioner:
+    """after_model 콜백 + 저장 카운터."""
+
+    def __init__(self, filename: str = DIAGRAM_FILENAME):
+        self._filename = filename
+        self.saved = 0
+        self.skipped = 0
+        self.failed = 0
+
+    async def after_model(self, callback_context: Any, llm_response: Any) -> None:
+        if getattr(llm_response, "partial", False) or getattr(llm_response, "error_code", None):
+            return None
+        await self._save(callback_context, llm_response)
+        return None
+
+    def on_response(self, before_model: Callable[..., Any]) -> Callable[..., Any]:
+        """before_model 콜백이 응답을 돌려주면 (캐시 히트) 그 응답의 다이어그램도 저장."""
+
+        async def callback(callback_context: Any, llm_request: Any) -> Any:
+            response = before_model(callback_context, llm_request)
+            if inspect.isawaitable(response):
+                response = await response
+            if response is not None:
+                await self._save(callback_context, response)
+            return response
+
+        return callback
+
+    async def _save(self, callback_context: Any, llm_response: Any) -> None:
+        try:
+            data = json.loads(strip_code_fence(response_text(llm_response)))
+        except ValueError:
+            return
+        mermaid = data.get("mermaid") if isinstance(data, dict) else None
+        if not isinstance(mermaid, str) or not mermaid.strip():
+            return
+        from google.genai import types
+
+        try:
+            await callback_context.save_artifact(self._filename, types.Part(text=mermaid.strip()))
+        except (ValueError, DiagramStoreUnavailable):
+            # artifact_service 없음(ValueError) / 저장소에 다이어그램 API 없음: mermaid는 이벤트에 그대로 남음
+            self.skipped += 1
+            return
+        except Exception as e:
+            self.failed += 1
+            logger.warning("saving diagram version failed: %s", e)
+            return
+        self.saved += 1
+
+    def stats(self) -> dict[str, Any]:
+        return {"saved": self.saved, "skipped": self.skipped, "failed": self.failed}
+
+
+def diagram_store_enabled() -> bool:
+    return os.getenv("DIAGRAM_STORE_ENABLED", "true").strip().lower() not in ("false", "0", "no", "off")
+
+
+def build_diagram_versioner() -> DiagramVersioner | None:
+    """DIAGRAM_STORE_ENABLED=false 면 None."""
+    return DiagramVersioner() if diagram_store_enabled() else None
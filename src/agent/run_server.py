@@ -1,24 +1,81 @@
 #!/usr/bin/env python3
-"""에이전트 API 서버 (Session Service: in-memory 또는 SESSION_SERVICE_URL 원격).
+"""에이전트 API 서버 (Session Service: in-memory, 로컬 SQLite 또는 SESSION_SERVICE_URL 원격).
 로컬: SESSION_USE_MEMORY=true → in-memory 세션 + 세션 CRUD 노출.
+단일 노드: SESSION_SQLITE_PATH 설정 → SQLite(WAL) 파일 세션 + 세션 CRUD 노출 (uvicorn --workers N 가능).
 배포: SESSION_SERVICE_URL 설정 → 원격 세션 사용, /run 만 노출 (세션 CRUD는 Session Service).
+일괄 생성: /run_batch → 프롬프트 목록을 제한된 동시성으로 실행, 완료되는 대로 NDJSON 한 줄씩.
+서버 측 렌더링: /render/{hash}.svg → mermaid 해시로 캐시된 SVG (브라우저의 mermaid.run 없이).
+준비 상태: 기동 후 백그라운드 warm-up(모델 로드, 커넥션 준비)이 끝나야 /ready 가 200 (/health 는 항상 200).
+프로파일링(PROFILE_ENABLED=true): 느린 /run(PROFILE_SLOW_MS) 또는 X-Profile: <PROFILE_TOKEN> 요청의 단계별 시간 + 스택 샘플 → /admin/profiles.
+Fast path: "A -> B -> C" 같이 구조가 명시된 프롬프트는 LLM 슬롯 없이 규칙으로 응답 (요청 body forceLlm: true 면 항상 LLM).
 """
+import time
+
+# 기동 시간 측정 시작 (아래 import부터 모듈 초기화 끝까지, STARTUP_IMPORT_BUDGET_MS와 비교)
+_import_started = time.perf_counter()
+
 import asyncio
 import os
 import logging
-import time
 import uuid
+from contextlib import AsyncExitStack, asynccontextmanager, nullcontext
 from types import SimpleNamespace
 from typing import Any
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
 
-from block_diagram_agent import get_llm_info, root_agent
-from google.adk.runners import Runner
+from agentserver import AdmissionRejected, AdmissionScheduler, KeyedLock, SingleFlight, map_unordered, request_key
+from agentserver.metrics import (
+    ERRORS,
+    in_flight,
+    observe_stage,
+    register_stats,
+    render,
+    stage_timer,
+)
+from agentserver.profiling import ProfilingMiddleware, build_profiler, folded
+from agentserver.responses import ClosingStreamingResponse, JSONBytesResponse, dumps, event_json, events_json, session_json
+from agentserver.startup import Readiness, StartupProfile
+from block_diagram_agent import DiagramResponse, EventFieldStream, force_llm, get_llm_info, preload_llm
+from block_diagram_agent.render import RenderError, build_renderer
+from block_diagram_agent.retry import content_text
+from sessionclient import DiagramArtifactService, DiagramCache, MemoryDiagramStore
+from sessionclient.models import paginate_summaries, session_summary, to_adk_event
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+_startup = StartupProfile(_import_started)
+_startup.mark("imports")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, "").strip() or default)
+    except ValueError:
+        logger.warning("invalid %s, using %s", name, default)
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, "").strip() or default)
+    except ValueError:
+        logger.warning("invalid %s, using %s", name, default)
+        return default
+
+
+def _env_bool(name: str, default: bool = False) -> bool:
+    v = os.getenv(name, "").strip().lower()
+    if not v:
+        return default
+    return v in ("true", "1", "yes", "on")
+
+
+# 다이어그램 저장소: mermaid를 내용 해시로 한 번만 저장하고 세션에는 참조만 (DIAGRAM_STORE_ENABLED=false 로 끔).
+# hash -> 텍스트 캐시는 세션 백엔드(참조 쓰기/해석)와 artifact 서비스(버전 저장)가 공유.
+_diagrams = DiagramCache(_env_int("DIAGRAM_CACHE_SIZE", 4096)) if _env_bool("DIAGRAM_STORE_ENABLED", True) else None
 
 
 def _session_service():
@@ -27,13 +84,47 @@ def _session_service():
         logger.info("Using in-memory session (SESSION_USE_MEMORY). Suitable for local dev only.")
         from google.adk.sessions import InMemorySessionService
         return InMemorySessionService()
+    sqlite_path = os.getenv("SESSION_SQLITE_PATH", "").strip()
+    if sqlite_path:
+        logger.info("Using SQLite session store: %s", sqlite_path)
+        from sessionclient import SqliteSessionService
+        return SqliteSessionService(
+            sqlite_path,
+            max_threads=_env_int("SESSION_SQLITE_THREADS", 4),
+            busy_timeout=_env_float("SESSION_SQLITE_BUSY_TIMEOUT", 10.0),
+            lazy_events=_env_bool("SESSION_LAZY_EVENTS", True),
+            diagrams=_diagrams,
+        )
     url = os.getenv("SESSION_SERVICE_URL", "").strip()
     if url:
         logger.info("Using remote session service: %s", url)
-        from sessionclient import RemoteSessionService
-        return RemoteSessionService(url)
+        from sessionclient import RemoteSessionService, SessionCache
+        # 세션 캐시: SESSION_CACHE_SIZE=0 이면 비활성. 히트 시 lastUpdateTime 이후 이벤트만 조회.
+        cache_size = _env_int("SESSION_CACHE_SIZE", 256)
+        cache = SessionCache(max_entries=cache_size, ttl=_env_float("SESSION_CACHE_TTL", 300.0)) if cache_size > 0 else None
+        # 하나의 커넥션 풀을 프로세스 수명 동안 재사용 (요청마다 TCP/TLS 핸드셰이크 방지)
+        return RemoteSessionService(
+            url,
+            timeout=_env_float("SESSION_HTTP_TIMEOUT", 30.0),
+            connect_timeout=_env_float("SESSION_HTTP_CONNECT_TIMEOUT", 5.0),
+            max_connections=_env_int("SESSION_HTTP_MAX_CONNECTIONS", 100),
+            max_keepalive_connections=_env_int("SESSION_HTTP_MAX_KEEPALIVE", 20),
+            keepalive_expiry=_env_float("SESSION_HTTP_KEEPALIVE_EXPIRY", 30.0),
+            http2=_env_bool("SESSION_HTTP2"),
+            cache=cache,
+            batch_max_events=_env_int("SESSION_BATCH_MAX_EVENTS", 32),
+            batch_max_delay=_env_float("SESSION_BATCH_MAX_DELAY", 2.0),
+            lazy_events=_env_bool("SESSION_LAZY_EVENTS", True),
+            # 스냅샷: snapshot + 최근 이벤트로 조회, N턴마다 스냅샷 기록, 오래된 이벤트는 보관 테이블로 (0이면 끔)
+            snapshot_tail=_env_int("SESSION_SNAPSHOT_TAIL", 30),
+            snapshot_every=_env_int("SESSION_SNAPSHOT_EVERY", 5),
+            snapshot_lines=_env_int("SESSION_SNAPSHOT_LINES", 20),
+            archive_after=_env_float("SESSION_ARCHIVE_AFTER", 7 * 24 * 3600.0),
+            diagrams=_diagrams,
+        )
     raise SystemExit(
         "session backend required: set SESSION_USE_MEMORY=true for local dev, "
+        "SESSION_SQLITE_PATH for a local SQLite file, "
         "or SESSION_SERVICE_URL for session service (e.g. http://localhost:8081)"
     )
 
@@ -41,16 +132,126 @@ def _session_service():
 # 앱 이름 (UI app.js와 동일). Runner에는 app 또는 (app_name + agent) 필수.
 APP_NAME = "diagram_agent"
 
-# 앱 생성 시점에 runner/session_service 고정 (env 기반)
-_session_svc = _session_service()
-_runner = Runner(app_name=APP_NAME, agent=root_agent, session_service=_session_svc)
-_use_in_memory = os.getenv("SESSION_USE_MEMORY", "").lower() in ("true", "1")
-
 # 기동 시 사용 중인 LLM 로그
 _llm_info = get_llm_info()
 logger.info("LLM: %s", _llm_info)
+# 메트릭 backend 라벨 (local / gemini)
+_backend = _llm_info.get("provider", "llm")
+
+# 앱 생성 시점에 runner/session_service 고정 (env 기반)
+_session_svc = _session_service()
+_startup.mark("session_service")
+# 다이어그램 버전(artifact): 세션 백엔드가 저장소를 겸함 (in-memory 세션이면 프로세스 메모리)
+_artifact_svc = (
+    DiagramArtifactService(
+        _session_svc if hasattr(_session_svc, "put_diagram_version") else MemoryDiagramStore(), _diagrams
+    )
+    if _diagrams is not None else None
+)
+
+# 에이전트(모델, 콜백)와 Runner는 모듈 import 시간에서 빼고 lifespan에서 (요청을 받기 전에) 만듦.
+# lifespan 없이 앱을 쓰면 (테스트 클라이언트 등) 처음 사용할 때.
+_agent_state: SimpleNamespace | None = None
+
+
+def _agent() -> SimpleNamespace:
+    """module: block_diagram_agent.agent (root_agent, 콜백 통계), runner, oneshot_runner. 처음 호출 시 생성."""
+    global _agent_state
+    if _agent_state is not None:
+        return _agent_state
+    started = time.perf_counter()
+    from agentserver.plugin import MetricsPlugin
+    from block_diagram_agent import agent
+    from google.adk.apps import App
+    from google.adk.runners import Runner
+    from google.adk.sessions import InMemorySessionService
+
+    runner = Runner(
+        app=App(name=APP_NAME, root_agent=agent.root_agent, plugins=[MetricsPlugin(_backend)]),
+        session_service=_session_svc,
+        artifact_service=_artifact_svc,
+    )
+    # /run_batch stateless 실행용: 프로세스 내 임시 세션 (실행 후 삭제, 세션 저장소에는 쓰지 않음)
+    oneshot_runner = Runner(
+        app=App(name=APP_NAME, root_agent=agent.root_agent, plugins=[MetricsPlugin(_backend)]),
+        session_service=InMemorySessionService(),
+    )
+    register_stats("response_cache", agent.get_response_cache_stats)
+    register_stats("context_compaction", agent.get_context_stats)
+    register_stats("diagram_edit", agent.get_edit_stats)
+    register_stats("mermaid_repair", agent.get_repair_stats)
+    register_stats("fast_path", agent.get_fast_path_stats)
+    if hasattr(agent.root_agent.model, "status"):
+        register_stats("llm_backend", agent.root_agent.model.status, label="base_url")
+    _agent_state = SimpleNamespace(module=agent, runner=runner, oneshot_runner=oneshot_runner)
+    _startup.record("agent", time.perf_counter() - started)
+    return _agent_state
+# 세션이 이 프로세스(메모리) 또는 로컬 SQLite 파일에 있으면 세션 CRUD를 직접 노출
+_local_sessions = (
+    os.getenv("SESSION_USE_MEMORY", "").lower() in ("true", "1") or bool(os.getenv("SESSION_SQLITE_PATH", "").strip())
+)
+
+# LLM admission control: 대기열(우선순위, 사용자별 공정성) + 포화 시 429 + Retry-After.
+# LLM_MAX_CONCURRENCY는 백엔드당 상한: 여기서는 풀 전체(백엔드 수 × 상한)만 묶고,
+# 백엔드별 상한은 RoutedLlm이 엔드포인트를 고른 뒤 그 엔드포인트의 슬롯으로 적용.
+_admission = AdmissionScheduler(
+    name=_backend,
+    max_inflight=_env_int("LLM_MAX_CONCURRENCY", 4) * max(1, len(_llm_info.get("backends") or ())),
+    max_queue=_env_int("LLM_QUEUE_SIZE", 64),
+    max_wait=_env_float("LLM_QUEUE_TIMEOUT", 60.0),
+)
+
+
+async def _warm_up_sessions() -> None:
+    """세션 저장소 커넥션 준비 (원격이면 커넥션 풀, SQLite면 DB 스레드)."""
+    await _session_svc.list_sessions(app_name=APP_NAME, user_id="__warmup__")
+
+
+# 기동 후 warm-up: 첫 요청이 LiteLLM import와 모델 cold load를 떠안지 않도록. 끝나야 /ready 가 200.
+_readiness = Readiness(
+    timeout=_env_float("WARMUP_TIMEOUT", 120.0),
+    max_wait=_env_float("WARMUP_MAX_WAIT", 300.0),
+)
+_warmup_enabled = _env_bool("WARMUP_ENABLED", True)
 
-app = FastAPI(title="Block Diagram Agent API")
+
+async def _warm_up_llm() -> None:
+    await _agent().module.warm_up_llm()
+
+
+if _warmup_enabled:
+    _readiness.add("llm", _warm_up_llm)
+    _readiness.add("session_service", _warm_up_sessions)
+
+
+@asynccontextmanager
+async def _lifespan(_app: FastAPI):
+    agent = _agent().module
+    if _warmup_enabled:
+        # 요청을 받기 전에 (메인 스레드에서) LiteLLM import: 첫 요청이 수 초를 떠안지 않도록
+        started = time.perf_counter()
+        preload_llm()
+        _startup.record("preload", time.perf_counter() - started)
+    _readiness.start()
+    yield
+    await _readiness.aclose()
+    # 원격 세션 클라이언트의 커넥션 풀 / SQLite 스레드 풀 정리
+    close = getattr(_session_svc, "aclose", None)
+    if close is not None:
+        await close()
+    # 다중 LLM 백엔드 라우터의 헬스 체크 태스크 정리
+    close = getattr(agent.root_agent.model, "aclose", None)
+    if close is not None:
+        await close()
+    # 응답 캐시 SQLite 커넥션 (스레드별)
+    agent.close_response_cache()
+
+
+app = FastAPI(title="Block Diagram Agent API", lifespan=_lifespan)
+# 요청 단위 프로파일링 (X-Profile 토큰 헤더 / 샘플링 / 느린 요청). PROFILE_ENABLED=true 일 때만 미들웨어 설치.
+_profiler = build_profiler()
+if _profiler is not None:
+    app.add_middleware(ProfilingMiddleware, profiler=_profiler)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -61,12 +262,12 @@ app.add_middleware(
 
 
 def _content_from_parts(parts: list) -> Any:
-    """newMessage.parts -> ADK Content (또는 호환 구조)."""
+    """newMessage.parts -> ADK Content (또는 호환 구조). google.genai는 여기서 import (모듈 import 시간에서 제외)."""
     try:
         from google.genai import types
-        return types.Content(role="user", parts=[types.Part(text=p.get("text", "")) for p in parts if "text" in p])
-    except Exception:
+    except ImportError:
         return {"role": "user", "parts": parts}
+    return types.Content(role="user", parts=[types.Part(text=p.get("text", "")) for p in parts if "text" in p])
 
 
 def _make_user_message_event(content: Any) -> Any:
@@ -89,109 +290,514 @@ def _make_user_message_event(content: Any) -> Any:
     )
 
 
-@app.post("/run")
-@app.post("/api/run")
-async def run(req: dict) -> list:
-    """POST /run 또는 /api/run — 에이전트 실행, 이벤트 목록 반환."""
+async def _prepare_run(user_id: str, session_id: str, content: Any) -> None:
+    """RemoteSessionService: Runner가 대화를 session.events만으로 구성하는 경우 첫 턴에 사용자 메시지가
+    비어 있어 LLM에 전달되지 않는 문제를 피하기 위해, run 전에 사용자 메시지를 세션에 이벤트로 추가."""
+    if not _local_sessions:
+        session = await _session_svc.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+        user_event = _make_user_message_event(content)
+        await _session_svc.append_event(session, user_event)
+
+
+def _coalesce(user_id: str, session_id: str):
+    """한 턴 동안 생성된 이벤트를 모아 턴 종료 시 한 번에 저장 (RemoteSessionService.coalesce). 그 외에는 no-op."""
+    coalesce = getattr(_session_svc, "coalesce", None)
+    if coalesce is None:
+        return nullcontext()
+    return coalesce(APP_NAME, user_id, session_id)
+
+
+def _parse_run_request(req: dict) -> tuple[str, str, Any]:
     user_id = req.get("userId", "default")
     session_id = req.get("sessionId", "default")
     new_message = req.get("newMessage") or {}
     parts = new_message.get("parts") or [{"text": ""}]
-    content = _content_from_parts(parts)
+    return user_id, session_id, _content_from_parts(parts)
+
+
+# 동일 (user, session, 메시지) 동시 요청은 첫 실행 결과를 공유 (UI 재시도/더블클릭).
+_run_flight = SingleFlight()
+# 같은 세션의 실행은 순서대로 (동시 턴의 이벤트가 섞이지 않도록).
+_session_locks = KeyedLock()
+
+
+def _admit(user_id: str, req: dict, default_priority: int = 0, llm: bool = True):
+    """LLM 실행 슬롯. priority(정수, 작을수록 먼저, 기본 default_priority)는 요청 body에서.
+    llm=False(fast path가 LLM 없이 답할 턴)면 슬롯 없이."""
+    if not llm:
+        return nullcontext()
     try:
-        # RemoteSessionService: Runner가 대화를 session.events만으로 구성하는 경우 첫 턴에 사용자 메시지가
-        # 비어 있어 LLM에 전달되지 않는 문제를 피하기 위해, run 전에 사용자 메시지를 세션에 이벤트로 추가.
-        if not _use_in_memory:
-            session = await _session_svc.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
-            user_event = _make_user_message_event(content)
-            await _session_svc.append_event(session, user_event)
-        run_fn = getattr(_runner, "run_async", None) or getattr(_runner, "run", None)
-        result = run_fn(
+        priority = int(req.get("priority", default_priority) or 0)
+    except (TypeError, ValueError):
+        priority = default_priority
+    return _admission.slot(user_id, priority)
+
+
+def _forced_llm(req: dict) -> bool:
+    """요청 body의 forceLlm: true — fast path를 건너뛰고 항상 LLM으로 생성."""
+    return req.get("forceLlm") is True
+
+
+async def _needs_llm(sessions: Any, user_id: str, session_id: str, content: Any, req: dict) -> bool:
+    """fast path가 답할 턴(구조가 명시된 프롬프트 + 아직 다이어그램이 없는 세션, forceLlm 아님)이 아니면 True.
+    세션 조회는 fast path에 맞는 프롬프트일 때만 (세션 락 안에서 호출)."""
+    matches = _agent().module.fast_path_matches
+    if _forced_llm(req) or not matches(content_text(content)):
+        return True
+    session = await sessions.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+    return session is None or not matches(content_text(content), session.state)
+
+
+def _too_busy(e: AdmissionRejected) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+
+@app.post("/run", response_class=JSONBytesResponse)
+@app.post("/api/run", response_class=JSONBytesResponse)
+async def run(req: dict) -> Response:
+    """POST /run 또는 /api/run — 에이전트 실행, 이벤트 목록(JSON 배열) 반환. forceLlm: true 이면 fast path 생략."""
+    user_id, session_id, content = _parse_run_request(req)
+    body = await _run_flight.do(
+        request_key(req, user_id, session_id),
+        lambda: _run_serialized(user_id, session_id, content, req),
+    )
+    return JSONBytesResponse(body)
+
+
+async def _run_serialized(user_id: str, session_id: str, content: Any, req: dict) -> bytes:
+    with in_flight("run"), stage_timer("run", "total"):
+        try:
+            events = await _run_turn("run", user_id, session_id, content, req)
+        except AdmissionRejected as e:
+            ERRORS.labels(_backend, "admission").inc()
+            raise _too_busy(e)
+        except Exception as e:
+            ERRORS.labels(_backend, "run").inc()
+            logger.exception("run failed")
+            raise HTTPException(status_code=500, detail=str(e))
+        _prerender(events)
+        # 이벤트를 REST 형식(camelCase)의 JSON 바이트로 한 번에 직렬화 (동시 요청은 같은 바이트를 공유)
+        with stage_timer("run", "serialize"):
+            return events_json(events)
+
+
+async def _run_turn(endpoint: str, user_id: str, session_id: str, content: Any, req: dict,
+                    default_priority: int = 0) -> list:
+    """세션 락 → LLM 슬롯 → 턴 단위 이벤트 배치 → 사용자 메시지 사전 추가 → Runner. 단계는 endpoint 라벨로 기록."""
+    async with AsyncExitStack() as stack:
+        await stack.enter_async_context(_session_locks.hold((user_id, session_id)))
+        with stage_timer(endpoint, "queue_wait"):
+            llm = await _needs_llm(_session_svc, user_id, session_id, content, req)
+            await stack.enter_async_context(_admit(user_id, req, default_priority, llm))
+        await stack.enter_async_context(_coalesce(user_id, session_id))
+        with stage_timer(endpoint, "pre_append"):
+            await _prepare_run(user_id, session_id, content)
+        with stage_timer(endpoint, "runner"), force_llm(_forced_llm(req)):
+            return await _collect_events(user_id, session_id, content)
+
+
+async def _collect_events(user_id: str, session_id: str, content: Any, runner: Any = None) -> list:
+    runner = runner or _agent().runner
+    run_fn = getattr(runner, "run_async", None) or getattr(runner, "run", None)
+    result = run_fn(
+        user_id=user_id,
+        session_id=session_id,
+        new_message=content,
+    )
+    if asyncio.iscoroutine(result):
+        return await result
+    if hasattr(result, "__anext__"):
+        # async generator
+        events = []
+        async for ev in result:
+            events.append(ev)
+        return events
+    return result if isinstance(result, list) else list(result)
+
+
+@app.post("/run_sse")
+@app.post("/api/run_sse")
+async def run_sse(req: dict, request: Request):
+    """POST /run_sse 또는 /api/run_sse — 이벤트를 생성되는 즉시 Server-Sent Events로 전송.
+    streaming(기본 true)이면 부분 텍스트(partial=true) 이벤트도 전송. 클라이언트 연결이 끊기면 실행 취소.
+    fields(기본 true)이면 부분 텍스트의 구조화 응답을 증분 파싱해 `event: field` 프레임도 전송:
+    {"field": "title", "delta": 전체 제목, "done": true} (완성 시 한 번), message/mermaid는 {"field", "delta", "done"}.
+    render(기본 false)이면 마지막에 서버 측 SVG를 만들어 `event: render` 프레임 {"hash", "url"} 전송.
+    """
+    started = time.perf_counter()
+    user_id, session_id, content = _parse_run_request(req)
+    # 세션 락, LLM 슬롯, 이벤트 버퍼는 스트림이 끝날 때 정리. 본문이 한 번도 읽히지 않아도 (첫 청크 전 연결 끊김 등)
+    # ClosingStreamingResponse가 close()를 호출. 429/500은 스트림 시작 전에 상태 코드로 응답
+    stack = AsyncExitStack()
+    try:
+        stack.enter_context(in_flight("run_sse"))
+        stack.enter_context(stage_timer("run_sse", "total"))
+        await stack.enter_async_context(_session_locks.hold((user_id, session_id)))
+        with stage_timer("run_sse", "queue_wait"):
+            llm = await _needs_llm(_session_svc, user_id, session_id, content, req)
+            await stack.enter_async_context(_admit(user_id, req, llm=llm))
+        await stack.enter_async_context(_coalesce(user_id, session_id))
+        with stage_timer("run_sse", "pre_append"):
+            await _prepare_run(user_id, session_id, content)
+    except AdmissionRejected as e:
+        await stack.aclose()
+        ERRORS.labels(_backend, "admission").inc()
+        raise _too_busy(e)
+    except Exception as e:
+        await stack.aclose()
+        ERRORS.labels(_backend, "run").inc()
+        logger.exception("run_sse prepare failed")
+        raise HTTPException(status_code=500, detail=str(e))
+    try:
+        streaming = req.get("streaming", True) is not False
+        fields = EventFieldStream() if streaming and req.get("fields", True) is not False else None
+        render_final = _renderer is not None and req.get("render") is True
+        forced = _forced_llm(req)
+        from google.adk.agents.run_config import RunConfig, StreamingMode
+
+        run_config = RunConfig(streaming_mode=StreamingMode.SSE if streaming else StreamingMode.NONE)
+        agen = _agent().runner.run_async(
             user_id=user_id,
             session_id=session_id,
             new_message=content,
+            run_config=run_config,
         )
-        if asyncio.iscoroutine(result):
-            events = await result
-        elif hasattr(result, "__anext__"):
-            # async generator
-            events = []
-            async for ev in result:
-                events.append(ev)
-        else:
-            events = result if isinstance(result, list) else list(result)
-    except Exception as e:
-        logger.exception("run failed")
-        raise HTTPException(status_code=500, detail=str(e))
-    # 이벤트를 REST 형식(camelCase 등)으로 직렬화
-    out = []
-    for ev in events:
-        if hasattr(ev, "model_dump"):
-            out.append(ev.model_dump())
-        elif hasattr(ev, "__dict__"):
-            out.append(_event_to_dict(ev))
-        else:
-            out.append(ev)
-    return out
+    except BaseException:
+        await stack.aclose()
+        raise
+
+    async def close() -> None:
+        try:
+            await agen.aclose()
+        finally:
+            await stack.aclose()
+
+    async def stream():
+        # StreamingResponse가 각 청크 전송을 await 하므로, 클라이언트가 느리면 생성기도 그만큼 대기 (back-pressure).
+        serialize_seconds = 0.0
+        final_events = []
+        try:
+            with stage_timer("run_sse", "runner"), force_llm(forced):
+                async for ev in agen:
+                    if await request.is_disconnected():
+                        logger.info("run_sse: client disconnected, cancelling session=%s", session_id)
+                        final_events.clear()
+                        break
+                    t = time.perf_counter()
+                    frame = _sse_frame(event_json(ev))
+                    serialize_seconds += time.perf_counter() - t
+                    yield frame
+                    if render_final and not getattr(ev, "partial", False):
+                        final_events.append(ev)
+                    for field in fields.feed(ev) if fields is not None else ():
+                        if field.field == "title":
+                            observe_stage("run_sse", "title_ready", time.perf_counter() - started)
+                        yield _sse_frame(dumps(field.to_json()), event="field")
+            observe_stage("run_sse", "serialize", serialize_seconds)
+            await close()
+            if final_events:
+                with stage_timer("run_sse", "render"):
+                    rendered = await _render_diagram(_diagram_or_none(final_events))
+                if rendered is not None:
+                    yield _sse_frame(dumps(rendered), event="render")
+        except asyncio.CancelledError:
+            logger.info("run_sse: cancelled session=%s", session_id)
+            raise
+        except Exception as e:
+            ERRORS.labels(_backend, "run").inc()
+            logger.exception("run_sse failed")
+            yield _sse_frame(dumps({"error": str(e)}), event="error")
+        finally:
+            await close()
+
+    return ClosingStreamingResponse(
+        stream(),
+        close,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ----- /run_batch: 프롬프트 목록 일괄 생성 (CI 등) -----
+# 배치 하나의 동시 실행 상한 (요청의 concurrency도 이 값으로 제한). LLM 전체 상한은 admission이 그대로 적용.
+_BATCH_CONCURRENCY = max(1, _env_int("RUN_BATCH_CONCURRENCY", _env_int("LLM_MAX_CONCURRENCY", 4)))
+_BATCH_MAX_ITEMS = max(1, _env_int("RUN_BATCH_MAX_ITEMS", 500))
+# 배치 항목은 기본적으로 대화형 /run(priority 0)보다 뒤에 슬롯을 받음
+_BATCH_PRIORITY = _env_int("RUN_BATCH_PRIORITY", 1)
+_batch_stats = {"batches": 0, "items": 0, "ok": 0, "failed": 0, "in_flight": 0}
+
+
+def _batch_item_content(item: Any) -> tuple[Any, str | None]:
+    """항목: "프롬프트" | {"prompt"|"text": ...} | {"newMessage": {"parts": [...]}} (+ id, sessionId)."""
+    if isinstance(item, str):
+        item = {"prompt": item}
+    if not isinstance(item, dict):
+        raise HTTPException(status_code=400, detail="item must be a string or an object")
+    prompt = item.get("prompt", item.get("text"))
+    if isinstance(prompt, str) and prompt.strip():
+        return _content_from_parts([{"text": prompt}]), item.get("sessionId")
+    parts = (item.get("newMessage") or {}).get("parts") or []
+    if not any(isinstance(p, dict) and str(p.get("text", "")).strip() for p in parts):
+        raise HTTPException(status_code=400, detail="item has no prompt")
+    return _content_from_parts(parts), item.get("sessionId")
 
 
-def _event_to_dict(ev: Any) -> dict:
-    d = {}
-    for k in ("id", "timestamp", "invocation_id", "branch", "author", "content", "actions", "partial", "turn_complete"):
-        v = getattr(ev, k, None)
-        if v is not None:
-            key = "invocationId" if k == "invocation_id" else k
-            d[key] = v
-    return d
+def _diagram_from_events(events: list) -> dict[str, Any]:
+    """마지막 모델 이벤트의 DiagramResponse (output_key로 저장된 state_delta["diagram"], 없으면 본문 JSON)."""
+    for ev in reversed(events):
+        if getattr(ev, "author", "user") == "user" or getattr(ev, "partial", False):
+            continue
+        delta = getattr(getattr(ev, "actions", None), "state_delta", None) or {}
+        if isinstance(delta.get("diagram"), dict):
+            return DiagramResponse.model_validate(delta["diagram"]).model_dump()
+        text = content_text(getattr(ev, "content", None)).strip()
+        if text:
+            return DiagramResponse.model_validate_json(text).model_dump()
+    raise ValueError("agent returned no diagram")
 
 
-# ----- In-memory 일 때만 세션 CRUD 노출 (UI가 같은 origin 사용). 경로: /api/apps/... -----
+async def _run_batch_item(user_id: str, item: Any, req: dict, stateless: bool) -> dict[str, Any]:
+    """항목 하나 실행. stateless면 임시 in-memory 세션(실행 후 삭제), 아니면 세션 저장소에 새 세션(또는 sessionId)."""
+    content, session_id = _batch_item_content(item)
+    with in_flight("run_batch"), stage_timer("run_batch", "total"):
+        if stateless:
+            oneshot_runner = _agent().oneshot_runner
+            sessions = oneshot_runner.session_service
+            session = await sessions.create_session(app_name=APP_NAME, user_id=user_id)
+            try:
+                async with AsyncExitStack() as stack:
+                    with stage_timer("run_batch", "queue_wait"):
+                        llm = await _needs_llm(sessions, user_id, session.id, content, req)
+                        await stack.enter_async_context(_admit(user_id, req, _BATCH_PRIORITY, llm))
+                    with stage_timer("run_batch", "runner"), force_llm(_forced_llm(req)):
+                        events = await _collect_events(user_id, session.id, content, oneshot_runner)
+            finally:
+                await sessions.delete_session(app_name=APP_NAME, user_id=user_id, session_id=session.id)
+            return {"diagram": _diagram_from_events(events)}
+        if not session_id:
+            session = await _session_svc.create_session(app_name=APP_NAME, user_id=user_id, state={})
+            session_id = session.id
+        events = await _run_turn("run_batch", user_id, session_id, content, req, _BATCH_PRIORITY)
+        return {"sessionId": session_id, "diagram": _diagram_from_events(events)}
+
+
+def _batch_error(e: BaseException) -> dict[str, Any]:
+    if isinstance(e, AdmissionRejected):
+        ERRORS.labels(_backend, "admission").inc()
+        return {"status": 429, "error": str(e), "retryAfter": e.retry_after}
+    if isinstance(e, HTTPException):
+        return {"status": e.status_code, "error": str(e.detail)}
+    ERRORS.labels(_backend, "run").inc()
+    logger.warning("run_batch item failed: %s", e, exc_info=not isinstance(e, ValueError))
+    return {"status": 500, "error": str(e) or type(e).__name__}
+
+
+@app.post("/run_batch")
+@app.post("/api/run_batch")
+async def run_batch(req: dict):
+    """POST /run_batch — {userId, items: [프롬프트 | {id?, prompt | newMessage, sessionId?}], stateless?, concurrency?, priority?}.
+    항목을 최대 concurrency개씩 동시에 실행하고, 끝나는 순서대로 NDJSON 한 줄씩 전송:
+    {"index", "id"?, "ok": true, "sessionId"?, "diagram": {title, message, mermaid}, "render"?, "elapsedMs"} 또는
+    {"index", "id"?, "ok": false, "status", "error"}. render: true 이면 "render": {"hash", "url"} (서버 측 SVG). 마지막 줄은 {"done": true, "total", "ok", "failed", "elapsedMs"}.
+    항목 오류는 해당 줄로만 보고하고 배치는 계속. 클라이언트 연결이 끊기면 남은 항목 취소.
+    """
+    items = req.get("items")
+    if not isinstance(items, list) or not items:
+        raise HTTPException(status_code=400, detail="items must be a non-empty list")
+    if len(items) > _BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"too many items (max {_BATCH_MAX_ITEMS})")
+    user_id = req.get("userId") or "batch"
+    stateless = req.get("stateless") is True
+    try:
+        limit = int(req.get("concurrency") or _BATCH_CONCURRENCY)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="concurrency must be an integer")
+    limit = max(1, min(limit, _BATCH_CONCURRENCY))
+    _batch_stats["batches"] += 1
+    _batch_stats["items"] += len(items)
+
+    async def run_item(index: int) -> tuple[dict[str, Any], float]:
+        started = time.perf_counter()
+        result = await _run_batch_item(user_id, items[index], req, stateless)
+        if req.get("render") is True:
+            rendered = await _render_diagram(result["diagram"])
+            if rendered is not None:
+                result["render"] = rendered
+        return result, time.perf_counter() - started
+
+    async def stream():
+        started = time.perf_counter()
+        ok = failed = 0
+        _batch_stats["in_flight"] += 1
+        results = map_unordered(run_item, range(len(items)), limit)
+        try:
+            async for index, value, error in results:
+                line: dict[str, Any] = {"index": index}
+                if isinstance(items[index], dict) and items[index].get("id") is not None:
+                    line["id"] = items[index]["id"]
+                if error is None:
+                    result, seconds = value
+                    line.update(ok=True, **result, elapsedMs=round(seconds * 1000, 1))
+                    ok += 1
+                else:
+                    line.update(ok=False, **_batch_error(error))
+                    failed += 1
+                yield dumps(line) + b"\n"
+            yield dumps({"done": True, "total": len(items), "ok": ok, "failed": failed,
+                         "elapsedMs": round((time.perf_counter() - started) * 1000, 1)}) + b"\n"
+        finally:
+            await results.aclose()
+            _batch_stats["in_flight"] -= 1
+            _batch_stats["ok"] += ok
+            _batch_stats["failed"] += failed
+
+    return StreamingResponse(
+        stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# ----- 서버 측 SVG 렌더링: mermaid 해시 → SVG (RENDER_ENABLED=false 이면 비활성) -----
+_renderer = build_renderer()
+# /run 응답 후 백그라운드 사전 렌더링 (태스크 참조 유지)
+_render_tasks: set[asyncio.Task] = set()
+_SVG_HEADERS = {
+    # 내용 주소(해시)이므로 영구 캐시 가능
+    "Cache-Control": "public, max-age=31536000, immutable",
+    "X-Content-Type-Options": "nosniff",
+    "Content-Security-Policy": "default-src 'none'; style-src 'unsafe-inline'",
+}
+
+
+def _diagram_or_none(events: list) -> dict[str, Any] | None:
+    try:
+        return _diagram_from_events(events)
+    except ValueError:
+        return None
+
+
+async def _render_diagram(diagram: dict[str, Any] | None) -> dict[str, Any] | None:
+    """diagram.mermaid를 렌더 캐시에 (CPU 작업은 스레드에서). {"hash", "url"}, 비활성/실패 시 None."""
+    mermaid = (diagram or {}).get("mermaid") or ""
+    if _renderer is None or not mermaid.strip():
+        return None
+    try:
+        key, _ = await asyncio.to_thread(_renderer.render, mermaid)
+    except RenderError as e:
+        logger.info("diagram not rendered: %s", e)
+        return None
+    return {"hash": key, "url": f"/render/{key}.svg"}
+
+
+def _prerender(events: list) -> None:
+    """/run 결과 다이어그램을 응답과 별개로 렌더링해 두기 (UI가 /render/{hash}.svg 를 바로 받도록)."""
+    if _renderer is None:
+        return
+    diagram = _diagram_or_none(events)
+    if diagram is None:
+        return
+    task = asyncio.create_task(_render_diagram(diagram))
+    _render_tasks.add(task)
+    task.add_done_callback(_render_tasks.discard)
+
+
+@app.get("/render/{key}.svg")
+@app.get("/api/render/{key}.svg")
+def get_rendered_svg(key: str) -> Response:
+    """GET /render/{hash}.svg — 캐시된 SVG. 없으면(또는 비활성) 404: POST /render 로 만든 뒤 다시 요청."""
+    svg = _renderer.get(key) if _renderer is not None else None
+    if svg is None:
+        raise HTTPException(status_code=404, detail="not rendered")
+    return Response(content=svg, media_type="image/svg+xml", headers={**_SVG_HEADERS, "ETag": f'"{key}"'})
+
+
+@app.post("/render", response_class=JSONBytesResponse)
+@app.post("/api/render", response_class=JSONBytesResponse)
+async def render_diagram(req: dict) -> Response:
+    """POST /render — {"mermaid"} → {"hash", "url"}. 지원하지 않는 구문은 422, 비활성이면 503."""
+    if _renderer is None:
+        raise HTTPException(status_code=503, detail="server-side rendering is disabled")
+    mermaid = req.get("mermaid")
+    if not isinstance(mermaid, str) or not mermaid.strip():
+        raise HTTPException(status_code=400, detail="mermaid is required")
+    try:
+        key, _ = await asyncio.to_thread(_renderer.render, mermaid)
+    except RenderError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return JSONBytesResponse({"hash": key, "url": f"/render/{key}.svg"})
+
+
+def _sse_frame(data: bytes, event: str | None = None) -> bytes:
+    head = f"event: {event}\n".encode() if event else b""
+    return head + b"data: " + data + b"\n\n"
+
+
+# ----- 로컬 세션(in-memory / SQLite)일 때만 세션 CRUD 노출 (UI가 같은 origin 사용). 경로: /api/apps/... -----
 @app.get("/api/apps/{app_name}/users/{user_id}/sessions")
 @app.get("/apps/{app_name}/users/{user_id}/sessions")
-async def list_sessions(app_name: str, user_id: str):
-    if not _use_in_memory:
+async def list_sessions(
+    app_name: str,
+    user_id: str,
+    view: str | None = None,
+    limit: int = 50,
+    after: str | None = None,
+):
+    """view=summary 이면 events 없이 {id, title, lastUpdateTime} 요약을 커서(after) 페이지로 반환."""
+    if not _local_sessions:
         raise HTTPException(status_code=404, detail="Session API is on Session Service")
-    sessions = await _session_svc.list_sessions(app_name=app_name, user_id=user_id)
-    return [_session_to_rest(s) for s in sessions]
+    resp = await _session_svc.list_sessions(app_name=app_name, user_id=user_id)
+    # ADK ListSessionsResponse(.sessions) 또는 list
+    sessions = getattr(resp, "sessions", resp)
+    if view == "summary":
+        if limit <= 0:
+            raise HTTPException(status_code=400, detail="invalid limit parameter")
+        try:
+            return paginate_summaries([session_summary(s) for s in sessions], min(limit, 500), after)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    return JSONBytesResponse(b"[" + b",".join(session_json(s) for s in sessions) + b"]")
 
 
 @app.post("/api/apps/{app_name}/users/{user_id}/sessions")
 @app.post("/apps/{app_name}/users/{user_id}/sessions")
 async def create_session(app_name: str, user_id: str, body: dict | None = None):
-    if not _use_in_memory:
+    if not _local_sessions:
         raise HTTPException(status_code=404, detail="Session API is on Session Service")
     body = body or {}
     state = body.get("state") or {}
     sess = await _session_svc.create_session(app_name=app_name, user_id=user_id, state=state, session_id=None)
-    return _session_to_rest(sess)
+    return JSONBytesResponse(session_json(sess))
 
 
 @app.post("/api/apps/{app_name}/users/{user_id}/sessions/{session_id}")
 @app.post("/apps/{app_name}/users/{user_id}/sessions/{session_id}")
 async def create_session_with_id(app_name: str, user_id: str, session_id: str, body: dict | None = None):
-    if not _use_in_memory:
+    if not _local_sessions:
         raise HTTPException(status_code=404, detail="Session API is on Session Service")
     body = body or {}
     state = body.get("state") or {}
     sess = await _session_svc.create_session(
         app_name=app_name, user_id=user_id, state=state, session_id=session_id
     )
-    return _session_to_rest(sess)
+    return JSONBytesResponse(session_json(sess))
 
 
 @app.get("/api/apps/{app_name}/users/{user_id}/sessions/{session_id}")
 @app.get("/apps/{app_name}/users/{user_id}/sessions/{session_id}")
 async def get_session(app_name: str, user_id: str, session_id: str):
-    if not _use_in_memory:
+    if not _local_sessions:
         raise HTTPException(status_code=404, detail="Session API is on Session Service")
     sess = await _session_svc.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
-    return _session_to_rest(sess)
+    if sess is None:
+        raise HTTPException(status_code=404, detail="session not found")
+    return JSONBytesResponse(session_json(sess))
 
 
 @app.delete("/api/apps/{app_name}/users/{user_id}/sessions/{session_id}")
 @app.delete("/apps/{app_name}/users/{user_id}/sessions/{session_id}")
 async def delete_session(app_name: str, user_id: str, session_id: str):
-    if not _use_in_memory:
+    if not _local_sessions:
         raise HTTPException(status_code=404, detail="Session API is on Session Service")
     await _session_svc.delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
     return None
@@ -200,44 +806,201 @@ async def delete_session(app_name: str, user_id: str, session_id: str):
 @app.post("/api/apps/{app_name}/users/{user_id}/sessions/{session_id}/events")
 @app.post("/apps/{app_name}/users/{user_id}/sessions/{session_id}/events")
 async def append_event(app_name: str, user_id: str, session_id: str, body: dict):
-    if not _use_in_memory:
+    if not _local_sessions:
         raise HTTPException(status_code=404, detail="Session API is on Session Service")
     sess = await _session_svc.get_session(app_name=app_name, user_id=user_id, session_id=session_id)
-    # REST Event -> ADK Event 변환 필요; 여기서는 최소 구현 (stateDelta 등만 반영하려면 이벤트 생성)
+    if sess is None:
+        raise HTTPException(status_code=404, detail="session not found")
     event = _rest_to_event(body)
     await _session_svc.append_event(sess, event)
     return None
 
 
-def _session_to_rest(s: Any) -> dict:
-    return {
-        "id": getattr(s, "id", s.id if hasattr(s, "id") else ""),
-        "appName": getattr(s, "app_name", s.app_name if hasattr(s, "app_name") else ""),
-        "userId": getattr(s, "user_id", s.user_id if hasattr(s, "user_id") else ""),
-        "lastUpdateTime": getattr(s, "last_update_time", 0),
-        "state": getattr(s, "state", {}),
-        "events": getattr(s, "events", []),
-    }
+# ----- 다이어그램 저장소 (로컬 세션일 때만; 원격이면 Session Service가 같은 경로 제공) -----
+_ARTIFACTS = "/apps/{app_name}/users/{user_id}/sessions/{session_id}/artifacts"
+
+
+def _artifacts() -> DiagramArtifactService:
+    if not _local_sessions:
+        raise HTTPException(status_code=404, detail="Diagram API is on Session Service")
+    if _artifact_svc is None:
+        raise HTTPException(status_code=404, detail="diagram store is disabled")
+    return _artifact_svc
+
+
+@app.get("/api/diagrams/{digest}")
+@app.get("/diagrams/{digest}")
+async def get_diagram(digest: str) -> Response:
+    """GET /diagrams/{hash} — mermaidRef가 가리키는 텍스트. 내용 주소라 불변 (immutable 캐시)."""
+    text = (await _artifacts().texts([digest])).get(digest)
+    if text is None:
+        raise HTTPException(status_code=404, detail="diagram not found")
+    return Response(
+        content=text,
+        media_type="text/plain; charset=utf-8",
+        headers={"Cache-Control": "public, max-age=31536000, immutable", "ETag": f'"{digest}"'},
+    )
+
+
+@app.get("/api" + _ARTIFACTS)
+@app.get(_ARTIFACTS)
+async def list_artifacts(app_name: str, user_id: str, session_id: str):
+    return await _artifacts().list_artifact_keys(app_name=app_name, user_id=user_id, session_id=session_id)
+
+
+@app.get("/api" + _ARTIFACTS + "/{filename}/versions/metadata")
+@app.get(_ARTIFACTS + "/{filename}/versions/metadata")
+async def list_artifact_versions(app_name: str, user_id: str, session_id: str, filename: str):
+    versions = await _artifacts().list_artifact_versions(
+        app_name=app_name, user_id=user_id, session_id=session_id, filename=filename
+    )
+    return [v.model_dump(by_alias=True, exclude_none=True) for v in versions]
+
+
+@app.get("/api" + _ARTIFACTS + "/{filename}/versions")
+@app.get(_ARTIFACTS + "/{filename}/versions")
+async def list_artifact_version_numbers(app_name: str, user_id: str, session_id: str, filename: str):
+    return await _artifacts().list_versions(app_name=app_name, user_id=user_id, session_id=session_id, filename=filename)
+
+
+@app.get("/api" + _ARTIFACTS + "/{filename}/versions/{version}")
+@app.get(_ARTIFACTS + "/{filename}/versions/{version}")
+async def load_artifact_version(app_name: str, user_id: str, session_id: str, filename: str, version: str):
+    """version은 번호 또는 latest."""
+    if version == "latest":
+        return await load_artifact(app_name, user_id, session_id, filename)
+    try:
+        number = int(version)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid version")
+    return await load_artifact(app_name, user_id, session_id, filename, number)
+
+
+@app.get("/api" + _ARTIFACTS + "/{filename}")
+@app.get(_ARTIFACTS + "/{filename}")
+async def load_artifact(app_name: str, user_id: str, session_id: str, filename: str, version: int | None = None):
+    part = await _artifacts().load_artifact(
+        app_name=app_name, user_id=user_id, session_id=session_id, filename=filename, version=version
+    )
+    if part is None:
+        raise HTTPException(status_code=404, detail="artifact not found")
+    return {"text": part.text}
 
 
 def _rest_to_event(body: dict) -> Any:
-    """REST 이벤트 body를 ADK Event 유사 객체로 (append_event용)."""
-    from types import SimpleNamespace
-    return SimpleNamespace(
-        id=body.get("id", ""),
-        timestamp=body.get("time", 0),
-        invocation_id=body.get("invocationId", ""),
-        branch=body.get("branch", ""),
-        author=body.get("author", ""),
-        content=body.get("content"),
-        actions=body.get("actions") or {},
+    """REST 이벤트 body -> ADK Event (append_event용, 예: UI의 세션 제목 stateDelta)."""
+    event = to_adk_event(None, body)
+    if event is None:
+        raise HTTPException(status_code=400, detail="invalid event")
+    return event
+
+
+# ----- 프로파일 캡처 (느린 요청 / X-Profile / 샘플링) -----
+def _profiles() -> Any:
+    if _profiler is None:
+        raise HTTPException(status_code=404, detail="profiling is disabled")
+    return _profiler
+
+
+@app.get("/admin/profiles")
+async def list_profiles():
+    """GET /admin/profiles — 캡처 요약 (최신 순): id, path, reason, total_ms, stages_ms, samples."""
+    return await asyncio.to_thread(_profiles().summaries)
+
+
+@app.get("/admin/profiles/{capture_id}.folded")
+async def get_profile_folded(capture_id: str) -> Response:
+    """GET /admin/profiles/{id}.folded — flamegraph folded 스택 (flamegraph.pl, speedscope)."""
+    record = await asyncio.to_thread(_profiles().load, capture_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="profile not found")
+    return Response(
+        content=folded(record.get("stacks") or {}),
+        media_type="text/plain; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{capture_id}.folded"'},
     )
 
 
+@app.get("/admin/profiles/{capture_id}")
+async def get_profile(capture_id: str):
+    """GET /admin/profiles/{id} — 캡처 전체 (단계별 시간 + 스택별 샘플 수)."""
+    record = await asyncio.to_thread(_profiles().load, capture_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="profile not found")
+    return JSONBytesResponse(record)
+
+
 @app.get("/")
 @app.get("/health")
 def health():
-    return {"status": "ok", "llm": get_llm_info()}
+    out = {"status": "ok", "llm": get_llm_info()}
+    agent = _agent().module
+    cache_stats = agent.get_response_cache_stats()
+    if cache_stats is not None:
+        out["response_cache"] = cache_stats
+    context_stats = agent.get_context_stats()
+    if context_stats is not None:
+        out["context_compaction"] = context_stats
+    edit_stats = agent.get_edit_stats()
+    if edit_stats is not None:
+        out["diagram_edit"] = edit_stats
+    repair_stats = agent.get_repair_stats()
+    if repair_stats is not None:
+        out["mermaid_repair"] = repair_stats
+    fast_path_stats = agent.get_fast_path_stats()
+    if fast_path_stats is not None:
+        out["fast_path"] = fast_path_stats
+    if _artifact_svc is not None:
+        out["diagrams"] = _diagram_stats()
+    if _profiler is not None:
+        out["profiling"] = _profiler.stats()
+    out["run_dedup"] = _run_flight.stats()
+    out["admission"] = _admission.stats()
+    out["run_batch"] = dict(_batch_stats, concurrency=_BATCH_CONCURRENCY)
+    if _renderer is not None:
+        out["render"] = _renderer.stats()
+    out["startup"] = _startup_stats()
+    return out
+
+
+def _diagram_stats() -> dict[str, Any]:
+    return {**_artifact_svc.stats(), **(_agent().module.get_diagram_version_stats() or {})}
+
+
+def _startup_stats() -> dict[str, Any]:
+    return {**_startup.stats(), **_readiness.stats()}
+
+
+@app.get("/ready")
+def ready() -> Response:
+    """GET /ready — k8s readinessProbe. warm-up이 끝나야 200, 그 전에는 503 (/health 는 liveness 용)."""
+    body = {"status": "ready" if _readiness.ready else "warming_up", **_startup_stats()}
+    return JSONBytesResponse(body, status_code=200 if _readiness.ready else 503)
+
+
+# 기존 stats() 카운터를 /metrics 게이지로 (scrape 시점에만 계산). 에이전트 콜백/LLM 백엔드 통계는 _agent()에서 등록.
+register_stats("admission", _admission.stats)
+register_stats("run_dedup", _run_flight.stats)
+register_stats("run_batch", lambda: dict(_batch_stats))
+if _renderer is not None:
+    register_stats("render", _renderer.stats)
+if _artifact_svc is not None:
+    register_stats("diagrams", _diagram_stats)
+if _profiler is not None:
+    register_stats("profiling", _profiler.stats)
+register_stats("startup", _startup_stats)
+if getattr(_session_svc, "cache", None) is not None:
+    register_stats("session_cache", _session_svc.cache.stats)
+
+
+@app.get("/metrics")
+def metrics():
+    """Prometheus text format. prometheus_client가 없으면 503."""
+    rendered = render()
+    if rendered is None:
+        raise HTTPException(status_code=503, detail="prometheus_client is not installed")
+    body, content_type = rendered
+    return Response(content=body, media_type=content_type)
 
 
 @app.get("/list-apps")
@@ -245,6 +1008,12 @@ def list_apps():
     return [APP_NAME]
 
 
+_startup.mark("app")
+# 실측 (에이전트/Runner는 lifespan의 agent 단계로 분리): 워커 1개 약 1.3~1.5초, CPU 1개에서 --workers 2 로
+# 동시에 뜨면 2.6~2.9초 (대부분 sessionclient가 쓰는 google.adk.sessions import)
+_startup.finish(_env_float("STARTUP_IMPORT_BUDGET_MS", 3000.0) / 1000)
+
+
 def main():
     import uvicorn
     port = int(os.getenv("PORT", "8080"))
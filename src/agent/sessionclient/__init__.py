@@ -1,10 +1,23 @@
 """Session Service HTTP 클라이언트 (ADK REST API 호환)."""
-from .client import RemoteSessionService
-from .models import SessionLike, event_to_rest, rest_to_session
+from .cache import SessionCache
+from .client import RemoteSessionService, SessionConflict
+from .sqlite import SqliteSessionService
+from .artifacts import DiagramArtifactService, DiagramStoreUnavailable, MemoryDiagramStore
+from .diagrams import DiagramCache
+from .models import LazyEventList, SessionLike, SessionSummary, event_to_rest, rest_to_session
 
 __all__ = [
+    "DiagramArtifactService",
+    "DiagramCache",
+    "DiagramStoreUnavailable",
+    "LazyEventList",
+    "MemoryDiagramStore",
     "RemoteSessionService",
+    "SessionCache",
+    "SessionConflict",
     "SessionLike",
+    "SessionSummary",
+    "SqliteSessionService",
     "rest_to_session",
     "event_to_rest",
 ]
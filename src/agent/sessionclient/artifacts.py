@@ -0,0 +1,235 @@
+"""ADK artifact service for text artifacts (diagram versions) on top of the content-addressed diagram store.
+
+``save_artifact`` stores the text once by hash (diagrams.py) and records a new session-scoped version that
+points at it; if the session already has a version, only a line diff against it is sent/stored. The store
+is the session backend itself (``RemoteSessionService`` / ``SqliteSessionService``), or ``MemoryDiagramStore``
+with the in-memory session service. Store methods:
+
+    put_diagram_version(app, user, session, filename, digest, text, base, diff) -> (version, create_time)
+    get_diagram_versions(app, user, session, filename) -> [(version, digest, create_time), ...]
+    get_diagram_files(app, user, session) -> [filename, ...]
+    delete_diagram_file(app, user, session, filename)
+    get_diagrams([digest, ...]) -> {digest: text}
+
+A store with ``supports_diff = False`` always gets the full text (no diff is computed).
+A store that turns out to have no diagram API (e.g. an older Session Service) raises ``DiagramStoreUnavailable``
+from ``put_diagram_version``; callers keep the mermaid inline in the event instead.
+Saving the same text as the latest version returns the latest version number instead of adding a version.
+Only text parts are supported.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from .diagrams import DiagramCache, diagram_hash, make_diff
+from .encoding import dumps
+
+try:
+    from google.adk.artifacts import BaseArtifactService
+    from google.adk.artifacts.base_artifact_service import ArtifactVersion, ensure_part
+    from google.genai import types
+except ImportError:
+    BaseArtifactService = object
+    ArtifactVersion = ensure_part = types = None
+
+MIME_TYPE = "text/vnd.mermaid"
+
+ArtifactKey = tuple[str, str, str, str]
+
+
+class DiagramStoreUnavailable(Exception):
+    """세션 저장소에 다이어그램 저장 API가 없음 (mermaid는 이벤트에 그대로 남음)."""
+
+
+class MemoryDiagramStore:
+    """프로세스 메모리 저장소 (SESSION_USE_MEMORY). 직렬화가 없으므로 diff 없이 전체 텍스트를 해시로 한 번만 보관."""
+
+    supports_diff = False
+
+    def __init__(self):
+        self._blobs: dict[str, str] = {}
+        self._versions: dict[ArtifactKey, list[tuple[int, str, float]]] = {}
+
+    async def put_diagram_version(self, app_name: str, user_id: str, session_id: str, filename: str, digest: str,
+                                  text: str, base: str | None = None, diff: Any = None) -> tuple[int, float]:
+        self._blobs.setdefault(digest, text)
+        versions = self._versions.setdefault((app_name, user_id, session_id, filename), [])
+        now = time.time()
+        versions.append((len(versions), digest, now))
+        return len(versions) - 1, now
+
+    async def get_diagram_versions(self, app_name: str, user_id: str, session_id: str,
+                                   filename: str) -> list[tuple[int, str, float]]:
+        return list(self._versions.get((app_name, user_id, session_id, filename), ()))
+
+    async def get_diagram_files(self, app_name: str, user_id: str, session_id: str) -> list[str]:
+        return sorted(f for (a, u, s, f), v in self._versions.items() if (a, u, s) == (app_name, user_id, session_id) and v)
+
+    async def delete_diagram_file(self, app_name: str, user_id: str, session_id: str, filename: str) -> None:
+        self._versions.pop((app_name, user_id, session_id, filename), None)
+
+    async def get_diagrams(self, digests: list[str]) -> dict[str, str]:
+        return {d: self._blobs[d] for d in digests if d in self._blobs}
+
+
+class DiagramArtifactService(BaseArtifactService):
+    """BaseArtifactService over a diagram store. cache는 세션 백엔드와 공유 (저장한 텍스트 = 참조로 바꿀 수 있는 텍스트)."""
+
+    def __init__(self, store: Any, cache: DiagramCache, *, max_sessions: int = 1024):
+        self._store = store
+        self._cache = cache
+        self._max_sessions = max(1, max_sessions)
+        # (app, user, session, filename) -> (최신 version, hash): diff 기준과 같은 내용 재저장 판단용
+        self._latest: OrderedDict[ArtifactKey, tuple[int, str]] = OrderedDict()
+        self.saves = 0
+        self.unchanged = 0
+        self.diffs = 0
+        self.text_bytes = 0
+        self.sent_bytes = 0
+
+    def _remember(self, key: ArtifactKey, version: int, digest: str) -> None:
+        self._latest[key] = (version, digest)
+        self._latest.move_to_end(key)
+        while len(self._latest) > self._max_sessions:
+            self._latest.popitem(last=False)
+
+    async def _latest_version(self, key: ArtifactKey) -> tuple[int, str] | None:
+        latest = self._latest.get(key)
+        if latest is None:
+            versions = await self._store.get_diagram_versions(*key)
+            if not versions:
+                return None
+            version, digest, _ = versions[-1]
+            latest = (version, digest)
+            self._remember(key, version, digest)
+        return latest
+
+    async def texts(self, digests: list[str]) -> dict[str, str]:
+        """hash -> 텍스트. 캐시에 없는 것만 저장소에서 한 번에 조회."""
+        out: dict[str, str] = {}
+        missing = []
+        for digest in digests:
+            text = self._cache.get(digest)
+            if text is None:
+                missing.append(digest)
+            else:
+                out[digest] = text
+        if missing:
+            for digest, text in (await self._store.get_diagrams(missing)).items():
+                if diagram_hash(text) == digest:
+                    self._cache.put(digest, text)
+                    out[digest] = text
+        return out
+
+    async def save_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        filename: str,
+        artifact: Any,
+        session_id: Optional[str] = None,
+        custom_metadata: Optional[dict[str, Any]] = None,
+    ) -> int:
+        part = ensure_part(artifact) if ensure_part is not None else artifact
+        text = getattr(part, "text", None)
+        if not isinstance(text, str):
+            raise ValueError(f"artifact {filename}: only text artifacts are supported")
+        text = text.strip()
+        digest = diagram_hash(text)
+        key = (app_name, user_id, session_id or "", filename)
+        latest = await self._latest_version(key)
+        if latest is not None and latest[1] == digest:
+            self.unchanged += 1
+            return latest[0]
+        base = diff = None
+        if latest is not None and getattr(self._store, "supports_diff", True):
+            base_text = (await self.texts([latest[1]])).get(latest[1])
+            if base_text is not None:
+                ops = make_diff(base_text, text)
+                if len(dumps(ops)) < len(text.encode("utf-8")):
+                    base, diff = latest[1], ops
+        version, _ = await self._store.put_diagram_version(*key, digest, text, base, diff)
+        self._cache.put(digest, text)
+        self._remember(key, version, digest)
+        self.saves += 1
+        self.text_bytes += len(text.encode("utf-8"))
+        if diff is not None:
+            self.diffs += 1
+            self.sent_bytes += len(dumps(diff))
+        else:
+            self.sent_bytes += len(text.encode("utf-8"))
+        return version
+
+    async def load_artifact(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        filename: str,
+        session_id: Optional[str] = None,
+        version: Optional[int] = None,
+    ) -> Any:
+        meta = await self._version(app_name, user_id, session_id, filename, version)
+        if meta is None:
+            return None
+        text = (await self.texts([meta[1]])).get(meta[1])
+        if text is None:
+            return None
+        return types.Part(text=text) if types is not None else {"text": text}
+
+    async def _version(self, app_name: str, user_id: str, session_id: Optional[str], filename: str,
+                       version: Optional[int]) -> tuple[int, str, float] | None:
+        versions = await self._store.get_diagram_versions(app_name, user_id, session_id or "", filename)
+        if not versions:
+            return None
+        if version is None:
+            return versions[-1]
+        return next((v for v in versions if v[0] == version), None)
+
+    async def list_artifact_keys(self, *, app_name: str, user_id: str, session_id: Optional[str] = None) -> list[str]:
+        return await self._store.get_diagram_files(app_name, user_id, session_id or "")
+
+    async def delete_artifact(self, *, app_name: str, user_id: str, filename: str,
+                              session_id: Optional[str] = None) -> None:
+        key = (app_name, user_id, session_id or "", filename)
+        self._latest.pop(key, None)
+        await self._store.delete_diagram_file(*key)
+
+    async def list_versions(self, *, app_name: str, user_id: str, filename: str,
+                            session_id: Optional[str] = None) -> list[int]:
+        versions = await self._store.get_diagram_versions(app_name, user_id, session_id or "", filename)
+        return [v for v, _, _ in versions]
+
+    def _artifact_version(self, key: ArtifactKey, meta: tuple[int, str, float]) -> Any:
+        app_name, user_id, session_id, filename = key
+        version, digest, created = meta
+        return ArtifactVersion(
+            version=version,
+            # Session Service와 같은 형식
+            canonical_uri=f"artifact://apps/{app_name}/users/{user_id}/sessions/{session_id}/artifacts/{filename}/versions/{version}",
+            custom_metadata={"hash": digest, "filename": filename},
+            create_time=created,
+            mime_type=MIME_TYPE,
+        )
+
+    async def list_artifact_versions(self, *, app_name: str, user_id: str, filename: str,
+                                     session_id: Optional[str] = None) -> list[Any]:
+        key = (app_name, user_id, session_id or "", filename)
+        versions = await self._store.get_diagram_versions(*key)
+        return [self._artifact_version(key, v) for v in versions]
+
+    async def get_artifact_version(self, *, app_name: str, user_id: str, filename: str,
+                                   session_id: Optional[str] = None, version: Optional[int] = None) -> Any:
+        meta = await self._version(app_name, user_id, session_id, filename, version)
+        return self._artifact_version((app_name, user_id, session_id or "", filename), meta) if meta is not None else None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "saves": self.saves,
+            "unchanged": self.unchanged,
+            "diffs": self.diffs,
+            "text_bytes": self.text_bytes,
+            "sent_bytes": self.sent_bytes,
+            **self._cache.stats(),
+        }
@@ -0,0 +1,86 @@
+"""In-process session cache (LRU + TTL) for RemoteSessionService.
+
+Write-through: append_event updates the cached session after the Session Service accepted the event.
+Each entry also keeps a cursor: the lastUpdateTime the Session Service last returned for the session (from a
+get or an append), never the timestamps of events written locally. On a hit, get_session only fetches events
+since the cursor (``?since=``), and appends send it for the staleness check.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+SessionKey = tuple[str, str, str]
+
+
+class SessionCache:
+    """(app_name, user_id, session_id) -> (세션 객체, 서버 커서). 가장 오래 사용되지 않은 항목부터 제거, ttl 초 후 만료."""
+
+    def __init__(self, max_entries: int = 256, ttl: float = 300.0):
+        self._max_entries = max(1, max_entries)
+        self._ttl = ttl
+        # key -> (session, expires_at, cursor)
+        self._entries: OrderedDict[SessionKey, tuple[Any, float, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: SessionKey) -> Any | None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            session, expires_at, _ = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return session
+
+    def put(self, key: SessionKey, session: Any, cursor: int | None = None) -> None:
+        """cursor: 서버가 응답한 lastUpdateTime. None이면 기존 항목의 값 유지 (write-through)."""
+        with self._lock:
+            if cursor is None:
+                entry = self._entries.get(key)
+                cursor = entry[2] if entry is not None else 0
+            self._entries[key] = (session, time.monotonic() + self._ttl, cursor)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def peek(self, key: SessionKey) -> Any | None:
+        """히트/미스 집계와 LRU 순서에 영향 없이 조회 (write-through 갱신용)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= time.monotonic():
+                return None
+            return entry[0]
+
+    def cursor(self, key: SessionKey) -> int:
+        """서버가 마지막으로 응답한 lastUpdateTime (?since=, 409 확인 헤더용). 항목이 없으면 0."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[2] if entry is not None else 0
+
+    def invalidate(self, key: SessionKey) -> None:
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
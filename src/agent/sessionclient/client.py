@@ -6,14 +6,57 @@ Comparison with InMemorySessionService (ADK built-in):
 - RemoteSessionService: create_session() POSTs to Session Service (e.g. /api/apps/.../sessions),
   which writes to PostgreSQL and returns REST JSON; we convert to ADK Session and return.
   Persistent; used when SESSION_SERVICE_URL is set.
+
+Connection handling: one httpx.AsyncClient per RemoteSessionService (connection pool + keep-alive,
+optional HTTP/2). Call aclose() on shutdown (run_server does this from the FastAPI lifespan).
+
+Caching: with a SessionCache, get_session on a hit only fetches events since the cursor, the lastUpdateTime
+the Session Service last returned (GET ...?since=), and append_event updates the cached entry (write-through).
+Appends send the cursor in X-Session-Last-Update-Time; on 409 (another writer updated the session) the client
+fetches and merges that delta, then retries once with the new cursor, and raises SessionConflict if it is
+still stale.
+
+Batching: inside ``async with svc.coalesce(app, user, session_id)`` append_event only buffers; the
+buffered events are sent with one POST .../events/batch (one DB transaction) when the block exits,
+or earlier once max_events / max_delay is reached.
+
+Snapshots (snapshot.py): with snapshot_tail, a full get_session asks for ``?view=snapshot&tail=N`` (state +
+the newest N events) and prepends an in-memory context event built from ``state["snapshot"]``. With
+snapshot_every, the coalesce() exit appends a snapshot event to the batch every N turns, and with
+archive_after the events older than that (already folded into the snapshot) are moved to cold storage
+(POST .../sessions/{id}/compact) in the background.
+
+Diagram store (diagrams.py, artifacts.py): with a DiagramCache, the client also stores diagram versions on
+the Session Service (POST .../artifacts/{filename}/versions with the full text or a diff against the previous
+version), writes events with ``mermaidRef`` hashes instead of mermaid text already stored, and resolves the
+hashes of a fetched session with one POST /api/diagrams/batch (cache misses only).
 """
+import asyncio
 import logging
-from typing import Any
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
 from urllib.parse import urljoin
 
 import httpx
 
-from .models import event_to_rest, rest_to_session
+from . import metrics, snapshot as snapshots
+from .artifacts import DiagramStoreUnavailable
+from .cache import SessionCache
+from .diagrams import DiagramCache, dehydrate_event, hydrate_sessions
+from .encoding import JSON_HEADERS, dumps, loads
+from .models import (
+    SessionSummary,
+    apply_event,
+    copy_events,
+    copy_session,
+    event_ids,
+    event_to_rest,
+    merge_session_delta,
+    rest_to_session,
+    rest_to_session_summary,
+    to_adk_event,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -22,20 +65,126 @@ try:
 except ImportError:
     BaseSessionService = object
 
+# append 시 캐시 커서(서버가 마지막으로 응답한 lastUpdateTime) 전달. Session Service가 더 새로운 값을 갖고 있으면
+# 409 (version conflict).
+LAST_UPDATE_HEADER = "X-Session-Last-Update-Time"
+
+
+class SessionConflict(Exception):
+    """변경분을 병합하고 다시 보냈는데도 다른 writer가 먼저 세션을 갱신함 (이벤트는 저장되지 않음)."""
+
+SessionKey = tuple[str, str, str]
+
+
+class _EventBatch:
+    """coalesce() 구간 동안 한 세션에 대해 버퍼링된 이벤트."""
+
+    __slots__ = ("key", "events", "turn", "session", "started", "lock", "timer")
+
+    def __init__(self, key: SessionKey):
+        self.key = key
+        self.events: list[Any] = []
+        self.turn: list[Any] = []  # 구간 전체의 이벤트 (중간 flush 후에도 유지, 스냅샷용)
+        self.session: Any = None  # append_event에 전달된 (Runner의) 세션
+        self.started = 0.0
+        self.lock = asyncio.Lock()
+        self.timer: asyncio.TimerHandle | None = None
+
+
 class RemoteSessionService(BaseSessionService):
     """SessionService that forwards to Session Service HTTP API.
     Subclasses BaseSessionService so InvocationContext validation accepts it.
     Paths: /api/apps/{app_name}/users/{user_id}/sessions, .../events
     """
 
-    def __init__(self, base_url: str, timeout: float = 30.0):
+    def __init__(
+        self,
+        base_url: str,
+        timeout: float = 30.0,
+        *,
+        connect_timeout: float | None = None,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = False,
+        cache: SessionCache | None = None,
+        batch_max_events: int = 32,
+        batch_max_delay: float = 2.0,
+        lazy_events: bool = True,
+        snapshot_tail: int = 0,
+        snapshot_every: int = 0,
+        snapshot_lines: int = 20,
+        archive_after: float = 0.0,
+        diagrams: DiagramCache | None = None,
+    ):
         self._base = base_url.rstrip("/")
-        self._timeout = timeout
+        self._timeout = httpx.Timeout(timeout, connect=connect_timeout if connect_timeout is not None else timeout)
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._http2 = http2
         self._api = f"{self._base}/api"
+        self._client: httpx.AsyncClient | None = None
+        self._cache = cache
+        self._batch_max_events = max(1, batch_max_events)
+        self._batch_max_delay = batch_max_delay
+        self._batches: dict[SessionKey, _EventBatch] = {}
+        self._batch_endpoint = True
+        self._flush_tasks: set[asyncio.Task] = set()
+        self._lazy_events = lazy_events
+        self._snapshot_tail = max(0, snapshot_tail)
+        self._snapshot_every = max(0, snapshot_every)
+        self._snapshot_lines = snapshot_lines
+        self._archive_after = archive_after
+        self._compact_endpoint = True
+        self._diagrams = diagrams
+        self._diagram_endpoint = True
+
+    @property
+    def cache(self) -> SessionCache | None:
+        return self._cache
+
+    def invalidate(self, app_name: str, user_id: str, session_id: str) -> None:
+        """캐시 항목 제거 (다른 writer가 세션을 바꾼 것을 알았을 때)."""
+        if self._cache is not None:
+            self._cache.invalidate((app_name, user_id, session_id))
 
     def _path(self, *parts: str) -> str:
         return urljoin(self._api + "/", "/".join(parts))
 
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """공유 AsyncClient (첫 사용 시 생성, aclose() 이후 재생성)."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self._timeout,
+                limits=self._limits,
+                http2=self._http2,
+            )
+        return self._client
+
+    async def _request(self, op: str, method: str, url: str, body: Any = None, **kwargs: Any) -> httpx.Response:
+        """client.request + 지연/페이로드 크기/오류 메트릭 (op 라벨). body는 한 번만 JSON 바이트로 인코딩해 전송."""
+        if body is not None:
+            kwargs["content"] = body if isinstance(body, bytes) else dumps(body)
+            kwargs["headers"] = {**JSON_HEADERS, **(kwargs.get("headers") or {})}
+        started = time.perf_counter()
+        try:
+            r = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            metrics.observe_error(op, time.perf_counter() - started)
+            raise
+        metrics.observe_response(op, time.perf_counter() - started, r)
+        return r
+
+    async def aclose(self) -> None:
+        """커넥션 풀 종료 (앱 종료 시 호출)."""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+
     async def create_session(
         self,
         app_name: str,
@@ -47,22 +196,81 @@ class RemoteSessionService(BaseSessionService):
         url = self._path("apps", app_name, "users", user_id, "sessions")
         if session_id:
             url = self._path("apps", app_name, "users", user_id, "sessions", session_id)
-        async with httpx.AsyncClient(timeout=self._timeout) as client:
-            r = await client.post(url, json={"state": state})
-            r.raise_for_status()
-            return rest_to_session(r.json())
+        r = await self._request("create_session", "POST", url, {"state": state})
+        r.raise_for_status()
+        session = rest_to_session(loads(r.content), lazy=self._lazy_events)
+        if self._cache is not None:
+            self._cache.put((app_name, user_id, session.id), session, _cursor(session))
+            return copy_session(session)
+        return session
 
     async def get_session(
         self,
         app_name: str,
         user_id: str,
         session_id: str,
+        config: Any = None,
     ) -> Any:
+        """세션 조회. config(GetSessionConfig)의 after_timestamp / num_recent_events 지원.
+        캐시 히트 시 서버 커서 이후 이벤트만 받아 병합. snapshot_tail이면 전체 조회 대신
+        snapshot + 최근 이벤트만 받고 앞에 요약 컨텍스트 이벤트를 붙임."""
         url = self._path("apps", app_name, "users", user_id, "sessions", session_id)
-        async with httpx.AsyncClient(timeout=self._timeout) as client:
-            r = await client.get(url)
+        key = (app_name, user_id, session_id)
+        after = getattr(config, "after_timestamp", None)
+        recent = getattr(config, "num_recent_events", None)
+        use_cache = self._cache is not None and after is None
+        cached = self._cache.get(key) if use_cache else None
+        if cached is not None:
+            session = await self._fetch_delta(key, cached)
+        else:
+            if after:
+                params: dict[str, Any] | None = {"since": int(after)}
+            elif self._snapshot_tail:
+                params = {"view": "snapshot", "tail": max(self._snapshot_tail, recent or 0)}
+            else:
+                params = None
+            r = await self._request("get_session", "GET", url, params=params)
             r.raise_for_status()
-            return rest_to_session(r.json())
+            data = loads(r.content)
+            await self._hydrate([data])
+            session = rest_to_session(data, lazy=self._lazy_events)
+            if after:
+                session.events = [e for e in session.events if (getattr(e, "timestamp", 0) or 0) >= after]
+            elif self._snapshot_tail:
+                context = snapshots.context_event(snapshots.get_snapshot(session.state), session.events)
+                if context is not None:
+                    session.events.insert(0, context)
+            if use_cache:
+                self._cache.put(key, session, _cursor(session))
+        if use_cache:
+            session = copy_session(session)
+        batch = self._batches.get(key)
+        if batch is not None and batch.events:
+            # 아직 전송 전인 이벤트도 같은 턴 안의 조회에는 보이도록 병합
+            if not use_cache:
+                session.events = copy_events(session.events)
+            known = event_ids(session.events)
+            for ev in batch.events:
+                adk_ev = to_adk_event(ev)
+                if adk_ev is not None and getattr(adk_ev, "id", None) not in known:
+                    session.events.append(adk_ev)
+        if recent:
+            session.events = session.events[-recent:]
+        metrics.observe_events("get_session", len(session.events))
+        return session
+
+    async def _fetch_delta(self, key: SessionKey, cached: Any) -> Any:
+        """캐시된 세션 + 서버 커서 이후 이벤트 -> 병합한 세션 (캐시와 커서도 갱신)."""
+        url = self._path("apps", *_key_path(key))
+        r = await self._request("get_session", "GET", url, params={"since": self._cache.cursor(key)})
+        if r.status_code == 404:
+            self._cache.invalidate(key)
+        r.raise_for_status()
+        data = loads(r.content)
+        await self._hydrate([data])
+        session = merge_session_delta(cached, data)
+        self._cache.put(key, session, _cursor(session))
+        return session
 
     async def list_sessions(
         self,
@@ -70,13 +278,31 @@ class RemoteSessionService(BaseSessionService):
         user_id: str,
     ) -> list:
         url = self._path("apps", app_name, "users", user_id, "sessions")
-        async with httpx.AsyncClient(timeout=self._timeout) as client:
-            r = await client.get(url)
-            r.raise_for_status()
-            data = r.json()
-            if isinstance(data, list):
-                return [rest_to_session(s) for s in data]
-            return []
+        r = await self._request("list_sessions", "GET", url)
+        r.raise_for_status()
+        data = loads(r.content)
+        if isinstance(data, list):
+            await self._hydrate(data)
+            return [rest_to_session(s, lazy=self._lazy_events) for s in data]
+        return []
+
+    async def list_session_summaries(
+        self,
+        app_name: str,
+        user_id: str,
+        limit: int = 50,
+        after: str | None = None,
+    ) -> tuple[list[SessionSummary], str | None]:
+        """세션 목록 요약 한 페이지 (GET .../sessions?view=summary). events를 받지 않음.
+        반환: (최근 갱신순 요약 목록, 다음 페이지 커서 또는 None)."""
+        url = self._path("apps", app_name, "users", user_id, "sessions")
+        params: dict[str, Any] = {"view": "summary", "limit": limit}
+        if after:
+            params["after"] = after
+        r = await self._request("list_session_summaries", "GET", url, params=params)
+        r.raise_for_status()
+        data = loads(r.content) or {}
+        return [rest_to_session_summary(s) for s in data.get("sessions") or []], data.get("nextCursor") or None
 
     async def delete_session(
         self,
@@ -85,20 +311,253 @@ class RemoteSessionService(BaseSessionService):
         session_id: str,
     ) -> None:
         url = self._path("apps", app_name, "users", user_id, "sessions", session_id)
-        async with httpx.AsyncClient(timeout=self._timeout) as client:
-            r = await client.delete(url)
-            r.raise_for_status()
+        self.invalidate(app_name, user_id, session_id)
+        r = await self._request("delete_session", "DELETE", url)
+        r.raise_for_status()
 
-    async def append_event(self, session: Any, event: Any) -> None:
-        """세션에 이벤트 추가 (POST .../sessions/{id}/events)."""
+    @staticmethod
+    def _session_key(session: Any) -> SessionKey:
         app_name = getattr(session, "app_name", None)
         user_id = getattr(session, "user_id", None)
         session_id = getattr(session, "id", None)
         if not all([app_name, user_id, session_id]):
             raise ValueError("session must have app_name, user_id, id")
-        url = self._path("apps", app_name, "users", user_id, "sessions", session_id, "events")
-        body = event_to_rest(event)
-        async with httpx.AsyncClient(timeout=self._timeout) as client:
-            r = await client.post(url, json=body)
+        return app_name, user_id, session_id
+
+    async def append_event(self, session: Any, event: Any) -> Any:
+        """세션에 이벤트 추가 (POST .../sessions/{id}/events). coalesce() 구간이면 버퍼에만 추가."""
+        key = self._session_key(session)
+        batch = self._batches.get(key)
+        if batch is not None:
+            batch.session = session
+            await self._buffer(batch, event)
+        else:
+            await self._post_events(key, [event])
+        return event
+
+    async def append_events(self, session: Any, events: list) -> None:
+        """여러 이벤트를 한 번에 추가 (POST .../sessions/{id}/events/batch, 서버에서 한 트랜잭션)."""
+        events = [e for e in events if not getattr(e, "partial", False)]
+        if events:
+            await self._post_events(self._session_key(session), events)
+
+    @asynccontextmanager
+    async def coalesce(self, app_name: str, user_id: str, session_id: str) -> AsyncIterator[None]:
+        """구간 내 append_event를 모아 종료 시(또는 max_events / max_delay 도달 시) 한 번에 전송."""
+        key = (app_name, user_id, session_id)
+        if key in self._batches:
+            # 중첩 구간은 바깥 구간이 flush
+            yield
+            return
+        batch = _EventBatch(key)
+        self._batches[key] = batch
+        snapshot = None
+        try:
+            yield
+            if self._snapshot_every:
+                snapshot = self._add_snapshot(batch)
+        finally:
+            try:
+                await self._flush_batch(batch)
+            finally:
+                if self._batches.get(key) is batch:
+                    del self._batches[key]
+        if snapshot is not None and self._archive_after > 0 and self._compact_endpoint:
+            self._track(asyncio.ensure_future(self._compact(key, snapshot)))
+
+    async def flush(self) -> None:
+        """버퍼링 중인 모든 이벤트 전송 (ADK Runner.close 에서도 호출)."""
+        for batch in list(self._batches.values()):
+            await self._flush_batch(batch)
+
+    async def _buffer(self, batch: _EventBatch, event: Any) -> None:
+        if getattr(event, "partial", False):
+            return
+        if not batch.events:
+            batch.started = time.monotonic()
+        batch.events.append(event)
+        if self._snapshot_every:
+            batch.turn.append(event)
+        if len(batch.events) >= self._batch_max_events:
+            await self._flush_batch(batch)
+        elif batch.timer is None and self._batch_max_delay > 0:
+            batch.timer = asyncio.get_running_loop().call_later(self._batch_max_delay, self._flush_later, batch)
+
+    def _flush_later(self, batch: _EventBatch) -> None:
+        batch.timer = None
+        self._track(asyncio.ensure_future(self._flush_batch(batch)))
+
+    def _track(self, task: asyncio.Task) -> None:
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._on_flush_done)
+
+    def _on_flush_done(self, task: asyncio.Task) -> None:
+        self._flush_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("background session write failed: %s", task.exception())
+
+    def _add_snapshot(self, batch: _EventBatch) -> dict[str, Any] | None:
+        """이전 스냅샷 이후 snapshot_every 턴이 쌓였으면 새 스냅샷 이벤트를 배치에 추가 (같은 POST로 전송)."""
+        session = batch.session
+        if session is None or not batch.turn:
+            return None
+        state = dict(getattr(session, "state", None) or {})
+        previous = snapshots.get_snapshot(state)
+        events = snapshots.events_since(previous, session.events)
+        known = {getattr(e, "id", None) for e in events}
+        events += [e for e in batch.turn if getattr(e, "id", None) not in known]
+        if snapshots.count_turns(events) < self._snapshot_every:
+            return None
+        event = snapshots.snapshot_event(
+            snapshots.fold(previous, events, state, max_lines=self._snapshot_lines))
+        batch.events.append(event)
+        return event.actions.state_delta[snapshots.SNAPSHOT_KEY]
+
+    async def _compact(self, key: SessionKey, snapshot: dict[str, Any]) -> None:
+        """스냅샷에 요약된 오래된 이벤트를 보관 테이블로 이동 (최근 snapshot_tail개는 유지)."""
+        before = int(min(time.time() - self._archive_after, snapshot.get("time") or 0))
+        if before <= 0:
+            return
+        url = self._path("apps", *_key_path(key), "compact")
+        r = await self._request("compact_session", "POST", url, {"before": before, "keep": self._snapshot_tail})
+        if r.status_code in (404, 405):
+            logger.info("session service has no compact endpoint; event archiving disabled")
+            self._compact_endpoint = False
+            return
+        r.raise_for_status()
+        archived = (loads(r.content) or {}).get("archived", 0) if r.content else 0
+        if archived:
+            logger.info("archived %d events of session %s", archived, key[2])
+
+    async def _flush_batch(self, batch: _EventBatch) -> None:
+        async with batch.lock:
+            if batch.timer is not None:
+                batch.timer.cancel()
+                batch.timer = None
+            events, batch.events = batch.events, []
+            if events:
+                logger.debug("flushing %d events for session %s (%.3fs buffered)",
+                             len(events), batch.key[2], time.monotonic() - batch.started)
+                await self._post_events(batch.key, events)
+
+    async def _post_events(self, key: SessionKey, events: list) -> None:
+        app_name, user_id, session_id = key
+        bodies = [event_to_rest(e) for e in events]
+        metrics.observe_events("append_events", len(bodies))
+        cached = self._cache.peek(key) if self._cache is not None else None
+        headers = {LAST_UPDATE_HEADER: str(self._cache.cursor(key))} if cached is not None else None
+        # 이벤트마다 한 번만 인코딩 (409 재전송, 배치 -> 이벤트별 폴백에서도 재사용). 저장된 다이어그램은 해시 참조로.
+        # 캐시 write-through(apply_event)는 참조로 바꾸기 전의 bodies를 씀.
+        if self._diagrams is not None:
+            encoded = [dumps(dehydrate_event(b, self._diagrams)) for b in bodies]
+        else:
+            encoded = [dumps(b) for b in bodies]
+        r = await self._send_events(key, encoded, headers)
+        if r.status_code == 409 and cached is not None:
+            # 커서 이후 다른 writer가 세션을 갱신함 → 그 변경분을 받아 캐시에 병합하고 새 커서로 한 번 더 전송
+            logger.info("session %s changed remotely; merging its events before retrying", session_id)
+            await self._fetch_delta(key, cached)
+            r = await self._send_events(key, encoded, {LAST_UPDATE_HEADER: str(self._cache.cursor(key))})
+            if r.status_code == 409:
+                self._cache.invalidate(key)
+                raise SessionConflict(f"session {session_id} was updated concurrently; events not appended")
+        if r.status_code not in (200, 204):
+            r.raise_for_status()
+        if self._cache is not None:
+            current = self._cache.peek(key)
+            if current is not None:
+                for event, body in zip(events, bodies):
+                    apply_event(current, event, body)
+                # 200이면 서버가 기록한 lastUpdateTime이 새 커서 (204: 구버전 서버, 다음 조회가 방금 보낸 이벤트도 받음)
+                cursor = (loads(r.content) or {}).get("lastUpdateTime") if r.status_code == 200 and r.content else None
+                self._cache.put(key, current, int(cursor) if isinstance(cursor, (int, float)) else None)
+
+    async def _send_events(self, key: SessionKey, bodies: list[bytes], headers: dict[str, str] | None) -> httpx.Response:
+        """bodies: 이벤트별로 인코딩된 REST JSON 바이트. 배치 body는 이어 붙여 만듦 (재인코딩 없음)."""
+        url = self._path("apps", *_key_path(key), "events")
+        if len(bodies) > 1 and self._batch_endpoint:
+            batch = b'{"events":[' + b",".join(bodies) + b"]}"
+            r = await self._request("append_events", "POST", url + "/batch", batch, headers=headers)
+            if r.status_code not in (404, 405):
+                return r
+            # 배치 엔드포인트가 없는 (구버전) Session Service → 이벤트별 전송으로 폴백
+            logger.info("session service has no batch append endpoint; falling back to per-event POST")
+            self._batch_endpoint = False
+        r = None
+        for body in bodies:
+            r = await self._request("append_event", "POST", url, body, headers=headers)
             if r.status_code not in (200, 204):
-                r.raise_for_status()
+                return r
+            # 버전 확인은 첫 이벤트에만 (이후 이벤트는 방금 보낸 이벤트로 갱신된 세션에 붙음)
+            headers = None
+        return r
+
+    # ----- 다이어그램 저장소 (artifacts.DiagramArtifactService) -----
+
+    async def _hydrate(self, sessions: list[dict[str, Any]]) -> None:
+        if self._diagrams is not None:
+            await hydrate_sessions(sessions, self._diagrams, self.get_diagrams)
+
+    def _artifact_path(self, app_name: str, user_id: str, session_id: str, *parts: str) -> str:
+        return self._path("apps", *_key_path((app_name, user_id, session_id)), "artifacts", *parts)
+
+    async def put_diagram_version(self, app_name: str, user_id: str, session_id: str, filename: str, digest: str,
+                                  text: str, base: str | None = None, diff: Any = None) -> tuple[int, float]:
+        """diff가 있으면 diff만 전송. 서버가 base를 모르거나(409) 결과 해시가 다르면(422) 전체 텍스트로 재전송."""
+        if not self._diagram_endpoint:
+            raise DiagramStoreUnavailable("session service has no diagram store")
+        url = self._artifact_path(app_name, user_id, session_id, filename, "versions")
+        body: dict[str, Any] = {"hash": digest, "base": base, "diff": diff} if diff is not None else {"hash": digest, "text": text}
+        r = await self._request("put_diagram", "POST", url, body)
+        if r.status_code in (409, 422) and diff is not None:
+            logger.info("diagram diff rejected (%d), sending full text", r.status_code)
+            r = await self._request("put_diagram", "POST", url, {"hash": digest, "text": text})
+        if r.status_code in (404, 405):
+            logger.info("session service has no diagram store; diagrams stay inline in events")
+            self._diagram_endpoint = False
+            raise DiagramStoreUnavailable("session service has no diagram store")
+        r.raise_for_status()
+        data = loads(r.content) or {}
+        return int(data.get("version", 0)), float(data.get("createTime") or 0)
+
+    async def get_diagram_versions(self, app_name: str, user_id: str, session_id: str,
+                                   filename: str) -> list[tuple[int, str, float]]:
+        url = self._artifact_path(app_name, user_id, session_id, filename, "versions", "metadata")
+        r = await self._request("get_diagram_versions", "GET", url)
+        if r.status_code == 404:
+            return []
+        r.raise_for_status()
+        return [(int(v["version"]), (v.get("customMetadata") or {}).get("hash", ""), float(v.get("createTime") or 0))
+                for v in loads(r.content) or []]
+
+    async def get_diagram_files(self, app_name: str, user_id: str, session_id: str) -> list[str]:
+        r = await self._request("get_diagram_files", "GET", self._artifact_path(app_name, user_id, session_id))
+        if r.status_code == 404:
+            return []
+        r.raise_for_status()
+        return list(loads(r.content) or [])
+
+    async def delete_diagram_file(self, app_name: str, user_id: str, session_id: str, filename: str) -> None:
+        r = await self._request("delete_diagram_file", "DELETE", self._artifact_path(app_name, user_id, session_id, filename))
+        if r.status_code != 404:
+            r.raise_for_status()
+
+    async def get_diagrams(self, digests: list[str]) -> dict[str, str]:
+        """hash -> 텍스트 (POST /api/diagrams/batch). 저장소에 없는 해시는 결과에서 빠짐."""
+        if not digests or not self._diagram_endpoint:
+            return {}
+        r = await self._request("get_diagrams", "POST", self._path("diagrams", "batch"), {"hashes": digests})
+        if r.status_code in (404, 405):
+            return {}
+        r.raise_for_status()
+        return (loads(r.content) or {}).get("diagrams") or {}
+
+
+def _cursor(session: Any) -> int:
+    """서버 응답으로 만든 세션의 lastUpdateTime (초) → 캐시 커서."""
+    return int(getattr(session, "last_update_time", 0) or 0)
+
+
+def _key_path(key: SessionKey) -> tuple[str, ...]:
+    app_name, user_id, session_id = key
+    return app_name, "users", user_id, "sessions", session_id
@@ -0,0 +1,276 @@
+"""Content-addressed diagram store: mermaid text stored once by hash, session events carry only the hash.
+
+- ``diagram_hash``: sha256 of the stripped mermaid, first 16 hex chars (same key as the server render cache,
+  ``/render/{hash}.svg``). Stored text is the stripped mermaid.
+- Blobs: a blob is either the full text or a line diff against another blob (``base``). Successive versions
+  of a session's diagram are saved as diffs against the previous version; chains are cut at
+  ``MAX_DELTA_CHAIN`` (the next blob is stored in full) so a read resolves at most that many diffs.
+- Refs: before an event is written, every mermaid whose hash is known to be stored (``DiagramCache``) is
+  replaced by ``"mermaidRef": "<hash>"`` — in ``stateDelta.diagram``, ``stateDelta.snapshot.diagram`` and
+  the model's JSON answer in ``content.parts[].text``. ``hydrate_session`` puts the text back on read.
+
+Diff format: ``[[start, end, [line, ...]], ...]`` — replace base lines ``[start:end]`` (lines keep their
+``\\n``) with the given lines, ops in ascending order.
+"""
+import difflib
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Iterable
+
+REF_KEY = "mermaidRef"
+MAX_DELTA_CHAIN = 16
+
+
+def diagram_hash(text: str) -> str:
+    return hashlib.sha256(text.strip().encode("utf-8")).hexdigest()[:16]
+
+
+def _lines(text: str) -> list[str]:
+    """줄바꿈(\\n)을 유지하며 나눔. splitlines와 달리 \\r 등에서는 나누지 않음 (Go splitLines와 같은 결과)."""
+    lines = text.split("\n")
+    out = [line + "\n" for line in lines[:-1]]
+    if lines[-1]:
+        out.append(lines[-1])
+    return out
+
+
+def make_diff(base: str, text: str) -> list[list[Any]]:
+    a = _lines(base)
+    b = _lines(text)
+    matcher = difflib.SequenceMatcher(None, a, b, autojunk=False)
+    return [[i1, i2, b[j1:j2]] for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != "equal"]
+
+
+def apply_diff(base: str, ops: Iterable[Any]) -> str:
+    """make_diff의 역. 형식이 잘못되면 ValueError."""
+    lines = _lines(base)
+    out: list[str] = []
+    pos = 0
+    for op in ops:
+        start, end, new = op
+        if not (isinstance(start, int) and isinstance(end, int) and pos <= start <= end <= len(lines)):
+            raise ValueError(f"invalid diff op range {start}:{end}")
+        out.extend(lines[pos:start])
+        out.extend(new)
+        pos = end
+    out.extend(lines[pos:])
+    return "".join(out)
+
+
+def resolve(digest: str, load: Callable[[str], tuple[str, str] | None]) -> str | None:
+    """load(hash) -> (base, data): base가 빈 문자열이면 data는 전체 텍스트, 아니면 base에 대한 diff(JSON).
+    체인을 따라가 전체 텍스트를 만듦. 없는 blob이 있으면 None."""
+    diffs: list[str] = []
+    while True:
+        row = load(digest)
+        if row is None:
+            return None
+        base, data = row
+        if not base:
+            break
+        diffs.append(data)
+        if len(diffs) > MAX_DELTA_CHAIN * 4:
+            raise ValueError(f"diagram delta chain too long at {digest}")
+        digest = base
+    text = data
+    for diff in reversed(diffs):
+        text = apply_diff(text, json.loads(diff))
+    return text
+
+
+class DiagramCache:
+    """hash -> 저장된 텍스트 (LRU). 여기 있는 해시만 참조로 바꿔 씀: 저장소에 있는 것이 확실한 다이어그램
+    (이 프로세스가 저장했거나 저장소에서 읽어 온 것)."""
+
+    def __init__(self, max_entries: int = 4096):
+        self._max_entries = max(1, max_entries)
+        self._entries: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.refs_written = 0
+        self.bytes_saved = 0
+        self.refs_resolved = 0
+        self.refs_missing = 0
+
+    def get(self, digest: str) -> str | None:
+        with self._lock:
+            text = self._entries.get(digest)
+            if text is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return text
+
+    def put(self, digest: str, text: str) -> None:
+        with self._lock:
+            self._entries[digest] = text
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def ref(self, mermaid: str) -> str | None:
+        """mermaid가 저장된 텍스트와 같으면 해시 (앞뒤 공백은 무시)."""
+        text = mermaid.strip()
+        if not text:
+            return None
+        digest = diagram_hash(text)
+        with self._lock:
+            if self._entries.get(digest) != text:
+                return None
+            self._entries.move_to_end(digest)
+            self.refs_written += 1
+            self.bytes_saved += len(mermaid.encode("utf-8")) - len(digest)
+        return digest
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "refs_written": self.refs_written,
+                "bytes_saved": self.bytes_saved,
+                "refs_resolved": self.refs_resolved,
+                "refs_missing": self.refs_missing,
+            }
+
+
+# ----- 이벤트 / state의 mermaid <-> 참조 -----
+
+Swap = Callable[[Any], dict[str, Any] | None]
+
+
+def _replace_key(d: dict[str, Any], old: str, new: str, value: Any) -> dict[str, Any]:
+    """키 순서를 유지하며 old를 new=value로 교체한 복사본."""
+    return {(new if k == old else k): (value if k == old else v) for k, v in d.items()}
+
+
+def _map_state(state: Any, swap: Swap) -> Any:
+    """state(또는 stateDelta)의 diagram / snapshot.diagram. 바뀐 것이 없으면 같은 객체."""
+    if not isinstance(state, dict):
+        return state
+    changed: dict[str, Any] = {}
+    diagram = swap(state.get("diagram"))
+    if diagram is not None:
+        changed["diagram"] = diagram
+    snapshot = state.get("snapshot")
+    if isinstance(snapshot, dict):
+        diagram = swap(snapshot.get("diagram"))
+        if diagram is not None:
+            changed["snapshot"] = {**snapshot, "diagram": diagram}
+    return {**state, **changed} if changed else state
+
+
+def _map_text(text: Any, swap: Swap, marker: str) -> str | None:
+    """모델의 JSON 응답 텍스트 ({title, message, mermaid}). 바뀐 것이 없으면 None."""
+    if not isinstance(text, str) or marker not in text or not text.lstrip().startswith("{"):
+        return None
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+    data = swap(data)
+    return json.dumps(data, ensure_ascii=False) if data is not None else None
+
+
+def _map_event(body: dict[str, Any], swap: Swap, marker: str) -> dict[str, Any]:
+    """REST 이벤트 body. 바뀐 부분만 복사 (원본은 그대로 — 캐시 write-through가 원본을 씀)."""
+    out = body
+    content = body.get("content")
+    parts = content.get("parts") if isinstance(content, dict) else None
+    if isinstance(parts, list):
+        new_parts, changed = [], False
+        for part in parts:
+            text = _map_text(part.get("text"), swap, marker) if isinstance(part, dict) else None
+            if text is not None:
+                part, changed = {**part, "text": text}, True
+            new_parts.append(part)
+        if changed:
+            out = {**out, "content": {**content, "parts": new_parts}}
+    actions = body.get("actions")
+    delta = actions.get("stateDelta") if isinstance(actions, dict) else None
+    new_delta = _map_state(delta, swap)
+    if new_delta is not delta:
+        out = {**out, "actions": {**actions, "stateDelta": new_delta}}
+    return out
+
+
+def dehydrate_event(body: dict[str, Any], cache: DiagramCache) -> dict[str, Any]:
+    """저장소에 있는 mermaid를 참조로 바꾼 이벤트 body (바꿀 것이 없으면 body 그대로)."""
+
+    def swap(d: Any) -> dict[str, Any] | None:
+        if not isinstance(d, dict) or not isinstance(d.get("mermaid"), str):
+            return None
+        digest = cache.ref(d["mermaid"])
+        return _replace_key(d, "mermaid", REF_KEY, digest) if digest else None
+
+    return _map_event(body, swap, '"mermaid"')
+
+
+def session_refs(data: dict[str, Any]) -> set[str]:
+    """REST 세션 JSON(state + events)에 있는 참조 해시."""
+    refs: set[str] = set()
+
+    def collect(d: Any) -> None:
+        if isinstance(d, dict) and isinstance(d.get(REF_KEY), str):
+            refs.add(d[REF_KEY])
+
+    _map_state(data.get("state"), collect)
+    for ev in data.get("events") or []:
+        if isinstance(ev, dict):
+            _map_event(ev, collect, REF_KEY)
+    return refs
+
+
+def hydrate_session(data: dict[str, Any], texts: dict[str, str], cache: DiagramCache | None = None) -> None:
+    """REST 세션 JSON의 참조를 텍스트로 되돌림 (제자리). texts에 없는 참조는 그대로 둠."""
+
+    def swap(d: Any) -> dict[str, Any] | None:
+        if not isinstance(d, dict) or not isinstance(d.get(REF_KEY), str):
+            return None
+        text = texts.get(d[REF_KEY])
+        if cache is not None:
+            if text is None:
+                cache.refs_missing += 1
+            else:
+                cache.refs_resolved += 1
+        return _replace_key(d, REF_KEY, "mermaid", text) if text is not None else None
+
+    if isinstance(data.get("state"), dict):
+        data["state"] = _map_state(data["state"], swap)
+    events = data.get("events")
+    if isinstance(events, list):
+        data["events"] = [_map_event(ev, swap, REF_KEY) if isinstance(ev, dict) else ev for ev in events]
+
+
+async def hydrate_sessions(
+    sessions: list[dict[str, Any]],
+    cache: DiagramCache,
+    fetch: Callable[[list[str]], Awaitable[dict[str, str]]],
+) -> None:
+    """여러 REST 세션 JSON의 참조를 한 번에 해석: 캐시에 없는 해시만 fetch(저장소 일괄 조회)로 받고,
+    받은 텍스트는 해시를 확인한 뒤 캐시에 넣음."""
+    refs: set[str] = set()
+    for data in sessions:
+        refs |= session_refs(data)
+    if not refs:
+        return
+    texts: dict[str, str] = {}
+    missing: list[str] = []
+    for digest in sorted(refs):
+        text = cache.get(digest)
+        if text is None:
+            missing.append(digest)
+        else:
+            texts[digest] = text
+    if missing:
+        for digest, text in (await fetch(missing)).items():
+            if diagram_hash(text) == digest:
+                cache.put(digest, text)
+                texts[digest] = text
+    for data in sessions:
+        hydrate_session(data, texts, cache)
@@ -0,0 +1,28 @@
+"""Request/response body encoding for the Session Service client. Uses orjson when installed.
+
+Bodies are encoded once to bytes and sent with ``content=`` so httpx does not run the stdlib encoder again.
+"""
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def dumps(obj: Any) -> bytes:
+    """Compact UTF-8 JSON. Values that are not JSON types are sent as str()."""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def loads(data: bytes) -> Any:
+    if not data:
+        return None
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
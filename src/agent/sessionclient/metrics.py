@@ -0,0 +1,64 @@
+"""Session Service HTTP client metrics (Prometheus). No-op when prometheus_client is not installed.
+
+- session_client_request_seconds{op}: latency per call (get_session, append_events, ...)
+- session_client_payload_bytes{op, direction}: request (sent) / response (received) body size
+- session_client_events{op}: events per fetched session (get_session) or per append POST (append_events)
+- session_client_errors_total{op, status}: HTTP status >= 400 or transport error ("error")
+"""
+from typing import Any
+
+try:
+    from prometheus_client import Counter, Histogram
+except ImportError:
+    Counter = Histogram = None
+
+_SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+_BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+_EVENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000)
+
+
+class _Noop:
+    def labels(self, *args: Any, **kwargs: Any) -> "_Noop":
+        return self
+
+    def observe(self, value: float) -> None:
+        pass
+
+    def inc(self, amount: float = 1) -> None:
+        pass
+
+
+if Histogram is not None:
+    REQUEST_SECONDS = Histogram(
+        "session_client_request_seconds", "Session Service request latency", ["op"], buckets=_SECONDS_BUCKETS
+    )
+    PAYLOAD_BYTES = Histogram(
+        "session_client_payload_bytes", "Session Service request/response body size", ["op", "direction"],
+        buckets=_BYTES_BUCKETS,
+    )
+    EVENTS = Histogram(
+        "session_client_events", "Events per fetched session or per append request", ["op"], buckets=_EVENT_BUCKETS
+    )
+    ERRORS = Counter("session_client_errors_total", "Session Service request errors", ["op", "status"])
+else:
+    REQUEST_SECONDS = PAYLOAD_BYTES = EVENTS = ERRORS = _Noop()
+
+
+def observe_response(op: str, seconds: float, response: Any) -> None:
+    REQUEST_SECONDS.labels(op).observe(seconds)
+    request = response.request
+    sent = len(request.content) if request is not None and request.content else 0
+    if sent:
+        PAYLOAD_BYTES.labels(op, "sent").observe(sent)
+    PAYLOAD_BYTES.labels(op, "received").observe(len(response.content))
+    if response.status_code >= 400:
+        ERRORS.labels(op, str(response.status_code)).inc()
+
+
+def observe_error(op: str, seconds: float) -> None:
+    REQUEST_SECONDS.labels(op).observe(seconds)
+    ERRORS.labels(op, "error").inc()
+
+
+def observe_events(op: str, count: int) -> None:
+    EVENTS.labels(op).observe(count)
@@ -1,6 +1,10 @@
 """Session Service REST API 요청/응답 모델 (ADK 호환 JSON 형식)."""
+import logging
+from collections.abc import Iterable, Iterator, MutableSequence
 from typing import Any
 
+logger = logging.getLogger(__name__)
+
 # REST API는 camelCase. Session Service(Go)와 동일한 JSON 형식 사용.
 # InvocationContext는 session이 ADK Session 인스턴스 또는 검증 가능한 dict를 요구함.
 
@@ -33,16 +37,17 @@ def session_to_rest(session: Any) -> dict[str, Any]:
     }
 
 
-def _rest_event_to_adk_event(ev: dict[str, Any]) -> Any | None:
-    """Convert REST event dict to ADK Event. Returns None if conversion fails."""
-    if not ev or AdkEvent is None:
-        return None
-    time_val = ev.get("time", 0)
-    if isinstance(time_val, (int, float)) and time_val > 1e12:
-        time_val = time_val / 1000.0
+def _rest_time(value: Any) -> Any:
+    if isinstance(value, (int, float)) and value > 1e12:
+        return value / 1000.0
+    return value
+
+
+def _rest_event_fields(ev: dict[str, Any]) -> dict[str, Any]:
+    """REST 이벤트 dict(camelCase) -> ADK Event 필드 dict."""
     adk_ev: dict[str, Any] = {
         "id": ev.get("id", ""),
-        "timestamp": time_val,
+        "timestamp": _rest_time(ev.get("time", 0)),
         "invocation_id": ev.get("invocationId", ""),
         "branch": ev.get("branch", ""),
         "author": ev.get("author", ""),
@@ -58,21 +63,126 @@ def _rest_event_to_adk_event(ev: dict[str, Any]) -> Any | None:
         adk_ev["actions"] = ev["actions"]
     if ev.get("groundingMetadata") is not None:
         adk_ev["grounding_metadata"] = ev["groundingMetadata"]
+    return adk_ev
+
+
+def _rest_event_to_adk_event(ev: dict[str, Any]) -> Any | None:
+    """Convert REST event dict to ADK Event (validated once). Returns None if conversion fails."""
+    if not ev or AdkEvent is None:
+        return None
     try:
-        return AdkEvent(**adk_ev)
+        return AdkEvent.model_validate(_rest_event_fields(ev))
     except Exception:
         return None
 
 
-def rest_to_session(data: dict[str, Any]) -> Any:
-    """REST JSON to ADK Session instance so InvocationContext validation passes."""
-    events_raw = data.get("events") or []
-    state = data.get("state") or {}
-    if isinstance(state, list):
-        state = {}
-    last_update_time = data.get("lastUpdateTime", 0)
-    if isinstance(last_update_time, (int, float)) and last_update_time > 1e12:
-        last_update_time = last_update_time / 1000.0
+class _RawEvent:
+    """아직 변환하지 않은 REST 이벤트. 변환 결과는 같은 셀을 공유하는 복사본(copy_session)에도 보임."""
+
+    __slots__ = ("data", "event")
+
+    def __init__(self, data: dict[str, Any]):
+        self.data = data
+        self.event: Any = None
+
+    def materialize(self) -> Any:
+        if self.event is None:
+            event = _rest_event_to_adk_event(self.data)
+            if event is None:
+                # 검증 실패: 인덱스를 유지해야 하므로 버리지 않고 본문 없는 이벤트로 대체
+                logger.warning("session event %s failed validation; content dropped", self.data.get("id"))
+                event = AdkEvent.model_construct(
+                    id=self.data.get("id", ""),
+                    author=self.data.get("author", ""),
+                    invocation_id=self.data.get("invocationId", ""),
+                    timestamp=_rest_time(self.data.get("time", 0)),
+                )
+            self.event = event
+            self.data = None
+        return self.event
+
+    @property
+    def id(self) -> Any:
+        return self.event.id if self.event is not None else self.data.get("id")
+
+
+class LazyEventList(MutableSequence):
+    """세션 이벤트 목록. REST dict를 그대로 보관하다가 인덱스/반복으로 접근할 때 ADK Event로 변환.
+
+    긴 세션에서 Runner가 실제로 읽는 이벤트만 검증 비용을 냄. 슬라이스와 copy()는 변환 셀을 공유.
+    """
+
+    __slots__ = ("_items",)
+
+    def __init__(self, items: Iterable[Any] = ()):
+        self._items = list(items)
+
+    @classmethod
+    def from_rest(cls, events_raw: Iterable[Any]) -> "LazyEventList":
+        return cls(_RawEvent(e) if isinstance(e, dict) else e for e in events_raw if e)
+
+    def _load(self, index: int) -> Any:
+        item = self._items[index]
+        if type(item) is _RawEvent:
+            item = self._items[index] = item.materialize()
+        return item
+
+    def __getitem__(self, index: Any) -> Any:
+        if isinstance(index, slice):
+            return LazyEventList(self._items[index])
+        return self._load(index)
+
+    def __setitem__(self, index: Any, value: Any) -> None:
+        self._items[index] = list(value) if isinstance(index, slice) else value
+
+    def __delitem__(self, index: Any) -> None:
+        del self._items[index]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[Any]:
+        for i in range(len(self._items)):
+            yield self._load(i)
+
+    def __reversed__(self) -> Iterator[Any]:
+        for i in range(len(self._items) - 1, -1, -1):
+            yield self._load(i)
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, (LazyEventList, list)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"LazyEventList({len(self._items)} events, {self.materialized} materialized)"
+
+    def insert(self, index: int, value: Any) -> None:
+        self._items.insert(index, value)
+
+    def copy(self) -> "LazyEventList":
+        return LazyEventList(self._items)
+
+    def extend_rest(self, events_raw: Iterable[Any]) -> None:
+        self._items.extend(LazyEventList.from_rest(events_raw)._items)
+
+    def event_ids(self) -> set[Any]:
+        """변환하지 않고 이벤트 id 집합."""
+        return {getattr(item, "id", None) for item in self._items}
+
+    def index_of_id(self, event_id: Any) -> int:
+        """변환하지 않고 뒤에서부터 id로 찾기. 없으면 -1."""
+        for i in range(len(self._items) - 1, -1, -1):
+            if getattr(self._items[i], "id", None) == event_id:
+                return i
+        return -1
+
+    @property
+    def materialized(self) -> int:
+        return sum(1 for item in self._items if type(item) is not _RawEvent or item.event is not None)
+
+
+def _rest_events_to_adk(events_raw: list) -> list[Any]:
     events: list[Any] = []
     if AdkEvent is not None:
         for e in events_raw:
@@ -82,32 +192,95 @@ def rest_to_session(data: dict[str, Any]) -> Any:
                     events.append(converted)
             else:
                 events.append(e)
+    return events
+
+
+def rest_to_session(data: dict[str, Any], lazy: bool = True) -> Any:
+    """REST JSON -> ADK Session (InvocationContext 검증 통과용).
+
+    세션 필드는 Session Service가 만든 신뢰 가능한 값이라 model_construct로 재검증 없이 생성.
+    lazy=True면 events는 LazyEventList (접근 시 이벤트별 한 번 검증), False면 모든 이벤트를 즉시 검증
+    (실패한 이벤트는 제외).
+    """
+    state = data.get("state") or {}
+    if isinstance(state, list):
+        state = {}
+    events_raw = data.get("events") or []
+    use_lazy = lazy and AdkEvent is not None
     payload = {
         "id": data.get("id", ""),
         "app_name": data.get("appName", ""),
         "user_id": data.get("userId", ""),
-        "last_update_time": last_update_time,
+        "last_update_time": _rest_time(data.get("lastUpdateTime", 0)) or 0.0,
         "state": state,
-        "events": events,
+        "events": LazyEventList.from_rest(events_raw) if use_lazy else _rest_events_to_adk(events_raw),
     }
     if AdkSession is not None:
-        try:
-            return AdkSession(**payload)
-        except Exception:
-            pass
-        try:
-            if hasattr(AdkSession, "model_validate"):
-                return AdkSession.model_validate(payload)
-        except Exception:
-            pass
-        try:
-            # Ensure we return an AdkSession so InvocationContext accepts it (events may be empty)
-            return AdkSession(**{**payload, "events": []})
-        except Exception:
-            pass
+        return AdkSession.model_construct(**payload)
     return SessionLike(**payload)
 
 
+def merge_session_delta(cached: Any, data: dict[str, Any]) -> Any:
+    """캐시된 세션 + "events since" 응답(이후 이벤트만 포함) -> 새 세션 객체.
+    since는 초 단위라 경계 시각의 이벤트가 다시 올 수 있으므로 id로 중복 제거. state/lastUpdateTime은 서버 값 사용.
+    """
+    merged = rest_to_session({**data, "events": []})
+    events = cached.events
+    known = event_ids(events)
+    if isinstance(events, LazyEventList):
+        merged.events = events.copy()
+        merged.events.extend_rest(e for e in data.get("events") or [] if not isinstance(e, dict) or e.get("id") not in known)
+        return merged
+    new_events = [e for e in _rest_events_to_adk(data.get("events") or []) if getattr(e, "id", None) not in known]
+    merged.events = list(events) + new_events
+    return merged
+
+
+def copy_events(events: Any) -> Any:
+    return events.copy() if isinstance(events, LazyEventList) else list(events)
+
+
+def event_ids(events: Any) -> set[Any]:
+    """이벤트 id 집합 (LazyEventList는 변환하지 않음)."""
+    return events.event_ids() if isinstance(events, LazyEventList) else {getattr(e, "id", None) for e in events}
+
+
+def copy_session(session: Any) -> Any:
+    """캐시 항목을 호출자에게 넘길 때 사용하는 얕은 복사 (events 목록/state dict만 새로 만듦, 이벤트 변환은 공유)."""
+    if hasattr(session, "model_copy"):
+        return session.model_copy(update={"events": copy_events(session.events), "state": dict(session.state)})
+    return SessionLike(
+        id=session.id,
+        app_name=session.app_name,
+        user_id=session.user_id,
+        last_update_time=session.last_update_time,
+        state=dict(session.state),
+        events=copy_events(session.events),
+    )
+
+
+def to_adk_event(event: Any, body: dict[str, Any] | None = None) -> Any | None:
+    """ADK Event가 아니면(SimpleNamespace 등) REST 형태를 거쳐 ADK Event로 변환. 실패 시 None."""
+    if AdkEvent is None or isinstance(event, AdkEvent):
+        return event
+    return _rest_event_to_adk_event(body if body is not None else event_to_rest(event))
+
+
+def apply_event(session: Any, event: Any, body: dict[str, Any]) -> None:
+    """write-through: Session Service가 받아들인 이벤트를 캐시된 세션에 반영 (events, state, last_update_time)."""
+    event = to_adk_event(event, body)
+    if event is not None and not getattr(event, "partial", False):
+        session.events.append(event)
+    state_delta = (body.get("actions") or {}).get("stateDelta") or {}
+    for k, v in state_delta.items():
+        if not k.startswith("temp:"):
+            session.state[k] = v
+    ts = getattr(event, "timestamp", None) if event is not None else None
+    if not isinstance(ts, (int, float)):
+        ts = body.get("time", 0)
+    session.last_update_time = max(session.last_update_time or 0, ts)
+
+
 def event_to_rest(event: Any) -> dict[str, Any]:
     """ADK Event-like 객체를 REST JSON 형태로 변환 (POST .../events body)."""
     # ADK Event: id, timestamp, invocation_id, author, content, actions (dict 또는 EventActions 객체)
@@ -147,11 +320,12 @@ def _get_attr_or_key(obj: Any, attr: str, key: str) -> Any:
 
 
 def _to_json_safe(obj: Any) -> Any:
-    """객체를 JSON 직렬화 가능한 형태로 변환."""
+    """객체를 JSON 직렬화 가능한 형태로 변환. pydantic 모델(genai Content 등)은 Go genai와 같은 camelCase,
+    None 필드 제외 (bytes는 base64 문자열)."""
     if obj is None:
         return None
     if hasattr(obj, "model_dump"):
-        return obj.model_dump()
+        return obj.model_dump(mode="json", by_alias=True, exclude_none=True)
     if hasattr(obj, "to_dict"):
         return obj.to_dict()
     if isinstance(obj, dict):
@@ -161,6 +335,69 @@ def _to_json_safe(obj: Any) -> Any:
     return obj
 
 
+def session_summary(session: Any) -> dict[str, Any]:
+    """세션 목록용 요약 (REST camelCase). events/state 전체 대신 id, title, lastUpdateTime만."""
+    state = getattr(session, "state", None) or {}
+    title = state.get("title") if isinstance(state, dict) else None
+    out = {
+        "id": getattr(session, "id", ""),
+        "appName": getattr(session, "app_name", ""),
+        "userId": getattr(session, "user_id", ""),
+        "lastUpdateTime": int(getattr(session, "last_update_time", 0) or 0),
+    }
+    if isinstance(title, str) and title:
+        out["title"] = title
+    return out
+
+
+def paginate_summaries(
+    summaries: list[dict[str, Any]],
+    limit: int,
+    after: str | None = None,
+) -> dict[str, Any]:
+    """lastUpdateTime 내림차순(동률은 id 오름차순) 정렬 후 커서("<lastUpdateTime>:<id>") 기반 페이지.
+    Session Service(Go)의 ?view=summary 응답과 같은 형태: {"sessions": [...], "nextCursor": "..."}."""
+    ordered = sorted(summaries, key=lambda s: (-s["lastUpdateTime"], s["id"]))
+    start = 0
+    if after:
+        ts, _, sid = after.partition(":")
+        try:
+            pos = (-int(ts), sid)
+        except ValueError:
+            raise ValueError("invalid cursor") from None
+        while start < len(ordered) and (-ordered[start]["lastUpdateTime"], ordered[start]["id"]) <= pos:
+            start += 1
+    page = ordered[start:start + limit]
+    out: dict[str, Any] = {"sessions": page}
+    if start + limit < len(ordered):
+        last = page[-1]
+        out["nextCursor"] = f"{last['lastUpdateTime']}:{last['id']}"
+    return out
+
+
+class SessionSummary:
+    """세션 목록 요약 (Session Service ?view=summary 응답 항목)."""
+
+    __slots__ = ("id", "app_name", "user_id", "last_update_time", "title")
+
+    def __init__(self, id: str, app_name: str, user_id: str, last_update_time: float, title: str = ""):
+        self.id = id
+        self.app_name = app_name
+        self.user_id = user_id
+        self.last_update_time = last_update_time
+        self.title = title
+
+
+def rest_to_session_summary(data: dict[str, Any]) -> SessionSummary:
+    return SessionSummary(
+        id=data.get("id", ""),
+        app_name=data.get("appName", ""),
+        user_id=data.get("userId", ""),
+        last_update_time=_rest_time(data.get("lastUpdateTime", 0)),
+        title=data.get("title") or "",
+    )
+
+
 class SessionLike:
     """REST Session과 호환되는 세션 객체 (ADK Runner가 사용)."""
 
@@ -0,0 +1,164 @@
+"""Session snapshots: the current diagram, title and a rolling summary kept in ``state["snapshot"]``.
+
+A snapshot is written as a content-less event (author ``session_snapshot``, stateDelta only) at the end of
+a turn, every ``snapshot_every`` turns, so it rides on the turn's batch append. It folds the events
+appended since the previous snapshot:
+
+    {"eventId": "<snapshot event id>", "time": <unix seconds>, "events": N, "turns": N,
+     "title": "...", "diagram": {title, message, mermaid},
+     "summary": [{"id": "<user event id>", "time": ..., "user": "...", "title": "..."}, ...]}
+
+With it the Session Service can answer ``?view=snapshot&tail=N`` (state + recent events only). The
+client then prepends one in-memory context event (never persisted) that carries the summary of the
+turns missing from the tail and, if no event in the tail carries it, the current diagram.
+"""
+import json
+import time
+import uuid
+from typing import Any, Iterable
+
+from .models import LazyEventList
+
+SNAPSHOT_KEY = "snapshot"
+SNAPSHOT_AUTHOR = "session_snapshot"
+# 스냅샷 요약으로 만든 in-memory 컨텍스트 이벤트 (저장하지 않음)
+CONTEXT_EVENT_ID = "snapshot-context"
+
+try:
+    from google.adk.events import Event as AdkEvent
+    from google.adk.events.event_actions import EventActions
+    from google.genai import types
+except ImportError:
+    AdkEvent = EventActions = types = None
+
+
+def _text(event: Any) -> str:
+    parts = getattr(getattr(event, "content", None), "parts", None) or []
+    return "".join(getattr(p, "text", None) or "" for p in parts if not getattr(p, "thought", False)).strip()
+
+
+def _state_delta(event: Any) -> dict[str, Any]:
+    actions = getattr(event, "actions", None)
+    delta = actions.get("stateDelta") if isinstance(actions, dict) else getattr(actions, "state_delta", None)
+    return delta or {}
+
+
+def _shorten(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+def get_snapshot(state: Any) -> dict[str, Any] | None:
+    snapshot = state.get(SNAPSHOT_KEY) if isinstance(state, dict) else None
+    return snapshot if isinstance(snapshot, dict) else None
+
+
+def events_since(snapshot: dict[str, Any] | None, events: Any) -> list:
+    """스냅샷 이벤트 뒤에 추가된 이벤트 (스냅샷이 없으면 전체). 스냅샷 이벤트가 목록에 없으면 시각으로 판단."""
+    if not snapshot:
+        return [e for e in events if getattr(e, "id", None) != CONTEXT_EVENT_ID]
+    event_id = snapshot.get("eventId")
+    index = events.index_of_id(event_id) if isinstance(events, LazyEventList) else next(
+        (i for i in range(len(events) - 1, -1, -1) if getattr(events[i], "id", None) == event_id), -1)
+    if index >= 0:
+        return list(events[index + 1:])
+    since = snapshot.get("time") or 0
+    return [e for e in events if (getattr(e, "timestamp", 0) or 0) > since and getattr(e, "id", None) != CONTEXT_EVENT_ID]
+
+
+def count_turns(events: Iterable[Any]) -> int:
+    """사용자 메시지 수 (원격 세션의 사전 추가로 생긴 연속 중복은 하나로)."""
+    turns, last = 0, None
+    for ev in events:
+        if getattr(ev, "author", "") != "user" or getattr(ev, "id", None) == CONTEXT_EVENT_ID:
+            continue
+        text = _text(ev)
+        if text and text != last:
+            turns += 1
+        last = text or last
+    return turns
+
+
+def fold(previous: dict[str, Any] | None, events: Iterable[Any], state: dict[str, Any], *,
+         max_lines: int = 20, summary_chars: int = 120) -> dict[str, Any]:
+    """이전 스냅샷 + 그 뒤의 이벤트 -> 새 스냅샷 (eventId/time은 snapshot_event가 채움)."""
+    previous = previous or {}
+    lines = [dict(line) for line in previous.get("summary") or []]
+    turns = int(previous.get("turns") or 0)
+    count = int(previous.get("events") or 0)
+    diagram = previous.get("diagram") or (state.get("diagram") if isinstance(state.get("diagram"), dict) else None)
+    title = previous.get("title") or ""
+    current: dict[str, Any] | None = None
+    for ev in events:
+        if getattr(ev, "author", "") == SNAPSHOT_AUTHOR or getattr(ev, "id", None) == CONTEXT_EVENT_ID:
+            continue
+        count += 1
+        text = _text(ev)
+        if getattr(ev, "author", "") == "user" and text:
+            user = _shorten(text, summary_chars)
+            if current is None or current["user"] != user or "title" in current:
+                current = {"id": getattr(ev, "id", ""), "time": int(getattr(ev, "timestamp", 0) or 0), "user": user}
+                lines.append(current)
+                turns += 1
+            else:
+                # 같은 메시지의 중복 (원격 세션의 사전 추가): tail에 남을 가능성이 큰 나중 이벤트 id로
+                current["id"] = getattr(ev, "id", "")
+        delta = _state_delta(ev)
+        if isinstance(delta.get("diagram"), dict):
+            diagram = delta["diagram"]
+            if current is not None and diagram.get("title"):
+                current["title"] = diagram["title"]
+        if isinstance(delta.get("title"), str) and delta["title"]:
+            title = delta["title"]
+    if isinstance(state.get("title"), str) and state["title"]:
+        title = state["title"]
+    snapshot: dict[str, Any] = {
+        "events": count,
+        "turns": turns,
+        "title": title or (diagram or {}).get("title", ""),
+        "summary": lines[-max_lines:] if max_lines > 0 else [],
+    }
+    if diagram:
+        snapshot["diagram"] = diagram
+    return snapshot
+
+
+def snapshot_event(snapshot: dict[str, Any]) -> Any:
+    """스냅샷을 state에 쓰는 내용 없는 이벤트 (id/time을 스냅샷에 기록)."""
+    event_id = str(uuid.uuid4())
+    now = time.time()
+    snapshot = {"eventId": event_id, "time": int(now), **snapshot}
+    return AdkEvent(
+        id=event_id,
+        author=SNAPSHOT_AUTHOR,
+        invocation_id="",
+        timestamp=now,
+        actions=EventActions(state_delta={SNAPSHOT_KEY: snapshot}),
+    )
+
+
+def context_event(snapshot: dict[str, Any] | None, events: Any) -> Any | None:
+    """snapshot + tail로 받은 세션의 앞에 붙일 컨텍스트 이벤트. 빠진 턴이 없으면 None."""
+    if not snapshot or AdkEvent is None:
+        return None
+    loaded = events.event_ids() if isinstance(events, LazyEventList) else {getattr(e, "id", None) for e in events}
+    lines = [line for line in snapshot.get("summary") or [] if line.get("id") not in loaded]
+    if not lines:
+        return None
+    text = ["Summary of earlier turns in this conversation:"]
+    older = int(snapshot.get("turns") or 0) - len(snapshot.get("summary") or [])
+    if older > 0:
+        text.append(f"- ({older} earlier turns omitted)")
+    text += [f"- user: {line.get('user', '')}" + (f" → {line['title']}" if line.get("title") else "") for line in lines]
+    diagram = snapshot.get("diagram")
+    if diagram and not any(isinstance(_state_delta(e).get("diagram"), dict) for e in events):
+        text.append("Current diagram (latest version, edit this one):")
+        text.append(json.dumps(diagram, ensure_ascii=False))
+    first = events[0] if len(events) else None
+    return AdkEvent(
+        id=CONTEXT_EVENT_ID,
+        author="user",
+        invocation_id="",
+        timestamp=(getattr(first, "timestamp", None) or snapshot.get("time") or 0),
+        content=types.Content(role="user", parts=[types.Part(text="\n".join(text))]),
+    )
@@ -0,0 +1,350 @@
+"""SQLite(WAL) 세션 백엔드 — Go Session Service 없이 한 노드에서 uvicorn --workers N으로 실행할 때.
+
+- 세션/이벤트를 로컬 파일 하나에 저장. 이벤트는 REST JSON(event_to_rest)으로 저장하고 (app, user, session, time)
+  인덱스로 조회, 읽을 때는 rest_to_session(LazyEventList)으로 변환.
+- 모든 DB 작업은 전용 스레드 풀에서 실행 (스레드마다 커넥션 하나), 이벤트 루프를 막지 않음.
+- 여러 워커 프로세스가 같은 파일을 사용: WAL이라 읽기는 쓰기와 동시에 진행, 쓰기는 BEGIN IMMEDIATE로
+  시작부터 쓰기 락을 잡고(락 승격 교착 방지) busy_timeout 동안 대기. state는 저장된 값에 stateDelta를
+  트랜잭션 안에서 병합하므로 다른 워커의 갱신을 덮어쓰지 않음.
+- diagrams(DiagramCache)를 주면 다이어그램 저장소(diagrams.py)도 같은 파일에: diagram_blobs(해시별 전체 텍스트
+  또는 이전 버전에 대한 diff), diagram_versions(세션별 artifact 버전 -> 해시). 이벤트는 mermaid 대신 해시 참조로
+  저장하고 읽을 때 되돌림.
+"""
+import asyncio
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, TypeVar
+
+from .diagrams import MAX_DELTA_CHAIN, DiagramCache, dehydrate_event, hydrate_sessions, resolve
+from .encoding import dumps, loads
+from .models import event_to_rest, rest_to_session
+
+try:
+    from google.adk.sessions import BaseSessionService
+    from google.adk.sessions.base_session_service import ListSessionsResponse
+except ImportError:
+    BaseSessionService = object
+    ListSessionsResponse = None
+
+T = TypeVar("T")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    create_time REAL NOT NULL,
+    update_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, id)
+);
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    id TEXT NOT NULL,
+    time REAL NOT NULL,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_by_session_time ON events (app_name, user_id, session_id, time);
+CREATE TABLE IF NOT EXISTS diagram_blobs (
+    hash TEXT PRIMARY KEY,
+    base TEXT NOT NULL,
+    depth INTEGER NOT NULL,
+    data TEXT NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS diagram_versions (
+    app_name TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    create_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id, filename, version)
+);
+"""
+
+
+class SqliteSessionService(BaseSessionService):
+    """BaseSessionService on a local SQLite file (WAL). Safe to share between worker processes."""
+
+    def __init__(self, path: str, *, max_threads: int = 4, busy_timeout: float = 10.0, lazy_events: bool = True,
+                 diagrams: DiagramCache | None = None):
+        self._path = path
+        self._busy_timeout = busy_timeout
+        self._lazy_events = lazy_events
+        self._diagrams = diagrams
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_threads), thread_name_prefix="session-sqlite")
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self._path, timeout=self._busy_timeout, isolation_level=None)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    async def _run(self, fn: Callable[..., T], *args: Any) -> T:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(fn, *args))
+
+    async def aclose(self) -> None:
+        """스레드 풀 종료 (진행 중인 작업을 기다림). 앱 종료 시 호출."""
+        await asyncio.to_thread(self._executor.shutdown, True)
+
+    # ----- 동기 DB 작업 (스레드 풀에서 실행) -----
+
+    def _write(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    def _create(self, app_name: str, user_id: str, session_id: str, state: dict[str, Any]) -> dict[str, Any]:
+        now = time.time()
+
+        def insert(conn: sqlite3.Connection) -> None:
+            conn.execute(
+                "INSERT INTO sessions (app_name, user_id, id, state, create_time, update_time) VALUES (?, ?, ?, ?, ?, ?)",
+                (app_name, user_id, session_id, dumps(state).decode("utf-8"), now, now),
+            )
+
+        try:
+            self._write(insert)
+        except sqlite3.IntegrityError:
+            raise ValueError(f"session {session_id} already exists") from None
+        return {"id": session_id, "appName": app_name, "userId": user_id, "lastUpdateTime": now, "state": state,
+                "events": []}
+
+    def _get(self, app_name: str, user_id: str, session_id: str, after: float | None,
+             recent: int | None) -> dict[str, Any] | None:
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT state, update_time FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+            (app_name, user_id, session_id),
+        ).fetchone()
+        if row is None:
+            return None
+        where = "app_name = ? AND user_id = ? AND session_id = ?"
+        args: list[Any] = [app_name, user_id, session_id]
+        if after is not None:
+            where += " AND time >= ?"
+            args.append(after)
+        if recent:
+            sql = f"SELECT body FROM (SELECT seq, body FROM events WHERE {where} ORDER BY seq DESC LIMIT ?) ORDER BY seq"
+            args.append(recent)
+        else:
+            sql = f"SELECT body FROM events WHERE {where} ORDER BY seq"
+        events = [loads(body) for (body,) in conn.execute(sql, args)]
+        return {"id": session_id, "appName": app_name, "userId": user_id, "lastUpdateTime": row[1],
+                "state": loads(row[0]), "events": events}
+
+    def _list(self, app_name: str, user_id: str | None) -> list[dict[str, Any]]:
+        sql = "SELECT id, user_id, state, update_time FROM sessions WHERE app_name = ?"
+        args: list[Any] = [app_name]
+        if user_id is not None:
+            sql += " AND user_id = ?"
+            args.append(user_id)
+        rows = self._conn().execute(sql + " ORDER BY update_time", args).fetchall()
+        return [{"id": sid, "appName": app_name, "userId": uid, "lastUpdateTime": ts, "state": loads(state),
+                 "events": []} for sid, uid, state, ts in rows]
+
+    def _delete(self, app_name: str, user_id: str, session_id: str) -> None:
+        def delete(conn: sqlite3.Connection) -> None:
+            for table in ("events", "diagram_versions"):
+                conn.execute(f"DELETE FROM {table} WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                             (app_name, user_id, session_id))
+            conn.execute("DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+                         (app_name, user_id, session_id))
+
+        self._write(delete)
+
+    def _append(self, app_name: str, user_id: str, session_id: str, body: dict[str, Any], ts: float) -> None:
+        delta = {k: v for k, v in ((body.get("actions") or {}).get("stateDelta") or {}).items()
+                 if not k.startswith("temp:")}
+
+        def append(conn: sqlite3.Connection) -> None:
+            row = conn.execute(
+                "SELECT state, update_time FROM sessions WHERE app_name = ? AND user_id = ? AND id = ?",
+                (app_name, user_id, session_id),
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"session {session_id} not found")
+            conn.execute(
+                "INSERT INTO events (app_name, user_id, session_id, id, time, body) VALUES (?, ?, ?, ?, ?, ?)",
+                (app_name, user_id, session_id, body.get("id", ""), ts, dumps(body).decode("utf-8")),
+            )
+            if delta:
+                state = loads(row[0])
+                state.update(delta)
+                conn.execute(
+                    "UPDATE sessions SET state = ?, update_time = ? WHERE app_name = ? AND user_id = ? AND id = ?",
+                    (dumps(state).decode("utf-8"), max(row[1], ts), app_name, user_id, session_id),
+                )
+            else:
+                conn.execute(
+                    "UPDATE sessions SET update_time = ? WHERE app_name = ? AND user_id = ? AND id = ?",
+                    (max(row[1], ts), app_name, user_id, session_id),
+                )
+
+        self._write(append)
+
+    def _put_diagram(self, app_name: str, user_id: str, session_id: str, filename: str, digest: str, text: str,
+                     base: str | None, diff: Any) -> tuple[int, float]:
+        """blob은 해시당 한 번 (base의 체인이 짧으면 diff로), 버전은 세션/파일별 0부터."""
+        now = time.time()
+
+        def put(conn: sqlite3.Connection) -> int:
+            if conn.execute("SELECT 1 FROM diagram_blobs WHERE hash = ?", (digest,)).fetchone() is None:
+                row = conn.execute("SELECT depth FROM diagram_blobs WHERE hash = ?", (base,)).fetchone() if base else None
+                if row is not None and diff is not None and row[0] < MAX_DELTA_CHAIN:
+                    blob = (digest, base, row[0] + 1, dumps(diff).decode("utf-8"), len(text))
+                else:
+                    blob = (digest, "", 0, text, len(text))
+                conn.execute("INSERT INTO diagram_blobs (hash, base, depth, data, size) VALUES (?, ?, ?, ?, ?)", blob)
+            where = (app_name, user_id, session_id, filename)
+            (version,) = conn.execute(
+                "SELECT COALESCE(MAX(version) + 1, 0) FROM diagram_versions "
+                "WHERE app_name = ? AND user_id = ? AND session_id = ? AND filename = ?", where,
+            ).fetchone()
+            conn.execute(
+                "INSERT INTO diagram_versions (app_name, user_id, session_id, filename, version, hash, create_time) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", (*where, version, digest, now),
+            )
+            return version
+
+        return self._write(put), now
+
+    def _diagram_versions(self, app_name: str, user_id: str, session_id: str,
+                          filename: str) -> list[tuple[int, str, float]]:
+        return self._conn().execute(
+            "SELECT version, hash, create_time FROM diagram_versions "
+            "WHERE app_name = ? AND user_id = ? AND session_id = ? AND filename = ? ORDER BY version",
+            (app_name, user_id, session_id, filename),
+        ).fetchall()
+
+    def _diagram_files(self, app_name: str, user_id: str, session_id: str) -> list[str]:
+        rows = self._conn().execute(
+            "SELECT DISTINCT filename FROM diagram_versions WHERE app_name = ? AND user_id = ? AND session_id = ? "
+            "ORDER BY filename", (app_name, user_id, session_id),
+        )
+        return [name for (name,) in rows]
+
+    def _delete_diagram_file(self, app_name: str, user_id: str, session_id: str, filename: str) -> None:
+        self._write(lambda conn: conn.execute(
+            "DELETE FROM diagram_versions WHERE app_name = ? AND user_id = ? AND session_id = ? AND filename = ?",
+            (app_name, user_id, session_id, filename),
+        ))
+
+    def _diagrams_by_hash(self, digests: list[str]) -> dict[str, str]:
+        conn = self._conn()
+        rows: dict[str, tuple[str, str] | None] = {}
+
+        def load(digest: str) -> tuple[str, str] | None:
+            if digest not in rows:
+                rows[digest] = conn.execute("SELECT base, data FROM diagram_blobs WHERE hash = ?", (digest,)).fetchone()
+            return rows[digest]
+
+        out = {}
+        for digest in digests:
+            text = resolve(digest, load)
+            if text is not None:
+                out[digest] = text
+        return out
+
+    async def _hydrate(self, sessions: list[dict[str, Any]]) -> None:
+        if self._diagrams is not None:
+            await hydrate_sessions(sessions, self._diagrams, self.get_diagrams)
+
+    # ----- 다이어그램 저장소 (artifacts.DiagramArtifactService) -----
+
+    async def put_diagram_version(self, app_name: str, user_id: str, session_id: str, filename: str, digest: str,
+                                  text: str, base: str | None = None, diff: Any = None) -> tuple[int, float]:
+        return await self._run(self._put_diagram, app_name, user_id, session_id, filename, digest, text, base, diff)
+
+    async def get_diagram_versions(self, app_name: str, user_id: str, session_id: str,
+                                   filename: str) -> list[tuple[int, str, float]]:
+        return await self._run(self._diagram_versions, app_name, user_id, session_id, filename)
+
+    async def get_diagram_files(self, app_name: str, user_id: str, session_id: str) -> list[str]:
+        return await self._run(self._diagram_files, app_name, user_id, session_id)
+
+    async def delete_diagram_file(self, app_name: str, user_id: str, session_id: str, filename: str) -> None:
+        await self._run(self._delete_diagram_file, app_name, user_id, session_id, filename)
+
+    async def get_diagrams(self, digests: list[str]) -> dict[str, str]:
+        return await self._run(self._diagrams_by_hash, digests)
+
+    # ----- BaseSessionService -----
+
+    async def create_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        state: dict[str, Any] | None = None,
+        session_id: str | None = None,
+    ) -> Any:
+        session_id = (session_id or "").strip() or str(uuid.uuid4())
+        data = await self._run(self._create, app_name, user_id, session_id, dict(state or {}))
+        return rest_to_session(data, lazy=self._lazy_events)
+
+    async def get_session(
+        self,
+        *,
+        app_name: str,
+        user_id: str,
+        session_id: str,
+        config: Any = None,
+    ) -> Any | None:
+        """config(GetSessionConfig)의 after_timestamp / num_recent_events는 SQL에서 거름."""
+        after = getattr(config, "after_timestamp", None)
+        recent = getattr(config, "num_recent_events", None)
+        data = await self._run(self._get, app_name, user_id, session_id, after, recent)
+        if data is None:
+            return None
+        await self._hydrate([data])
+        return rest_to_session(data, lazy=self._lazy_events)
+
+    async def list_sessions(self, *, app_name: str, user_id: str | None = None) -> Any:
+        """갱신 시각 오름차순, events 없이."""
+        data = await self._run(self._list, app_name, user_id)
+        await self._hydrate(data)
+        sessions = [rest_to_session(d) for d in data]
+        return ListSessionsResponse(sessions=sessions) if ListSessionsResponse is not None else sessions
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        await self._run(self._delete, app_name, user_id, session_id)
+
+    async def append_event(self, session: Any, event: Any) -> Any:
+        """메모리 세션에 반영(temp: 상태 포함, partial 제외)한 뒤 이벤트와 stateDelta를 한 트랜잭션으로 저장."""
+        if getattr(event, "partial", False):
+            return event
+        event = await super().append_event(session, event)
+        body = event_to_rest(event)
+        ts = event.timestamp if isinstance(getattr(event, "timestamp", None), (int, float)) else time.time()
+        body["time"] = ts
+        if self._diagrams is not None:
+            body = dehydrate_event(body, self._diagrams)
+        await self._run(self._append, session.app_name, session.user_id, session.id, body, ts)
+        session.last_update_time = max(session.last_update_time or 0, ts)
+        return event
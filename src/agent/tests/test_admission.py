@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+
+from agentserver import AdmissionRejected, AdmissionScheduler
+
+
+async def _hold(scheduler, user, priority, order, release):
+    async with scheduler.slot(user, priority):
+        order.append(user)
+        await release.wait()
+
+
+def test_priority_then_round_robin_between_users():
+    async def main():
+        scheduler = AdmissionScheduler("t", max_inflight=1, max_queue=10, max_wait=5)
+        order: list[str] = []
+        gate = asyncio.Event()
+        first = asyncio.create_task(_hold(scheduler, "busy", 0, order, gate))
+        await asyncio.sleep(0)
+        done = asyncio.Event()
+        done.set()
+        waiters = [
+            asyncio.create_task(_hold(scheduler, user, priority, order, done))
+            for user, priority in [("a", 1), ("a", 1), ("a", 1), ("b", 1), ("urgent", 0)]
+        ]
+        await asyncio.sleep(0)
+        assert scheduler.queue_depth == 5
+        gate.set()
+        await asyncio.gather(first, *waiters)
+        return order, scheduler
+
+    order, scheduler = asyncio.run(main())
+    assert order == ["busy", "urgent", "a", "b", "a", "a"]
+    assert scheduler.inflight == 0 and scheduler.stats()["admitted"] == 6
+
+
+def test_rejects_when_queue_full_or_wait_exceeded():
+    async def main():
+        scheduler = AdmissionScheduler("t", max_inflight=1, max_queue=1, max_wait=0.05)
+        gate = asyncio.Event()
+        holder = asyncio.create_task(_hold(scheduler, "x", 0, [], gate))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(_hold(scheduler, "y", 0, [], gate))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as full:
+            await _hold(scheduler, "z", 0, [], gate)
+        with pytest.raises(AdmissionRejected):
+            await waiter
+        gate.set()
+        await holder
+        return scheduler, full.value
+
+    scheduler, full = asyncio.run(main())
+    assert full.retry_after >= 1
+    stats = scheduler.stats()
+    assert (stats["rejected"], stats["timed_out"], stats["inflight"], stats["queue_depth"]) == (1, 1, 0, 0)
+
+
+def test_cancelled_waiter_does_not_leak_a_slot():
+    async def main():
+        scheduler = AdmissionScheduler("t", max_inflight=1, max_queue=4, max_wait=5)
+        gate = asyncio.Event()
+        holder = asyncio.create_task(_hold(scheduler, "x", 0, [], gate))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(_hold(scheduler, "y", 0, [], gate))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        gate.set()
+        await holder
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        return scheduler
+
+    scheduler = asyncio.run(main())
+    assert (scheduler.inflight, scheduler.queue_depth) == (0, 0)
@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+
+from agentserver.concurrency import KeyedLock, SingleFlight, map_unordered, request_key
+
+
+def test_single_flight_shares_result():
+    async def main():
+        flight = SingleFlight()
+        calls = 0
+
+        async def fn():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "ok"
+
+        results = await asyncio.gather(*(flight.do("k", fn) for _ in range(3)))
+        assert results == ["ok"] * 3 and calls == 1
+        assert flight.stats() == {"in_flight": 0, "leaders": 1, "shared": 2, "abandoned": 0}
+
+    asyncio.run(main())
+
+
+def test_single_flight_leader_cancel_does_not_fail_followers():
+    async def main():
+        flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def fn():
+            await release.wait()
+            return "done"
+
+        leader = asyncio.create_task(flight.do("k", fn))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("k", fn))
+        await asyncio.sleep(0)
+        leader.cancel()  # 첫 요청의 클라이언트가 끊김
+        await asyncio.sleep(0)
+        release.set()
+        assert await follower == "done"
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+
+    asyncio.run(main())
+
+
+def test_single_flight_cancels_work_when_everyone_leaves():
+    async def main():
+        flight = SingleFlight()
+        cancelled = asyncio.Event()
+
+        async def fn():
+            try:
+                await asyncio.sleep(3600)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        callers = [asyncio.create_task(flight.do("k", fn)) for _ in range(2)]
+        await asyncio.sleep(0)
+        for c in callers:
+            c.cancel()
+        await asyncio.wait_for(cancelled.wait(), 1)
+        assert flight.stats()["in_flight"] == 0 and flight.stats()["abandoned"] == 1
+
+        async def again():
+            return "fresh"
+
+        assert await flight.do("k", again) == "fresh"
+
+    asyncio.run(main())
+
+
+def test_single_flight_shares_exception():
+    async def main():
+        flight = SingleFlight()
+
+        async def fn():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(flight.do("k", fn), flight.do("k", fn), return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results)
+
+    asyncio.run(main())
+
+
+def test_keyed_lock_serializes_per_key_and_forgets_idle_keys():
+    async def main():
+        locks = KeyedLock()
+        order = []
+
+        async def run(key, name):
+            async with locks.hold(key):
+                order.append(f"{name}+")
+                await asyncio.sleep(0.01)
+                order.append(f"{name}-")
+
+        await asyncio.gather(run("s1", "a"), run("s1", "b"), run("s2", "c"))
+        assert order.index("a-") < order.index("b+")
+        assert order.index("c+") < order.index("a-")  # 다른 키는 동시에
+        assert len(locks) == 0
+
+    asyncio.run(main())
+
+
+def test_map_unordered_reports_errors_per_item():
+    async def main():
+        async def fn(x):
+            await asyncio.sleep(0.001 * (3 - x))
+            if x == 1:
+                raise ValueError(x)
+            return x * 10
+
+        out = {i: (v, e) for i, v, e in [r async for r in map_unordered(fn, [0, 1, 2], 2)]}
+        assert out[0] == (0, None) and out[2] == (20, None) and isinstance(out[1][1], ValueError)
+
+    asyncio.run(main())
+
+
+def test_request_key_covers_behavioural_fields():
+    msg = {"role": "user", "parts": [{"text": "hi"}]}
+    base = request_key({"newMessage": msg}, "u", "s")
+    assert request_key({"newMessage": dict(reversed(list(msg.items())))}, "u", "s") == base
+    assert request_key({"newMessage": msg, "forceLlm": True}, "u", "s") != base
+    assert request_key({"newMessage": msg, "priority": 5}, "u", "s") != base
+    assert request_key({"newMessage": msg}, "u", "other") != base
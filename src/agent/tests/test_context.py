@@ -0,0 +1,83 @@
+import json
+from types import SimpleNamespace
+
+from google.genai import types
+
+from block_diagram_agent.context import ContextCompactor
+from block_diagram_agent.retry import content_text
+
+
+def _user(text):
+    return types.Content(role="user", parts=[types.Part(text=text)])
+
+
+def _model(text):
+    return types.Content(role="model", parts=[types.Part(text=text)])
+
+
+def _diagram(title, body="A --> B"):
+    return _model(json.dumps({"title": title, "message": "ok", "mermaid": f"flowchart TD\n    {body}"}))
+
+
+def _texts(contents):
+    return [(c.role, content_text(c)) for c in contents]
+
+
+def test_window_keeps_recent_turns_and_summarizes_the_rest():
+    contents = []
+    for i in range(5):
+        contents += [_user(f"request {i}"), _diagram(f"v{i}")]
+    compactor = ContextCompactor(window_turns=2, token_budget=0)
+    request = SimpleNamespace(contents=contents)
+    compactor.before_model(None, request)
+    result = request.contents
+    assert [c.role for c in result] == ["user", "model", "user", "model"]
+    summary = result[0].parts[0].text
+    assert [line for line in summary.splitlines() if line.startswith("- user:")] == [
+        "- user: request 0 → [previous diagram: v0]",
+        "- user: request 1 → [previous diagram: v1]",
+        "- user: request 2 → [previous diagram: v2]",
+    ]
+    assert result[0].parts[1].text == "request 3"
+    # 창 안의 이전 다이어그램은 제목만, 최신 다이어그램은 원문
+    assert _texts(result)[1] == ("model", "[previous diagram: v3]")
+    assert result[3] is contents[-1]
+    stats = compactor.stats()
+    assert stats["requests"] == 1 and stats["tokens_saved"] == stats["last_saved"] > 0
+
+
+def test_token_budget_moves_old_turns_into_the_summary():
+    contents = []
+    for i in range(4):
+        contents += [_user(f"request {i} " + "x" * 400), _model(f"answer {i}")]
+    compactor = ContextCompactor(window_turns=10, token_budget=300)
+    result = compactor.compact(contents)
+    assert compactor.count(contents) > 300 >= compactor.count(result)
+    assert [c.role for c in result] == ["user", "model", "user", "model"]
+    assert result[0].parts[0].text.count("- user:") == 2
+    assert _texts(result)[-1] == ("model", "answer 3")
+    # 한 턴보다 줄이지는 않음
+    tiny = ContextCompactor(window_turns=10, token_budget=1).compact(contents)
+    assert _texts(tiny)[-1] == ("model", "answer 3") and len(tiny) == 2
+
+
+def test_latest_diagram_is_kept_when_its_turn_falls_out_of_the_window():
+    latest = _diagram("Shop", "Cart --> Checkout")
+    contents = [
+        _user("draw a shop"), latest,
+        _user("what does checkout do?"), _model("It takes payment."),
+        _user("and the cart?"), _model("It holds items."),
+    ]
+    result = ContextCompactor(window_turns=1, token_budget=0).compact(contents)
+    summary = result[0].parts[0].text
+    assert "- user: draw a shop → Shop" in summary
+    assert summary.endswith("Current diagram (latest version, edit this one):\n" + content_text(latest))
+    assert _texts(result)[1:] == [("model", "It holds items.")]
+
+
+def test_consecutive_duplicate_user_messages_are_merged():
+    contents = [_user("draw a shop"), _user("draw a shop"), _diagram("Shop"), _user("draw a shop")]
+    result = ContextCompactor(window_turns=4, token_budget=0).compact(contents)
+    assert _texts(result) == [
+        ("user", "draw a shop"), ("model", content_text(contents[2])), ("user", "draw a shop"),
+    ]
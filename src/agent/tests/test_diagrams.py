@@ -0,0 +1,90 @@
+import asyncio
+import copy
+import json
+
+import pytest
+
+from sessionclient.diagrams import (
+    REF_KEY, DiagramCache, apply_diff, dehydrate_event, diagram_hash, hydrate_sessions, make_diff, resolve,
+)
+
+V1 = "flowchart TD\n    A[Web] --> B[(DB)]"
+V2 = "flowchart TD\n    A[Web] --> C[Cache]\n    C --> B[(DB)]"
+V3 = "flowchart LR\r\n    A[Web] --> C[Cache]\n    C --> B[(DB)]\n"
+
+
+@pytest.mark.parametrize("base, text", [(V1, V2), (V2, V3), (V3, V1), ("", V1), (V1, "")])
+def test_diff_round_trip(base, text):
+    assert apply_diff(base, make_diff(base, text)) == text
+
+
+def test_apply_diff_rejects_bad_ranges():
+    with pytest.raises(ValueError):
+        apply_diff(V1, [[1, 0, []]])
+    with pytest.raises(ValueError):
+        apply_diff(V1, [[0, 5, []]])
+
+
+def test_resolve_follows_the_delta_chain():
+    h1, h2, h3 = diagram_hash(V1), diagram_hash(V2), diagram_hash(V3)
+    blobs = {
+        h1: ("", V1),
+        h2: (h1, json.dumps(make_diff(V1, V2))),
+        h3: (h2, json.dumps(make_diff(V2, V3))),
+    }
+    assert resolve(h3, blobs.get) == V3
+    assert resolve(h2, blobs.get) == V2
+    del blobs[h1]
+    assert resolve(h3, blobs.get) is None
+
+
+def _event(mermaid):
+    answer = json.dumps({"title": "t", "message": "m", "mermaid": mermaid})
+    return {
+        "id": "e1",
+        "content": {"role": "model", "parts": [{"text": answer}]},
+        "actions": {"stateDelta": {"diagram": {"title": "t", "mermaid": mermaid}, "snapshot": {"diagram": {"mermaid": mermaid}}}},
+    }
+
+
+def test_dehydrate_only_stored_diagrams_and_hydrate_back():
+    cache = DiagramCache()
+    body = _event(V2)
+    original = copy.deepcopy(body)
+    assert dehydrate_event(body, cache) is body  # 저장소에 없는 다이어그램은 그대로
+    cache.put(diagram_hash(V2), V2.strip())
+    stored = dehydrate_event(body, cache)
+    assert body == original  # 원본은 바뀌지 않음
+    digest = diagram_hash(V2)
+    assert stored["actions"]["stateDelta"]["diagram"] == {"title": "t", REF_KEY: digest}
+    assert stored["actions"]["stateDelta"]["snapshot"]["diagram"] == {REF_KEY: digest}
+    assert json.loads(stored["content"]["parts"][0]["text"])[REF_KEY] == digest
+    assert V2 not in json.dumps(stored)
+
+    fetched = []
+
+    async def fetch(digests):
+        fetched.append(digests)
+        return {digest: V2, "0" * 16: "tampered"}
+
+    session = {"state": {"diagram": {REF_KEY: digest}}, "events": [stored]}
+    asyncio.run(hydrate_sessions([session], DiagramCache(), fetch))
+    assert fetched == [[digest]]
+    assert session["events"][0] == original
+    assert session["state"]["diagram"] == {"mermaid": V2}
+
+
+def test_hydrate_uses_cache_and_ignores_mismatched_text():
+    cache = DiagramCache()
+    digest = diagram_hash(V1)
+
+    async def fetch(digests):
+        return {d: "not the stored text" for d in digests}
+
+    session = {"state": {"diagram": {REF_KEY: digest}}, "events": []}
+    asyncio.run(hydrate_sessions([session], cache, fetch))
+    assert session["state"]["diagram"] == {REF_KEY: digest}  # 해시가 다르면 해석하지 않음
+    assert cache.stats()["refs_missing"] == 1
+    cache.put(digest, V1)
+    asyncio.run(hydrate_sessions([session], cache, fetch))
+    assert session["state"]["diagram"] == {"mermaid": V1}
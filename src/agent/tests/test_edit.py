@@ -0,0 +1,127 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.genai import types
+
+from block_diagram_agent.edit import DiagramEditor, PatchError, apply_edits
+from block_diagram_agent.mermaid import parse_flowchart
+from block_diagram_agent.retry import RequestStash, response_text
+from block_diagram_agent.schema import DiagramEdit, DiagramResponse
+
+PREVIOUS = "flowchart TD\n    A[Web]\n    B[(DB)]\n    A --> B"
+
+
+def _edit(op, **kwargs):
+    return DiagramEdit(op=op, **kwargs)
+
+
+def test_apply_edits():
+    out = apply_edits(PREVIOUS, [
+        _edit("add_node", id="C", label="Cache", subgraph="data"),
+        _edit("remove_edge", source="A", target="B"),
+        _edit("add_edge", source="A", target="C", label="read"),
+        _edit("add_edge", source="C", target="B"),
+        _edit("rename_node", id="A", label="Web server"),
+        _edit("move_to_subgraph", id="B", subgraph="data", label="Data tier"),
+    ])
+    chart = parse_flowchart(out)
+    assert chart.nodes["A"].label == "Web server"
+    assert chart.nodes["B"].shape == ("[(", ")]")
+    assert [(e.source, e.target, e.label) for e in chart.edges] == [("A", "C", "read"), ("C", "B", "")]
+    assert chart.membership == {"C": "data", "B": "data"}
+    assert chart.subgraphs["data"].title == "Data tier"
+
+
+def test_remove_node_drops_its_edges():
+    chart = parse_flowchart(apply_edits(PREVIOUS, [_edit("remove_node", id="B")]))
+    assert list(chart.nodes) == ["A"] and chart.edges == []
+
+
+def test_add_edge_is_idempotent():
+    chart = parse_flowchart(apply_edits(PREVIOUS, [_edit("add_edge", source="A", target="B")]))
+    assert len(chart.edges) == 1
+
+
+@pytest.mark.parametrize("edit, message", [
+    (_edit("remove_node", id="Z"), "unknown node 'Z'"),
+    (_edit("add_node", id="A", label="again"), "already exists"),
+    (_edit("add_edge", source="A", target="Z"), "unknown node 'Z'"),
+    (_edit("remove_edge", source="B", target="A"), "no edge"),
+    (_edit("rename_node", id="A"), "missing label"),
+])
+def test_apply_edits_errors(edit, message):
+    with pytest.raises(PatchError, match=message):
+        apply_edits(PREVIOUS, [edit])
+
+
+def test_apply_edits_rejects_unparseable_previous():
+    with pytest.raises(PatchError, match="not an editable flowchart"):
+        apply_edits("sequenceDiagram\n    A->>B: hi", [_edit("remove_node", id="A")])
+
+
+def _response(text):
+    return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=text)]))
+
+
+def _context(model=None):
+    agent = SimpleNamespace(canonical_model=model)
+    return SimpleNamespace(
+        invocation_id="inv-1",
+        state={"diagram": {"title": "Web stack", "message": "", "mermaid": PREVIOUS}},
+        _invocation_context=SimpleNamespace(agent=agent),
+    )
+
+
+_BAD_PATCH = '{"title": "웹", "message": "캐시를 추가했습니다", "mermaid": "", "edits": [{"op": "remove_node", "id": "Z"}]}'
+
+
+class _Model:
+    def __init__(self, reply=None, error=None):
+        self._reply, self._error = reply, error
+
+    async def generate_content_async(self, request, stream=False):
+        if self._error is not None:
+            raise self._error
+        yield _response(self._reply)
+
+
+def _run(editor, context, response):
+    asyncio.run(editor.after_model(context, response))
+    return DiagramResponse.model_validate_json(response_text(response))
+
+
+def test_patch_applied():
+    editor = DiagramEditor(RequestStash())
+    response = _response('{"title": "t", "message": "m", "edits": [{"op": "rename_node", "id": "A", "label": "Edge"}]}')
+    result = _run(editor, _context(), response)
+    assert "A[Edge]" in result.mermaid and editor.stats()["patched"] == 1
+
+
+def test_regenerates_full_diagram_after_patch_failure():
+    stash = RequestStash()
+    context = _context(_Model(reply='{"title": "웹", "message": "다시 그림", "mermaid": "flowchart TD\\n    A --> C"}'))
+    stash.before_model(context, LlmRequest())
+    editor = DiagramEditor(stash)
+    assert _run(editor, context, _response(_BAD_PATCH)).mermaid == "flowchart TD\n    A --> C"
+    assert editor.stats()["regenerated"] == 1
+
+
+@pytest.mark.parametrize("model, stashed", [
+    (None, False),  # 재생성할 요청 없음
+    (_Model(error=RuntimeError("backend down")), True),
+    (_Model(reply="not json"), True),
+    (_Model(reply='{"title": "웹", "message": "m", "mermaid": ""}'), True),  # 재생성에도 mermaid 없음
+])
+def test_keeps_previous_diagram_when_regeneration_fails(model, stashed):
+    stash = RequestStash()
+    context = _context(model)
+    if stashed:
+        stash.before_model(context, LlmRequest())
+    editor = DiagramEditor(stash)
+    result = _run(editor, context, _response(_BAD_PATCH))
+    assert result.mermaid == PREVIOUS and result.title == "Web stack"
+    assert "그대로" in result.message  # 사용자 언어로 안내
+    assert editor.stats()["regenerate_failures"] == 1
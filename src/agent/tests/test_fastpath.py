@@ -0,0 +1,106 @@
+from types import SimpleNamespace
+
+import pytest
+from google.genai import types
+
+from block_diagram_agent.fastpath import FastPath, force_llm, route
+from block_diagram_agent.mermaid import parse_flowchart
+from block_diagram_agent.schema import DiagramResponse
+
+
+def _labels(found):
+    return [node.label for node in parse_flowchart(found.response.mermaid).nodes.values()]
+
+
+@pytest.mark.parametrize("text, labels", [
+    ("A -> B -> C, C -> D", ["A", "B", "C", "D"]),
+    ("웹 서버 → WAS → DB 그려줘", ["웹 서버", "WAS", "DB"]),
+    ("A -> B -> C 로 그려줘", ["A", "B", "C"]),
+    ("Draw a diagram: client ->|HTTPS| gateway -> orders", ["client", "gateway", "orders"]),
+    ("client -> gateway -> db. Draw a flowchart.", ["client", "gateway", "db"]),
+])
+def test_chain(text, labels):
+    found = route(text)
+    assert found.kind == "chain" and found.confidence == 1.0
+    assert _labels(found) == labels
+
+
+def test_chain_link_label_and_db_shape():
+    chart = parse_flowchart(route("client ->|HTTPS| api -> postgres").response.mermaid)
+    assert chart.direction == "LR"
+    assert [e.label for e in chart.edges] == ["HTTPS", ""]
+    assert chart.nodes["N3"].shape == ("[(", ")]")
+
+
+def test_language_follows_prompt():
+    assert "그렸습니다" in route("웹 → WAS → DB").response.message
+    assert route("web -> app -> db").response.message.startswith("Drew")
+
+
+@pytest.mark.parametrize("text", [
+    # 버린 문장에 요구 사항이 있음
+    "API -> DB, make sure the DB is drawn in a private subnet",
+])
+def test_leftover_instructions_lower_confidence(text):
+    found = route(text)
+    assert found is not None and found.confidence < 0.9
+
+
+@pytest.mark.parametrize("text", [
+    "A -> B -> C 로 시퀀스 다이어그램을 그려줘",  # flowchart가 아님
+    "Draw a sequence diagram: client -> server -> db",
+    "Given that f(x) => g(x), draw the pipeline",  # 라벨이 문장 조각
+    "A -> B -> C 구조로 그려줘",
+    "add a cache between web and db",
+    "A -> B 에 C 추가",
+    "what is A -> B?",
+    "Draw a login flow with two-factor authentication",
+    "",
+])
+def test_no_route(text):
+    assert route(text) is None
+
+
+def test_tiers():
+    found = route("3계층 구조: 웹, WAS, 데이터베이스")
+    assert found.kind == "tiers" and found.confidence == 1.0
+    assert _labels(found) == ["웹", "WAS", "데이터베이스"]
+    assert route("3-tier: web, db").confidence < 0.9
+
+
+def test_list():
+    found = route("Login flow:\n- Open app\n- Enter password\n- Dashboard")
+    assert found.kind == "list" and found.response.title == "Login flow"
+    assert _labels(found) == ["Open app", "Enter password", "Dashboard"]
+    assert route("- a\n  - b\n- c").confidence < 0.9
+    assert route("- a\nsome prose\n- b") is None
+
+
+def _context(text, state=None):
+    return SimpleNamespace(user_content=types.Content(role="user", parts=[types.Part(text=text)]), state=state or {})
+
+
+def test_before_model_hit_matches_model_turn():
+    fast = FastPath()
+    response = fast.before_model(_context("a -> b -> c"), None)
+    assert response.turn_complete
+    DiagramResponse.model_validate_json(response.content.parts[0].text)
+    assert fast.stats()["hits_chain"] == 1
+
+
+def test_before_model_skips_follow_up_force_and_low_confidence():
+    fast = FastPath()
+    assert fast.before_model(_context("a -> b", {"diagram": {"mermaid": "flowchart TD"}}), None) is None
+    with force_llm():
+        assert fast.before_model(_context("a -> b"), None) is None
+        assert fast.match("a -> b") is None
+    assert fast.before_model(_context("API -> DB, make sure the DB is drawn in a private subnet"), None) is None
+    stats = fast.stats()
+    assert (stats["follow_ups"], stats["forced"], stats["low_confidence"], stats["hits"]) == (1, 1, 1, 0)
+
+
+def test_match_has_no_side_effects():
+    fast = FastPath()
+    assert fast.match("a -> b") is not None
+    assert fast.match("a -> b", {"diagram": {"title": "x"}}) is None
+    assert fast.stats()["checked"] == 0
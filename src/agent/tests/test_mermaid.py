@@ -0,0 +1,120 @@
+import pytest
+
+from block_diagram_agent.mermaid import MermaidParseError, parse_flowchart
+from block_diagram_agent.render import render_svg
+from block_diagram_agent.repair import diagram_keyword, repair_mermaid
+
+
+def test_parse_chain_and_subgraph():
+    chart = parse_flowchart(
+        "flowchart LR\n"
+        "    subgraph data [Data tier]\n"
+        "        direction TB\n"
+        "        B[(DB)]\n"
+        "    end\n"
+        "    A[Web] & C([Worker]) -->|query| B --> D\n"
+        "    classDef hot fill:#f00"
+    )
+    assert chart.direction == "LR"
+    assert chart.subgraphs["data"].title == "Data tier"
+    assert chart.subgraphs["data"].direction == "TB"
+    assert chart.membership == {"B": "data"}
+    assert [(e.source, e.target, e.label) for e in chart.edges] == [
+        ("A", "B", "query"), ("C", "B", "query"), ("B", "D", ""),
+    ]
+    assert chart.extras == ["classDef hot fill:#f00"]
+
+
+def test_not_a_flowchart():
+    with pytest.raises(MermaidParseError):
+        parse_flowchart("sequenceDiagram\n    A->>B: hi")
+    with pytest.raises(MermaidParseError):
+        parse_flowchart("flowchart TD\n    subgraph S\n    A")
+
+
+@pytest.mark.parametrize("code", [
+    "---\ntitle: Demo\n---\nflowchart LR\n    A --> B",
+    "flowchart TD\n    A --> B\n    A ~~~ C",
+    "flowchart TD\n    accTitle: Big; picture\n    accDescr: Web talks to DB\n    A --> B",
+    "flowchart TD\n    accDescr {\n        first line\n        second line\n    }\n    A --> B",
+    'flowchart TD\n    A@{ shape: cyl, label: "Data (main)" } --> B\n    C@{ shape: rect }',
+    'flowchart TD\n    A["a"] --> B\n    A["b"]',
+])
+def test_valid_syntax_is_kept(code):
+    assert repair_mermaid(code) == (code, [])
+    render_svg(code)
+
+
+def test_node_metadata():
+    chart = parse_flowchart('flowchart TD\n    A[DB]\n    A@{ shape: cyl } --> B@{ label: "Queue" }')
+    assert chart.nodes["A"].label == "DB"
+    assert chart.nodes["B"].label == "Queue"
+    chart.nodes["B"].label = "Topic"
+    out = chart.to_mermaid()
+    assert 'A@{ shape: cyl, label: "DB" }' in out
+    assert parse_flowchart(out).nodes["B"].label == "Topic"
+
+
+def test_redeclared_id_relabels_one_node():
+    chart = parse_flowchart('flowchart TD\n    A["a"] --> B\n    A["b"] --> C')
+    assert list(chart.nodes) == ["A", "B", "C"]
+    assert chart.nodes["A"].label == "b"
+    assert chart.warnings == []
+
+
+def test_invisible_link_is_not_drawn():
+    chart = parse_flowchart("flowchart LR\n    A ~~~ B")
+    assert [(e.source, e.op, e.target) for e in chart.edges] == [("A", "~~~", "B")]
+    assert "<path class=\"bd-edge" not in render_svg("flowchart LR\n    A ~~~ B")
+
+
+def test_front_matter_header_is_added_after_it():
+    fixed, fixes = repair_mermaid("---\ntitle: Demo\n---\nA --> B")
+    assert fixed == "---\ntitle: Demo\n---\nflowchart TD\nA --> B"
+    assert fixes == ["added missing 'flowchart TD' header"]
+    assert diagram_keyword(fixed) == "flowchart"
+
+
+def test_repair_patches_only_broken_lines():
+    code = (
+        "%% keep me\n"
+        "flowchart TD\n"
+        "  A[User (web)] --> B;  B --> end\n"
+        "  subgraph S\n"
+        "      X\n"
+        "  end\n"
+        "  S[Service] --> end\n"
+        "  click A href \"https://example.com\""
+    )
+    fixed, fixes = repair_mermaid(code)
+    assert fixed.splitlines() == [
+        "%% keep me",
+        "flowchart TD",
+        '  A["User (web)"] --> B; B --> end_node',
+        "  subgraph S",
+        "      X",
+        "  end",
+        "  S_node[Service] --> end_node",
+        "  click A href \"https://example.com\"",
+    ]
+    assert len(fixes) == 3
+    chart = parse_flowchart(fixed)
+    assert chart.warnings == []
+    assert ("S_node", "end_node") in [(e.source, e.target) for e in chart.edges]
+
+
+def test_subgraph_clashing_with_node_is_renamed():
+    fixed, fixes = repair_mermaid("flowchart TD\n    A[a]\n    subgraph A\n        B\n    end")
+    assert fixed == "flowchart TD\n    A[a]\n    subgraph A_group [A]\n        B\n    end"
+    assert fixes == ["subgraph id 'A' clashes with a node; renamed to 'A_group'"]
+
+
+def test_fence_and_unrepairable():
+    fixed, fixes = repair_mermaid("```mermaid\nflowchart TD\n    A --> B\n```")
+    assert fixed == "flowchart TD\n    A --> B"
+    assert fixes == ["removed code fence"]
+    assert repair_mermaid("sequenceDiagram\n    A->>B: hi")[1] == []
+    with pytest.raises(MermaidParseError):
+        repair_mermaid("flowchart TD\n    A --> ")
+    with pytest.raises(MermaidParseError):
+        repair_mermaid("---\ntitle: never closed\nflowchart TD")
@@ -0,0 +1,28 @@
+import asyncio
+
+from agentserver.profiling import RequestProfiler, build_profiler
+
+
+def _scope(path, profile=None):
+    headers = [(b"x-profile", profile.encode())] if profile is not None else []
+    return {"type": "http", "method": "POST", "path": path, "headers": headers}
+
+
+def test_disabled_by_default(monkeypatch):
+    monkeypatch.delenv("PROFILE_ENABLED", raising=False)
+    assert build_profiler() is None
+
+
+def test_header_needs_token_and_path(tmp_path):
+    async def main():
+        open_ = RequestProfiler(str(tmp_path / "open"))
+        assert open_.begin(_scope("/run", "1")) is None
+        profiler = RequestProfiler(str(tmp_path / "token"), token="s3cret")
+        assert profiler.begin(_scope("/run", "1")) is None
+        assert profiler.begin(_scope("/admin/profiles", "s3cret")) is None
+        capture = profiler.begin(_scope("/api/run", "s3cret"))
+        assert capture is not None and capture.reason == "header"
+        await profiler.end(capture)
+        assert profiler.stats()["captures_header"] == 1
+
+    asyncio.run(main())
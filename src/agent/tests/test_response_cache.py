@@ -0,0 +1,77 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from google.genai import types
+
+from block_diagram_agent.response_cache import MemoryBackend, ResponseCache, SQLiteBackend
+from block_diagram_agent.schema import DiagramResponse
+
+RESPONSE = DiagramResponse(title="Shop", message="done", mermaid="flowchart TD\n    A --> B")
+
+
+def _context(text):
+    return SimpleNamespace(user_content=types.Content(role="user", parts=[types.Part(text=text)]), state={})
+
+
+def _llm_response(response):
+    return SimpleNamespace(content=types.Content(role="model", parts=[types.Part(text=response.model_dump_json())]))
+
+
+class _ThreadRecordingBackend(SQLiteBackend):
+    threads: set
+
+    def get(self, key):
+        self.threads.add(threading.get_ident())
+        return super().get(key)
+
+
+def test_sqlite_backend_runs_off_the_event_loop(tmp_path):
+    backend = _ThreadRecordingBackend(str(tmp_path / "cache.db"))
+    backend.threads = set()
+    cache = ResponseCache(backend, model_name="m", similarity_threshold=0.5)
+
+    async def main():
+        await cache.after_model(_context("draw a web shop"), _llm_response(RESPONSE))
+        hit = await cache.before_model(_context("Draw a web shop!"), None)
+        similar = await cache.before_model(_context("draw a web shops"), None)
+        miss = await cache.before_model(_context("something else entirely"), None)
+        return hit, similar, miss
+
+    hit, similar, miss = asyncio.run(main())
+    assert DiagramResponse.model_validate_json(hit.content.parts[0].text) == RESPONSE
+    assert similar is not None and miss is None
+    assert threading.get_ident() not in backend.threads
+    assert cache.stats() | {"hit_rate": 0} == {
+        "hits_exact": 1, "hits_similar": 1, "misses": 1, "stores": 1, "hit_rate": 0, "entries": 1,
+    }
+
+
+def test_sqlite_backend_counts_entries_without_querying_and_closes(tmp_path):
+    path = str(tmp_path / "cache.db")
+    backend = SQLiteBackend(path, max_entries=2)
+    for i in range(3):
+        thread = threading.Thread(target=backend.put, args=(f"k{i}", "b", f"p{i}", "v"))
+        thread.start()
+        thread.join()
+    assert len(backend._conns) == 4  # __init__ + 스레드 3개
+    backend.close()
+    assert backend._conns == []
+    backend._conn = None  # stats()는 커넥션을 쓰지 않아야 함
+    assert ResponseCache(backend, model_name="m").stats()["entries"] == 2
+    reopened = SQLiteBackend(path)
+    assert len(reopened) == 2 and reopened.get("k2") == "v"
+    reopened.close()
+
+
+def test_memory_backend_bucket_includes_previous_diagram():
+    cache = ResponseCache(MemoryBackend(), model_name="m")
+
+    async def main():
+        await cache.after_model(_context("add a cache"), _llm_response(RESPONSE))
+        followup = _context("add a cache")
+        followup.state["diagram"] = {"mermaid": "flowchart TD\n    X --> Y"}
+        return await cache.before_model(_context("add a cache"), None), await cache.before_model(followup, None)
+
+    same, other = asyncio.run(main())
+    assert same is not None and other is None
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from agentserver.responses import ClosingStreamingResponse
+
+
+def _scope(spec_version="2.4"):
+    return {"type": "http", "asgi": {"spec_version": spec_version}}
+
+
+async def _receive():
+    await asyncio.sleep(3600)
+
+
+def test_closes_when_body_never_starts():
+    started, closed = [], []
+
+    async def body():
+        started.append(True)
+        yield b"data"
+
+    async def on_close():
+        closed.append(True)
+
+    async def send(message):
+        raise OSError("client went away")  # 헤더 전송 전에 끊김
+
+    response = ClosingStreamingResponse(body(), on_close, media_type="text/event-stream")
+    with pytest.raises(Exception):
+        asyncio.run(response(_scope(), _receive, send))
+    assert closed == [True] and started == []
+
+
+def test_closes_generator_suspended_at_yield():
+    events = []
+
+    async def body():
+        try:
+            yield b"first"
+            yield b"second"
+        finally:
+            events.append("body finally")
+
+    async def on_close():
+        events.append("on_close")
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+        if message.get("body") == b"first":
+            raise OSError("broken pipe")
+
+    response = ClosingStreamingResponse(body(), on_close)
+    with pytest.raises(Exception):
+        asyncio.run(response(_scope(), _receive, send))
+    assert events == ["body finally", "on_close"]
+
+
+def test_closes_after_normal_completion():
+    closed = []
+
+    async def body():
+        yield b"x"
+
+    async def on_close():
+        closed.append(True)
+
+    async def send(message):
+        pass
+
+    asyncio.run(ClosingStreamingResponse(body(), on_close)(_scope(), _receive, send))
+    assert closed == [True]
@@ -0,0 +1,67 @@
+import asyncio
+from typing import Any, AsyncGenerator
+
+from google.adk.models.base_llm import BaseLlm
+
+from block_diagram_agent.router import Backend, RoutedLlm
+
+
+class _SlowLlm(BaseLlm):
+    peak: int = 0
+    running: int = 0
+
+    async def generate_content_async(self, llm_request: Any, stream: bool = False) -> AsyncGenerator[Any, None]:
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(0.01)
+            yield self.model
+        finally:
+            self.running -= 1
+
+
+async def _call(router: RoutedLlm) -> list:
+    return [r async for r in router.generate_content_async(None)]
+
+
+def test_each_backend_has_its_own_limit():
+    async def main():
+        llms = [_SlowLlm(model="a"), _SlowLlm(model="b")]
+        router = RoutedLlm("m", [Backend(f"http://{l.model}", l, max_concurrency=2) for l in llms], health_interval=0)
+        results = await asyncio.gather(*(_call(router) for _ in range(8)))
+        assert sorted(r[0] for r in results) == ["a"] * 4 + ["b"] * 4
+        assert [l.peak for l in llms] == [2, 2]
+        assert [b.outstanding + b.waiting for b in router.backends] == [0, 0]
+
+    asyncio.run(main())
+
+
+def test_full_backend_sorts_last():
+    async def main():
+        llms = [_SlowLlm(model="a"), _SlowLlm(model="b")]
+        router = RoutedLlm("m", [Backend("http://a", llms[0], 1), Backend("http://b", llms[1], 0)],
+                           policy="ewma", health_interval=0)
+        router.backends[1].latency_ewma = 10.0  # ewma만 보면 항상 a
+        results = await asyncio.gather(*(_call(router) for _ in range(3)))
+        assert sorted(r[0] for r in results) == ["a", "b", "b"]
+
+    asyncio.run(main())
+
+
+def test_retry_from_after_model_does_not_deadlock():
+    # 엔드포인트 2개 x 슬롯 1개를 두 턴이 다 잡은 상태에서, 각 턴이 최종 응답을 받는 중(after_model)에 재호출
+    async def main():
+        llms = [_SlowLlm(model="a"), _SlowLlm(model="b")]
+        router = RoutedLlm("m", [Backend(f"http://{l.model}", l, max_concurrency=1) for l in llms], health_interval=0)
+
+        async def turn() -> list:
+            retried = []
+            async for _ in router.generate_content_async(None):
+                retried += await _call(router)  # retry.call_again
+            return retried
+
+        results = await asyncio.wait_for(asyncio.gather(turn(), turn()), timeout=2)
+        assert [len(r) for r in results] == [1, 1]
+        assert [b.outstanding + b.waiting for b in router.backends] == [0, 0]
+
+    asyncio.run(main())
@@ -0,0 +1,134 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from sessionclient import RemoteSessionService, SessionCache, SessionConflict
+from sessionclient.models import LazyEventList, merge_session_delta, rest_to_session
+
+
+def _event(i, ts):
+    return {"id": f"e{i}", "author": "user", "invocationId": f"i{i}", "timestamp": ts,
+            "content": {"role": "user", "parts": [{"text": f"turn {i}"}]}}
+
+
+def _session(events, state=None, updated=2.0):
+    return {"id": "s", "appName": "a", "userId": "u", "state": state or {}, "lastUpdateTime": updated, "events": events}
+
+
+@pytest.mark.parametrize("lazy", [True, False])
+def test_merge_dedups_boundary_events_and_takes_server_state(lazy):
+    cached = rest_to_session(_session([_event(1, 1.0), _event(2, 2.0)], {"n": 1}), lazy=lazy)
+    # since는 초 단위라 경계 시각의 e2가 다시 옴
+    merged = merge_session_delta(cached, _session([_event(2, 2.0), _event(3, 2.5)], {"n": 2}, updated=2.5))
+    assert [e.id for e in merged.events] == ["e1", "e2", "e3"]
+    assert merged.state == {"n": 2}
+    assert merged.last_update_time == 2.5
+    assert isinstance(merged.events, LazyEventList) is lazy
+    assert [e.id for e in cached.events] == ["e1", "e2"]  # 캐시된 세션은 그대로
+
+
+def test_session_cache_lru_ttl_and_peek():
+    cache = SessionCache(max_entries=2, ttl=60)
+    cache.put(("a", "u", "1"), "one")
+    cache.put(("a", "u", "2"), "two")
+    assert cache.get(("a", "u", "1")) == "one"
+    cache.put(("a", "u", "3"), "three")  # 가장 오래 안 쓴 2가 빠짐
+    assert cache.peek(("a", "u", "2")) is None
+    assert cache.peek(("a", "u", "1")) == "one"
+    cache.invalidate(("a", "u", "1"))
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 0, "invalidations": 1}
+    expired = SessionCache(ttl=0)
+    expired.put(("a", "u", "1"), "one")
+    assert expired.get(("a", "u", "1")) is None
+
+
+def test_get_session_fetches_only_new_events_on_hit():
+    requests = []
+
+    def handler(request):
+        requests.append(dict(request.url.params))
+        if "since" in request.url.params:
+            return httpx.Response(200, content=json.dumps(_session([_event(2, 2.0), _event(3, 3.0)], updated=3.0)))
+        return httpx.Response(200, content=json.dumps(_session([_event(1, 1.0), _event(2, 2.0)])))
+
+    async def main():
+        svc = RemoteSessionService("http://sessions", cache=SessionCache())
+        svc._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        first = await svc.get_session(app_name="a", user_id="u", session_id="s")
+        first.events.append("caller's own copy")  # 호출자에게는 복사본
+        second = await svc.get_session(app_name="a", user_id="u", session_id="s")
+        await svc.aclose()
+        return second
+
+    second = asyncio.run(main())
+    assert requests == [{}, {"since": "2"}]
+    assert [e.id for e in second.events] == ["e1", "e2", "e3"]
+
+
+class _Server:
+    """lastUpdateTime을 서버 시각(updated)으로 관리하는 Session Service 흉내. other_writes: 409 전에 끼어드는 쓰기 수."""
+
+    def __init__(self, other_writes=0):
+        self.events = [(1, _event(1, 1.0))]  # (저장 시각, 이벤트)
+        self.updated = 10
+        self.other_writes = other_writes
+        self.requests = []
+
+    def handler(self, request):
+        if request.method == "GET":
+            self.requests.append(("GET", request.url.params.get("since")))
+            since = int(request.url.params.get("since", 0))
+            events = [e for updated, e in self.events if updated >= since]
+            return httpx.Response(200, content=json.dumps(_session(events, updated=self.updated)))
+        self.requests.append(("POST", request.headers.get("X-Session-Last-Update-Time")))
+        if self.other_writes:
+            self.other_writes -= 1
+            self.updated += 1
+            self.events.append((self.updated, _event(100 + self.updated, float(self.updated))))
+        if int(request.headers.get("X-Session-Last-Update-Time", self.updated)) < self.updated:
+            return httpx.Response(409)
+        self.updated += 1
+        self.events.append((self.updated, json.loads(request.content)))
+        return httpx.Response(200, content=json.dumps({"lastUpdateTime": self.updated}))
+
+
+def _append(server, *timestamps):
+    async def main():
+        svc = RemoteSessionService("http://sessions", cache=SessionCache())
+        svc._client = httpx.AsyncClient(transport=httpx.MockTransport(server.handler))
+        session = await svc.get_session(app_name="a", user_id="u", session_id="s")
+        try:
+            for i, ts in enumerate(timestamps):
+                await svc.append_event(session, SimpleNamespace(id=f"mine{i}", timestamp=ts, author="user", actions={}))
+        finally:
+            cached = svc.cache.peek(("a", "u", "s"))
+            session = await svc.get_session(app_name="a", user_id="u", session_id="s") if cached else None
+            await svc.aclose()
+        return session
+
+    return asyncio.run(main())
+
+
+def test_cursor_comes_from_the_server_not_local_event_timestamps():
+    server = _Server()
+    # 에이전트 시계가 서버보다 한참 앞서도 (timestamp 1000) 커서는 서버가 응답한 값
+    session = _append(server, 1000.0, 1001.0)
+    assert server.requests == [("GET", None), ("POST", "10"), ("POST", "11"), ("GET", "12")]
+    assert [e.id for e in session.events] == ["e1", "mine0", "mine1"]
+
+
+def test_conflict_merges_remote_events_then_retries():
+    server = _Server(other_writes=1)
+    session = _append(server, 5.0)
+    assert server.requests == [("GET", None), ("POST", "10"), ("GET", "10"), ("POST", "11"), ("GET", "12")]
+    assert [e.id for e in session.events] == ["e1", "e111", "mine0"]
+
+
+def test_conflict_after_retry_is_raised():
+    server = _Server(other_writes=2)
+    with pytest.raises(SessionConflict):
+        _append(server, 5.0)
+    assert server.requests == [("GET", None), ("POST", "10"), ("GET", "10"), ("POST", "11")]
@@ -0,0 +1,49 @@
+import asyncio
+from types import SimpleNamespace
+
+from google.genai import types
+
+from block_diagram_agent.versions import DiagramVersioner
+from sessionclient import DiagramArtifactService, DiagramCache, DiagramStoreUnavailable, MemoryDiagramStore
+
+RESPONSE = '{"title": "t", "message": "m", "mermaid": "flowchart TD\\n    A --> B"}'
+
+
+class _NoDiagramApi(MemoryDiagramStore):
+    async def put_diagram_version(self, *args, **kwargs):
+        raise DiagramStoreUnavailable("session service has no diagram store")
+
+
+def _context(artifacts):
+    async def save_artifact(filename, part):
+        return await artifacts.save_artifact(app_name="a", user_id="u", session_id="s", filename=filename, artifact=part)
+
+    return SimpleNamespace(save_artifact=save_artifact)
+
+
+def _response(text):
+    return SimpleNamespace(content=types.Content(role="model", parts=[types.Part(text=text)]), partial=False)
+
+
+def test_saves_versions_and_skips_unchanged():
+    artifacts = DiagramArtifactService(MemoryDiagramStore(), DiagramCache())
+    versioner = DiagramVersioner()
+    asyncio.run(versioner.after_model(_context(artifacts), _response(RESPONSE)))
+    asyncio.run(versioner.after_model(_context(artifacts), _response(RESPONSE)))
+    assert versioner.stats() == {"saved": 2, "skipped": 0, "failed": 0}
+    assert artifacts.stats()["unchanged"] == 1
+
+
+def test_store_without_diagram_api_is_skipped():
+    versioner = DiagramVersioner()
+    asyncio.run(versioner.after_model(_context(DiagramArtifactService(_NoDiagramApi(), DiagramCache())), _response(RESPONSE)))
+    assert versioner.stats() == {"saved": 0, "skipped": 1, "failed": 0}
+
+
+def test_unexpected_errors_are_counted_as_failures():
+    async def save_artifact(filename, part):
+        raise NotImplementedError("bug")
+
+    versioner = DiagramVersioner()
+    asyncio.run(versioner.after_model(SimpleNamespace(save_artifact=save_artifact), _response(RESPONSE)))
+    assert versioner.stats() == {"saved": 0, "skipped": 0, "failed": 1}
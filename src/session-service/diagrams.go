@@ -0,0 +1,478 @@
+package main
+
+import (
+	"crypto/sha256"
+	"encoding/hex"
+	"encoding/json"
+	"errors"
+	"fmt"
+	"net/http"
+	"strconv"
+	"strings"
+	"time"
+
+	"github.com/gorilla/mux"
+	"gorm.io/gorm"
+)
+
+// Content-addressed diagram store (same format as the agent's sessionclient/diagrams.py).
+//
+// diagram_blobs holds each diagram once, keyed by the first 16 hex chars of the sha256 of the stripped
+// mermaid text. A blob is either the full text (base = "") or a line diff against another blob; chains are
+// cut at maxDiagramChain. diagram_versions maps a session artifact version (ADK artifactDelta) to a hash.
+// Session events carry {"mermaidRef": "<hash>"} instead of the mermaid text.
+var diagramSchema = []string{
+	`CREATE TABLE IF NOT EXISTS diagram_blobs (
+	hash TEXT PRIMARY KEY,
+	base TEXT NOT NULL,
+	depth INTEGER NOT NULL,
+	data TEXT NOT NULL,
+	size INTEGER NOT NULL,
+	created_at TIMESTAMPTZ NOT NULL DEFAULT now())`,
+	`CREATE TABLE IF NOT EXISTS diagram_versions (
+	app_name TEXT NOT NULL,
+	user_id TEXT NOT NULL,
+	session_id TEXT NOT NULL,
+	filename TEXT NOT NULL,
+	version INTEGER NOT NULL,
+	hash TEXT NOT NULL,
+	create_time TIMESTAMPTZ NOT NULL,
+	PRIMARY KEY (app_name, user_id, session_id, filename, version))`,
+}
+
+const (
+	maxDiagramChain   = 16
+	diagramMimeType   = "text/vnd.mermaid"
+	maxDiagramsPerGet = 256
+)
+
+// diffOp replaces base lines [Start:End] with Lines. JSON: [start, end, [line, ...]].
+type diffOp struct {
+	Start int
+	End   int
+	Lines []string
+}
+
+func (op *diffOp) UnmarshalJSON(b []byte) error {
+	var raw []json.RawMessage
+	if err := json.Unmarshal(b, &raw); err != nil {
+		return err
+	}
+	if len(raw) != 3 {
+		return fmt.Errorf("diff op must be [start, end, lines]")
+	}
+	if err := json.Unmarshal(raw[0], &op.Start); err != nil {
+		return err
+	}
+	if err := json.Unmarshal(raw[1], &op.End); err != nil {
+		return err
+	}
+	return json.Unmarshal(raw[2], &op.Lines)
+}
+
+// SaveDiagramRequest is the REST body for saving a diagram version: the full text, or a diff against base.
+type SaveDiagramRequest struct {
+	Hash string    `json:"hash"`
+	Text *string   `json:"text"`
+	Base string    `json:"base"`
+	Diff *[]diffOp `json:"diff"`
+}
+
+// ArtifactVersion is the ADK ArtifactVersion JSON shape; customMetadata.hash is the diagram hash.
+type ArtifactVersion struct {
+	Version        int            `json:"version"`
+	CanonicalURI   string         `json:"canonicalUri"`
+	CustomMetadata map[string]any `json:"customMetadata"`
+	CreateTime     float64        `json:"createTime"`
+	MimeType       string         `json:"mimeType"`
+}
+
+// DiagramsRequest / DiagramsResponse: batch lookup by hash (unknown hashes are left out).
+type DiagramsRequest struct {
+	Hashes []string `json:"hashes"`
+}
+
+type DiagramsResponse struct {
+	Diagrams map[string]string `json:"diagrams"`
+}
+
+type diagramBlob struct {
+	Base  string
+	Depth int
+	Data  string
+}
+
+type diagramVersion struct {
+	Version    int
+	Hash       string
+	CreateTime time.Time
+}
+
+var errUnknownBase = errors.New("unknown base diagram")
+
+func diagramHash(text string) string {
+	sum := sha256.Sum256([]byte(strings.TrimSpace(text)))
+	return hex.EncodeToString(sum[:])[:16]
+}
+
+// splitLines splits after each "\n", keeping it (Python str.splitlines(keepends=True) for "\n" text).
+func splitLines(text string) []string {
+	if text == "" {
+		return nil
+	}
+	lines := strings.SplitAfter(text, "\n")
+	if lines[len(lines)-1] == "" {
+		lines = lines[:len(lines)-1]
+	}
+	return lines
+}
+
+func applyDiff(base string, ops []diffOp) (string, error) {
+	lines := splitLines(base)
+	var b strings.Builder
+	pos := 0
+	for _, op := range ops {
+		if op.Start < pos || op.Start > op.End || op.End > len(lines) {
+			return "", fmt.Errorf("invalid diff op range %d:%d", op.Start, op.End)
+		}
+		for _, l := range lines[pos:op.Start] {
+			b.WriteString(l)
+		}
+		for _, l := range op.Lines {
+			b.WriteString(l)
+		}
+		pos = op.End
+	}
+	for _, l := range lines[pos:] {
+		b.WriteString(l)
+	}
+	return b.String(), nil
+}
+
+func loadBlob(db *gorm.DB, hash string) (*diagramBlob, error) {
+	var blobs []diagramBlob
+	if err := db.Raw("SELECT base, depth, data FROM diagram_blobs WHERE hash = ?", hash).Scan(&blobs).Error; err != nil {
+		return nil, err
+	}
+	if len(blobs) == 0 {
+		return nil, nil
+	}
+	return &blobs[0], nil
+}
+
+// loadDiagram resolves the diff chain of hash to the full text. ok is false if a blob is missing.
+func loadDiagram(db *gorm.DB, hash string) (text string, ok bool, err error) {
+	var diffs []string
+	for {
+		blob, err := loadBlob(db, hash)
+		if err != nil || blob == nil {
+			return "", false, err
+		}
+		if blob.Base == "" {
+			text = blob.Data
+			break
+		}
+		diffs = append(diffs, blob.Data)
+		if len(diffs) > maxDiagramChain*4 {
+			return "", false, fmt.Errorf("diagram delta chain too long at %s", hash)
+		}
+		hash = blob.Base
+	}
+	for i := len(diffs) - 1; i >= 0; i-- {
+		var ops []diffOp
+		if err := json.Unmarshal([]byte(diffs[i]), &ops); err != nil {
+			return "", false, err
+		}
+		if text, err = applyDiff(text, ops); err != nil {
+			return "", false, err
+		}
+	}
+	return text, true, nil
+}
+
+func listDiagramVersions(db *gorm.DB, sid SessionID, filename string) ([]diagramVersion, error) {
+	var versions []diagramVersion
+	err := db.Raw(`SELECT version, hash, create_time FROM diagram_versions
+WHERE app_name = ? AND user_id = ? AND session_id = ? AND filename = ? ORDER BY version`,
+		sid.AppName, sid.UserID, sid.ID, filename).Scan(&versions).Error
+	return versions, err
+}
+
+func toArtifactVersion(sid SessionID, filename string, v diagramVersion) ArtifactVersion {
+	return ArtifactVersion{
+		Version: v.Version,
+		CanonicalURI: fmt.Sprintf("artifact://apps/%s/users/%s/sessions/%s/artifacts/%s/versions/%d",
+			sid.AppName, sid.UserID, sid.ID, filename, v.Version),
+		CustomMetadata: map[string]any{"hash": v.Hash},
+		CreateTime:     float64(v.CreateTime.UnixMilli()) / 1000,
+		MimeType:       diagramMimeType,
+	}
+}
+
+func artifactVars(w http.ResponseWriter, r *http.Request) (SessionID, string, bool) {
+	vars := mux.Vars(r)
+	sid, err := SessionIDFromVars(vars)
+	if err != nil || sid.ID == "" {
+		http.Error(w, "session_id parameter is required", http.StatusBadRequest)
+		return sid, "", false
+	}
+	return sid, vars["filename"], true
+}
+
+// saveDiagramVersionHandler handles POST .../sessions/{id}/artifacts/{filename}/versions. The body is the full
+// text or a diff against a stored blob (409 if base is unknown, 422 if the result does not match hash). The
+// blob is stored once per hash — as a diff when base's chain is short enough — and a new version is recorded.
+func saveDiagramVersionHandler(db *gorm.DB) http.HandlerFunc {
+	return func(w http.ResponseWriter, r *http.Request) {
+		sid, filename, ok := artifactVars(w, r)
+		if !ok {
+			return
+		}
+		var req SaveDiagramRequest
+		if err := json.NewDecoder(r.Body).Decode(&req); err != nil {
+			http.Error(w, err.Error(), http.StatusBadRequest)
+			return
+		}
+		db := db.WithContext(r.Context())
+		var text string
+		switch {
+		case req.Diff != nil:
+			base, found, err := loadDiagram(db, req.Base)
+			if err != nil {
+				http.Error(w, err.Error(), http.StatusInternalServerError)
+				return
+			}
+			if req.Base == "" || !found {
+				http.Error(w, errUnknownBase.Error(), http.StatusConflict)
+				return
+			}
+			if text, err = applyDiff(base, *req.Diff); err != nil {
+				http.Error(w, err.Error(), http.StatusUnprocessableEntity)
+				return
+			}
+		case req.Text != nil:
+			text = *req.Text
+		default:
+			http.Error(w, "text or base+diff is required", http.StatusBadRequest)
+			return
+		}
+		text = strings.TrimSpace(text)
+		if req.Hash != diagramHash(text) {
+			http.Error(w, "hash does not match the diagram text", http.StatusUnprocessableEntity)
+			return
+		}
+		now := time.Now()
+		var version int
+		err := db.Transaction(func(tx *gorm.DB) error {
+			blob, data, depth := "", text, 0
+			if req.Diff != nil {
+				if b, err := loadBlob(tx, req.Base); err != nil {
+					return err
+				} else if b != nil && b.Depth < maxDiagramChain {
+					encoded, err := json.Marshal(diffJSON(*req.Diff))
+					if err != nil {
+						return err
+					}
+					blob, data, depth = req.Base, string(encoded), b.Depth+1
+				}
+			}
+			if err := tx.Exec(`INSERT INTO diagram_blobs (hash, base, depth, data, size) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (hash) DO NOTHING`, req.Hash, blob, depth, data, len(text)).Error; err != nil {
+				return err
+			}
+			// 같은 세션/파일의 동시 저장은 PK 충돌로 실패 (에이전트는 세션별로 턴을 직렬화함)
+			if err := tx.Raw(`SELECT COALESCE(MAX(version) + 1, 0) FROM diagram_versions
+WHERE app_name = ? AND user_id = ? AND session_id = ? AND filename = ?`,
+				sid.AppName, sid.UserID, sid.ID, filename).Scan(&version).Error; err != nil {
+				return err
+			}
+			return tx.Exec(`INSERT INTO diagram_versions (app_name, user_id, session_id, filename, version, hash, create_time)
+VALUES (?, ?, ?, ?, ?, ?, ?)`, sid.AppName, sid.UserID, sid.ID, filename, version, req.Hash, now).Error
+		})
+		if err != nil {
+			http.Error(w, err.Error(), http.StatusInternalServerError)
+			return
+		}
+		writeJSON(w, http.StatusOK, toArtifactVersion(sid, filename, diagramVersion{Version: version, Hash: req.Hash, CreateTime: now}))
+	}
+}
+
+// diffJSON converts ops back to the wire format ([start, end, lines]) for storage.
+func diffJSON(ops []diffOp) [][]any {
+	out := make([][]any, len(ops))
+	for i, op := range ops {
+		lines := op.Lines
+		if lines == nil {
+			lines = []string{}
+		}
+		out[i] = []any{op.Start, op.End, lines}
+	}
+	return out
+}
+
+// listArtifactsHandler handles GET .../sessions/{id}/artifacts: artifact filenames of the session.
+func listArtifactsHandler(db *gorm.DB) http.HandlerFunc {
+	return func(w http.ResponseWriter, r *http.Request) {
+		sid, _, ok := artifactVars(w, r)
+		if !ok {
+			return
+		}
+		names := []string{}
+		if err := db.WithContext(r.Context()).Raw(`SELECT DISTINCT filename FROM diagram_versions
+WHERE app_name = ? AND user_id = ? AND session_id = ? ORDER BY filename`,
+			sid.AppName, sid.UserID, sid.ID).Scan(&names).Error; err != nil {
+			http.Error(w, err.Error(), http.StatusInternalServerError)
+			return
+		}
+		writeJSON(w, http.StatusOK, names)
+	}
+}
+
+// listArtifactVersionsHandler handles GET .../artifacts/{filename}/versions (version numbers) and
+// .../versions/metadata (ADK ArtifactVersion list, with the diagram hash in customMetadata).
+func listArtifactVersionsHandler(db *gorm.DB, metadata bool) http.HandlerFunc {
+	return func(w http.ResponseWriter, r *http.Request) {
+		sid, filename, ok := artifactVars(w, r)
+		if !ok {
+			return
+		}
+		versions, err := listDiagramVersions(db.WithContext(r.Context()), sid, filename)
+		if err != nil {
+			http.Error(w, err.Error(), http.StatusInternalServerError)
+			return
+		}
+		if !metadata {
+			numbers := make([]int, 0, len(versions))
+			for _, v := range versions {
+				numbers = append(numbers, v.Version)
+			}
+			writeJSON(w, http.StatusOK, numbers)
+			return
+		}
+		out := make([]ArtifactVersion, 0, len(versions))
+		for _, v := range versions {
+			out = append(out, toArtifactVersion(sid, filename, v))
+		}
+		writeJSON(w, http.StatusOK, out)
+	}
+}
+
+// loadArtifactHandler handles GET .../artifacts/{filename}[?version=N] and .../versions/{version} ("latest" or
+// a number): the ADK Part JSON ({"text": ...}) of that version, resolved from the diff chain.
+func loadArtifactHandler(db *gorm.DB) http.HandlerFunc {
+	return func(w http.ResponseWriter, r *http.Request) {
+		sid, filename, ok := artifactVars(w, r)
+		if !ok {
+			return
+		}
+		want := mux.Vars(r)["version"]
+		if want == "" {
+			want = r.URL.Query().Get("version")
+		}
+		db := db.WithContext(r.Context())
+		versions, err := listDiagramVersions(db, sid, filename)
+		if err != nil {
+			http.Error(w, err.Error(), http.StatusInternalServerError)
+			return
+		}
+		var found *diagramVersion
+		if want == "" || want == "latest" {
+			if len(versions) > 0 {
+				found = &versions[len(versions)-1]
+			}
+		} else {
+			n, err := strconv.Atoi(want)
+			if err != nil {
+				http.Error(w, "invalid version", http.StatusUnprocessableEntity)
+				return
+			}
+			for i := range versions {
+				if versions[i].Version == n {
+					found = &versions[i]
+				}
+			}
+		}
+		if found == nil {
+			http.Error(w, "artifact not found", http.StatusNotFound)
+			return
+		}
+		text, ok, err := loadDiagram(db, found.Hash)
+		if err != nil {
+			http.Error(w, err.Error(), http.StatusInternalServerError)
+			return
+		}
+		if !ok {
+			http.Error(w, "artifact not found", http.StatusNotFound)
+			return
+		}
+		w.Header().Set("X-Artifact-Version", strconv.Itoa(found.Version))
+		w.Header().Set("ETag", `"`+found.Hash+`"`)
+		writeJSON(w, http.StatusOK, map[string]string{"text": text})
+	}
+}
+
+// deleteArtifactHandler handles DELETE .../artifacts/{filename}: drops the session's versions. Blobs are
+// shared between sessions by hash and stay.
+func deleteArtifactHandler(db *gorm.DB) http.HandlerFunc {
+	return func(w http.ResponseWriter, r *http.Request) {
+		sid, filename, ok := artifactVars(w, r)
+		if !ok {
+			return
+		}
+		if err := db.WithContext(r.Context()).Exec(`DELETE FROM diagram_versions
+WHERE app_name = ? AND user_id = ? AND session_id = ? AND filename = ?`,
+			sid.AppName, sid.UserID, sid.ID, filename).Error; err != nil {
+			http.Error(w, err.Error(), http.StatusInternalServerError)
+			return
+		}
+		writeJSON(w, http.StatusOK, nil)
+	}
+}
+
+// getDiagramHandler handles GET /api/diagrams/{hash}: the mermaid text. Content-addressed, so cacheable forever.
+func getDiagramHandler(db *gorm.DB) http.HandlerFunc {
+	return func(w http.ResponseWriter, r *http.Request) {
+		hash := mux.Vars(r)["hash"]
+		text, ok, err := loadDiagram(db.WithContext(r.Context()), hash)
+		if err != nil {
+			http.Error(w, err.Error(), http.StatusInternalServerError)
+			return
+		}
+		if !ok {
+			http.Error(w, "diagram not found", http.StatusNotFound)
+			return
+		}
+		w.Header().Set("Content-Type", "text/plain; charset=utf-8")
+		w.Header().Set("Cache-Control", "public, max-age=31536000, immutable")
+		w.Header().Set("ETag", `"`+hash+`"`)
+		_, _ = w.Write([]byte(text))
+	}
+}
+
+// getDiagramsHandler handles POST /api/diagrams/batch: {"hashes": [...]} -> {"diagrams": {hash: text}}.
+func getDiagramsHandler(db *gorm.DB) http.HandlerFunc {
+	return func(w http.ResponseWriter, r *http.Request) {
+		var req DiagramsRequest
+		if err := json.NewDecoder(r.Body).Decode(&req); err != nil {
+			http.Error(w, err.Error(), http.StatusBadRequest)
+			return
+		}
+		if len(req.Hashes) > maxDiagramsPerGet {
+			http.Error(w, fmt.Sprintf("at most %d hashes per request", maxDiagramsPerGet), http.StatusBadRequest)
+			return
+		}
+		db := db.WithContext(r.Context())
+		out := DiagramsResponse{Diagrams: map[string]string{}}
+		for _, hash := range req.Hashes {
+			text, ok, err := loadDiagram(db, hash)
+			if err != nil {
+				http.Error(w, err.Error(), http.StatusInternalServerError)
+				return
+			}
+			if ok {
+				out.Diagrams[hash] = text
+			}
+		}
+		writeJSON(w, http.StatusOK, out)
+	}
+}
@@ -1,8 +1,13 @@
 package main
 
 import (
+	"context"
 	"encoding/json"
+	"errors"
 	"net/http"
+	"sort"
+	"strconv"
+	"time"
 
 	"github.com/gorilla/mux"
 	"google.golang.org/adk/session"
@@ -24,6 +29,10 @@ func listSessionsHandler(svc session.Service) http.HandlerFunc {
 			http.Error(w, err.Error(), http.StatusInternalServerError)
 			return
 		}
+		if r.URL.Query().Get("view") == "summary" {
+			writeSummaryPage(w, r, resp.Sessions)
+			return
+		}
 		out := make([]Session, 0, len(resp.Sessions))
 		for _, s := range resp.Sessions {
 			sess, err := FromSession(s)
@@ -37,6 +46,54 @@ func listSessionsHandler(svc session.Service) http.HandlerFunc {
 	}
 }
 
+const (
+	defaultSummaryLimit = 50
+	maxSummaryLimit     = 500
+)
+
+// writeSummaryPage answers GET .../sessions?view=summary[&limit=N][&after=cursor]:
+// summaries sorted by lastUpdateTime (newest first), paginated by an opaque cursor.
+func writeSummaryPage(w http.ResponseWriter, r *http.Request, sessions []session.Session) {
+	q := r.URL.Query()
+	limit := defaultSummaryLimit
+	if v := q.Get("limit"); v != "" {
+		n, err := strconv.Atoi(v)
+		if err != nil || n <= 0 {
+			http.Error(w, "invalid limit parameter", http.StatusBadRequest)
+			return
+		}
+		limit = min(n, maxSummaryLimit)
+	}
+	summaries := make([]SessionSummary, 0, len(sessions))
+	for _, s := range sessions {
+		summaries = append(summaries, ToSessionSummary(s))
+	}
+	sort.Slice(summaries, func(i, j int) bool {
+		if summaries[i].LastUpdateTime != summaries[j].LastUpdateTime {
+			return summaries[i].LastUpdateTime > summaries[j].LastUpdateTime
+		}
+		return summaries[i].ID < summaries[j].ID
+	})
+	start := 0
+	if after := q.Get("after"); after != "" {
+		ts, id, err := parseSummaryCursor(after)
+		if err != nil {
+			http.Error(w, err.Error(), http.StatusBadRequest)
+			return
+		}
+		start = sort.Search(len(summaries), func(i int) bool {
+			s := summaries[i]
+			return s.LastUpdateTime < ts || (s.LastUpdateTime == ts && s.ID > id)
+		})
+	}
+	end := min(start+limit, len(summaries))
+	page := SessionSummaryPage{Sessions: summaries[start:end]}
+	if end < len(summaries) {
+		page.NextCursor = summaryCursor(summaries[end-1])
+	}
+	writeJSON(w, http.StatusOK, page)
+}
+
 func createSessionHandler(svc session.Service) http.HandlerFunc {
 	return func(w http.ResponseWriter, r *http.Request) {
 		sid, err := SessionIDFromVars(mux.Vars(r))
@@ -96,11 +153,36 @@ func getSessionHandler(svc session.Service) http.HandlerFunc {
 			http.Error(w, "session_id parameter is required", http.StatusBadRequest)
 			return
 		}
-		resp, err := svc.Get(r.Context(), &session.GetRequest{
+		req := &session.GetRequest{
 			AppName:   sid.AppName,
 			UserID:    sid.UserID,
 			SessionID: sid.ID,
-		})
+		}
+		// ?since=<unix seconds>: 해당 시각 이후(포함) 이벤트만 반환 (에이전트 세션 캐시의 delta 동기화용,
+		// 값은 이 서비스가 응답한 lastUpdateTime)
+		if v := r.URL.Query().Get("since"); v != "" {
+			since, err := strconv.ParseInt(v, 10, 64)
+			if err != nil {
+				http.Error(w, "invalid since parameter", http.StatusBadRequest)
+				return
+			}
+			req.After = time.Unix(since, 0)
+		}
+		get := svc.Get
+		// ?view=snapshot[&tail=N]: state + 최근 이벤트만 (state["snapshot"]에 이전 이력의 요약이 있음)
+		if r.URL.Query().Get("view") == "snapshot" && req.After.IsZero() {
+			tail := defaultSnapshotTail
+			if v := r.URL.Query().Get("tail"); v != "" {
+				if tail, err = strconv.Atoi(v); err != nil || tail <= 0 {
+					http.Error(w, "invalid tail parameter", http.StatusBadRequest)
+					return
+				}
+			}
+			get = func(ctx context.Context, req *session.GetRequest) (*session.GetResponse, error) {
+				return getSnapshotTail(ctx, svc, req, tail)
+			}
+		}
+		resp, err := get(r.Context(), req)
 		if err != nil {
 			http.Error(w, err.Error(), http.StatusInternalServerError)
 			return
@@ -114,6 +196,70 @@ func getSessionHandler(svc session.Service) http.HandlerFunc {
 	}
 }
 
+// defaultSnapshotTail is the number of recent events returned by ?view=snapshot without &tail.
+const defaultSnapshotTail = 30
+
+// getSnapshotTail returns the session with its newest tail events. Events appended after the snapshot are
+// always included (the client folds them into the next snapshot); a session without a snapshot is returned
+// in full, since nothing summarizes its older events yet.
+func getSnapshotTail(ctx context.Context, svc session.Service, req *session.GetRequest, tail int) (*session.GetResponse, error) {
+	recent := *req
+	recent.NumRecentEvents = tail
+	resp, err := svc.Get(ctx, &recent)
+	if err != nil {
+		return nil, err
+	}
+	snapshot, _ := sessionStateAll(resp.Session.State())["snapshot"].(map[string]any)
+	if snapshot == nil {
+		return svc.Get(ctx, req)
+	}
+	events := resp.Session.Events()
+	snapshotTime, _ := snapshot["time"].(float64)
+	if events.Len() < tail || snapshotTime == 0 || events.At(0).Timestamp.Unix() <= int64(snapshotTime) {
+		return resp, nil
+	}
+	// tail보다 많은 이벤트가 스냅샷 이후에 쌓임 (스냅샷 쓰기 실패 등) → 스냅샷 시각 이후 전체
+	since := *req
+	since.After = time.Unix(int64(snapshotTime), 0)
+	return svc.Get(ctx, &since)
+}
+
+// compactSessionHandler handles POST .../sessions/{id}/compact: moves events older than "before" (unix seconds),
+// except the newest "keep", from events to events_archive in one statement. The agent only asks for events
+// already folded into the session snapshot.
+func compactSessionHandler(db *gorm.DB) http.HandlerFunc {
+	return func(w http.ResponseWriter, r *http.Request) {
+		sid, err := SessionIDFromVars(mux.Vars(r))
+		if err != nil || sid.ID == "" {
+			http.Error(w, "session_id parameter is required", http.StatusBadRequest)
+			return
+		}
+		var req CompactRequest
+		if err := json.NewDecoder(r.Body).Decode(&req); err != nil {
+			http.Error(w, err.Error(), http.StatusBadRequest)
+			return
+		}
+		if req.Before <= 0 || req.Keep < 0 {
+			http.Error(w, "before must be a unix time and keep must not be negative", http.StatusBadRequest)
+			return
+		}
+		res := db.WithContext(r.Context()).Exec(`WITH moved AS (
+	DELETE FROM events
+	WHERE app_name = ? AND user_id = ? AND session_id = ? AND timestamp < ?
+	  AND id NOT IN (SELECT id FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?
+	                 ORDER BY timestamp DESC LIMIT ?)
+	RETURNING *)
+INSERT INTO events_archive SELECT * FROM moved`,
+			sid.AppName, sid.UserID, sid.ID, time.Unix(req.Before, 0),
+			sid.AppName, sid.UserID, sid.ID, req.Keep)
+		if res.Error != nil {
+			http.Error(w, res.Error.Error(), http.StatusInternalServerError)
+			return
+		}
+		writeJSON(w, http.StatusOK, CompactResponse{Archived: res.RowsAffected})
+	}
+}
+
 func deleteSessionHandler(svc session.Service, db *gorm.DB) http.HandlerFunc {
 	return func(w http.ResponseWriter, r *http.Request) {
 		sid, err := SessionIDFromVars(mux.Vars(r))
@@ -123,10 +269,12 @@ func deleteSessionHandler(svc session.Service, db *gorm.DB) http.HandlerFunc {
 		}
 		// ADK sessions 테이블과 events 테이블에 FK가 있어 세션만 삭제하면 실패할 수 있음. events를 먼저 삭제.
 		if db != nil {
-			if res := db.Exec("DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?",
-				sid.AppName, sid.UserID, sid.ID); res.Error != nil {
-				http.Error(w, res.Error.Error(), http.StatusInternalServerError)
-				return
+			for _, table := range []string{"events", "events_archive", "diagram_versions"} {
+				if res := db.Exec("DELETE FROM "+table+" WHERE app_name = ? AND user_id = ? AND session_id = ?",
+					sid.AppName, sid.UserID, sid.ID); res.Error != nil {
+					http.Error(w, res.Error.Error(), http.StatusInternalServerError)
+					return
+				}
 			}
 		}
 		if err := svc.Delete(r.Context(), &session.DeleteRequest{
@@ -163,14 +311,113 @@ func appendEventHandler(svc session.Service) http.HandlerFunc {
 			http.Error(w, err.Error(), http.StatusInternalServerError)
 			return
 		}
+		if isStale(r, getResp.Session) {
+			http.Error(w, errStaleSession.Error(), http.StatusConflict)
+			return
+		}
 		if err := svc.AppendEvent(r.Context(), getResp.Session, ToSessionEvent(ev)); err != nil {
 			http.Error(w, err.Error(), http.StatusInternalServerError)
 			return
 		}
-		w.WriteHeader(http.StatusNoContent)
+		updated, err := storedLastUpdate(r.Context(), svc, sid)
+		if err != nil {
+			http.Error(w, err.Error(), http.StatusInternalServerError)
+			return
+		}
+		writeJSON(w, http.StatusOK, AppendEventsResponse{LastUpdateTime: updated})
 	}
 }
 
+// lastUpdateHeader carries, on append, the lastUpdateTime (unix seconds) this service last returned to the client
+// (from a get or a previous append).
+const lastUpdateHeader = "X-Session-Last-Update-Time"
+
+// isStale reports whether the stored session is newer than the client's cached copy (version conflict).
+func isStale(r *http.Request, s session.Session) bool {
+	v := r.Header.Get(lastUpdateHeader)
+	if v == "" {
+		return false
+	}
+	clientTime, err := strconv.ParseInt(v, 10, 64)
+	if err != nil {
+		return false
+	}
+	return s.LastUpdateTime().Unix() > clientTime
+}
+
+// storedLastUpdate re-reads the session after an append for the lastUpdateTime the store recorded. After is set to
+// now so no events are loaded.
+func storedLastUpdate(ctx context.Context, svc session.Service, sid SessionID) (int64, error) {
+	resp, err := svc.Get(ctx, &session.GetRequest{
+		AppName:   sid.AppName,
+		UserID:    sid.UserID,
+		SessionID: sid.ID,
+		After:     time.Now(),
+	})
+	if err != nil {
+		return 0, err
+	}
+	return resp.Session.LastUpdateTime().Unix(), nil
+}
+
+// TxServiceFactory builds a session.Service bound to an open DB transaction.
+type TxServiceFactory func(tx *gorm.DB) (session.Service, error)
+
+// appendEventsHandler handles POST .../sessions/{id}/events/batch: appends a list of events in one DB transaction
+// (one session read for the whole batch instead of one per event).
+func appendEventsHandler(db *gorm.DB, txService TxServiceFactory) http.HandlerFunc {
+	return func(w http.ResponseWriter, r *http.Request) {
+		sid, err := SessionIDFromVars(mux.Vars(r))
+		if err != nil || sid.ID == "" {
+			http.Error(w, "session_id parameter is required", http.StatusBadRequest)
+			return
+		}
+		var req AppendEventsRequest
+		if err := json.NewDecoder(r.Body).Decode(&req); err != nil {
+			http.Error(w, err.Error(), http.StatusBadRequest)
+			return
+		}
+		if len(req.Events) == 0 {
+			w.WriteHeader(http.StatusNoContent)
+			return
+		}
+		status := http.StatusInternalServerError
+		var updated int64
+		err = db.WithContext(r.Context()).Transaction(func(tx *gorm.DB) error {
+			svc, err := txService(tx)
+			if err != nil {
+				return err
+			}
+			getResp, err := svc.Get(r.Context(), &session.GetRequest{
+				AppName:   sid.AppName,
+				UserID:    sid.UserID,
+				SessionID: sid.ID,
+			})
+			if err != nil {
+				return err
+			}
+			if isStale(r, getResp.Session) {
+				status = http.StatusConflict
+				return errStaleSession
+			}
+			for _, ev := range req.Events {
+				if err := svc.AppendEvent(r.Context(), getResp.Session, ToSessionEvent(ev)); err != nil {
+					return err
+				}
+			}
+			updated, err = storedLastUpdate(r.Context(), svc, sid)
+			return err
+		})
+		if err != nil {
+			http.Error(w, err.Error(), status)
+			return
+		}
+		writeJSON(w, http.StatusOK, AppendEventsResponse{LastUpdateTime: updated})
+	}
+}
+
+var errStaleSession = errors.New("session was updated after the client's copy")
+
 func writeJSON(w http.ResponseWriter, status int, v any) {
 	w.Header().Set("Content-Type", "application/json")
 	w.WriteHeader(status)
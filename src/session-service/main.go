@@ -7,6 +7,7 @@ import (
 	"os"
 
 	"github.com/gorilla/mux"
+	"google.golang.org/adk/session"
 	"google.golang.org/adk/session/database"
 	"gorm.io/driver/postgres"
 	"gorm.io/gorm"
@@ -35,6 +36,11 @@ func buildDSN() string {
 		host, user, password, dbname, port, sslmode)
 }
 
+var archiveSchema = []string{
+	"CREATE TABLE IF NOT EXISTS events_archive (LIKE events INCLUDING DEFAULTS)",
+	"CREATE INDEX IF NOT EXISTS events_archive_by_session ON events_archive (app_name, user_id, session_id, timestamp)",
+}
+
 func main() {
 	dsn := buildDSN()
 	if dsn == "" {
@@ -52,6 +58,18 @@ func main() {
 	if err != nil {
 		log.Fatalf("Failed to open DB for delete: %v", err)
 	}
+	// 압축(compact)으로 옮긴 오래된 이벤트의 보관 테이블 (events와 같은 컬럼)
+	for _, stmt := range archiveSchema {
+		if err := db.Exec(stmt).Error; err != nil {
+			log.Fatalf("Failed to create events archive table: %v", err)
+		}
+	}
+	// 다이어그램 저장소: 해시별 blob(전체 또는 이전 버전에 대한 diff) + 세션 artifact 버전
+	for _, stmt := range diagramSchema {
+		if err := db.Exec(stmt).Error; err != nil {
+			log.Fatalf("Failed to create diagram tables: %v", err)
+		}
+	}
 
 	port := os.Getenv("PORT")
 	if port == "" {
@@ -71,6 +89,26 @@ func main() {
 	api.HandleFunc("/apps/{app_name}/users/{user_id}/sessions/{session_id}", deleteSessionHandler(svc, db)).Methods(http.MethodDelete)
 	// Append event (used by agent's remote session client)
 	api.HandleFunc("/apps/{app_name}/users/{user_id}/sessions/{session_id}/events", appendEventHandler(svc)).Methods(http.MethodPost)
+	// Append several events in one transaction (agent flushes a whole turn at once)
+	txService := func(tx *gorm.DB) (session.Service, error) {
+		return database.NewSessionService(postgres.New(postgres.Config{Conn: tx.Statement.ConnPool}))
+	}
+	api.HandleFunc("/apps/{app_name}/users/{user_id}/sessions/{session_id}/events/batch", appendEventsHandler(db, txService)).Methods(http.MethodPost)
+
+	// Move events already summarized by the session snapshot to events_archive
+	api.HandleFunc("/apps/{app_name}/users/{user_id}/sessions/{session_id}/compact", compactSessionHandler(db)).Methods(http.MethodPost)
+
+	// Diagram versions (ADK artifact routes) and the content-addressed diagram store
+	artifacts := "/apps/{app_name}/users/{user_id}/sessions/{session_id}/artifacts"
+	api.HandleFunc(artifacts, listArtifactsHandler(db)).Methods(http.MethodGet)
+	api.HandleFunc(artifacts+"/{filename}/versions", saveDiagramVersionHandler(db)).Methods(http.MethodPost)
+	api.HandleFunc(artifacts+"/{filename}/versions", listArtifactVersionsHandler(db, false)).Methods(http.MethodGet)
+	api.HandleFunc(artifacts+"/{filename}/versions/metadata", listArtifactVersionsHandler(db, true)).Methods(http.MethodGet)
+	api.HandleFunc(artifacts+"/{filename}/versions/{version}", loadArtifactHandler(db)).Methods(http.MethodGet)
+	api.HandleFunc(artifacts+"/{filename}", loadArtifactHandler(db)).Methods(http.MethodGet)
+	api.HandleFunc(artifacts+"/{filename}", deleteArtifactHandler(db)).Methods(http.MethodDelete)
+	api.HandleFunc("/diagrams/batch", getDiagramsHandler(db)).Methods(http.MethodPost)
+	api.HandleFunc("/diagrams/{hash}", getDiagramHandler(db)).Methods(http.MethodGet)
 
 	http.Handle("/", cors(r))
 	log.Printf("Session service listening on :%s", port)
@@ -83,7 +121,7 @@ func cors(next http.Handler) http.Handler {
 	return http.HandlerFunc(func(w http.ResponseWriter, r *http.Request) {
 		w.Header().Set("Access-Control-Allow-Origin", "*")
 		w.Header().Set("Access-Control-Allow-Methods", "GET, POST, PUT, DELETE, OPTIONS")
-		w.Header().Set("Access-Control-Allow-Headers", "Content-Type, Authorization")
+		w.Header().Set("Access-Control-Allow-Headers", "Content-Type, Authorization, X-Session-Last-Update-Time")
 		if r.Method == http.MethodOptions {
 			w.WriteHeader(http.StatusOK)
 			return
@@ -4,6 +4,8 @@ package main
 import (
 	"fmt"
 	"maps"
+	"strconv"
+	"strings"
 	"time"
 
 	"github.com/mitchellh/mapstructure"
@@ -22,12 +24,50 @@ type Session struct {
 	State          map[string]any `json:"state"`
 }
 
+// SessionSummary is the lightweight REST shape used by the session list (?view=summary): no events, no full state.
+type SessionSummary struct {
+	ID             string `json:"id"`
+	AppName        string `json:"appName"`
+	UserID         string `json:"userId"`
+	LastUpdateTime int64  `json:"lastUpdateTime"`
+	Title          string `json:"title,omitempty"`
+}
+
+// SessionSummaryPage is one page of session summaries. NextCursor is empty on the last page.
+type SessionSummaryPage struct {
+	Sessions   []SessionSummary `json:"sessions"`
+	NextCursor string           `json:"nextCursor,omitempty"`
+}
+
 // CreateSessionRequest is the REST body for creating a session.
 type CreateSessionRequest struct {
 	State  map[string]any `json:"state"`
 	Events []Event        `json:"events"`
 }
 
+// AppendEventsRequest is the REST body for appending several events at once.
+type AppendEventsRequest struct {
+	Events []Event `json:"events"`
+}
+
+// AppendEventsResponse is the body returned after an append: the session's lastUpdateTime as stored by the service.
+// The agent's session cache uses it as its cursor (?since=, X-Session-Last-Update-Time) rather than the timestamps
+// of the events it wrote.
+type AppendEventsResponse struct {
+	LastUpdateTime int64 `json:"lastUpdateTime"`
+}
+
+// CompactRequest is the REST body for moving old events to the archive table.
+type CompactRequest struct {
+	Before int64 `json:"before"`
+	Keep   int   `json:"keep"`
+}
+
+// CompactResponse reports how many events were archived.
+type CompactResponse struct {
+	Archived int64 `json:"archived"`
+}
+
 // Event is the REST JSON shape for a session event (ADK compatible).
 type Event struct {
 	ID                 string                   `json:"id"`
@@ -100,6 +140,41 @@ func FromSession(s session.Session) (Session, error) {
 	}, nil
 }
 
+// ToSessionSummary converts session.Session to its list summary (title comes from state["title"]).
+func ToSessionSummary(s session.Session) SessionSummary {
+	title := ""
+	if v, err := s.State().Get("title"); err == nil {
+		if t, ok := v.(string); ok {
+			title = t
+		}
+	}
+	return SessionSummary{
+		ID:             s.ID(),
+		AppName:        s.AppName(),
+		UserID:         s.UserID(),
+		LastUpdateTime: s.LastUpdateTime().Unix(),
+		Title:          title,
+	}
+}
+
+// summaryCursor encodes the sort position (lastUpdateTime desc, id asc) of a summary.
+func summaryCursor(s SessionSummary) string {
+	return fmt.Sprintf("%d:%s", s.LastUpdateTime, s.ID)
+}
+
+// parseSummaryCursor decodes a cursor produced by summaryCursor.
+func parseSummaryCursor(c string) (int64, string, error) {
+	ts, id, ok := strings.Cut(c, ":")
+	if !ok {
+		return 0, "", fmt.Errorf("invalid cursor")
+	}
+	t, err := strconv.ParseInt(ts, 10, 64)
+	if err != nil {
+		return 0, "", fmt.Errorf("invalid cursor")
+	}
+	return t, id, nil
+}
+
 func sessionStateAll(st session.State) map[string]any {
 	m := make(map[string]any)
 	for k, v := range st.All() {
@@ -1,6 +1,10 @@
 (function () {
   const APP_NAME = 'diagram_agent';
   const USER_ID = 'ui-user';
+  // 세션을 열 때 받는 최근 이벤트 수 (그 이전은 state.snapshot의 요약으로 표시)
+  const SNAPSHOT_TAIL = 30;
+  // 서버 측 SVG 렌더링 사용 (window.SERVER_RENDER = false 이면 항상 브라우저의 mermaid.run)
+  const SERVER_RENDER = window.SERVER_RENDER !== false;
 
   const newSessionBtn = document.getElementById('newSession');
   const deleteSessionBtn = document.getElementById('deleteSession');
@@ -96,10 +100,25 @@
     if (loading) setStatus('처리 중…', 'loading');
   }
 
+  const SESSION_PAGE_SIZE = 100;
+  const SESSION_MAX_PAGES = 20;
+
+  /** 세션 목록: 요약(view=summary, events 없음)을 커서 페이지 단위로 조회. 구버전 서버(배열 응답)도 지원. */
   async function listSessions() {
-    const res = await fetch(sessionApiUrl(`/apps/${APP_NAME}/users/${USER_ID}/sessions`));
-    if (!res.ok) throw new Error('세션 목록 조회 실패: ' + res.status);
-    return res.json();
+    const all = [];
+    let after = '';
+    for (let page = 0; page < SESSION_MAX_PAGES; page++) {
+      const params = new URLSearchParams({ view: 'summary', limit: String(SESSION_PAGE_SIZE) });
+      if (after) params.set('after', after);
+      const res = await fetch(sessionApiUrl(`/apps/${APP_NAME}/users/${USER_ID}/sessions?${params}`));
+      if (!res.ok) throw new Error('세션 목록 조회 실패: ' + res.status);
+      const data = await res.json();
+      if (Array.isArray(data)) return data;
+      all.push(...(data.sessions || []));
+      if (!data.nextCursor) break;
+      after = data.nextCursor;
+    }
+    return all;
   }
 
   async function createSession() {
@@ -115,8 +134,10 @@
     return res.json();
   }
 
-  async function getSession(sessionId) {
-    const res = await fetch(sessionApiUrl(`/apps/${APP_NAME}/users/${USER_ID}/sessions/${sessionId}`));
+  /** 세션 조회. snapshot이면 state + 최근 이벤트만 (?view=snapshot, 미지원 서버는 전체를 반환). */
+  async function getSession(sessionId, { snapshot = false } = {}) {
+    const query = snapshot ? `?view=snapshot&tail=${SNAPSHOT_TAIL}` : '';
+    const res = await fetch(sessionApiUrl(`/apps/${APP_NAME}/users/${USER_ID}/sessions/${sessionId}${query}`));
     if (!res.ok) throw new Error('세션 조회 실패: ' + res.status);
     return res.json();
   }
@@ -150,6 +171,74 @@
     return res.json();
   }
 
+  /**
+   * /run_sse 스트리밍 실행. 이벤트가 생성되는 즉시 onEvent(ev) 호출, 완료 후 최종(비부분) 이벤트 목록 반환.
+   * 서버가 구조화 응답을 증분 파싱해 보내는 `event: field` 프레임({field, delta, done})은 onField(f)로 전달.
+   * 마지막 `event: render` 프레임({hash, url}: 서버에서 렌더링한 SVG)은 onRender(r)로 전달.
+   * 엔드포인트가 없으면(404/405) null 반환 → 호출 측에서 runAgent로 폴백.
+   */
+  async function runAgentStream(sessionId, text, onEvent, onField, onRender) {
+    const res = await fetch(apiUrl('/run_sse'), {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream' },
+      body: JSON.stringify({
+        appName: APP_NAME,
+        sessionId: sessionId,
+        userId: USER_ID,
+        streaming: true,
+        fields: true,
+        render: SERVER_RENDER,
+        newMessage: {
+          role: 'user',
+          parts: [{ text: text }],
+        },
+      }),
+    });
+    if (res.status === 404 || res.status === 405) return null;
+    if (!res.ok || !res.body) {
+      const errBody = await res.text();
+      throw new Error('실행 오류 ' + res.status + (errBody ? ': ' + errBody.slice(0, 200) : ''));
+    }
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    const finalEvents = [];
+    let buf = '';
+    const handleFrame = (frame) => {
+      let eventType = 'message';
+      let data = '';
+      for (const line of frame.split('\n')) {
+        if (line.startsWith('event:')) eventType = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trimStart();
+      }
+      if (!data) return;
+      const payload = JSON.parse(data);
+      if (eventType === 'error') throw new Error('실행 오류: ' + (payload.error || data));
+      if (eventType === 'field') {
+        if (onField) onField(payload);
+        return;
+      }
+      if (eventType === 'render') {
+        if (onRender) onRender(payload);
+        return;
+      }
+      if (!payload.partial) finalEvents.push(payload);
+      if (onEvent) onEvent(payload);
+    };
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buf += decoder.decode(value, { stream: true });
+      let idx;
+      while ((idx = buf.indexOf('\n\n')) !== -1) {
+        const frame = buf.slice(0, idx);
+        buf = buf.slice(idx + 2);
+        handleFrame(frame);
+      }
+    }
+    if (buf.trim()) handleFrame(buf);
+    return finalEvents;
+  }
+
   function stripJsonCodeFence(s) {
     let t = (s || '').trim();
     if (t.startsWith('```json')) t = t.slice(7).trim();
@@ -158,19 +247,24 @@
     return t.trim();
   }
 
+  /** 응답 JSON: mermaid 또는 (저장소에 있는 다이어그램이면) mermaidRef(내용 해시) */
+  function isDiagramJson(j) {
+    return !!j && (typeof j.mermaid === 'string' || typeof j.mermaidRef === 'string');
+  }
+
   function parseMermaidJson(text) {
     const t = stripJsonCodeFence((text || '').trim());
     for (const raw of [t, t.replace(/\s*---[\s\S]*$/, '')]) {
       try {
         const j = JSON.parse(raw);
-        if (j && typeof j.mermaid === 'string') return j;
+        if (isDiagramJson(j)) return j;
       } catch (_) {}
       const start = raw.indexOf('{');
       const end = raw.lastIndexOf('}');
       if (start !== -1 && end > start) {
         try {
           const j = JSON.parse(raw.slice(start, end + 1));
-          if (j && typeof j.mermaid === 'string') return j;
+          if (isDiagramJson(j)) return j;
         } catch (_) {}
       }
     }
@@ -179,7 +273,7 @@
 
   function extractMermaid(text) {
     const j = parseMermaidJson(text);
-    if (j) return j.mermaid.trim();
+    if (j) return typeof j.mermaid === 'string' ? j.mermaid.trim() : null;
     const match = (text || '').match(/```mermaid\s*([\s\S]*?)```/);
     return match ? match[1].trim() : null;
   }
@@ -290,6 +384,53 @@
     return lastCode;
   }
 
+  /** state의 현재 다이어그램 (output_key로 저장된 값, 없으면 스냅샷의 값). 이벤트를 훑지 않음. */
+  function getMermaidFromState(state) {
+    const candidates = [state && state.diagram, state && state.snapshot && state.snapshot.diagram];
+    for (const d of candidates) {
+      if (d && typeof d.mermaid === 'string' && d.mermaid.trim()) return d.mermaid.trim();
+    }
+    return '';
+  }
+
+  const diagramTexts = new Map();
+
+  /** 내용 해시 → mermaid. 내용 주소라 불변이므로 한 번 받은 것은 계속 재사용. 실패하면 null. */
+  async function fetchDiagram(hash) {
+    if (diagramTexts.has(hash)) return diagramTexts.get(hash);
+    try {
+      const res = await fetch(sessionApiUrl('/diagrams/' + encodeURIComponent(hash)));
+      if (!res.ok) return null;
+      const text = await res.text();
+      diagramTexts.set(hash, text);
+      return text;
+    } catch (_) {
+      return null;
+    }
+  }
+
+  /** state.diagram / state.snapshot.diagram 의 mermaidRef를 mermaid로 (제자리). */
+  async function hydrateDiagramRefs(state) {
+    const candidates = [state && state.diagram, state && state.snapshot && state.snapshot.diagram];
+    for (const d of candidates) {
+      if (!d || typeof d.mermaid === 'string' || typeof d.mermaidRef !== 'string') continue;
+      const text = await fetchDiagram(d.mermaidRef);
+      if (text !== null) d.mermaid = text;
+    }
+  }
+
+  /** 받은 이벤트에 없는 (보관/생략된) 이전 턴의 스냅샷 요약. 없으면 null. */
+  function getSnapshotNote(state, events) {
+    const snapshot = state && state.snapshot;
+    if (!snapshot || !Array.isArray(snapshot.summary)) return null;
+    const loaded = new Set((events || []).map((ev) => ev.id));
+    const lines = snapshot.summary.filter((l) => !loaded.has(l.id));
+    if (!lines.length) return null;
+    const older = (snapshot.turns || 0) - snapshot.summary.length;
+    const text = lines.map((l) => '• ' + l.user + (l.title ? ' → ' + l.title : '')).join('\n');
+    return (older > 0 ? `(이전 ${older}턴 생략)\n` : '') + text;
+  }
+
   function renderSessionList() {
     sessionListEmptyEl.hidden = sessions.length > 0;
     sessionListEl.innerHTML = '';
@@ -337,14 +478,16 @@
     setStatus('불러오는 중…', 'loading');
 
     try {
-      const session = await getSession(sessionId);
+      const session = await getSession(sessionId, { snapshot: true });
       const messages = eventsToChatMessages(session.events || []);
+      const note = getSnapshotNote(session.state, session.events);
+      if (note) messages.unshift({ role: 'note', text: note });
       for (const msg of messages) {
         const div = document.createElement('div');
         div.className = 'chat-msg ' + msg.role;
         const who = document.createElement('span');
         who.className = 'chat-role';
-        who.textContent = msg.role === 'user' ? '나' : '에이전트';
+        who.textContent = msg.role === 'user' ? '나' : msg.role === 'note' ? '이전 대화 요약' : '에이전트';
         const body = document.createElement('div');
         body.className = 'chat-body';
         body.textContent = msg.text;
@@ -354,13 +497,14 @@
       }
       chatMessagesEl.scrollTop = chatMessagesEl.scrollHeight;
 
-      const mermaidCode = getLatestMermaidFromEvents(session.events || []);
+      await hydrateDiagramRefs(session.state);
+      const mermaidCode = getMermaidFromState(session.state) || getLatestMermaidFromEvents(session.events || []);
       if (mermaidCode) {
         diagramPlaceholder.hidden = true;
         diagramViewport.hidden = false;
         diagramContainer.classList.add('has-diagram');
         resetDiagramTransform();
-        await renderMermaid(mermaidCode);
+        await renderDiagram(mermaidCode);
       } else {
         diagramPlaceholder.hidden = false;
         diagramViewport.hidden = true;
@@ -373,6 +517,56 @@
     }
   }
 
+  /** 서버 렌더 캐시 키와 같은 해시: 앞뒤 공백 제거한 mermaid의 sha256 앞 16자 (비보안 origin이면 null). */
+  async function diagramHash(code) {
+    if (!window.crypto || !crypto.subtle) return null;
+    const digest = await crypto.subtle.digest('SHA-256', new TextEncoder().encode(code.trim()));
+    return Array.from(new Uint8Array(digest).slice(0, 8), (b) => b.toString(16).padStart(2, '0')).join('');
+  }
+
+  /** 서버에서 렌더링한 SVG 문자열. 캐시에 없으면(404) POST /render 후 다시 요청. 사용할 수 없으면 null. */
+  async function fetchServerSvg(code, url) {
+    if (!url) {
+      const hash = await diagramHash(code);
+      if (!hash) return null;
+      url = '/render/' + hash + '.svg';
+    }
+    let res = await fetch(apiUrl(url));
+    if (res.status === 404) {
+      const made = await fetch(apiUrl('/render'), {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ mermaid: code }),
+      });
+      // 422: 서버 렌더러가 지원하지 않는 구문, 503: 비활성 → mermaid.run
+      if (!made.ok) return null;
+      res = await fetch(apiUrl((await made.json()).url));
+    }
+    if (!res.ok) return null;
+    return res.text();
+  }
+
+  /** 다이어그램 표시: 서버 측 SVG를 우선 사용하고, 실패하면 브라우저에서 mermaid.run. */
+  async function renderDiagram(code, url) {
+    if (SERVER_RENDER) {
+      try {
+        const text = await fetchServerSvg(code, url);
+        const svg = text && new DOMParser().parseFromString(text, 'image/svg+xml').documentElement;
+        if (svg && svg.nodeName === 'svg') {
+          const block = document.createElement('div');
+          block.className = 'server-svg';
+          block.appendChild(document.importNode(svg, true));
+          diagramEl.innerHTML = '';
+          diagramEl.appendChild(block);
+          return;
+        }
+      } catch (e) {
+        console.warn('[DEBUG] server render failed, falling back to mermaid.run:', e.message);
+      }
+    }
+    await renderMermaid(code);
+  }
+
   async function renderMermaid(code) {
     diagramEl.innerHTML = '';
     const block = document.createElement('div');
@@ -461,8 +655,55 @@
     chatMessagesEl.scrollTop = chatMessagesEl.scrollHeight;
 
     setLoading(true);
+    // 스트리밍 중 부분 응답을 보여줄 말풍선 (완료 시 최종 메시지로 교체)
+    const streamDiv = document.createElement('div');
+    streamDiv.className = 'chat-msg model streaming';
+    streamDiv.innerHTML = '<span class="chat-role">에이전트</span><div class="chat-body"></div>';
+    const streamBody = streamDiv.querySelector('.chat-body');
+    const showStreaming = (body) => {
+      if (!streamDiv.isConnected) chatMessagesEl.appendChild(streamDiv);
+      streamBody.textContent = body;
+      chatMessagesEl.scrollTop = chatMessagesEl.scrollHeight;
+    };
+    let streamText = '';
+    // field 이벤트(제목 → 설명 → mermaid 순)가 오면 원문 JSON 대신 설명을 바로 보여줌
+    const live = { fields: false, message: '', mermaid: '' };
+    let rendered = null;
     try {
-      const events = await runAgent(currentSessionId, text);
+      let events = await runAgentStream(
+        currentSessionId,
+        text,
+        (ev) => {
+          if (!ev.partial) return;
+          streamText += getEventText(ev);
+          if (live.fields) return;
+          // 구조화(JSON) 응답의 원문은 보여주지 않음 (field 이벤트를 기다림)
+          if (!/^\s*[{`]/.test(streamText)) showStreaming(streamText);
+          setStatus('생성 중… (' + streamText.length + '자)', 'loading');
+        },
+        (f) => {
+          live.fields = true;
+          if (f.field === 'title' && f.done) {
+            const current = sessions.find((s) => s.id === currentSessionId);
+            if (current) {
+              current.title = String(f.delta).trim().slice(0, 25);
+              renderSessionList();
+            }
+          } else if (f.field === 'message') {
+            live.message += f.delta;
+            showStreaming(live.message);
+            setStatus('설명 작성 중…', 'loading');
+          } else if (f.field === 'mermaid') {
+            live.mermaid += f.delta;
+            setStatus('다이어그램 생성 중… (' + live.mermaid.length + '자)', 'loading');
+          }
+        },
+        (r) => {
+          rendered = r;
+        },
+      );
+      if (events === null) events = await runAgent(currentSessionId, text);
+      streamDiv.remove();
       const fullText = collectModelText(events);
       console.log('[DEBUG] sendMessage: model response fullText=', fullText);
       let parsed = null;
@@ -489,7 +730,7 @@
         diagramViewport.hidden = false;
         diagramContainer.classList.add('has-diagram');
         resetDiagramTransform();
-        await renderMermaid(mermaidCode);
+        await renderDiagram(mermaidCode, rendered && rendered.url);
         setStatus('다이어그램을 반영했습니다.', 'success');
       } else {
         setStatus('응답에서 다이어그램을 찾지 못했습니다.', 'error');
@@ -517,6 +758,7 @@
       const current = sessions.find((s) => s.id === currentSessionId);
       console.log('[DEBUG] sendMessage: after refresh, current session=', current ? { id: current.id, state: current.state, 'state?.title': current.state && current.state.title } : null);
     } catch (err) {
+      streamDiv.remove();
       setStatus('오류: ' + (err.message || String(err)), 'error');
       const errDiv = document.createElement('div');
       errDiv.className = 'chat-msg model error';